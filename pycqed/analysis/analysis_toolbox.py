@@ -16,6 +16,8 @@ from scipy.interpolate import griddata
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 import h5py
 from scipy.signal import argrelextrema
+from pycqed.measurement.hdf5_data import read_instrument_settings
+from pycqed.measurement import data_catalogue
 # to allow backwards compatibility with old a_tools code
 from .tools.file_handling import *
 from .tools.data_manipulation import *
@@ -35,11 +37,32 @@ except:
         datadir = None
     print('Data directory set to:', datadir)
 
+# If True, data is looked up in the measurement catalogue of the data
+# directory (see pycqed.measurement.data_catalogue) instead of walking the
+# day folders.
+use_catalogue = True
+
 ######################################################################
 #     Filehandling tools
 ######################################################################
 
 
+def get_catalogue(folder=None):
+    '''
+    Returns the measurement catalogue of folder (default is datadir) or None
+    if use_catalogue is False or the catalogue can not be used.
+
+    Catalogues are only used (and created) for the configured datadir, not
+    for other folders that are searched.
+    '''
+    if not use_catalogue or datadir is None:
+        return None
+    if (folder is not None and
+            os.path.abspath(folder) != os.path.abspath(datadir)):
+        return None
+    return data_catalogue.get_catalogue(datadir)
+
+
 def nearest_idx(array, value):
     '''
     find the index of the value closest to the specified value.
@@ -100,6 +123,18 @@ def is_equal(ts0, ts1, or_equal=False):
 
 
 def return_last_n_timestamps(n, contains=''):
+    catalogue = get_catalogue()
+    if catalogue is not None:
+        timestamps = []
+        # Fetches a few extra folders as measurements that share a
+        # timestamp are only returned once.
+        for day, name in catalogue.find(contains=contains, limit=2*n):
+            if len(timestamps) == n:
+                break
+            if len(timestamps) == 0 or timestamps[-1] != day+name[:6]:
+                timestamps.append(day+name[:6])
+        if len(timestamps) == n:
+            return timestamps
     timestamps = []
     for i in range(n):
         if i == 0:
@@ -136,7 +171,17 @@ def latest_data(contains='', older_than=None, newer_than=None, or_equal=False,
     else:
         search_dir = folder
 
-    daydirs = os.listdir(search_dir)
+    catalogue = get_catalogue(search_dir)
+    if catalogue is not None:
+        return _latest_data_from_catalogue(
+            catalogue, search_dir, contains=contains, older_than=older_than,
+            newer_than=newer_than, or_equal=or_equal,
+            return_timestamp=return_timestamp, raise_exc=raise_exc,
+            return_all=return_all)
+
+    # the datadir also contains files (e.g. the measurement catalogue)
+    daydirs = [d for d in os.listdir(search_dir)
+               if os.path.isdir(os.path.join(search_dir, d))]
 
     if len(daydirs) == 0:
         logging.warning('No data found in datadir')
@@ -191,6 +236,36 @@ def latest_data(contains='', older_than=None, newer_than=None, or_equal=False,
                 search_dir, daydir, measdir)
 
 
+def _latest_data_from_catalogue(catalogue, search_dir, contains='',
+                                older_than=None, newer_than=None,
+                                or_equal=False, return_timestamp=False,
+                                raise_exc=False, return_all=False):
+    '''
+    Implementation of latest_data using the measurement catalogue.
+    '''
+    kw = {'contains': contains, 'or_equal': or_equal,
+          'older_than': (None if older_than is None
+                         else ''.join(verify_timestamp(older_than))),
+          'newer_than': (None if newer_than is None
+                         else ''.join(verify_timestamp(newer_than)))}
+    found = catalogue.find(limit=1, **kw)
+    if len(found) == 0:
+        if raise_exc is True:
+            raise Exception('No fitting data found.')
+        else:
+            return False
+    daydir, measdir = found[0]
+    if return_all:
+        measdirs = [name for _, name in catalogue.find(
+            day=daydir, ascending=True, **kw)]
+        return search_dir, daydir, measdirs
+    if return_timestamp is False:
+        return os.path.join(search_dir, daydir, measdir)
+    else:
+        return str(daydir)+str(measdir[:6]), os.path.join(
+            search_dir, daydir, measdir)
+
+
 def data_from_time(timestamp, folder=None):
     '''
     returns the full path of the data specified by its timestamp in the
@@ -198,7 +273,21 @@ def data_from_time(timestamp, folder=None):
     '''
     if (folder is None):
         folder = datadir
-    daydirs = os.listdir(folder)
+
+    catalogue = get_catalogue(folder)
+    if catalogue is not None:
+        daystamp, tstamp = verify_timestamp(timestamp)
+        measdirs = [name for _, name in catalogue.find(
+            day=daystamp, timemark=tstamp)]
+        if len(measdirs) == 1:
+            return os.path.join(folder, daystamp, measdirs[0])
+        elif len(measdirs) > 1:
+            raise NameError('Timestamp is not unique: %s ' % (measdirs))
+        # Not in the catalogue, the directory lookup below raises the
+        # appropriate error.
+
+    daydirs = [d for d in os.listdir(folder)
+               if os.path.isdir(os.path.join(folder, d))]
 
     if len(daydirs) == 0:
         raise Exception('No data in the data directory specified')
@@ -253,6 +342,23 @@ def get_start_stop_time(timestamp):
     return timestamp_start, timestamp_stop
 
 
+def _get_instrument_settings(ma):
+    '''
+    Returns the instrument settings of an analysis object or an empty dict
+    if the file does not contain instrument settings. The settings are read
+    once per data file and cached on the analysis object.
+    '''
+    cached = getattr(ma, '_instrument_settings', None)
+    if cached is not None and cached[0] is ma.data_file:
+        return cached[1]
+    if 'Instrument settings' not in ma.data_file:
+        settings = {}
+    else:
+        settings = read_instrument_settings(ma.data_file)
+    ma._instrument_settings = (ma.data_file, settings)
+    return settings
+
+
 def get_data_from_timestamp_legacy(timestamps, param_names, TwoD=False, max_files=None):
     from pycqed.analysis import measurement_analysis as MA
     if max_files is not None:
@@ -266,6 +372,7 @@ def get_data_from_timestamp_legacy(timestamps, param_names, TwoD=False, max_file
             ma.get_naming_and_values_2D()
         else:
             ma.get_naming_and_values()
+        settings = _get_instrument_settings(ma)
         for param in param_names:
             if '.' not in param:
                 special_output = {'amp': 0, 'phase': 1, 'I': 2, 'Q': 3}
@@ -286,8 +393,8 @@ def get_data_from_timestamp_legacy(timestamps, param_names, TwoD=False, max_file
                         'This data file attribute does not exist or hasn''t been coded for extraction.')
 
             else:
-                if param.split('.')[0] in ma.data_file.get('Instrument settings', {}):
-                    data[param].append(ma.data_file['Instrument settings'][
+                if param.split('.')[0] in settings:
+                    data[param].append(settings[
                                        param.split('.')[0]].attrs[param.split('.')[1]])
                 elif param.split('.')[0] in ma.data_file.get('Analysis', {}):
                     temp = ma.data_file['Analysis']
@@ -308,6 +415,7 @@ def get_data_from_timestamp_legacy(timestamps, param_names, TwoD=False, max_file
 
 def get_data_from_ma_v1(ma, param_names):
     data = od([(param, None) for param in param_names])
+    settings = _get_instrument_settings(ma)
     for param in param_names:
         if '.' not in param:
             special_output = {'amp': 0, 'phase': 1, 'I': 2, 'Q': 3}
@@ -328,8 +436,8 @@ def get_data_from_ma_v1(ma, param_names):
                     'This data file attribute does not exist or hasn''t been coded for extraction.')
 
         else:
-            if param.split('.')[0] in ma.data_file.get('Instrument settings', {}):
-                data[param] = ma.data_file['Instrument settings'][
+            if param.split('.')[0] in settings:
+                data[param] = settings[
                     param.split('.')[0]].attrs[param.split('.')[1]]
             elif param.split('.')[0] in ma.data_file.get('Analysis', {}):
                 temp = ma.data_file['Analysis']
@@ -349,6 +457,7 @@ def get_data_from_ma_v1(ma, param_names):
 
 def get_data_from_ma_v2(ma, param_names, numeric_params=None):
     data = od([(param, None) for param in param_names])
+    settings = _get_instrument_settings(ma)
     # print 'boo7', data['amp']
     for param in param_names:
         if param == 'all_data':
@@ -376,12 +485,12 @@ def get_data_from_ma_v2(ma, param_names, numeric_params=None):
             # tmp_var is a temporary fix!
             # should be removed at some point
             try:
-                tmp_var = ma.data_file['Instrument settings'][
+                tmp_var = settings[
                     'MC'].attrs['detector_function_name']
             except:
                 tmp_var = None
             if tmp_var == 'TimeDomainDetector':
-                temp2 = ma.data_file['Instrument settings']['TD_Meas']
+                temp2 = settings['TD_Meas']
                 exec(
                     ('cal_zero = %s' % (temp2.attrs['cal_zero_points'])), locals())
                 exec(
@@ -416,8 +525,8 @@ def get_data_from_ma_v2(ma, param_names, numeric_params=None):
             # print 'boo9', data['amp']
 
         else:
-            if param.split('.')[0] in list(ma.data_file.get('Instrument settings', {}).keys()):
-                data[param] = ma.data_file['Instrument settings'][
+            if param.split('.')[0] in settings:
+                data[param] = settings[
                     param.split('.')[0]].attrs[param.split('.')[1]]
             else:
                 extract_param = True
@@ -464,14 +573,124 @@ def append_data_from_ma(ma, param_names, data, data_version=2,
         data[param].append(new_data[param])
 
 
+def get_filepaths_from_timestamps(timestamps, folder=None):
+    '''
+    Returns the path of the data file of every timestamp, None for
+    timestamps for which no data file is found.
+    '''
+    if folder is None:
+        folder = datadir
+    # The catalogue is synchronized once instead of for every timestamp
+    catalogue = get_catalogue(folder)
+    filepaths = []
+    for timestamp in timestamps:
+        measdir = None
+        if catalogue is not None:
+            daystamp, tstamp = verify_timestamp(timestamp)
+            found = catalogue.find(day=daystamp, timemark=tstamp)
+            if len(found) == 1:
+                measdir = os.path.join(folder, *found[0])
+        if measdir is None:
+            try:
+                measdir = data_from_time(timestamp, folder=folder)
+            except Exception:
+                filepaths.append(None)
+                continue
+        filepaths.append(measurement_filename(measdir))
+    return filepaths
+
+
+def _is_file_param(param):
+    '''
+    Parameters with a "." are read directly from the data file (instrument
+    settings, analysis results), other parameters (e.g. "all_data",
+    "fit_params", attributes of the analysis object) require a
+    MeasurementAnalysis object.
+    '''
+    return '.' in param
+
+
+def get_data_from_timestamps(timestamps, param_names, numeric_params=None,
+                             filter_no_analysis=False, n_processes=None,
+                             use_cache=True, return_dataframe=False):
+    '''
+    Bulk loader that reads instrument settings and analysis results of
+    many timestamps. Only the requested attributes and datasets are read
+    (read-only, in a pool of processes) and results are cached for as long
+    as the files do not change.
+
+    Args:
+        timestamps (list): timestamps to load.
+        param_names (list or dict): parameters ("instrument.parameter" or
+            "group.(subgroups.)name") to read. If a dict, the values are the
+            parameters and the keys the names in the result.
+        numeric_params (list): parameters that are converted to floats.
+        filter_no_analysis (bool): skip files without an "Analysis" group.
+        n_processes (int): number of processes used to read the files.
+        return_dataframe (bool): return a pandas DataFrame indexed by
+            timestamp instead of an ordered dict of columns.
+
+    Returns:
+        ordered dict with a column (numpy array or list) per parameter and
+        the "timestamps" that were loaded, or a DataFrame.
+    '''
+    if type(param_names) is dict:
+        names = param_names
+    else:
+        names = od((param, param) for param in param_names)
+    timestamps = list(timestamps)
+    filepaths = get_filepaths_from_timestamps(timestamps)
+    records = bulk_load_params(
+        filepaths, names.values(), n_processes=n_processes,
+        use_cache=use_cache,
+        required_group='Analysis' if filter_no_analysis else None)
+    loaded = [i for i, record in enumerate(records) if record is not None]
+    if numeric_params is not None:
+        # numeric_params refers to the names in the result
+        numeric_params = [names[key] for key in numeric_params
+                          if key in names]
+    columns = records_to_columns([records[i] for i in loaded],
+                                 names.values(),
+                                 numeric_params=numeric_params)
+    out_data = od((key, columns[param]) for key, param in names.items())
+    loaded_timestamps = [timestamps[i] for i in loaded]
+    if return_dataframe:
+        return pd.DataFrame(out_data, index=loaded_timestamps)
+    out_data['timestamps'] = loaded_timestamps
+    return out_data
+
+
 def get_data_from_timestamp_list(timestamps,
                                  param_names,
                                  TwoD=False,
                                  max_files=None,
                                  filter_no_analysis=False,
-                                 numeric_params=None):
+                                 numeric_params=None,
+                                 n_processes=None):
     from pycqed.analysis import measurement_analysis as ma
 
+    if type(param_names) is dict:
+        file_params = all(_is_file_param(p) for p in param_names.values())
+    else:
+        file_params = all(_is_file_param(p) for p in param_names)
+    if file_params and type(timestamps) is not str:
+        # Only instrument settings and analysis results are requested, these
+        # are read without creating a MeasurementAnalysis per timestamp.
+        if max_files is not None:
+            timestamps = timestamps[:max_files]
+        out_data = get_data_from_timestamps(
+            timestamps, param_names, numeric_params=numeric_params,
+            filter_no_analysis=filter_no_analysis, n_processes=n_processes)
+        for key, column in out_data.items():
+            if (key != 'timestamps' and isinstance(column, np.ndarray) and
+                    (numeric_params is None or key not in numeric_params)):
+                out_data[key] = list(column)
+        loaded = set(out_data['timestamps'])
+        removed = [ts for ts in timestamps if ts not in loaded]
+        if len(removed) > 0:
+            print('timestamps removed by filtering:', removed)
+        return out_data
+
     if type(timestamps) is str:
         timestamps = [timestamps]
         single_timestamp = True
@@ -619,7 +838,7 @@ def get_all_msmt_filepaths(folder, suffix='hdf5', pattern=''):
 
 
 def get_instrument_setting(analysis_object, instrument_name, parameter):
-    instrument_settings = analysis_object.data_file['Instrument settings']
+    instrument_settings = _get_instrument_settings(analysis_object)
     instrument = instrument_settings[instrument_name]
     attr = instrument.attrs[parameter]
     return attr
@@ -636,8 +855,8 @@ def compare_instrument_settings_timestamp(timestamp_a, timestamp_b):
     analysis_object_a = h5py.File(h5filepath, h5mode)
     h5filepath = measurement_filename(get_folder(timestamp_b))
     analysis_object_b = h5py.File(h5filepath, h5mode)
-    sets_a = analysis_object_a['Instrument settings']
-    sets_b = analysis_object_b['Instrument settings']
+    sets_a = read_instrument_settings(analysis_object_a)
+    sets_b = read_instrument_settings(analysis_object_b)
 
     for ins_key in list(sets_a.keys()):
         print()
@@ -676,8 +895,8 @@ def compare_instrument_settings(analysis_object_a, analysis_object_b):
     Takes two analysis objects as input and prints the differences between the instrument settings.
     Currently it only compares settings existing in object_a, this function can be improved to not care about the order of arguments.
     '''
-    sets_a = analysis_object_a.data_file['Instrument settings']
-    sets_b = analysis_object_b.data_file['Instrument settings']
+    sets_a = read_instrument_settings(analysis_object_a.data_file)
+    sets_b = read_instrument_settings(analysis_object_b.data_file)
 
     for ins_key in list(sets_a.keys()):
         print()
@@ -718,6 +937,18 @@ def get_timestamps_in_range(timestamp_start, timestamp_end=None,
         datetime_end = datetime.datetime.today()
     else:
         datetime_end = datetime_from_timestamp(timestamp_end)
+    catalogue = get_catalogue()
+    if catalogue is not None:
+        if exact_label_match:
+            label = '' if label is None else label
+        found = catalogue.find(
+            contains=label, ascending=True, or_equal=True,
+            newer_than=datetime.datetime.strftime(
+                datetime_start, '%Y%m%d%H%M%S'),
+            older_than=datetime.datetime.strftime(
+                datetime_end, '%Y%m%d%H%M%S'))
+        return ['{}_{}'.format(day, name[:6]) for day, name in found]
+
     days_delta = (datetime_end.date() - datetime_start.date()).days
     all_timestamps = []
     for day in reversed(list(range(days_delta+1))):
@@ -750,8 +981,32 @@ def get_timestamps_in_range(timestamp_start, timestamp_end=None,
     return all_timestamps
 
 
+def _get_experimental_data_from_analysis(timestamp):
+    '''
+    Reads the data and naming of a file that is not supported by the bulk
+    loader using a MeasurementAnalysis, in the same format as
+    bulk_load_experimental_data.
+    '''
+    # Import within function statement to prevent circular import
+    from pycqed.analysis import measurement_analysis as MA
+    ana = MA.MeasurementAnalysis(timestamp=timestamp, auto=False,
+                                 close_file=True, close_fig=True)
+    ana.get_naming_and_values()
+    parameter_names = getattr(ana, 'parameter_names', [ana.sweep_name])
+    if len(parameter_names) == 1:
+        sweep_points = [ana.sweep_points]
+    else:
+        sweep_points = list(ana.sweep_points)
+    exp_data = od()
+    exp_data['sweep_parameter_names'] = list(parameter_names)
+    exp_data['value_names'] = list(ana.value_names)
+    exp_data['data'] = sweep_points + list(ana.measured_values)
+    ana.finish()
+    return exp_data
+
+
 def get_mean_df(label, starting_timestamp, ending_timestamp,
-                return_raw_dataframes=False):
+                return_raw_dataframes=False, n_processes=None):
     '''
     Returns a dataframe containing the mean and standard error of mean (sem)
     of all datasets that match a certain label.
@@ -759,32 +1014,31 @@ def get_mean_df(label, starting_timestamp, ending_timestamp,
 
     if return raw_dataframes
     '''
-    # Import within function statement to prevent circular import
-    from pycqed.analysis import measurement_analysis as MA
     timestamps = get_timestamps_in_range(timestamp_start=starting_timestamp,
                                          timestamp_end=ending_timestamp,
                                          label=label)
+    # Only the data and naming is read (in parallel) instead of creating a
+    # MeasurementAnalysis per timestamp.
+    all_exp_data = bulk_load_experimental_data(
+        get_filepaths_from_timestamps(timestamps), n_processes=n_processes)
     for i, timestamp in enumerate(timestamps):
-        ana = MA.MeasurementAnalysis(timestamp=timestamp, auto=False,
-                                     close_file=True, close_fig=True)
-        ana.get_naming_and_values()
-        if i == 0:  # Initialize appropriate number of dataframes
-            n_variables = len(ana.value_names)
-            dataframes = [pd.DataFrame() for i in range(n_variables)]
-        for j in range(len(ana.value_names)):
-            dataframes[j][timestamp] = ana.measured_values[j]
-        ana.finish()
+        if all_exp_data[i] is None:
+            # e.g. files in an older data format
+            all_exp_data[i] = _get_experimental_data_from_analysis(timestamp)
+    value_names = all_exp_data[0]['value_names']
+    dataframes = [pd.DataFrame(od(
+        (timestamp, pd.Series(exp_data['data'][j-len(value_names)]))
+        for timestamp, exp_data in zip(timestamps, all_exp_data)))
+        for j in range(len(value_names))]
 
     # Create the combined dataframe
     mean_df = pd.DataFrame()
     # Add sweep points to dataframe
-    for i, par_name in enumerate(ana.parameter_names):
-        if len(ana.parameter_names) != 1:
-            mean_df[par_name] = ana.sweep_points[i]
-        else:
-            mean_df[par_name] = ana.sweep_points
+    exp_data = all_exp_data[-1]
+    for i, par_name in enumerate(exp_data['sweep_parameter_names']):
+        mean_df[par_name] = exp_data['data'][i]
     # Add the mean and sem to the dataframe
-    for i, val_name in enumerate(ana.value_names):
+    for i, val_name in enumerate(exp_data['value_names']):
         mean_df[val_name+'_mean'] = dataframes[i].mean(axis=1)
         mean_df[val_name+'_sem'] = dataframes[i].sem(axis=1)
 
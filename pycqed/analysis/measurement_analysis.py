@@ -5,6 +5,7 @@ from scipy import stats
 import h5py
 from matplotlib import pyplot as plt
 from pycqed.analysis import analysis_toolbox as a_tools
+from pycqed.measurement.hdf5_data import read_instrument_settings
 from pycqed.analysis import fitting_models as fit_mods
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 import scipy.optimize as optimize
@@ -14,6 +15,7 @@ import textwrap
 from scipy.interpolate import interp1d
 import pylab
 from pycqed.analysis.tools import data_manipulation as dm_tools
+from pycqed.analysis.tools import file_handling as fh_tools
 import imp
 import math
 from math import erfc
@@ -57,10 +59,23 @@ class MeasurementAnalysis(object):
             self.run_default_analysis(TwoD=TwoD, **kw)
 
     def load_hdf5data(self, folder=None, file_only=False, **kw):
+        '''
+        Opens the data file.
+
+        kw:
+            h5mode (str): mode in which the file is opened (default 'r+').
+            read_only (bool): opens the file read-only ('r'). Data is then
+                not read into memory but handed out as read-only views
+                (see get_values) and analysis results are stored in the
+                side-car file (see analysis_h5data).
+        '''
         if folder is None:
             folder = self.folder
         self.h5filepath = a_tools.measurement_filename(folder)
         h5mode = kw.pop('h5mode', 'r+')
+        if kw.pop('read_only', False):
+            h5mode = 'r'
+        self.read_only = (h5mode == 'r')
         self.data_file = h5py.File(self.h5filepath, h5mode)
         if not file_only:
             for k in list(self.data_file.keys()):
@@ -79,6 +94,9 @@ class MeasurementAnalysis(object):
     def finish(self, close_file=True, **kw):
         if close_file:
             self.data_file.close()
+            if getattr(self, 'analysis_file', None) is not None:
+                self.analysis_file.close()
+                self.analysis_file = None
 
     def analysis_h5data(self, name='analysis'):
         if not os.path.exists(os.path.join(self.folder, name+'.hdf5')):
@@ -165,19 +183,40 @@ class MeasurementAnalysis(object):
                 figsize=(6, 1.5*len(self.value_names)))
         return tuple(self.f + [self.figarray] + self.ax + [self.axarray])
 
+    def get_dataset(self, key):
+        '''
+        Returns dataset "key" of the group "Experimental Data".
+        In read-only mode a read-only view is returned that does not read
+        the data into memory (see fh_tools.get_dataset_view), otherwise the
+        data is read.
+        '''
+        if getattr(self, 'read_only', False):
+            return fh_tools.get_dataset_view(self.g[key])
+        return self.g[key][()]
+
     def get_values(self, key):
+        '''
+        Returns the values of a sweep parameter or value (a column of the
+        "Data" dataset) or of dataset "key".
+
+        The values are returned as float64 arrays, except in read-only mode
+        where the values are returned as views in the dtype of the dataset
+        to avoid copying (large) datasets.
+        '''
         if key in self.get_key('sweep_parameter_names'):
             names = self.get_key('sweep_parameter_names')
 
             ind = names.index(key)
-            values = self.g['Data'].value[:, ind]
+            values = self.get_dataset('Data')[:, ind]
         elif key in self.get_key('value_names'):
             names = self.get_key('value_names')
             ind = (names.index(key) +
                    len(self.get_key('sweep_parameter_names')))
-            values = self.g['Data'].value[:, ind]
+            values = self.get_dataset('Data')[:, ind]
         else:
-            values = self.g[key].value
+            values = self.get_dataset(key)
+        if getattr(self, 'read_only', False):
+            return values
         # Makes sure all data is np float64
         return np.asarray(values, dtype=np.float64)
 
@@ -192,7 +231,7 @@ class MeasurementAnalysis(object):
             s = s.decode('utf-8')
         # If it is an array of value decodes individual entries
         if type(s) == np.ndarray:
-            s = [s.decode('utf-8') for s in s]
+            s = [s.decode('utf-8') if isinstance(s, bytes) else s for s in s]
         return s
 
     def group_values(self, group_name):
@@ -200,14 +239,27 @@ class MeasurementAnalysis(object):
         Returns values for group with the name "group_name" from the
         hdf5 data file.
         '''
-        group_values = self.g[group_name].value
+        group_values = self.g[group_name][()]
         return np.asarray(group_values, dtype=np.float64)
 
+    def get_analysis_file(self):
+        '''
+        Returns the file analysis results are written to, this is the data
+        file unless it is opened read-only. In that case the side-car file
+        (see analysis_h5data) is used.
+        '''
+        if not getattr(self, 'read_only', False):
+            return self.data_file
+        if getattr(self, 'analysis_file', None) is None:
+            self.analysis_file = self.analysis_h5data()
+        return self.analysis_file
+
     def add_analysis_datagroup_to_file(self, group_name='Analysis'):
-        if group_name in self.data_file:
-            self.analysis_group = self.data_file[group_name]
+        analysis_file = self.get_analysis_file()
+        if group_name in analysis_file:
+            self.analysis_group = analysis_file[group_name]
         else:
-            self.analysis_group = self.data_file.create_group(group_name)
+            self.analysis_group = analysis_file.create_group(group_name)
 
     def add_dataset_to_analysisgroup(self, datasetname, data):
         try:
@@ -574,12 +626,12 @@ class MeasurementAnalysis(object):
                              % datasaving_format)
 
     def get_best_fit_results(self, peak=False, weighted=False):
-        if len(self.data_file['Analysis']) is 1:
-            return list(self.data_file['Analysis'].values())[0]
+        if len(self.get_analysis_file()['Analysis']) is 1:
+            return list(self.get_analysis_file()['Analysis'].values())[0]
         else:
             normalized_chisquares = {}
             haspeak_lst = []
-            for key, item in self.data_file['Analysis'].items():
+            for key, item in self.get_analysis_file()['Analysis'].items():
                 if weighted is False:
                     chisqr = item.attrs['chisqr']
                 else:
@@ -606,7 +658,7 @@ class MeasurementAnalysis(object):
                 best_key = min(normalized_chisquares,
                                key=normalized_chisquares.get)
             print('Best key: ', best_key)
-            best_fit_results = self.data_file['Analysis'][best_key]
+            best_fit_results = self.get_analysis_file()['Analysis'][best_key]
             return best_fit_results
 
 
@@ -645,8 +697,8 @@ class OptimizationAnalysis(MeasurementAnalysis):
     def run_default_analysis(self, close_file=True, show=False, plot_all=False, **kw):
         self.get_naming_and_values()
         try:
-            optimization_method = self.data_file['Instrument settings']\
-                ['MC'].attrs['optimization_method']
+            optimization_method = read_instrument_settings(
+                self.data_file)['MC'].attrs['optimization_method']
         except:
             optimization_method = 'Numerical'
             # This is because the MC is no longer an instrument and thus
@@ -2375,7 +2427,7 @@ class touch_n_go_SSRO_Analysis(MeasurementAnalysis):
 
         shots_I_data = self.get_values(key='touch_n_go_I_shots')
         shots_Q_data = self.get_values(key='touch_n_go_Q_shots')
-        instrument_settings = self.data_file['Instrument settings']
+        instrument_settings = read_instrument_settings(self.data_file)
         threshold = instrument_settings['CBox'].attrs['signal_threshold_line0']
         # plotting the histograms before rotation
         fig, axes = plt.subplots(figsize=(10, 10))
@@ -2606,7 +2658,8 @@ class T1_Analysis(TD_Analysis):
         return fit_res
 
     def get_measured_T1(self):
-        fitted_pars = self.data_file['Analysis']['Fitted Params F|1>']
+        fitted_pars = self.get_analysis_file()['Analysis'][
+            'Fitted Params F|1>']
         T1 = fitted_pars['tau'].attrs['value']
         T1_stderr = fitted_pars['tau'].attrs['stderr']
 
@@ -2794,7 +2847,8 @@ class Ramsey_Analysis(TD_Analysis):
         return self.fit_res
 
     def get_measured_freq(self):
-        fitted_pars = self.data_file['Analysis']['Fitted Params I_cal']
+        fitted_pars = self.get_analysis_file()['Analysis'][
+            'Fitted Params I_cal']
         freq = fitted_pars['frequency'].attrs['value']
         freq_stderr = fitted_pars['frequency'].attrs['stderr']
 
@@ -2805,7 +2859,8 @@ class Ramsey_Analysis(TD_Analysis):
         Returns measured T2 star from the fit to the Ical data.
          return T2, T2_stderr
         '''
-        fitted_pars = self.data_file['Analysis']['Fitted Params I_cal']
+        fitted_pars = self.get_analysis_file()['Analysis'][
+            'Fitted Params I_cal']
         T2 = fitted_pars['tau'].attrs['value']
         T2_stderr = fitted_pars['tau'].attrs['stderr']
 
@@ -5109,7 +5164,7 @@ def fit_qubit_frequency(sweep_points, data, mode='dac',
     qubit_name = kw.pop('qubit_name', None)
     if qubit_name is not None and data_file is not None:
         try:
-            instrument_settings = data_file['Instrument settings']
+            instrument_settings = read_instrument_settings(data_file)
             qubit_attrs = instrument_settings[qubit_name].attrs
             print(qubit_attrs)
         except:
@@ -1,4 +1,350 @@
 '''
-Currently empty should contain the filehandling tools portion of the
-analysis toolbox
-'''
\ No newline at end of file
+Part of the 'new' analysis toolbox.
+Contains the filehandling tools portion of the analysis toolbox.
+
+The bulk loaders read only the requested datasets and attributes from many
+data files. Files are opened read-only and are read in a pool of processes
+when there are many of them. Results are cached per file and parameter and
+are reused for as long as the modification time of the file does not change.
+
+get_dataset_view gives access to a dataset without reading it into memory,
+it is used by the read-only mode of the MeasurementAnalysis.
+'''
+import os
+import warnings
+from collections import OrderedDict as od
+from concurrent.futures import ProcessPoolExecutor
+import h5py
+import numpy as np
+
+from pycqed.measurement.hdf5_data import read_instrument_settings
+
+# Files are read in a process pool if at least this many files need to be
+# read (starting the pool takes longer than reading a few files).
+min_files_parallel = 16
+# Maximum number of (file, parameter) values that are kept in the cache.
+cache_size = 100000
+
+_EXPERIMENTAL_DATA = ':experimental_data'
+_GROUPS = ':groups'
+_file_cache = od()
+
+
+class LazyDataset(object):
+
+    '''
+    Read-only wrapper of a 2D h5py dataset that only reads the data that is
+    indexed. Supports transposing such that columns of the dataset can be
+    accessed as rows (e.g. data.T[0, :] reads the first column).
+    '''
+
+    def __init__(self, dset, transposed=False):
+        self.dset = dset
+        self.transposed = transposed
+
+    @property
+    def shape(self):
+        return self.dset.shape[::-1] if self.transposed else self.dset.shape
+
+    @property
+    def dtype(self):
+        return self.dset.dtype
+
+    @property
+    def ndim(self):
+        return self.dset.ndim
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return '<LazyDataset "{}" shape {}>'.format(self.dset.name,
+                                                    self.shape)
+
+    @property
+    def T(self):
+        return LazyDataset(self.dset, transposed=not self.transposed)
+
+    def transpose(self):
+        return self.T
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.dset[()]
+        data = data.T if self.transposed else data
+        return data if dtype is None else data.astype(dtype)
+
+    @staticmethod
+    def _normalize(key, length):
+        # h5py does not support negative indices and steps
+        if isinstance(key, slice):
+            start, stop, step = key.indices(length)
+            if step < 0:
+                return (slice(stop+1, max(stop+1, start+1)),
+                        slice(None, None, step))
+            return slice(start, max(start, stop), step), slice(None)
+        if isinstance(key, (int, np.integer)):
+            return (key + length if key < 0 else key), None
+        return key, slice(None)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, )
+        key = key + (slice(None), )*(self.ndim - len(key))
+        if self.transposed:
+            key = key[::-1]
+        h5_key, post_key = zip(*[self._normalize(k, n)
+                                 for k, n in zip(key, self.dset.shape)])
+        data = self.dset[h5_key]
+        # reversed slices are read forward and reversed in memory
+        data = data[tuple(k for k in post_key if k is not None)]
+        return data.T if self.transposed else data
+
+
+def get_dataset_view(dset):
+    '''
+    Returns a read-only view of a dataset that does not read the data into
+    memory.
+
+    Contiguous, uncompressed datasets are memory-mapped (a numpy memmap),
+    for other (e.g. chunked) datasets a LazyDataset is returned that reads
+    the data using h5py slicing when it is indexed.
+    '''
+    if (dset.chunks is None and dset.compression is None and
+            dset.dtype.kind in 'biuf' and dset.size > 0 and
+            dset.file.driver in ('sec2', 'stdio')):
+        offset = dset.id.get_offset()
+        if offset is not None:
+            return np.memmap(dset.file.filename, mode='r', dtype=dset.dtype,
+                             shape=dset.shape, offset=offset, order='C')
+    return LazyDataset(dset)
+
+
+def clear_file_cache():
+    '''
+    Removes all values from the cache of the bulk loaders.
+    '''
+    _file_cache.clear()
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    if isinstance(value, np.ndarray) and value.dtype.kind in 'OS':
+        return [_decode(v) for v in value]
+    return value
+
+
+def _read_node(group, path):
+    '''
+    Returns attribute or dataset path[-1] of the (sub)group path[:-1].
+    '''
+    for key in path[:-1]:
+        group = group[key]
+    if path[-1] in group.attrs:
+        return group.attrs[path[-1]]
+    return group[path[-1]][()]
+
+
+def _read_param(data_file, param, settings):
+    '''
+    Reads a single parameter from an open data file, the parameter names
+    are interpreted as in get_data_from_ma_v2:
+
+    - "instrument.parameter": instrument setting
+    - "group.(subgroups.)name": attribute or dataset in the "Analysis" group
+      or, if not present there, in the root of the file.
+    - "name": dataset in the "Experimental Data" or "Analysis" group.
+    '''
+    path = param.split('.')
+    if len(path) == 1:
+        for group in ['Experimental Data', 'Analysis']:
+            if group in data_file and param in data_file[group]:
+                return np.double(data_file[group][param][()])
+        raise KeyError(param)
+
+    if settings[0] is None:
+        settings[0] = (read_instrument_settings(data_file)
+                       if 'Instrument settings' in data_file else {})
+    if path[0] in settings[0]:
+        return _decode(settings[0][path[0]].attrs[path[1]])
+    if 'Analysis' in data_file and path[0] in data_file['Analysis']:
+        return _decode(_read_node(data_file['Analysis'], path))
+    if path[0] in data_file:
+        return _decode(_read_node(data_file, path))
+    raise KeyError(param)
+
+
+def _read_experimental_data(data_file):
+    '''
+    Reads the data and naming of the "Experimental Data" group (only the
+    "Version 2" data format is supported).
+    The data is transposed such that every row contains a sweep parameter
+    or value as in MeasurementAnalysis.get_naming_and_values.
+    '''
+    grp = data_file['Experimental Data']
+    if _decode(grp.attrs.get('datasaving_format', b'')) != 'Version 2':
+        raise ValueError('Data format not supported by the bulk loader')
+    exp_data = od()
+    for key in ['sweep_parameter_names', 'sweep_parameter_units',
+                'value_names', 'value_units']:
+        exp_data[key] = _decode(grp.attrs[key])
+    exp_data['data'] = np.asarray(grp['Data'][()], dtype=np.float64).T
+    return exp_data
+
+
+def _load_file(args):
+    '''
+    Reads the parameters from a single file, runs in the worker processes.
+    Returns the values or the exception that was raised opening the file.
+    '''
+    filepath, param_names = args
+    values = {}
+    try:
+        with h5py.File(filepath, 'r') as data_file:
+            settings = [None]
+            for param in param_names:
+                if param == _GROUPS:
+                    values[param] = list(data_file.keys())
+                elif param == _EXPERIMENTAL_DATA:
+                    values[param] = _read_experimental_data(data_file)
+                else:
+                    try:
+                        values[param] = _read_param(data_file, param,
+                                                    settings)
+                    except KeyError:
+                        values[param] = None
+    except Exception as e:
+        return e
+    return values
+
+
+def _file_version(filepath):
+    st = os.stat(filepath)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _load_files(filepaths, param_names, n_processes=None, use_cache=True):
+    '''
+    Returns a list with a dict of values per file, files that can not be read
+    are None. Values are taken from the cache if the file did not change.
+    '''
+    results = [None]*len(filepaths)
+    todo = []
+    for i, filepath in enumerate(filepaths):
+        try:
+            version = _file_version(filepath)
+        except (OSError, TypeError):
+            continue
+        values = {}
+        missing = []
+        for param in param_names:
+            cached = _file_cache.get((filepath, param)) if use_cache else None
+            if cached is not None and cached[0] == version:
+                _file_cache.move_to_end((filepath, param))
+                values[param] = cached[1]
+            else:
+                missing.append(param)
+        results[i] = values
+        if len(missing) > 0:
+            todo.append((i, version, (filepath, missing)))
+
+    if n_processes is None:
+        n_processes = os.cpu_count()
+    if n_processes > 1 and len(todo) >= min_files_parallel:
+        with ProcessPoolExecutor(max_workers=n_processes) as executor:
+            loaded = list(executor.map(
+                _load_file, [args for _, _, args in todo],
+                chunksize=max(1, len(todo)//(4*n_processes))))
+    else:
+        loaded = [_load_file(args) for _, _, args in todo]
+
+    for (i, version, (filepath, missing)), values in zip(todo, loaded):
+        if isinstance(values, Exception):
+            results[i] = None
+            warnings.warn('Could not read "{}": {}'.format(filepath, values))
+            continue
+        results[i].update(values)
+        if use_cache:
+            for param in missing:
+                _file_cache[(filepath, param)] = (version, values[param])
+    while len(_file_cache) > cache_size:
+        _file_cache.popitem(last=False)
+    return results
+
+
+def bulk_load_params(filepaths, param_names, n_processes=None,
+                     use_cache=True, required_group=None):
+    '''
+    Reads parameters from many data files.
+
+    Args:
+        filepaths (list): paths of the hdf5 data files.
+        param_names (list): parameters to read, see _read_param for how
+            the names are interpreted. Parameters that are not present in a
+            file are None.
+        n_processes (int): number of processes used to read the files,
+            the default is the number of cpus.
+        use_cache (bool): use values cached in an earlier call if the file
+            did not change.
+        required_group (str): if not None, files that do not contain this
+            group (e.g. "Analysis") are filtered out.
+
+    Returns:
+        list with an ordered dict of values per file, None for files that
+        could not be read or that were filtered out.
+    Cached values are shared between calls and should not be modified.
+    '''
+    param_names = list(param_names)
+    load_names = param_names + ([_GROUPS] if required_group else [])
+    results = _load_files(filepaths, load_names, n_processes=n_processes,
+                          use_cache=use_cache)
+    records = []
+    for values in results:
+        if values is None or (required_group and
+                              required_group not in values[_GROUPS]):
+            records.append(None)
+        else:
+            records.append(od((p, values[p]) for p in param_names))
+    return records
+
+
+def bulk_load_experimental_data(filepaths, n_processes=None, use_cache=True):
+    '''
+    Reads the "Experimental Data" of many data files.
+
+    Returns:
+        list with an ordered dict per file containing the sweep parameter
+        and value names and units and the transposed "data", None for files
+        that could not be read or that are not in the "Version 2" format.
+    '''
+    results = _load_files(filepaths, [_EXPERIMENTAL_DATA],
+                          n_processes=n_processes, use_cache=use_cache)
+    return [None if values is None else values[_EXPERIMENTAL_DATA]
+            for values in results]
+
+
+def records_to_columns(records, param_names, numeric_params=None):
+    '''
+    Converts a list of records (ordered dicts) to a column per parameter.
+    Columns of numeric parameters, and of parameters that only contain
+    numbers of the same shape, are numpy arrays, other columns are lists.
+    '''
+    columns = od()
+    for param in param_names:
+        column = [record[param] for record in records]
+        if numeric_params is not None and param in numeric_params:
+            try:
+                columns[param] = np.array(column, dtype=np.float64)
+            except ValueError:
+                columns[param] = [np.double(val) for val in column]
+            continue
+        arr = None
+        if all(isinstance(v, (int, float, np.number, np.ndarray))
+               for v in column):
+            try:
+                arr = np.array(column)
+            except ValueError:
+                pass
+        columns[param] = column if (arr is None or arr.dtype == object) \
+            else arr
+    return columns
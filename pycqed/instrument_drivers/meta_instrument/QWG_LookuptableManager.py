@@ -2,7 +2,11 @@ from qcodes.instrument.base import Instrument
 from qcodes.instrument.parameter import ManualParameter
 from qcodes.utils import validators as vals
 import logging
+import numpy as np
+from collections import OrderedDict
 from pycqed.measurement.waveform_control_CC import waveform as wf
+from pycqed.instrument_drivers.meta_instrument.waveform_cache import \
+    WaveformCache
 
 
 class QWG_LookuptableManager(Instrument):
@@ -29,61 +33,64 @@ class QWG_LookuptableManager(Instrument):
                            parameter_class=ManualParameter,
                            initial_value=4e-9)
 
+        # the pulses played by codeword 0, 1, ...
+        self.codeword_pulses = ['X180', 'Y180', 'X90', 'Y90', 'mX90', 'mY90']
+        self.waveform_cache = WaveformCache(self, QWG)
+        self.waveform_cache.add_waveform(
+            'gauss', self._gauss,
+            ['Q_amp180', 'Q_gauss_width', 'Q_motzoi',
+             lambda: self.QWG.get('ch{}_amp'.format(1))])
 
-    def load_pulses_onto_AWG_lookuptable(self):
-        self.QWG.stop()
-
+    def _gauss(self):
         G_amp = self.Q_amp180()/self.QWG.get('ch{}_amp'.format(1))
         # Amplitude is set using the channel amplitude (at least for now)
-        G, D = wf.gauss_pulse(G_amp, self.Q_gauss_width(),
+        return wf.gauss_pulse(G_amp, self.Q_gauss_width(),
                               motzoi=self.Q_motzoi(),
                               sampling_rate=1e9)  # sampling rate of QWG
-        self.QWG.deleteWaveformAll()
-        self.QWG.createWaveformReal('X180_q0_I', G)
-        self.QWG.createWaveformReal('X180_q0_Q', D)
-        self.QWG.createWaveformReal('X90_q0_I', self.Q_amp90_scale()*G)
-        self.QWG.createWaveformReal('X90_q0_Q', self.Q_amp90_scale()*D)
-
-        self.QWG.createWaveformReal('Y180_q0_I', D)
-        self.QWG.createWaveformReal('Y180_q0_Q', -G)
-        self.QWG.createWaveformReal('Y90_q0_I', self.Q_amp90_scale()*D)
-        self.QWG.createWaveformReal('Y90_q0_Q', -self.Q_amp90_scale()*G)
 
-        self.QWG.createWaveformReal('mX90_q0_I', -self.Q_amp90_scale()*G)
-        self.QWG.createWaveformReal('mX90_q0_Q', -self.Q_amp90_scale()*D)
-        self.QWG.createWaveformReal('mY90_q0_I', -self.Q_amp90_scale()*D)
-        self.QWG.createWaveformReal('mY90_q0_Q', self.Q_amp90_scale()*G)
+    def generate_standard_pulses(self):
+        """
+        Returns the waveforms of the pulses by name. The gaussian pulse is
+        only regenerated if one of its parameters changed.
+        """
+        G, D = self.waveform_cache.get('gauss')
+        waveforms = OrderedDict()
+        waveforms['X180_q0_I'] = G
+        waveforms['X180_q0_Q'] = D
+        waveforms['X90_q0_I'] = self.Q_amp90_scale()*G
+        waveforms['X90_q0_Q'] = self.Q_amp90_scale()*D
 
-        # Filler waveform
-        self.QWG.createWaveformReal('zero', [0]*4)
-        self.QWG.codeword_0_ch1_waveform('X180_q0_I')
-        self.QWG.codeword_0_ch2_waveform('X180_q0_Q')
-        self.QWG.codeword_0_ch3_waveform('X180_q0_I')
-        self.QWG.codeword_0_ch4_waveform('X180_q0_Q')
+        waveforms['Y180_q0_I'] = D
+        waveforms['Y180_q0_Q'] = -G
+        waveforms['Y90_q0_I'] = self.Q_amp90_scale()*D
+        waveforms['Y90_q0_Q'] = -self.Q_amp90_scale()*G
 
-        self.QWG.codeword_1_ch1_waveform('Y180_q0_I')
-        self.QWG.codeword_1_ch2_waveform('Y180_q0_Q')
-        self.QWG.codeword_1_ch3_waveform('Y180_q0_I')
-        self.QWG.codeword_1_ch4_waveform('Y180_q0_Q')
+        waveforms['mX90_q0_I'] = -self.Q_amp90_scale()*G
+        waveforms['mX90_q0_Q'] = -self.Q_amp90_scale()*D
+        waveforms['mY90_q0_I'] = -self.Q_amp90_scale()*D
+        waveforms['mY90_q0_Q'] = self.Q_amp90_scale()*G
 
-        self.QWG.codeword_2_ch1_waveform('X90_q0_I')
-        self.QWG.codeword_2_ch2_waveform('X90_q0_Q')
-        self.QWG.codeword_2_ch3_waveform('X90_q0_I')
-        self.QWG.codeword_2_ch4_waveform('X90_q0_Q')
+        # Filler waveform
+        waveforms['zero'] = np.zeros(4)
+        return waveforms
 
-        self.QWG.codeword_3_ch1_waveform('Y90_q0_I')
-        self.QWG.codeword_3_ch2_waveform('Y90_q0_Q')
-        self.QWG.codeword_3_ch3_waveform('Y90_q0_I')
-        self.QWG.codeword_3_ch4_waveform('Y90_q0_Q')
+    def load_pulses_onto_AWG_lookuptable(self, force_upload=False):
+        """
+        Uploads the pulses to the QWG. The QWG only sends the waveforms that
+        changed since they were last uploaded, if force_upload is True all
+        waveforms are deleted from the QWG and uploaded again.
+        """
+        self.QWG.stop()
 
-        self.QWG.codeword_4_ch1_waveform('mX90_q0_I')
-        self.QWG.codeword_4_ch2_waveform('mX90_q0_Q')
-        self.QWG.codeword_4_ch3_waveform('mX90_q0_I')
-        self.QWG.codeword_4_ch4_waveform('mX90_q0_Q')
+        if force_upload:
+            self.QWG.deleteWaveformAll()
+        self.QWG.createWaveformsReal(self.generate_standard_pulses())
 
-        self.QWG.codeword_5_ch1_waveform('mY90_q0_I')
-        self.QWG.codeword_5_ch2_waveform('mY90_q0_Q')
-        self.QWG.codeword_5_ch3_waveform('mY90_q0_I')
-        self.QWG.codeword_5_ch4_waveform('mY90_q0_Q')
+        for cw, pulse in enumerate(self.codeword_pulses):
+            for ch in range(1, 5):
+                # channels 1 and 3 play I, channels 2 and 4 play Q
+                wave_name = pulse + ('_q0_I' if ch % 2 else '_q0_Q')
+                self.QWG.set('codeword_{}_ch{}_waveform'.format(cw, ch),
+                             wave_name)
         self.QWG.start()
         self.QWG.getOperationComplete()
@@ -5,6 +5,8 @@ from qcodes.instrument.parameter import ManualParameter
 from qcodes.utils import validators as vals
 import logging
 from pycqed.measurement import Pulse_Generator as PG
+from pycqed.instrument_drivers.meta_instrument.waveform_cache import \
+    WaveformCache
 import unittest
 import matplotlib.pyplot as plt
 import imp
@@ -22,6 +24,11 @@ class UHFQC_LookuptableManager(Instrument):
 
     For now this is a test version that only stores the parameters for a
     specific set of pulses.
+
+    The pulses are only regenerated if one of the parameters they depend
+    on changed, the waveform_cache keeps track of this and counts the
+    generated pulses (nr_generated). The UHFQC only uploads a pulse if it
+    differs from the one its AWG program plays.
     '''
     shared_kwargs = ['UHFQC']
 
@@ -140,6 +147,11 @@ class UHFQC_LookuptableManager(Instrument):
         self._voltage_min = -1.0
         self._voltage_max = 1.0-1.0/2**13
 
+        self.waveform_cache = WaveformCache(
+            self, UHFQC, common_parameters=['mixer_apply_predistortion_matrix',
+                                            'mixer_alpha', 'mixer_phi'])
+        self._add_standard_waveforms()
+
     def run_test_suite(self):
             # pass the UHFQC to the module so it can be used in the tests
             from importlib import reload
@@ -149,138 +161,151 @@ class UHFQC_LookuptableManager(Instrument):
                 test_suite.LutManTests)
             unittest.TextTestRunner(verbosity=2).run(suite)
 
-    def generate_standard_pulses(self):
+    def _add_standard_waveforms(self):
         '''
-        Generates a basic set of pulses (I, X-180, Y-180, x-90, y-90, Block,
-                                         X180_delayed)
-        using the parameters set on this meta-instrument and returns the
-        corresponding waveforms for both I and Q channels as a dict.
-
-        Note the primitive set is a different set than the one used in
-        Serwan's thesis.
+        Adds the standard pulses to the waveform_cache together with the
+        parameters they depend on.
         '''
-        # Standard qubit pulses
-        Wave_I = [np.zeros(10), np.zeros(10)]
-        Wave_X_180 = PG.mod_gauss(self.get('Q_amp180'), self.get('Q_gauss_width'),
-                                  self.get('Q_modulation'), axis='x',
-                                  motzoi=self.get('Q_motzoi_parameter'),
-                                  sampling_rate=self.get('sampling_rate'),
-                                  Q_phase_delay=self.get('mixer_IQ_phase_skewness'),
-                                  nr_sigma=self.Q_gauss_nr_sigma())
-        Wave_X_90 = PG.mod_gauss(self.get('Q_amp90'), self.get('Q_gauss_width'),
-                                 self.get('Q_modulation'), axis='x',
-                                 motzoi=self.get('Q_motzoi_parameter'),
-                                 sampling_rate=self.get('sampling_rate'),
-                                 Q_phase_delay=self.get('mixer_IQ_phase_skewness'),
-                                 nr_sigma=self.Q_gauss_nr_sigma())
-
-        Wave_Y_180 = PG.mod_gauss(self.get('Q_amp180'), self.get('Q_gauss_width'),
-                                  self.get('Q_modulation'), axis='y',
-                                  motzoi=self.get('Q_motzoi_parameter'),
-                                  sampling_rate=self.get('sampling_rate'),
-                                  Q_phase_delay=self.get('mixer_IQ_phase_skewness'),
-                                  nr_sigma=self.Q_gauss_nr_sigma())
-        Wave_Y_90 = PG.mod_gauss(self.get('Q_amp90'), self.get('Q_gauss_width'),
-                                 self.get('Q_modulation'), axis='y',
-                                 motzoi=self.get('Q_motzoi_parameter'),
-                                 sampling_rate=self.get('sampling_rate'),
-                                 Q_phase_delay=self.get('mixer_IQ_phase_skewness'),
-                                 nr_sigma=self.Q_gauss_nr_sigma())
-
-        Wave_mX90 = PG.mod_gauss(-self.get('Q_amp90'), self.get('Q_gauss_width'),
-                                 self.get('Q_modulation'), axis='x',
-                                 motzoi=self.get('Q_motzoi_parameter'),
-                                 sampling_rate=self.get('sampling_rate'),
-                                 Q_phase_delay=self.get('mixer_IQ_phase_skewness'),
-                                 nr_sigma=self.Q_gauss_nr_sigma())
-
-        Wave_mY90 = PG.mod_gauss(-self.get('Q_amp90'), self.get('Q_gauss_width'),
-                                 self.get('Q_modulation'), axis='y',
-                                 motzoi=self.get('Q_motzoi_parameter'),
-                                 sampling_rate=self.get('sampling_rate'),
-                                 Q_phase_delay=self.get('mixer_IQ_phase_skewness'),
-                                 nr_sigma=self.Q_gauss_nr_sigma())
-        Block = PG.block_pulse(self.get('Q_ampCW'), self.Q_block_length.get(),  #ns
-                               sampling_rate=self.get('sampling_rate'),
-                               delay=0,
-                               phase=0)
-        ModBlock = PG.mod_pulse(Block[0], Block[1],
-                                f_modulation=self.Q_modulation.get(),
-                                sampling_rate=self.sampling_rate.get(),
-                                Q_phase_delay=self.mixer_IQ_phase_skewness.get())
-
-
-        ###### RO pulses
-        M = PG.block_pulse(self.get('M_amp'), self.M_length.get(),  #ns
-                               sampling_rate=self.get('sampling_rate'),
-                               delay=0,
-                               phase=self.get('M_phi'))
-        Mod_M = PG.mod_pulse(M[0], M[1],
-                                f_modulation=self.M_modulation.get(),
-                                sampling_rate=self.sampling_rate.get(),
-                                Q_phase_delay=self.mixer_IQ_phase_skewness.get())
-        # advanced RO pulses
-        # with ramp-up
-        M_up = PG.block_pulse(self.get('M_up_amp'), self.M_up_length.get(),  #ns
-                               sampling_rate=self.get('sampling_rate'),
-                               delay=0,
-                               phase=self.get('M_up_phi'))
+        q_pars = ['Q_gauss_width', 'Q_gauss_nr_sigma', 'Q_modulation',
+                  'Q_motzoi_parameter', 'sampling_rate',
+                  'mixer_IQ_phase_skewness']
+        block_pars = ['Q_ampCW', 'Q_block_length', 'sampling_rate']
+        M_pars = ['M_amp', 'M_length', 'M_phi', 'M_modulation',
+                  'sampling_rate', 'mixer_IQ_phase_skewness']
+        M_up_pars = M_pars + ['M_up_amp', 'M_up_length', 'M_up_phi']
+        M_down_pars = M_up_pars + ['M_down_amp0', 'M_down_amp1',
+                                   'M_down_length', 'M_down_phi0',
+                                   'M_down_phi1', 'M0_modulation',
+                                   'M1_modulation']
+        waveforms = [
+            ('I', lambda: [np.zeros(10), np.zeros(10)], []),
+            ('X180', lambda: self._mod_gauss(self.Q_amp180(), 'x'),
+             ['Q_amp180'] + q_pars),
+            ('Y180', lambda: self._mod_gauss(self.Q_amp180(), 'y'),
+             ['Q_amp180'] + q_pars),
+            ('X90', lambda: self._mod_gauss(self.Q_amp90(), 'x'),
+             ['Q_amp90'] + q_pars),
+            ('Y90', lambda: self._mod_gauss(self.Q_amp90(), 'y'),
+             ['Q_amp90'] + q_pars),
+            ('mX90', lambda: self._mod_gauss(-self.Q_amp90(), 'x'),
+             ['Q_amp90'] + q_pars),
+            ('mY90', lambda: self._mod_gauss(-self.Q_amp90(), 'y'),
+             ['Q_amp90'] + q_pars),
+            ('Block', self._block, block_pars),
+            ('ModBlock', self._mod_block,
+             block_pars + ['Q_modulation', 'mixer_IQ_phase_skewness']),
+            ('M_square', self._mod_M, M_pars),
+            ('M_up_mid', self._mod_M_up_mid, M_up_pars),
+            ('M_up_mid_double_dep', self._mod_M_up_mid_down, M_down_pars)]
+        for name, generator, parameters in waveforms:
+            self.waveform_cache.add_waveform(
+                name, self._predistorted(generator), parameters)
+
+    def _predistorted(self, generator):
+        def generate():
+            wave = generator()
+            if self.mixer_apply_predistortion_matrix():
+                wave = np.dot(self.get_mixer_predistortion_matrix(), wave)
+            return wave
+        return generate
+
+    def _mod_gauss(self, amp, axis):
+        return PG.mod_gauss(amp, self.get('Q_gauss_width'),
+                            self.get('Q_modulation'), axis=axis,
+                            motzoi=self.get('Q_motzoi_parameter'),
+                            sampling_rate=self.get('sampling_rate'),
+                            Q_phase_delay=self.get('mixer_IQ_phase_skewness'),
+                            nr_sigma=self.Q_gauss_nr_sigma())
+
+    def _block(self):
+        return PG.block_pulse(self.get('Q_ampCW'), self.Q_block_length.get(),
+                              sampling_rate=self.get('sampling_rate'),
+                              delay=0,
+                              phase=0)
+
+    def _mod_block(self):
+        Block = self._block()
+        return PG.mod_pulse(Block[0], Block[1],
+                            f_modulation=self.Q_modulation.get(),
+                            sampling_rate=self.sampling_rate.get(),
+                            Q_phase_delay=self.mixer_IQ_phase_skewness.get())
+
+    def _M(self):
+        return PG.block_pulse(self.get('M_amp'), self.M_length.get(),
+                              sampling_rate=self.get('sampling_rate'),
+                              delay=0,
+                              phase=self.get('M_phi'))
+
+    def _mod_M(self):
+        M = self._M()
+        return PG.mod_pulse(M[0], M[1],
+                            f_modulation=self.M_modulation.get(),
+                            sampling_rate=self.sampling_rate.get(),
+                            Q_phase_delay=self.mixer_IQ_phase_skewness.get())
+
+    def _mod_M_up_mid(self):
+        # RO pulse with ramp-up
+        M = self._M()
+        M_up = PG.block_pulse(self.get('M_up_amp'), self.M_up_length.get(),
+                              sampling_rate=self.get('sampling_rate'),
+                              delay=0,
+                              phase=self.get('M_up_phi'))
 
         M_up_mid = (np.concatenate((M_up[0], M[0])),
                     np.concatenate((M_up[1], M[1])))
 
-        Mod_M_up_mid = PG.mod_pulse(M_up_mid[0],M_up_mid[1],
-                                f_modulation=self.get('M_modulation'),
-                                sampling_rate=self.get('sampling_rate'),
-                                Q_phase_delay=self.get('mixer_IQ_phase_skewness'))
-
-        # with ramp-up and double frequency depletion
-        M_down0 = PG.block_pulse(self.get('M_down_amp0'), self.get('M_down_length'),  #ns
-                       sampling_rate=self.get('sampling_rate'),
-                       delay=0,
-                       phase=self.get('M_down_phi0'))
-
-        M_down1 = PG.block_pulse(self.get('M_down_amp1'), self.get('M_down_length'),  #ns
-                       sampling_rate=self.get('sampling_rate'),
-                       delay=0,
-                       phase=self.get('M_down_phi1'))
+        return PG.mod_pulse(M_up_mid[0], M_up_mid[1],
+                            f_modulation=self.get('M_modulation'),
+                            sampling_rate=self.get('sampling_rate'),
+                            Q_phase_delay=self.get('mixer_IQ_phase_skewness'))
+
+    def _mod_M_up_mid_down(self):
+        # RO pulse with ramp-up and double frequency depletion
+        Mod_M_up_mid = self._mod_M_up_mid()
+        M_down0 = PG.block_pulse(self.get('M_down_amp0'), self.get('M_down_length'),  # ns
+                                 sampling_rate=self.get('sampling_rate'),
+                                 delay=0,
+                                 phase=self.get('M_down_phi0'))
+
+        M_down1 = PG.block_pulse(self.get('M_down_amp1'), self.get('M_down_length'),  # ns
+                                 sampling_rate=self.get('sampling_rate'),
+                                 delay=0,
+                                 phase=self.get('M_down_phi1'))
         Mod_M_down0 = PG.mod_pulse(M_down0[0],
-                         M_down1[1],
-                         f_modulation=self.get('M0_modulation'),
-                         sampling_rate=self.get('sampling_rate'),
-                         Q_phase_delay=self.get('mixer_IQ_phase_skewness'))
+                                   M_down1[1],
+                                   f_modulation=self.get('M0_modulation'),
+                                   sampling_rate=self.get('sampling_rate'),
+                                   Q_phase_delay=self.get('mixer_IQ_phase_skewness'))
         Mod_M_down1 = PG.mod_pulse(M_down1[0],
-                     M_down1[1],
-                     f_modulation=self.get('M1_modulation'),
-                     sampling_rate=self.get('sampling_rate'),
-                     Q_phase_delay=self.get('mixer_IQ_phase_skewness'))
+                                   M_down1[1],
+                                   f_modulation=self.get('M1_modulation'),
+                                   sampling_rate=self.get('sampling_rate'),
+                                   Q_phase_delay=self.get('mixer_IQ_phase_skewness'))
 
         # summing the depletion components
         Mod_M_down = (np.add(Mod_M_down0[0],
-                                Mod_M_down1[0]),
+                             Mod_M_down1[0]),
                       np.add(Mod_M_down0[1],
-                                  Mod_M_down1[1]))
-
-        #concatenating up, mid and depletion
-        Mod_M_up_mid_down = (np.concatenate((Mod_M_up_mid[0], Mod_M_down[0])),
-                    np.concatenate((Mod_M_up_mid[1], Mod_M_down[1])))
-
-        self._wave_dict = {'I': Wave_I,
-                           'X180': Wave_X_180, 'Y180': Wave_Y_180,
-                           'X90': Wave_X_90, 'Y90': Wave_Y_90,
-                           'mX90': Wave_mX90, 'mY90': Wave_mY90,
-                           'Block': Block,
-                           'ModBlock': ModBlock,
-                           'M_square': Mod_M,
-                           'M_up_mid': Mod_M_up_mid,
-                           'M_up_mid_double_dep': Mod_M_up_mid_down
-                           }
-
-        if self.mixer_apply_predistortion_matrix():
-            M = self.get_mixer_predistortion_matrix()
-            for key, val in self._wave_dict.items():
-                self._wave_dict[key] = np.dot(M, val)
+                             Mod_M_down1[1]))
+
+        # concatenating up, mid and depletion
+        return (np.concatenate((Mod_M_up_mid[0], Mod_M_down[0])),
+                np.concatenate((Mod_M_up_mid[1], Mod_M_down[1])))
+
+    def generate_standard_pulses(self):
+        '''
+        Generates a basic set of pulses (I, X-180, Y-180, x-90, y-90, Block,
+                                         X180_delayed)
+        using the parameters set on this meta-instrument and returns the
+        corresponding waveforms for both I and Q channels as a dict.
+
+        Only the pulses of which a parameter changed since they were last
+        generated are regenerated (see waveform_cache).
 
+        Note the primitive set is a different set than the one used in
+        Serwan's thesis.
+        '''
+        self._wave_dict = self.waveform_cache.get_all()
         return self._wave_dict
 
     def render_wave(self, wave_name, show=True, time_unit='lut_index',
@@ -360,10 +385,14 @@ class UHFQC_LookuptableManager(Instrument):
              (0, 1/self.get('mixer_alpha') * 1/np.cos(self.get('mixer_phi')*2*np.pi/360))))
         return mixer_pre_distortion_matrix
 
-    def load_pulse_onto_AWG_lookuptable(self, pulse_name, regenerate_pulses=True):
+    def load_pulse_onto_AWG_lookuptable(self, pulse_name, regenerate_pulses=True,
+                                        force_upload=False):
         '''
         Load a pulses to the lookuptable, it uses the lut_mapping to
         determine which lookuptable to load to.
+
+        The UHFQC does not upload the pulse again if its AWG program already
+        plays it, unless force_upload is True.
         '''
         if regenerate_pulses:
             wave_dict = self.generate_standard_pulses()
@@ -376,7 +405,9 @@ class UHFQC_LookuptableManager(Instrument):
         Q_wave = np.clip(np.multiply(self.get('mixer_QI_amp_ratio'),
                          wave_dict[pulse_name][1]), self._voltage_min,
                          self._voltage_max)
-        self.UHFQC.awg_sequence_acquisition_and_pulse(I_wave, Q_wave, self.acquisition_delay())
+        self.UHFQC.awg_sequence_acquisition_and_pulse(
+            I_wave, Q_wave, self.acquisition_delay(),
+            force_upload=force_upload)
         print('wave {} should be loaded in UHFQC'.format(pulse_name))
 
     def give_back_wave_forms(self, pulse_name, regenerate_pulses=True):
@@ -22,6 +22,10 @@ class UHFQC_LookuptableManagerManager(Instrument):
 
     For now this is a test version that only stores the parameters for a
     specific set of pulses.
+
+    The LutMans only regenerate the pulses of which a parameter changed,
+    the UHFQC only uploads a multiplexed pulse if it differs from the one
+    its AWG program plays.
     '''
     shared_kwargs = ['UHFQC']
 
@@ -183,10 +187,13 @@ class UHFQC_LookuptableManagerManager(Instrument):
              (0, 1/self.get('mixer_alpha') * 1/np.cos(self.get('mixer_phi')*2*np.pi/360))))
         return mixer_pre_distortion_matrix
 
-    def load_pulse_onto_AWG_lookuptable(self, pulse_name):
+    def load_pulse_onto_AWG_lookuptable(self, pulse_name, force_upload=False):
         '''
         Load a pulses to the lookuptable, it uses the lut_mapping to
         determine which lookuptable to load to.
+
+        The UHFQC does not upload the pulse again if its AWG program already
+        plays it, unless force_upload is True.
         '''
 
         wave_dict = self._wave_dict
@@ -197,7 +204,9 @@ class UHFQC_LookuptableManagerManager(Instrument):
         Q_wave = np.clip(np.multiply(self.get('mixer_QI_amp_ratio'),
                          wave_dict[pulse_name][1]), self._voltage_min,
                          self._voltage_max)
-        self.UHFQC.awg_sequence_acquisition_and_pulse(I_wave, Q_wave, self.acquisition_delay())
+        self.UHFQC.awg_sequence_acquisition_and_pulse(
+            I_wave, Q_wave, self.acquisition_delay(),
+            force_upload=force_upload)
         print('wave {} should be loaded in UHFQC'.format(pulse_name))
 
     def give_back_wave_forms(self, pulse_name):
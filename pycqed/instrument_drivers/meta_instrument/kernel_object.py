@@ -1,4 +1,5 @@
 import os
+import sys
 import logging
 import numpy as np
 
@@ -11,6 +12,8 @@ from pycqed.measurement.kernel_functions import kernel_generic, htilde_bounce, \
     heaviside, kernel_generic2
 
 import pycqed.measurement.kernel_functions as kf
+from pycqed.measurement import kernel_cache
+from pycqed.measurement.waveform_control import predistortion
 
 
 class Distortion(Instrument):
@@ -42,6 +45,21 @@ class Distortion(Instrument):
                            docstring='Path for loading external kernels,' +
                            'such as room temperature correction kernels.')
 
+        self.add_parameter('kernel_cache_dir',
+                           initial_value=kernel_cache.default_cache_dir,
+                           vals=vals.Anything(),
+                           parameter_class=ManualParameter,
+                           docstring='Directory of the on-disk kernel cache, '
+                           'shared between processes. None disables the '
+                           'cache.')
+        self.add_parameter('kernel_cache_size',
+                           initial_value=kernel_cache.default_cache_size,
+                           vals=vals.Ints(1),
+                           parameter_class=ManualParameter,
+                           docstring='Maximum number of kernels in the '
+                           'on-disk cache, least recently used kernels are '
+                           'removed.')
+
         self.add_parameter('config_changed',
                            vals=vals.Bool(),
                            get_cmd=self._get_config_changed)
@@ -164,6 +182,26 @@ class Distortion(Instrument):
         return kf.decay_kernel(amp=self.decay_amp_2(), tau=self.decay_tau_2(),
                                length=self.decay_length_2())
 
+    def get_bounce_filter_1(self):
+        return kf.bounce_filter(amp=self.bounce_amp_1(),
+                                time=self.bounce_tau_1(),
+                                length=self.bounce_length_1())
+
+    def get_bounce_filter_2(self):
+        return kf.bounce_filter(amp=self.bounce_amp_2(),
+                                time=self.bounce_tau_2(),
+                                length=self.bounce_length_2())
+
+    def get_skin_filter(self):
+        return kf.skin_filter(alpha=self.skineffect_alpha(),
+                              length=self.skineffect_length())
+
+    def get_decay_filter_1(self):
+        return kf.decay_filter(amp=self.decay_amp_1(), tau=self.decay_tau_1())
+
+    def get_decay_filter_2(self):
+        return kf.decay_filter(amp=self.decay_amp_2(), tau=self.decay_tau_2())
+
     # def get_poly_kernel(self):
     #     return poly_kernel(a=self.poly_a(),
     #                        b=self.poly_b(),
@@ -196,17 +234,49 @@ class Distortion(Instrument):
                        self.get_decay_kernel_2()]
         cache.update({'OPT_chevron.tmp': self.convolve_kernel(kernel_list)})
 
-    def get_corrections_kernel(self):
+    def get_kernel_cache(self):
+        """
+        Returns the on-disk kernel cache or None if it is disabled.
+        """
+        if not self.kernel_cache_dir():
+            return None
+        return kernel_cache.KernelCache(self.kernel_cache_dir(),
+                                        max_size=self.kernel_cache_size())
 
-        kernel_list_before = self.kernel_list()
+    def _external_kernel_paths(self):
+        return [os.path.join(self.kernel_dir_path(), k_name)
+                for k_name in self.kernel_list()]
 
+    def load_external_kernels(self):
+        cache = self.get_kernel_cache()
         external_kernels = []
-        for k_name in kernel_list_before:
-            f_name = os.path.join(self.kernel_dir_path(), k_name)
-            print('Loading {}'.format(f_name))
-
-            kernel_vec = np.loadtxt(f_name)
+        for f_name in self._external_kernel_paths():
+            if cache is None:
+                print('Loading {}'.format(f_name))
+                kernel_vec = np.loadtxt(f_name)
+            else:
+                kernel_vec = cache.load_text_kernel(f_name)
             external_kernels.append(kernel_vec)
+        return external_kernels
+
+    def corrections_kernel_key(self):
+        """
+        Returns the key of the corrections kernel in the kernel cache, based
+        on the values of the configuration parameters, the contents of the
+        external kernel files and the source of the kernel functions.
+        """
+        config = sorted((name, par.get()) for name, par in
+                        self.parameters.items()
+                        if isinstance(par, ConfigParameter) and
+                        name != 'kernel_list')
+        file_hashes = [kernel_cache.file_hash(f_name) for f_name in
+                       self._external_kernel_paths()]
+        code = kernel_cache.code_version(kf, sys.modules[__name__])
+        return kernel_cache.cache_key('corrections_kernel', config,
+                                      file_hashes, code)
+
+    def get_corrections_kernel(self):
+        external_kernels = self.load_external_kernels()
 
         kernel_object_kernels = [
             self.get_bounce_kernel_1(),
@@ -219,6 +289,38 @@ class Distortion(Instrument):
         return self.convolve_kernel(kernel_list,
                                     length=self.corrections_length())
 
+    def get_corrections_filters(self):
+        '''
+        Returns the corrections as a cascade of filters [(b, a), ...], the
+        external kernels are FIR filters, the decay, bounce and skin effect
+        corrections are IIR filters (see kernel_functions.apply_filters).
+        Up to the lengths of the kernels the impulse response is identical
+        to the corrections kernel.
+        '''
+        filters = [(k, [1.]) for k in self.load_external_kernels()]
+        filters += [self.get_bounce_filter_1(),
+                    self.get_bounce_filter_2(),
+                    self.get_skin_filter(),
+                    self.get_decay_filter_1(),
+                    self.get_decay_filter_2()]
+        # leave out identity filters
+        return [(b, a) for (b, a) in filters
+                if not (len(b) == 1 and len(a) == 1 and b[0] == a[0])]
+
+    def distort_waveform(self, waveform, method='filters'):
+        '''
+        Applies the corrections to a waveform (or an array of waveforms).
+
+        method: 'filters' applies the cascade of corrections filters in O(N),
+                'kernel' convolves with the corrections kernel.
+        '''
+        if method == 'filters':
+            return kf.apply_filters(waveform, self.get_corrections_filters())
+        elif method == 'kernel':
+            return predistortion.convolve_waveforms(waveform, self.kernel())
+        else:
+            raise ValueError('Unknown method "{}"'.format(method))
+
     def save_corrections_kernel(self, filename):
 
         # if type(kernel_list_before) is not list:
@@ -234,7 +336,16 @@ class Distortion(Instrument):
         if self.config_changed():
             print('{} configuration changed, recalculating kernels'.format(
                   self.name))
-            self._precalculated_kernel = self.get_corrections_kernel()
+            cache = self.get_kernel_cache()
+            if cache is None:
+                kernel = self.get_corrections_kernel()
+            else:
+                key = self.corrections_kernel_key()
+                kernel = cache.get(key)
+                if kernel is None:
+                    kernel = self.get_corrections_kernel()
+                    cache.put(key, kernel)
+            self._precalculated_kernel = kernel
             self._config_changed = False
 
         return self._precalculated_kernel
@@ -0,0 +1,172 @@
+'''
+Dirty tracking of the waveforms of the lookuptable managers (LutMans).
+
+A LutMan generates its waveforms from its parameters, during a calibration
+(e.g. of the amplitude or the DRAG parameter) only one of these parameters
+changes per iteration. The WaveformCache knows which parameters feed which
+waveform:
+    - a waveform is only regenerated if the value of one of its parameters
+      changed since it was last generated.
+    - a waveform is only uploaded to a slot of the instrument (e.g. an
+      entry of a lookuptable) if it differs from what was last uploaded to
+      that slot.
+
+What was uploaded is recorded per instrument (see upload_record) such that
+LutMans that load into the same instrument do not skip each others uploads.
+The record only knows about uploads that were done through a WaveformCache,
+if the instrument is reset or loaded by other means the uploads should be
+forced (clear_uploads).
+'''
+import weakref
+import numpy as np
+from collections import OrderedDict
+
+_upload_records = weakref.WeakKeyDictionary()
+
+
+def _equal(a, b):
+    '''
+    Compares two sequences of values (numbers, strings or arrays).
+    '''
+    return len(a) == len(b) and all(np.array_equal(x, y)
+                                    for x, y in zip(a, b))
+
+
+class UploadRecord(object):
+
+    '''
+    Remembers the data that was last uploaded to each slot of an instrument.
+    '''
+
+    def __init__(self):
+        self._slots = {}
+
+    def needs_upload(self, slot, *data):
+        '''
+        Returns True if data differs from what was last uploaded to slot.
+        '''
+        uploaded = self._slots.get(slot)
+        return uploaded is None or not _equal(uploaded, data)
+
+    def mark_uploaded(self, slot, *data):
+        # copies as the uploaded arrays can be modified by the caller
+        self._slots[slot] = tuple(np.copy(d) for d in data)
+
+    def clear(self, slot=None):
+        if slot is None:
+            self._slots.clear()
+        else:
+            self._slots.pop(slot, None)
+
+
+def upload_record(instrument):
+    '''
+    Returns the UploadRecord of an instrument, it is shared by all
+    WaveformCaches that upload to that instrument.
+    '''
+    try:
+        if instrument not in _upload_records:
+            _upload_records[instrument] = UploadRecord()
+    except TypeError:
+        # e.g. no instrument (None), the record can not be shared
+        return UploadRecord()
+    return _upload_records[instrument]
+
+
+class WaveformCache(object):
+
+    '''
+    Args:
+        instrument: the LutMan of which the parameters are used.
+        target: the instrument the waveforms are uploaded to.
+        common_parameters (list): parameters that feed every waveform,
+            e.g. those of a predistortion that is applied to all waveforms.
+
+    Parameters are given by name (of a parameter of the instrument) or as a
+    function without arguments (e.g. a parameter of another instrument).
+
+    Attributes:
+        nr_generated (dict): number of times each waveform was generated.
+        nr_uploads (int): number of uploads that were not skipped.
+    '''
+
+    def __init__(self, instrument, target, common_parameters=()):
+        self.instrument = instrument
+        self.common_parameters = list(common_parameters)
+        self._uploads = upload_record(target)
+        self._generators = OrderedDict()
+        self._waveforms = {}
+        self.nr_generated = {}
+        self.nr_uploads = 0
+
+    def add_waveform(self, name, generator, parameters):
+        '''
+        Adds a waveform that is generated by calling generator(), its value
+        may only depend on the parameters (and the common_parameters).
+        '''
+        self._generators[name] = (generator, list(parameters))
+        self._waveforms.pop(name, None)
+        self.nr_generated.setdefault(name, 0)
+
+    def waveform_names(self):
+        return list(self._generators.keys())
+
+    def _parameter_values(self, name):
+        values = []
+        for par in self._generators[name][1] + self.common_parameters:
+            if callable(par):
+                values.append(par())
+            else:
+                values.append(self.instrument.get(par))
+        return tuple(values)
+
+    def is_dirty(self, name):
+        '''
+        Returns True if the waveform has to be regenerated.
+        '''
+        cached = self._waveforms.get(name)
+        return cached is None or not _equal(cached[0],
+                                            self._parameter_values(name))
+
+    def get(self, name):
+        '''
+        Returns the waveform, it is regenerated if it is dirty.
+        '''
+        values = self._parameter_values(name)
+        cached = self._waveforms.get(name)
+        if cached is None or not _equal(cached[0], values):
+            cached = (values, self._generators[name][0]())
+            self._waveforms[name] = cached
+            self.nr_generated[name] += 1
+        return cached[1]
+
+    def get_all(self):
+        '''
+        Returns a dict with all waveforms, only the dirty ones are
+        regenerated.
+        '''
+        return OrderedDict((name, self.get(name)) for name in self._generators)
+
+    def invalidate(self, name=None):
+        '''
+        Forces the waveform (or all waveforms if name is None) to be
+        regenerated the next time it is used.
+        '''
+        if name is None:
+            self._waveforms.clear()
+        else:
+            self._waveforms.pop(name, None)
+
+    def needs_upload(self, slot, *data):
+        return self._uploads.needs_upload(slot, *data)
+
+    def mark_uploaded(self, slot, *data):
+        self._uploads.mark_uploaded(slot, *data)
+        self.nr_uploads += 1
+
+    def clear_uploads(self, slot=None):
+        '''
+        Forgets what was uploaded to the slot (or to all slots of the
+        target instrument if slot is None).
+        '''
+        self._uploads.clear(slot)
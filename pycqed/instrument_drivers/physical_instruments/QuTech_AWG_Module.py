@@ -14,6 +14,7 @@ from .SCPI import SCPI
 
 import numpy as np
 import struct
+import hashlib
 from qcodes import validators as vals
 
 
@@ -41,9 +42,23 @@ class HandshakeParameter(StandardParameter):
 
 class QuTech_AWG_Module(SCPI):
 
+    # Waveform data that is uploaded at once (createWaveformsReal) is sent
+    # in writes of at most this many bytes (the size of the socket buffer)
+    max_upload_batch_size = 512*1024
+
     def __init__(self, name, address, port, **kwargs):
         super().__init__(name, address, port, **kwargs)
 
+        # Client side shadow of the waveform list of the AWG, maps the name
+        # of a waveform to the digest and length of the uploaded data. It is
+        # used to skip uploading waveforms that did not change and is only
+        # valid if the waveform list is not modified by other clients.
+        self._wlist_shadow = {}
+        # True if the shadow contains all waveforms that were created on the
+        # AWG (after deleteWaveformAll), otherwise waveforms that are not in
+        # the shadow can exist on the AWG.
+        self._wlist_shadow_complete = False
+
         # AWG properties
         self.device_descriptor = type('', (), {})()
         self.device_descriptor.model = 'QWG'
@@ -178,10 +193,9 @@ class QuTech_AWG_Module(SCPI):
                            label='Waveform list',
                            get_cmd=self._getWlist)
 
-        # This command is added manually
+        # These commands are added manually
         # self.add_function('deleteWaveform'
-        self.add_function('deleteWaveformAll',
-                          call_cmd='wlist:waveform:delete all')
+        # self.add_function('deleteWaveformAll'
 
         doc_sSG = "Synchronize both sideband frequency" \
             + " generators, i.e. restart them with their defined phases."
@@ -261,6 +275,26 @@ class QuTech_AWG_Module(SCPI):
             'test'
         '''
         self.write('wlist:waveform:delete "%s"' % name)
+        self._wlist_shadow.pop(name, None)
+
+    def deleteWaveformAll(self):
+        self.write('wlist:waveform:delete all')
+        self._wlist_shadow.clear()
+        self._wlist_shadow_complete = True
+
+    def reset(self):
+        super().reset()
+        self._wlist_shadow.clear()
+        self._wlist_shadow_complete = False
+
+    def clearWaveformShadow(self):
+        '''
+        Forgets which waveforms were uploaded, such that they are uploaded
+        again by createWaveformReal. Use this if the waveform list of the AWG
+        was modified by another client.
+        '''
+        self._wlist_shadow.clear()
+        self._wlist_shadow_complete = False
 
     def getWaveformType(self, name):
         '''
@@ -350,11 +384,13 @@ class QuTech_AWG_Module(SCPI):
         # write binblock
         hdr = 'wlist:waveform:data "{}",'.format(name)
         self.binBlockWrite(binBlock, hdr)
+        self._wlist_shadow.pop(name, None)
 
     def createWaveformReal(self, name, waveform):
         """
         Convenience function to create a waveform in the AWG and then send
-        data to it
+        data to it. Nothing is sent if the AWG already contains the same
+        waveform (see createWaveformsReal).
 
         Args:
             name(string): name of waveform for internal use by the AWG
@@ -365,6 +401,47 @@ class QuTech_AWG_Module(SCPI):
 
         Compatibility:  QWG
         """
+        self.createWaveformsReal({name: waveform})
+
+    def createWaveformsReal(self, waveforms):
+        """
+        Creates several waveforms in the AWG and sends their data.
+
+        Only the waveforms that changed since they were last uploaded (or
+        that were not uploaded yet) are sent, the commands of these waveforms
+        are sent together in as few writes as possible (of at most
+        max_upload_batch_size bytes).
+
+        Args:
+            waveforms (dict): waveforms (float[numpoints], normalized
+            between -1.0 and 1.0) by name
+
+        Compatibility:  QWG
+        """
+        batch = b''
+        uploaded = {}
+        for name, waveform in waveforms.items():
+            cmds, shadow = self._createWaveformRealCmds(name, waveform)
+            if not cmds:
+                continue
+            if batch and len(batch) + len(cmds) > self.max_upload_batch_size:
+                self.writeBinary(batch)
+                self._wlist_shadow.update(uploaded)
+                batch = b''
+                uploaded = {}
+            batch += cmds
+            uploaded[name] = shadow
+        if batch:
+            self.writeBinary(batch)
+            self._wlist_shadow.update(uploaded)
+
+    def _createWaveformRealCmds(self, name, waveform):
+        """
+        Returns the commands (as bytes) that create waveform name in the AWG
+        and send its data, and the entry of the waveform in the shadow of the
+        waveform list. The commands are empty if the AWG already contains
+        the same waveform.
+        """
         wv_val = vals.Arrays(min_value=-1, max_value=1)
         wv_val.validate(waveform)
 
@@ -375,8 +452,28 @@ class QuTech_AWG_Module(SCPI):
             raise ValueError('Waveform length ({}) must be < {}'.format(
                              waveLen, maxWaveLen))
 
-        self.newWaveformReal(name, waveLen)
-        self.sendWaveformDataReal(name, waveform)
+        # The digest is computed on the data as it is sent to the AWG
+        binBlock = np.asarray(waveform, dtype=np.float32).tobytes()
+        shadow = (hashlib.sha1(binBlock).hexdigest(), waveLen)
+        old_shadow = self._wlist_shadow.get(name)
+        if old_shadow == shadow:
+            return b'', shadow
+
+        cmds = ''
+        if (old_shadow is not None and old_shadow[1] != waveLen) or (
+                old_shadow is None and not self._wlist_shadow_complete):
+            # newWaveformReal does not change the length of an existing
+            # waveform. A waveform that is not in the shadow can exist on
+            # the AWG with another length (e.g. uploaded in an earlier
+            # session), it is deleted as well.
+            cmds += 'wlist:waveform:delete "%s"' % name + self._terminator
+        if old_shadow is None or old_shadow[1] != waveLen:
+            cmds += ('wlist:waveform:new "%s",%d,real' % (name, waveLen) +
+                     self._terminator)
+        hdr = 'wlist:waveform:data "{}",'.format(name)
+        cmds += hdr + SCPI.buildHeaderString(len(binBlock))
+        return (cmds.encode() + binBlock + self._terminator.encode(),
+                shadow)
 
     ##########################################################################
     # Generic (i.e. at least AWG520 and AWG5014) Tektronix AWG functions
@@ -8,13 +8,8 @@ from . import QuTech_ControlBoxdriver as qcb
 from ._controlbox import defHeaders_CBox_v3 as defHeaders
 
 from qcodes.instrument.parameter import ManualParameter
-# cython drivers for encoding and decoding
-import pyximport
-pyximport.install(setup_args={"script_args": ["--compiler=msvc"],
-                              "include_dirs": np.get_include()},
-                  reload_support=True)
-# important codec is after pyximport.install
-from ._controlbox import codec as c
+# numpy encoder and decoder, replaces the cython codec
+from ._controlbox import codec_numpy as c
 
 '''
 @author: Xiang Fu
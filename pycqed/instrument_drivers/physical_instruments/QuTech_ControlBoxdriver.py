@@ -1,6 +1,5 @@
 import time
 import numpy as np
-import visa
 import unittest
 # from bitstring import BitArray
 import logging
@@ -8,14 +7,10 @@ import logging
 from qcodes.instrument.visa import VisaInstrument
 from qcodes.utils import validators as vals
 
-# cython drivers for encoding and decoding
-import pyximport
-pyximport.install(setup_args={"script_args": ["--compiler=msvc"],
-                              "include_dirs": np.get_include()},
-                  reload_support=True)
-
 from ._controlbox import defHeaders  # File containing bytestring commands
-from ._controlbox import codec as c  # must be below pyximport.install
+# numpy encoder and decoder, replaces the cython codec
+from ._controlbox import codec_numpy as c
+from ._controlbox.transport import VisaTransport
 
 
 class QuTech_ControlBox(VisaInstrument):
@@ -26,7 +21,7 @@ class QuTech_ControlBox(VisaInstrument):
     This is a direct port of the 'old' qtlab driver.
 
     Requirements:
-    defHeaders.py,  codec.pyx and working cython installation
+    defHeaders.py,  codec_numpy.py
     '''
 
     def __init__(self, name, address, reset=False, run_tests=False, **kw):
@@ -247,8 +242,10 @@ class QuTech_ControlBox(VisaInstrument):
     def decode_message(self, data_bytes, data_bits_per_byte=7,
                        bytes_per_value=2, signed_integer=False):
         '''
-        Exists for legacy use (only used in integration streaming mode)
-        recommend using the cython version otherwise.
+        Decodes a message (ending with checksum and EOM) of records that
+        consist of several values with different encodings (only used in
+        integration streaming mode), see codec_numpy.decode_records.
+        Use c.decode_message for messages of values with a single encoding.
         '''
         message_bytes = bytearray(data_bytes[:-2])
         # checksum = c.calculate_checksum(message_bytes)
@@ -262,27 +259,8 @@ class QuTech_ControlBox(VisaInstrument):
             signed_integer = [signed_integer]*len(bytes_per_value)
         assert(len(data_bits_per_byte) == len(bytes_per_value))
 
-        bytes_per_iteration = sum(bytes_per_value)
-        message_length = len(message_bytes)/bytes_per_iteration
-        values = np.zeros([message_length, len(bytes_per_value)])
-        cum_bytes_per_val = np.cumsum(bytes_per_value)
-
-        for i in range(message_length):
-            iteration_bytes = message_bytes[i*bytes_per_iteration:
-                                            (i+1)*bytes_per_iteration]
-            j = 0
-            for j in range(len(bytes_per_value)):
-                if j == 0:
-                    byte_val = iteration_bytes[:(cum_bytes_per_val[j])]
-                else:
-                    byte_val = iteration_bytes[(cum_bytes_per_val[j-1]):
-                                               (cum_bytes_per_val[j])]
-                val = self.decode_byte(byte_val,
-                                       data_bits_per_byte=data_bits_per_byte[
-                                           j],
-                                       signed_integer=signed_integer[j])
-                values[i, j] = val
-        return values
+        return c.decode_records(message_bytes, data_bits_per_byte,
+                                bytes_per_value, signed_integer)
 
     def create_message(self, cmd, data_bytes=None,
                        EOM=defHeaders.EndOfMessageHeader):
@@ -559,9 +537,9 @@ class QuTech_ControlBox(VisaInstrument):
         i = 0
         while not succes:
             i += 1
-            in_wait = self.visa_handle.bytes_in_buffer
+            in_wait = self.transport.bytes_in_buffer()
             if in_wait > 0:
-                message.extend(self._read_raw(in_wait))
+                message.extend(self.transport.read(in_wait))
             elif termination_send:
                 if in_wait == 0:  # This is to prevent slow message check
                     if message[-1] == ord(defHeaders.EndOfMessageHeader):
@@ -577,8 +555,8 @@ class QuTech_ControlBox(VisaInstrument):
         t1 = time.time()
         print('Acquiring data took: %s s' % (t1-t0))
 
-        # Has to use the slower (non cython) legacy version of the decoder
-        # because of unsigned integers and different shapes of databytes
+        # Uses the record decoder because of unsigned integers and different
+        # shapes of databytes
         decoded_data = self.decode_message(message,
                                            data_bits_per_byte=[7, 7, 7, 7],
                                            bytes_per_value=[4, 4, 1, 1],
@@ -1322,70 +1300,28 @@ class QuTech_ControlBox(VisaInstrument):
     ########################
     # These functions are located in AuxiliaryFctn in the matlab driver
 
+    def set_address(self, address):
+        super().set_address(address)
+        # all communication with the CBox goes through the transport
+        self.transport = VisaTransport(self.visa_handle)
+
     def _read_raw(self, size):
         '''
         Intended to replace visa_handle.read_raw
         '''
-        # Todo: test where this construction should be located, problem
-        # seems to be missing a send comand rather than read
-        # this is to catch the timeout error that can occur due to the latency
-        # of 1ms in the serial emulator of windows.
-        for i in range(2):
-            try:
-                with(self.visa_handle.ignore_warning(
-                        visa.constants.VI_SUCCESS_MAX_CNT)):
-                    mes = self.visa_handle.visalib.read(
-                        self.visa_handle.session, size)
-                    break
-            except visa.VisaIOError as e:
-                logging.warning(e)
-        else:
-            # If it fails 5 times raise an error,
-            # could not figure out how to raise original error
-            raise Exception
-        return mes[0]
+        return self.transport.read(size)
 
     def serial_read(self, timeout=5, read_all=False, read_N=0):
         '''
         Reads on the serial port until EndOfMessageHeader is received.
 
-        If read all == False and read_N = 0 it reads 1 entry.
-        if read_all ==True it reads up to the EndOfMessageHeader.
-        if read_N != 0 it reads a fixed number of bytes.
-
-        Setting read_N speeds up the readout significantly.
+        All bytes that are available are read at once and searched for the
+        EndOfMessageHeader, bytes received after it are kept for the next
+        read. read_all and read_N are no longer needed and are ignored.
 
         returns the message as bytes (including the EndOfMessageHeader).
         '''
-        buffersize = 4090
-        t_start = time.time()
-        end_of_message_received = False
-        message = bytes()
-        while not end_of_message_received:
-            if read_all:
-                m = self._read_raw(self.visa_handle.bytes_in_buffer)
-                message += m
-            elif read_N != 0:
-                if self.visa_handle.bytes_in_buffer == 2:
-                    # To catch all the "empty" messages (checksum +EOM)
-                    # Removing this makes program more robust.
-                    m = self._read_raw(2)
-                    message += m
-                elif (self.visa_handle.bytes_in_buffer > read_N/2 or
-                        self.visa_handle.bytes_in_buffer >= buffersize):
-                    m = self._read_raw(read_N)
-                    message += m
-            elif self.visa_handle.bytes_in_buffer != 0:
-                message += self._read_raw(1)
-
-            if len(message) != 0:
-                if message[-1:] == defHeaders.EndOfMessageHeader:
-                    end_of_message_received = True
-
-            if not end_of_message_received:
-                time.sleep(.0001)
-                if (time.time() - t_start) > timeout:
-                    raise Exception('Read timed out without EndOfMessage')
+        message = self.transport.read_message(timeout=timeout)
         # If an error code gets send CBox will return [checksum, err_code, EOM]
         if bytes([message[-2]]) == defHeaders.IllegalCommandHeader:
             raise ValueError('Command not recognized')
@@ -1415,12 +1351,12 @@ class QuTech_ControlBox(VisaInstrument):
             raise TypeError('command must be type bytes')
         checksum = c.calculate_checksum(command)
 
-        in_wait = self.visa_handle.bytes_in_buffer
+        in_wait = self.transport.bytes_in_buffer()
         while in_wait > 0:  # Clear any leftover messages in the buffer
-            self.visa_handle.clear()
+            self.transport.clear()
             logging.warning("Extra flush! Flushed %s bytes" % in_wait)
-            in_wait = self.visa_handle.bytes_in_buffer
-        self.visa_handle.write_raw(command)
+            in_wait = self.transport.bytes_in_buffer()
+        self.transport.write(command)
         # Done writing , verify message executed
         if verify_execution:
             message = self.serial_read()
@@ -2080,10 +2016,4 @@ class QuTech_ControlBox(VisaInstrument):
         @param unsigned_array: the unsigned number array.
         @param bit_width: Bit width of the output signed number.
         '''
-
-        signed_array = []
-        for sample in unsigned_array:
-            # print("sample: ", sample)
-            signed_array.append(self.convert_to_signed(sample, bit_width))
-
-        return signed_array
+        return c.convert_to_signed(unsigned_array, bit_width)
@@ -53,7 +53,7 @@ class SCPI(IPInstrument):
         return self._socket.recv(size)  # FIXME: should be in parent class
 
     def writeBinary(self, binMsg):
-        self._socket.send(binMsg)       # FIXME: should be in parent class
+        self._socket.sendall(binMsg)    # FIXME: should be in parent class
 
     def ask_float(self, str):
         return float(self.ask(str))
@@ -0,0 +1,171 @@
+'''
+Acquisition buffers for the single acquisition functions of the UHFQC.
+
+The data of a channel arrives in chunks of arbitrary size (one per poll).
+Instead of growing the result arrays with np.concatenate for every chunk,
+which copies all data received so far, the chunks are copied into
+preallocated per channel buffers.
+
+Rows (one sample of every channel) that are complete can be streamed to a
+callback with the signature callback(start_idx, values), e.g. the write
+method of the DataWriter of the MeasurementControl. When streaming, the
+buffer can be a ring buffer that is shorter than the acquisition. The
+channels of a poll do not arrive in sync (a poll can contain several chunks
+of one channel and none of another), a ring buffer has to be long enough
+to absorb the difference.
+
+This module does not depend on zhinst, the functions that poll only rely on
+the poll method of the daq (ziDAQServer) object.
+'''
+import numpy as np
+
+
+class AcquisitionBuffer(object):
+
+    '''
+    Preallocated buffer for the samples of several channels.
+
+    Args:
+        channels (list): the channels (keys) of the data.
+        samples (int): number of samples per channel, samples that are
+            received beyond this number are ignored.
+        chunk_size (int): number of rows that are passed to the callback
+            at once (the last chunk can be shorter), defaults to samples.
+        callback (function): called as callback(start_idx, values) when
+            the rows start_idx up to start_idx+len(values) are complete for
+            all channels, values has shape (n, nr_channels) and is a view
+            on the buffer that is only valid during the call.
+        buffer_length (int): number of samples that are kept per channel,
+            defaults to samples. A (ring) buffer shorter than samples
+            requires a callback and should be a multiple of chunk_size, a
+            channel that gets more than buffer_length samples ahead of
+            another channel raises a ValueError.
+    '''
+
+    def __init__(self, channels, samples, chunk_size=None, callback=None,
+                 buffer_length=None):
+        self.channels = list(channels)
+        self.samples = int(samples)
+        if chunk_size is None:
+            chunk_size = self.samples
+        self.chunk_size = max(int(chunk_size), 1)
+        self.callback = callback
+        if buffer_length is None:
+            buffer_length = self.samples
+        elif callback is None:
+            raise ValueError('A ring buffer requires a callback')
+        elif buffer_length % self.chunk_size != 0:
+            raise ValueError('buffer_length ({}) should be a multiple of '
+                             'chunk_size ({})'.format(buffer_length,
+                                                      self.chunk_size))
+        self.buffer_length = max(int(buffer_length), 1)
+
+        self._data = np.zeros((len(self.channels), self.buffer_length))
+        self._rows = {ch: i for i, ch in enumerate(self.channels)}
+        self.nr_received = dict.fromkeys(self.channels, 0)
+        self.nr_streamed = 0
+
+    def add(self, channel, vector):
+        '''
+        Copies the samples in vector after the samples of channel that were
+        received before. Returns the number of samples that were copied.
+        '''
+        row = self._data[self._rows[channel]]
+        start = self.nr_received[channel]
+        vector = np.ravel(vector)[:self.samples-start]
+        stop = start + len(vector)
+        if stop - self.nr_streamed > self.buffer_length:
+            raise ValueError('Acquisition buffer overflow: channel {} is more '
+                             'than {} samples ahead of the other channels'
+                             .format(channel, self.buffer_length))
+        idx = start
+        while idx < stop:
+            pos = idx % self.buffer_length
+            n = min(stop - idx, self.buffer_length - pos)
+            row[pos:pos+n] = vector[idx-start:idx-start+n]
+            idx += n
+        self.nr_received[channel] = stop
+        if self.callback is not None:
+            self._stream()
+        return len(vector)
+
+    def add_vectors(self, vectors):
+        '''
+        Adds the samples of several channels, vectors is a dict of
+        channel: samples. The channels are added in turns up to the end of
+        a chunk, such that the vectors of a dataset do not overflow a ring
+        buffer of one chunk if the channels are in sync.
+        '''
+        vectors = {ch: np.ravel(v) for ch, v in vectors.items()}
+        added = dict.fromkeys(vectors, 0)
+        while True:
+            nr_added = 0
+            for channel, vector in vectors.items():
+                start = added[channel]
+                if start >= len(vector):
+                    continue
+                n = self.chunk_size - self.nr_received[channel] % \
+                    self.chunk_size
+                n = self.add(channel, vector[start:start+n])
+                # samples beyond the number of samples are ignored
+                added[channel] = start + n if n else len(vector)
+                nr_added += n
+            if not nr_added:
+                return
+
+    def _stream(self):
+        nr_complete = min(self.nr_received.values())
+        if nr_complete < self.samples:
+            nr_complete -= nr_complete % self.chunk_size
+        while self.nr_streamed < nr_complete:
+            start = self.nr_streamed
+            # chunks never wrap around the end of the (ring) buffer
+            stop = min(start - start % self.chunk_size + self.chunk_size,
+                       nr_complete)
+            pos = start % self.buffer_length
+            self.callback(start, self._data[:, pos:pos+stop-start].T)
+            self.nr_streamed = stop
+
+    def is_complete(self):
+        return all(n >= self.samples for n in self.nr_received.values())
+
+    def is_ring_buffer(self):
+        return self.buffer_length < self.samples
+
+    def get_data(self):
+        '''
+        Returns a dict with the samples received per channel.
+        '''
+        if self.is_ring_buffer():
+            raise ValueError('The data of a ring buffer has been streamed')
+        return {ch: self._data[self._rows[ch], :self.nr_received[ch]]
+                for ch in self.channels}
+
+
+def add_dataset(acquisition_buffer, dataset, paths):
+    '''
+    Adds the vectors of a dataset (as returned by daq.poll or daq.get) to
+    the buffer, paths is a dict of channel: node path.
+    '''
+    vectors = {}
+    for channel, path in paths.items():
+        chunks = [np.ravel(v['vector']) for v in dataset.get(path, [])]
+        if chunks:
+            vectors[channel] = (chunks[0] if len(chunks) == 1 else
+                                np.concatenate(chunks))
+    acquisition_buffer.add_vectors(vectors)
+
+
+def poll_acquisition(daq, acquisition_buffer, paths, acquisition_time=0.010,
+                     timeout=0):
+    '''
+    Polls the daq until all samples were received or the timeout (s)
+    elapsed. Returns True if all samples were received.
+    '''
+    accumulated_time = 0
+    while (accumulated_time < timeout and
+           not acquisition_buffer.is_complete()):
+        dataset = daq.poll(acquisition_time, 1, 4, True)
+        add_dataset(acquisition_buffer, dataset, paths)
+        accumulated_time += acquisition_time
+    return acquisition_buffer.is_complete()
@@ -10,6 +10,12 @@ from qcodes.instrument.base import Instrument
 from qcodes.utils import validators as vals
 from fnmatch import fnmatch
 from qcodes.instrument.parameter import ManualParameter
+from pycqed.instrument_drivers.physical_instruments.ZurichInstruments import \
+    UHFQC_acquisition as acq
+from pycqed.instrument_drivers.physical_instruments.ZurichInstruments.ZI_nodes \
+    import NodeAccess
+from pycqed.instrument_drivers.physical_instruments.ZurichInstruments.\
+    ZI_awg_programs import AWGProgramLoader, interleave_waveforms
 #from instrument_drivers.physical_instruments.ZurichInstruments import UHFQuantumController as ZI_UHFQC
 
 
@@ -50,8 +56,14 @@ class UHFQC(Instrument):
         self._awgModule = self._daq.awgModule()
         self._awgModule.set('awgModule/device', self._device)
         self._awgModule.execute()
+        # all gets and sets of nodes go through the (caching, batching) node
+        # access layer
+        self._nodes = NodeAccess(self._daq, self._device)
 
         self.single_acquisition_paths = []
+        self._single_acquisition_mode = 'rl'
+        # the loaded AWG program and the compiled programs, see awg_string
+        self._awg_programs = AWGProgramLoader(self._awgModule)
 
         s_node_pars=[]
         d_node_pars=[]
@@ -77,7 +89,7 @@ class UHFQC(Instrument):
 
         for parameter in s_node_pars:
             parname=parameter[0].replace("/","_")
-            parfunc="/"+device+"/"+parameter[0]
+            parfunc=parameter[0]
             if parameter[1] == 'float':
                 self.add_parameter(
                     parname,
@@ -119,8 +131,10 @@ class UHFQC(Instrument):
 
         for parameter in d_node_pars:
             parname=parameter[0].replace("/","_")
-            parfunc="/"+device+"/"+parameter[0]
+            parfunc=parameter[0]
             if parameter[1]=='float':
+                # read-only values that are updated by the device
+                self._nodes.add_volatile_node(parfunc)
                 self.add_parameter(
                     parname,
                     get_cmd=self._gen_get_func(self.getd, parfunc))
@@ -175,74 +189,74 @@ class UHFQC(Instrument):
         # Load an AWG program (from Zurich Instruments/LabOne/WebServer/awg/src)
         self.awg_sequence_acquisition()
 
-        # Turn on both outputs
-        self.sigouts_0_on(1)
-        self.sigouts_1_on(1)
+        with self.batch():
+            # Turn on both outputs
+            self.sigouts_0_on(1)
+            self.sigouts_1_on(1)
 
-        # QuExpress thresholds on DIO (mode == 2), AWG control of DIO (mode == 1)
-        self.dios_0_mode(2)
-        # Drive DIO bits 31 to 16
-        self.dios_0_drive(0xc)
+            # QuExpress thresholds on DIO (mode == 2), AWG control of DIO (mode == 1)
+            self.dios_0_mode(2)
+            # Drive DIO bits 31 to 16
+            self.dios_0_drive(0xc)
 
-        # Configure the analog trigger input 1 of the AWG to assert on a rising edge on Ref_Trigger 1 (front-panel of the instrument)
-        self.awgs_0_triggers_0_rising(1)
-        self.awgs_0_triggers_0_level(0.000000000)
-        self.awgs_0_triggers_0_channel(2)
+            # Configure the analog trigger input 1 of the AWG to assert on a rising edge on Ref_Trigger 1 (front-panel of the instrument)
+            self.awgs_0_triggers_0_rising(1)
+            self.awgs_0_triggers_0_level(0.000000000)
+            self.awgs_0_triggers_0_channel(2)
 
 
-        # Straight connection, signal input 1 to channel 1, signal input 2 to channel 2
-        self.quex_deskew_0_col_0(1.0)
-        self.quex_deskew_0_col_1(0.0)
-        self.quex_deskew_1_col_0(0.0)
-        self.quex_deskew_1_col_1(1.0)
+            # Straight connection, signal input 1 to channel 1, signal input 2 to channel 2
+            self.quex_deskew_0_col_0(1.0)
+            self.quex_deskew_0_col_1(0.0)
+            self.quex_deskew_1_col_0(0.0)
+            self.quex_deskew_1_col_1(1.0)
 
-        self.quex_wint_delay(0)
+            self.quex_wint_delay(0)
 
-        # Setting the clock to external
-        self.system_extclk(1)
+            # Setting the clock to external
+            self.system_extclk(1)
 
-        # No rotation on the output of the weighted integration units, i.e. take real part of result
-        for i in range(0, 4):
-            eval('self.quex_rot_{0}_real(1.0)'.format(i))
-            eval('self.quex_rot_{0}_imag(0.0)'.format(i))
+            # No rotation on the output of the weighted integration units, i.e. take real part of result
+            for i in range(0, 4):
+                getattr(self, 'quex_rot_{0}_real'.format(i))(1.0)
+                getattr(self, 'quex_rot_{0}_imag'.format(i))(0.0)
 
-        # No cross-coupling in the matrix multiplication (identity matrix)
-        for i in range(0, 4):
-            for j in range(0, 4):
-                if i == j:
-                    eval('self.quex_trans_{0}_col_{1}_real(1)'.format(i,j))
-                else:
-                    eval('self.quex_trans_{0}_col_{1}_real(0)'.format(i,j))
+            # No cross-coupling in the matrix multiplication (identity matrix)
+            for i in range(0, 4):
+                for j in range(0, 4):
+                    if i == j:
+                        getattr(self, 'quex_trans_{0}_col_{1}_real'.format(i,j))(1)
+                    else:
+                        getattr(self, 'quex_trans_{0}_col_{1}_real'.format(i,j))(0)
 
-        # Configure the result logger to not do any averaging
-        self.quex_rl_length(pow(2, LOG2_AVG_CNT)-1)
-        self.quex_rl_avgcnt(LOG2_RL_AVG_CNT)
-        self.quex_rl_source(2)
+            # Configure the result logger to not do any averaging
+            self.quex_rl_length(pow(2, LOG2_AVG_CNT)-1)
+            self.quex_rl_avgcnt(LOG2_RL_AVG_CNT)
+            self.quex_rl_source(2)
 
-        # Ready for readout. Writing a '1' to these nodes activates the automatic readout of results.
-        # This functionality should be used once the ziPython driver has been improved to handle
-        # the 'poll' commands of these results correctly. Until then, we write a '0' to the nodes
-        # to prevent automatic result readout. It is then necessary to poll e.g. the AWG in order to
-        # detect when the measurement is complete, and then manually fetch the results using the 'get'
-        # command. Disabling the automatic result readout speeds up the operation a bit, since we avoid
-        # sending the same data twice.
-        self.quex_iavg_readout(0)
-        self.quex_rl_readout(0)
+            # Ready for readout. Writing a '1' to these nodes activates the automatic readout of results.
+            # This functionality should be used once the ziPython driver has been improved to handle
+            # the 'poll' commands of these results correctly. Until then, we write a '0' to the nodes
+            # to prevent automatic result readout. It is then necessary to poll e.g. the AWG in order to
+            # detect when the measurement is complete, and then manually fetch the results using the 'get'
+            # command. Disabling the automatic result readout speeds up the operation a bit, since we avoid
+            # sending the same data twice.
+            self.quex_iavg_readout(0)
+            self.quex_rl_readout(0)
 
 
 
 
-        # The custom firmware will feed through the signals on Signal Input 1 to Signal Output 1 and Signal Input 2 to Signal Output 2
-        # when the AWG is OFF. For most practical applications this is not really useful. We, therefore, disable the generation of
-        # these signals on the output here.
-        self.sigouts_0_enables_3(0)
-        self.sigouts_1_enables_7(0)
+            # The custom firmware will feed through the signals on Signal Input 1 to Signal Output 1 and Signal Input 2 to Signal Output 2
+            # when the AWG is OFF. For most practical applications this is not really useful. We, therefore, disable the generation of
+            # these signals on the output here.
+            self.sigouts_0_enables_3(0)
+            self.sigouts_1_enables_7(0)
 
 
 
     def _gen_set_func(self, dev_set_type, cmd_str):
         def set_func(val):
-            dev_set_type(cmd_str, val)
             return dev_set_type(cmd_str, value=val)
         return set_func
 
@@ -253,6 +267,16 @@ class UHFQC(Instrument):
 
     def reconnect(self):
         zi_utils.autoDetect(self._daq)
+        self.invalidate()
+
+    def invalidate(self):
+        '''
+        Forgets the cached node values and which AWG program is loaded. Use
+        this if the device was changed by other means, e.g. by another
+        client or a restart of the device.
+        '''
+        self._nodes.invalidate()
+        self._awg_programs.invalidate()
 
     def awg(self, filename):
         print(filename)
@@ -264,22 +288,23 @@ class UHFQC(Instrument):
         self.awg('UHFLI_AWG_sequences/'+filename)
 
     def awg_file(self, filename):
-        self._awgModule.set('awgModule/compiler/sourcefile', filename)
-        self._awgModule.set('awgModule/compiler/start', 1)
-        #self._awgModule.set('awgModule/elf/file', '')
-        while self._awgModule.get('awgModule/progress')['progress'][0] < 1.0:
-            time.sleep(0.1)
-        print(self._awgModule.get('awgModule/compiler/statusstring')['compiler']['statusstring'][0])
+        # the program is not cached as the file can change
+        self._awg_programs.load_file(filename)
+        print(self._awg_programs.status_string)
 
     def awg_string(self, sourcestring):
-        self._awgModule.set('awgModule/compiler/sourcestring', sourcestring)
-        #self._awgModule.set('awgModule/elf/file', '')
-        while self._awgModule.get('awgModule/progress')['progress'][0] < 1.0:
-            time.sleep(0.1)
-        print(self._awgModule.get('awgModule/compiler/statusstring')['compiler']['statusstring'][0])
-        while self._awgModule.get('awgModule/progress')['progress'][0] < 1.0:
-            time.sleep(0.01)
-        time.sleep(0.2)
+        '''
+        Compiles and uploads an AWG program.
+
+        Compiled programs are cached by the hash of the source: the program
+        that is loaded is not uploaded again and a program that was compiled
+        before is uploaded from its ELF file without compiling it (see
+        ZI_awg_programs). Call invalidate if the AWG was programmed by other
+        means.
+        '''
+        if self._awg_programs.load_string(sourcestring) in ('compiled',
+                                                            'failed'):
+            print(self._awg_programs.status_string)
 
     def close(self):
         self._daq.disconnectDevice(self._device)
@@ -300,19 +325,30 @@ class UHFQC(Instrument):
 
         return nodes
 
-    def single_acquisition_get(self, samples, acquisition_time=0.010, timeout=0, channels=set([0, 1]), mode='rl'):
+    def _single_acquisition_samples(self, mode='rl'):
+        # the number of results that the result logger (or input averager)
+        # is configured for
+        if mode == 'rl':
+            return self.quex_rl_length()
+        else:
+            return self.quex_iavg_length()
+
+    def single_acquisition_get(self, samples=None, acquisition_time=0.010, timeout=0, channels=set([0, 1]), mode='rl',
+                               callback=None, chunk_size=None, buffer_length=None):
+        if samples is None:
+            samples = self._single_acquisition_samples(mode)
         # Define the channels to use
         paths = dict()
-        data = dict()
         if mode == 'rl':
             for c in channels:
                 paths[c] = '/' + self._device + '/quex/rl/data/{}'.format(c)
-                data[c] = []
                 self._daq.subscribe(paths[c])
         else:
             for c in channels:
                 paths[c] = '/' + self._device + '/quex/iavg/data/{}'.format(c)
-                data[c] = []
+        # the results are copied into preallocated arrays
+        data = acq.AcquisitionBuffer(channels, samples, chunk_size=chunk_size, callback=callback,
+                                     buffer_length=buffer_length)
 
         # Disable automatic readout
         self._daq.setInt('/' + self._device + '/quex/rl/readout', 0)
@@ -340,68 +376,73 @@ class UHFQC(Instrument):
             return None
 
         # Acquire data
-        gotem = [False]*len(channels)
-        for n, c in enumerate(channels):
-            p = paths[c]
-            dataset = self._daq.get(p, True, 0)
-            if p in dataset:
-                for v in dataset[p]:
-                    data[c] = np.concatenate((data[c], v['vector']))
-                if len(data[c]) >= samples:
-                    gotem[n] = True
-
-        if not all(gotem):
+        dataset = dict()
+        for c in channels:
+            dataset.update(self._daq.get(paths[c], True, 0))
+        acq.add_dataset(data, dataset, paths)
+
+        if not data.is_complete():
             print("Error: Didn't get all results!")
-            for n, c in enumerate(channels):
-                print("    : Channel {}: Got {} of {} samples", c, len(data[c]), samples)
+            for c in channels:
+                print("    : Channel {}: Got {} of {} samples".format(c, data.nr_received[c], samples))
             return None
 
-        # print("data type {}".format(type(data)))
-        return data
+        return {} if data.is_ring_buffer() else data.get_data()
 
-    def single_acquisition_poll(self, samples, acquisition_time=0.010, timeout=0):
-        data = dict()
+    def single_acquisition_poll(self, samples=None, acquisition_time=0.010, timeout=0,
+                                callback=None, chunk_size=None, buffer_length=None):
+        if samples is None:
+            samples = self._single_acquisition_samples(self._single_acquisition_mode)
+        paths = dict(enumerate(self.single_acquisition_paths))
+        # the results are copied into preallocated arrays
+        data = acq.AcquisitionBuffer(paths.keys(), samples, chunk_size=chunk_size, callback=callback,
+                                     buffer_length=buffer_length)
 
         # Start acquisition
         self._daq.asyncSetInt('/' + self._device + '/awgs/0/single', 1)
         self._daq.asyncSetInt('/' + self._device + '/awgs/0/enable', 1)
 
         # Acquire data
-        gotem = [False]*len(self.single_acquisition_paths)
-        accumulated_time = 0
-
-        while accumulated_time < timeout and not all(gotem):
-            dataset = self._daq.poll(acquisition_time, 1, 4, True)
-            #print(dataset)
-            for n, p in enumerate(self.single_acquisition_paths):
-                if p in dataset:
-                    for v in dataset[p]:
-                        if n in data:
-                            data[n] = np.concatenate((data[n], v['vector']))
-                        else:
-                            data[n] = v['vector']
-                        if len(data[n]) >= samples:
-                            gotem[n] = True
-            accumulated_time += acquisition_time
-
-        if not all(gotem):
+        if not acq.poll_acquisition(self._daq, data, paths, acquisition_time, timeout):
             print("Error: Didn't get all results!")
-            for n, c in enumerate(self.single_acquisition_paths):
-                print("    : Channel {}: Got {} of {} samples", n, len(data[n]), samples)
+            for n in paths:
+                print("    : Channel {}: Got {} of {} samples".format(n, data.nr_received[n], samples))
             return None
 
-        return data
+        return {} if data.is_ring_buffer() else data.get_data()
 
-    def single_acquisition(self, samples, acquisition_time=0.010, timeout=0, channels=set([0, 1]), mode='rl'):
+    def single_acquisition(self, samples=None, acquisition_time=0.010, timeout=0, channels=set([0, 1]), mode='rl',
+                           callback=None, chunk_size=None, buffer_length=None):
+        '''
+        Acquires samples results per channel, by default the number of
+        results the result logger (mode 'rl') or input averager (mode 'iavg')
+        is configured for. The results are returned as a dict of channel:
+        array.
+
+        The results of a poll are copied into preallocated arrays. If a
+        callback is given, completed chunks of chunk_size samples of all
+        channels are passed to it as callback(start_idx, values), e.g.
+        MC.data_writer.write. If buffer_length is given only the last
+        buffer_length samples are kept per channel and an empty dict is
+        returned if these are not all samples. The channels do not arrive
+        in sync, the ring buffer has to absorb the difference.
+        '''
+        if samples is None:
+            samples = self._single_acquisition_samples(mode)
         # Shorter acquisitions can use the poll function
         if samples <= 256:
-            return self.single_acquisition_poll(samples, acquisition_time, timeout, channels, mode)
+            return self.single_acquisition_poll(samples, acquisition_time, timeout,
+                                                callback=callback, chunk_size=chunk_size,
+                                                buffer_length=buffer_length)
         else:
-            return self.single_acquisition_get(samples, acquisition_time, timeout, channels, mode)
+            return self.single_acquisition_get(samples, acquisition_time, timeout, channels, mode,
+                                               callback=callback, chunk_size=chunk_size,
+                                               buffer_length=buffer_length)
 
     def single_acquisition_initialize(self, channels=set([0, 1]), mode='rl'):
         # Define the channels to use
         self.single_acquisition_paths = []
+        self._single_acquisition_mode = mode
 
         if mode == 'rl':
             for c in channels:
@@ -531,26 +572,28 @@ class UHFQC(Instrument):
         tbase = np.arange(0, trace_length/1.8e9, 1/1.8e9)
         cosI = np.array(np.cos(2*np.pi*IF*tbase))
         sinI = np.array(np.sin(2*np.pi*IF*tbase))
-        eval('self.quex_wint_weights_{}_real(np.array(cosI))'.format(weight_function_I))
-        eval('self.quex_wint_weights_{}_imag(np.array(sinI))'.format(weight_function_I))
-        eval('self.quex_wint_weights_{}_real(np.array(sinI))'.format(weight_function_Q))
-        eval('self.quex_wint_weights_{}_imag(np.array(cosI))'.format(weight_function_Q))
-        eval('self.quex_rot_{}_real(1.0)'.format(weight_function_I))
-        eval('self.quex_rot_{}_imag(1.0)'.format(weight_function_I))
-        eval('self.quex_rot_{}_real(1.0)'.format(weight_function_Q))
-        eval('self.quex_rot_{}_imag(-1.0)'.format(weight_function_Q))
+        getattr(self, 'quex_wint_weights_{}_real'.format(weight_function_I))(np.array(cosI))
+        getattr(self, 'quex_wint_weights_{}_imag'.format(weight_function_I))(np.array(sinI))
+        getattr(self, 'quex_wint_weights_{}_real'.format(weight_function_Q))(np.array(sinI))
+        getattr(self, 'quex_wint_weights_{}_imag'.format(weight_function_Q))(np.array(cosI))
+        with self.batch():
+            getattr(self, 'quex_rot_{}_real'.format(weight_function_I))(1.0)
+            getattr(self, 'quex_rot_{}_imag'.format(weight_function_I))(1.0)
+            getattr(self, 'quex_rot_{}_real'.format(weight_function_Q))(1.0)
+            getattr(self, 'quex_rot_{}_imag'.format(weight_function_Q))(-1.0)
 
     def prepare_DSB_weight_and_rotation(self, IF, weight_function_I=0, weight_function_Q=1):
         trace_length = 4096
         tbase = np.arange(0, trace_length/1.8e9, 1/1.8e9)
         cosI = np.array(np.cos(2*np.pi*IF*tbase))
         sinI = np.array(np.sin(2*np.pi*IF*tbase))
-        eval('self.quex_wint_weights_{}_real(np.array(cosI))'.format(weight_function_I))
-        eval('self.quex_wint_weights_{}_real(np.array(sinI))'.format(weight_function_Q))
-        eval('self.quex_rot_{}_real(1.0)'.format(weight_function_I))
-        eval('self.quex_rot_{}_imag(0.0)'.format(weight_function_I))
-        eval('self.quex_rot_{}_real(1.0)'.format(weight_function_Q))
-        eval('self.quex_rot_{}_imag(0.0)'.format(weight_function_Q))
+        getattr(self, 'quex_wint_weights_{}_real'.format(weight_function_I))(np.array(cosI))
+        getattr(self, 'quex_wint_weights_{}_real'.format(weight_function_Q))(np.array(sinI))
+        with self.batch():
+            getattr(self, 'quex_rot_{}_real'.format(weight_function_I))(1.0)
+            getattr(self, 'quex_rot_{}_imag'.format(weight_function_I))(0.0)
+            getattr(self, 'quex_rot_{}_real'.format(weight_function_Q))(1.0)
+            getattr(self, 'quex_rot_{}_imag'.format(weight_function_Q))(0.0)
 
     def _make_full_path(self, path):
         if path[0] == '/':
@@ -560,19 +603,50 @@ class UHFQC(Instrument):
 
     def seti(self, path, value, async=False):
         if async:
-            func = self._daq.asyncSetInt
+            self._daq.asyncSetInt(self._make_full_path(path), int(value))
+            self._nodes.invalidate(path)
         else:
-            func = self._daq.setInt
-
-        func(self._make_full_path(path), int(value))
+            self._nodes.set(path, int(value))
 
     def setd(self, path, value, async=False):
         if async:
-            func = self._daq.asyncSetDouble
+            self._daq.asyncSetDouble(self._make_full_path(path), float(value))
+            self._nodes.invalidate(path)
         else:
-            func = self._daq.setDouble
+            self._nodes.set(path, float(value))
+
+    def batch(self):
+        '''
+        Context manager, the nodes that are set inside the block are set in
+        a single transaction at the end of the block, e.g.
+            with UHFQC.batch():
+                UHFQC.quex_rl_length(100)
+                UHFQC.quex_rl_avgcnt(10)
+        Vector nodes are not batched, they are set immediately.
+        '''
+        return self._nodes.batch()
+
+    def cached(self):
+        '''
+        Context manager, inside the block every node is read from the device
+        at most once, e.g.
+            with UHFQC.cached():
+                length = UHFQC.quex_rl_length()
+        Outside such a block every get reads the device.
+        '''
+        return self._nodes.cached()
+
+    def invalidate_cache(self, pattern=None):
+        '''
+        Removes the cached values of the nodes matching pattern
+        (e.g. 'quex/rot/*') or of all nodes, use this inside a cached block
+        if the settings were changed by another client (e.g. the web
+        interface).
+        '''
+        self._nodes.invalidate(pattern)
 
-        func(self._make_full_path(path), float(value))
+    def sync(self):
+        self._nodes.sync()
 
     def get(self, paths, convert=None):
         if type(paths) is not list:
@@ -584,7 +658,7 @@ class UHFQC(Instrument):
         values = {}
 
         for p in paths:
-            values[p] = convert(self._daq.getDouble(self._make_full_path(p)))
+            values[p] = self._nodes.get(p, convert)
 
         if single:
             return values[paths[0]]
@@ -631,7 +705,14 @@ class UHFQC(Instrument):
 
     ## sequencer functions
 
-    def awg_sequence_acquisition_and_pulse(self, Iwave, Qwave, acquisition_delay):
+    def awg_sequence_acquisition_and_pulse(self, Iwave, Qwave, acquisition_delay,
+                                           force_upload=False):
+        '''
+        Loads a program that plays the pulse (Iwave, Qwave) and starts the
+        acquisition after acquisition_delay (s). The pulse is only uploaded
+        if it differs from the one the program plays, unless force_upload is
+        True (see awg_upload_waveforms).
+        '''
         if np.max(Iwave)>1.0 or np.min(Iwave)<-1.0:
             raise KeyError("exceeding AWG range for I channel, all values should be withing +/-1")
         elif np.max(Qwave)>1.0 or np.min(Qwave)<-1.0:
@@ -641,8 +722,12 @@ class UHFQC(Instrument):
         elif len(Qwave)>16384:
             raise KeyError("exceeding max AWG wave lenght of 16384 samples for Q channel, trying to upload {} samples".format(len(Qwave)))
 
-        wave_I_string = self.array_to_combined_vector_string(Iwave, "Iwave")
-        wave_Q_string = self.array_to_combined_vector_string(Qwave, "Qwave")
+        # The program only contains placeholders for the waveforms such that
+        # it does not change (and is not recompiled) if only the waveforms
+        # change. The waveforms are uploaded as binary vectors.
+        nr_samples = max(len(Iwave), len(Qwave))
+        wave_I_string = 'wave Iwave = zeros({});\n'.format(nr_samples)
+        wave_Q_string = 'wave Qwave = zeros({});\n'.format(nr_samples)
         delay_samples = int(acquisition_delay*1.8e9/8)
         delay_string = '\twait(getUserReg(2));\n'
         self.awgs_0_userregs_2(delay_samples)
@@ -679,6 +764,7 @@ setTrigger(0);"""
 
         string = preamble+wave_I_string+wave_Q_string+loop_start+delay_string+end_string
         self.awg_string(string)
+        self.awg_upload_waveforms(0, Iwave, Qwave, force_upload)
 
     def array_to_combined_vector_string(self, array, name):
         # this function cuts up arrays into several vectors of maximum length 1024 that are joined.
@@ -735,6 +821,23 @@ setTrigger(0);"""
     def awg_update_waveform(self, index, data):
         self.awgs_0_waveform_index(index)
         self.awgs_0_waveform_data(data)
+        self._awg_programs.mark_waveform_uploaded(index, data)
+
+    def awg_upload_waveforms(self, index, Iwave, Qwave, force_upload=False):
+        '''
+        Uploads the waveforms of the two channels played by a playWave of the
+        loaded AWG program, index is the index of the waveform in the program
+        (the order in which the waveforms are first played).
+
+        The waveforms are not uploaded if they were already uploaded to the
+        loaded program, unless force_upload is True. Loading another program
+        (e.g. awg_sequence_acquisition) resets the waveforms, they are
+        uploaded again.
+        '''
+        data = interleave_waveforms(Iwave, Qwave)
+        if force_upload or self._awg_programs.needs_waveform_upload(index,
+                                                                    data):
+            self.awg_update_waveform(index, data)
 
     def awg_sequence_acquisition_and_pulse_SSB(self, f_RO_mod, RO_amp, RO_pulse_length, acquisition_delay):
         f_sampling=1.8e9
@@ -749,17 +852,18 @@ setTrigger(0);"""
 
 
     def upload_transformation_matrix(self, matrix):
-        for i in range(np.shape(matrix)[0]): #looping over the rows
-            for j in range(np.shape(matrix)[1]): #looping over the colums
-                #value =matrix[i,j]
-                #print(value)
-                eval('self.quex_trans_{}_col_{}_real(matrix[{}][{}])'.format(j,i,i,j))
+        with self.batch():
+            for i in range(np.shape(matrix)[0]): #looping over the rows
+                for j in range(np.shape(matrix)[1]): #looping over the colums
+                    #value =matrix[i,j]
+                    #print(value)
+                    getattr(self, 'quex_trans_{}_col_{}_real'.format(j,i))(matrix[i][j])
 
     def download_transformation_matrix(self, nr_rows=4, nr_cols=4):
         matrix = np.zeros([nr_rows, nr_cols])
         for i in range(np.shape(matrix)[0]): #looping over the rows
             for j in range(np.shape(matrix)[1]): #looping over the colums
-                matrix[i][j] = (eval('self.quex_trans_{}_col_{}_real()'.format(j,i)))
+                matrix[i][j] = getattr(self, 'quex_trans_{}_col_{}_real'.format(j,i))()
                 #print(value)
                 #matrix[i,j]=value
         return matrix
@@ -0,0 +1,175 @@
+'''
+Loading programs onto the AWG of a Zurich Instruments device.
+
+Compiling an AWG program takes seconds. The AWGProgramLoader keeps the ELF
+file of every program it compiled, named after the hash of the source, and
+    - does not upload a program again if it is the loaded program.
+    - uploads a program that was compiled before from its ELF file instead
+      of compiling it again (if the upload fails it is compiled).
+
+Which program is loaded is only known for programs that are loaded using
+the loader. If the AWG is programmed by other means (e.g. from a source
+file, by another client or after a restart of the device) the loader has to
+be invalidated.
+
+Waveforms of a program are uploaded as binary vectors (see
+interleave_waveforms). The loader records the waveforms that were uploaded
+to the loaded program, such that a waveform is only uploaded if it changed.
+The record is cleared whenever another program is loaded (loading a
+program resets its waveforms) or the loader is invalidated.
+
+This module does not depend on zhinst, it only relies on the set and get
+methods of the awgModule.
+'''
+import time
+import hashlib
+import numpy as np
+
+
+def program_hash(sourcestring):
+    return hashlib.sha1(sourcestring.encode()).hexdigest()
+
+
+def interleave_waveforms(*waves):
+    '''
+    Returns the vector of the waveform of a playWave of several channels as
+    it is uploaded to the AWG: the samples of the channels are interleaved,
+    shorter waveforms are padded with zeros.
+    '''
+    nr_samples = max(len(w) for w in waves)
+    data = np.zeros((nr_samples, len(waves)))
+    for i, w in enumerate(waves):
+        data[:len(w), i] = w
+    return data.ravel()
+
+
+class AWGProgramLoader(object):
+
+    '''
+    Args:
+        awg_module: the awgModule of the ziDAQServer, configured for the
+            device (or an object with the same set and get methods).
+        poll_interval (float): time in s between checks of the progress of
+            a compilation or upload.
+
+    Attributes:
+        loaded_hash: the hash of the loaded program, None if it is unknown.
+        status_string: the status string of the last compilation.
+    '''
+
+    def __init__(self, awg_module, poll_interval=0.01):
+        self._awg_module = awg_module
+        self.poll_interval = poll_interval
+        self.loaded_hash = None
+        # program hash -> name of the ELF file
+        self._elf_files = {}
+        # waveform index -> data uploaded to the loaded program
+        self._waveforms = {}
+        self.status_string = ''
+
+    def _get(self, node):
+        # e.g. get('awgModule/elf/upload') returns {'elf': {'upload': [0]}}
+        value = self._awg_module.get('awgModule/' + node)
+        for key in node.split('/'):
+            value = value[key]
+        return value[0]
+
+    def invalidate(self):
+        '''
+        Forgets which program is loaded, the next program is uploaded even
+        if it is the program that was loaded last.
+        '''
+        self.loaded_hash = None
+        self._waveforms.clear()
+
+    def clear(self):
+        '''
+        Forgets which program is loaded and the compiled programs.
+        '''
+        self.invalidate()
+        self._elf_files.clear()
+
+    def is_compiled(self, sourcestring):
+        return program_hash(sourcestring) in self._elf_files
+
+    def needs_waveform_upload(self, index, data):
+        '''
+        Returns True if data differs from the waveform that was last
+        uploaded to index of the loaded program.
+        '''
+        uploaded = self._waveforms.get(index)
+        return uploaded is None or not np.array_equal(uploaded, data)
+
+    def mark_waveform_uploaded(self, index, data):
+        # a copy as the uploaded array can be modified by the caller
+        self._waveforms[index] = np.copy(data)
+
+    def load_string(self, sourcestring):
+        '''
+        Loads a program onto the AWG.
+
+        Returns:
+            'loaded' if the program was already loaded, 'uploaded' if it
+            was uploaded from its ELF file, 'compiled' if it was compiled
+            and uploaded or 'failed' if the compilation failed.
+        '''
+        digest = program_hash(sourcestring)
+        if digest == self.loaded_hash:
+            return 'loaded'
+        self.invalidate()
+        elf_file = self._elf_files.get(digest)
+        if elf_file is not None:
+            if self._upload_elf(elf_file):
+                self.loaded_hash = digest
+                return 'uploaded'
+            # e.g. the file was removed from the data server
+            del self._elf_files[digest]
+
+        elf_file = 'pycqed_{}.elf'.format(digest)
+        self._awg_module.set('awgModule/elf/file', elf_file)
+        self._awg_module.set('awgModule/compiler/sourcestring', sourcestring)
+        if not self._wait_for_compilation():
+            return 'failed'
+        self._elf_files[digest] = elf_file
+        self.loaded_hash = digest
+        return 'compiled'
+
+    def load_file(self, filename):
+        '''
+        Compiles and loads the program in a source file (on the data
+        server). The program is not cached as the file can change.
+
+        Returns:
+            'compiled' or 'failed'
+        '''
+        self.invalidate()
+        self._awg_module.set('awgModule/compiler/sourcefile', filename)
+        self._awg_module.set('awgModule/compiler/start', 1)
+        return 'compiled' if self._wait_for_compilation() else 'failed'
+
+    def _wait_for_compilation(self):
+        '''
+        Waits until the program is compiled and uploaded, returns False if
+        the compilation or the upload failed.
+        '''
+        while self._get('compiler/status') == -1:
+            time.sleep(self.poll_interval)
+        self.status_string = self._get('compiler/statusstring')
+        # status 1 means the compilation failed
+        if self._get('compiler/status') == 1:
+            return False
+        while (self._get('progress') < 1.0 and
+               self._get('elf/status') != 1):
+            time.sleep(self.poll_interval)
+        return self._get('elf/status') != 1
+
+    def _upload_elf(self, elf_file):
+        '''
+        Uploads a compiled program, returns False if the upload failed.
+        '''
+        self._awg_module.set('awgModule/elf/file', elf_file)
+        self._awg_module.set('awgModule/elf/upload', 1)
+        while self._get('elf/upload') == 1:
+            time.sleep(self.poll_interval)
+        # status 1 means the upload failed
+        return self._get('elf/status') != 1
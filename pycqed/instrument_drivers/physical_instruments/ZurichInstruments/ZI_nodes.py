@@ -0,0 +1,161 @@
+'''
+Node access layer for the Zurich Instruments drivers.
+
+Every getX/setX of a ziDAQServer is a round trip to the data server. The
+NodeAccess reduces these by
+    - batching set operations: inside a "with nodes.batch():" block the
+      values are collected and set in a single daq.set([...]) transaction
+      when the block ends.
+    - caching values that are read: inside a "with nodes.cached():" block a
+      node is only read once, the cache is cleared when the block ends.
+
+Outside a cached block every get reads the device, such that e.g. a
+snapshot records the actual values. Values that are set are never cached,
+the device can coerce them (e.g. a range is rounded to one of the
+available ranges) and the next get reads the value that was applied. Nodes
+that the device changes by itself (matching one of the volatile_nodes
+patterns, e.g. an output that is switched off on an overload, or added
+using add_volatile_node) are not cached inside a cached block either.
+
+This module does not depend on zhinst, it only relies on the
+getDouble, setInt, setDouble, set and sync methods of the daq.
+'''
+from contextlib import contextmanager
+from fnmatch import fnmatch
+
+
+class NodeAccess(object):
+
+    '''
+    Args:
+        daq: the ziDAQServer (or an object with the same interface).
+        device (str): the device id, used to make paths absolute.
+        volatile_nodes (list): patterns of (device relative) paths of nodes
+            that are never cached.
+    '''
+    volatile_nodes = ('awgs/*/enable', 'awgs/*/ready', 'awgs/*/userregs/*',
+                      'sigouts/*/on', 'sigouts/*/range',
+                      'sigouts/*/autorange', 'sigins/*/range')
+
+    def __init__(self, daq, device, volatile_nodes=None):
+        self._daq = daq
+        self._device = device
+        if volatile_nodes is not None:
+            self.volatile_nodes = tuple(volatile_nodes)
+        self._cache = {}
+        self._cache_depth = 0
+        self._batch = None
+        self._pending = {}
+        self._volatile = {}
+
+    def full_path(self, path):
+        if path[0] == '/':
+            return path.lower()
+        else:
+            return ('/' + self._device + '/' + path).lower()
+
+    def is_volatile(self, path):
+        '''
+        Returns True if the (absolute) path matches one of the
+        volatile_nodes patterns.
+        '''
+        if path not in self._volatile:
+            self._volatile[path] = any(
+                fnmatch(path, self.full_path(p)) for p in self.volatile_nodes)
+        return self._volatile[path]
+
+    def add_volatile_node(self, path):
+        '''
+        Marks a node as volatile, e.g. a read-only node that is updated by
+        the device. Volatile nodes are never cached.
+        '''
+        path = self.full_path(path)
+        self._volatile[path] = True
+        self._cache.pop(path, None)
+
+    def set(self, path, value):
+        '''
+        Sets a node, ints are set as integers, other values as doubles.
+        Inside a batch the value is set when the batch ends.
+        '''
+        path = self.full_path(path)
+        # the next get reads the value the device applied
+        self._cache.pop(path, None)
+        if self._batch is not None:
+            self._batch.append((path, value))
+            self._pending[path] = value
+        elif isinstance(value, int):
+            self._daq.setInt(path, value)
+        else:
+            self._daq.setDouble(path, value)
+
+    def get(self, path, convert=float):
+        '''
+        Returns the (converted) value of a node. Inside a batch a value that
+        is not set yet is returned as it was set, inside a cached block a
+        value that was read before is returned from the cache.
+        '''
+        path = self.full_path(path)
+        if path in self._pending:
+            return convert(self._pending[path])
+        if path in self._cache:
+            return convert(self._cache[path])
+        value = self._daq.getDouble(path)
+        if self._cache_depth and not self.is_volatile(path):
+            self._cache[path] = value
+        return convert(value)
+
+    def invalidate(self, pattern=None):
+        '''
+        Removes the cached values of the nodes matching pattern (e.g.
+        'quex/rot/*'), or of all nodes if pattern is None.
+        '''
+        if pattern is None:
+            self._cache.clear()
+        else:
+            pattern = self.full_path(pattern)
+            for path in [p for p in self._cache if fnmatch(p, pattern)]:
+                del self._cache[path]
+
+    @contextmanager
+    def cached(self):
+        '''
+        Context manager inside which every node is read at most once, e.g.
+        to compute settings from the values of many nodes. The values are
+        assumed not to be changed by other clients during the block. Blocks
+        can be nested, the cache is cleared at the end of the outermost
+        block.
+        '''
+        self._cache_depth += 1
+        try:
+            yield
+        finally:
+            self._cache_depth -= 1
+            if not self._cache_depth:
+                self._cache.clear()
+
+    @contextmanager
+    def batch(self):
+        '''
+        Context manager that collects all set operations and sets them in a
+        single transaction at the end of the block. Values are set in the
+        order in which they were set. Batches can be nested, the values are
+        set at the end of the outermost batch.
+        '''
+        if self._batch is not None:
+            yield
+            return
+        self._batch = []
+        try:
+            yield
+            if self._batch:
+                self._daq.set([[path, value] for path, value in self._batch])
+        finally:
+            self._batch = None
+            self._pending.clear()
+
+    def sync(self):
+        '''
+        Waits until all values that were set are applied to the device.
+        '''
+        self._daq.sync()
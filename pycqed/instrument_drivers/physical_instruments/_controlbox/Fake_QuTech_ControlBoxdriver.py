@@ -0,0 +1,25 @@
+from .transport import FakeCBoxTransport
+from .. import QuTech_ControlBoxdriver as qcb
+
+
+'''
+This fake driver runs the CBox driver against an in memory CBox
+(FakeCBoxTransport) instead of the serial port. The responses of the fake
+CBox are set using CBox.transport.set_response.
+'''
+
+
+class Fake_QuTech_ControlBox(qcb.QuTech_ControlBox):
+
+    def set_address(self, address=None):
+        self._address = address
+        self.transport = FakeCBoxTransport()
+
+    def set_terminator(self, terminator=None):
+        self._terminator = terminator
+
+    def _set_visa_timeout(self, value):
+        pass
+
+    def _get_visa_timeout(self):
+        pass
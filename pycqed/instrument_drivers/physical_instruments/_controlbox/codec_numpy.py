@@ -0,0 +1,249 @@
+'''
+NumPy encoder and decoder for the CBox, a drop in replacement for the
+cython module codec.pyx that does not need a compiler.
+
+Messages are encoded and decoded as a whole, the bytes of a message are
+viewed as a (nr_values, bytes_per_value) array from which the data bits are
+selected and shifted into place.
+The protocol is described in the docstring of encode_byte.
+'''
+import numpy as np
+
+
+def create_message(cmd=None, data_bytes=bytes(), EOM=b"\x7F"):
+    '''
+    Input arguments:
+                  cmd         = None
+        bytes     data_bytes  = bytes()
+        bytes     EOM         = b'\x7F'
+
+    Creates bytes to send as a message.
+    Starts with a command, then adds the data bytes and ends with EOM.
+    '''
+    message = bytes()
+    if cmd is not None:
+        message += cmd
+    message += data_bytes
+    message += EOM
+    return message
+
+
+def _shifts(data_bits_per_byte, bytes_per_value):
+    # the most significant bits are in the first byte of a value
+    return data_bits_per_byte*np.arange(bytes_per_value-1, -1, -1,
+                                        dtype=np.int64)
+
+
+def encode_byte(value, data_bits_per_byte=7, expected_number_of_bytes=2):
+    '''
+    input arguments
+    int value                    : value to be encoded
+    int data_bits_per_byte       : specify bits/byte used in encoding
+    int expected_number_of_bytes : number of bytes expected by CBox
+
+    returns
+    bytes data_bytes             : the encoded value
+
+
+    From "250 MSPs Control Box Design Specification" version May 2015
+    by Jacob de Sterke
+
+    full_byte encoding:
+    In this mode each protocol byte contains 7 bits or the data to be
+    transferred. This results in a bit efficiency of about 85%. This mode
+    is mostly used when large words (e.g. 28-bit words) need to be
+    transferred. This improves the efficiency since transferring a 28-bit
+    word only needs four protocol bytes instead of seven when using the
+    nibble per byte mode.
+
+    |7|6|5|4|3|2|1|0|
+     | | > > > > > > > data bits
+     |
+     always 1
+
+
+    nibble_byte encoding:
+    In this mode each protocol byte contains only four bits (a nibble) of
+    the data to be transferred. This results in a bit efficiency of 50%;
+    to transfer one data byte two protocol bytes are needed.
+    |7|6|5|4|3|2|1|0|
+    | | | | | > > >  data bits
+    | | > > > unused bits (should be set to zero for consistency)
+    |
+    always 1
+    '''
+    # A single value is encoded without numpy, which is faster for the
+    # short messages (the commands) that use this function
+    value = int(value)
+    data_bits_per_byte = int(data_bits_per_byte)
+    mask = (1 << data_bits_per_byte) - 1
+    return bytes([(value >> (data_bits_per_byte*i) & mask) | 128
+                  for i in range(int(expected_number_of_bytes)-1, -1, -1)])
+
+
+def encode_array(values, data_bits_per_byte=7, bytes_per_value=2):
+    '''
+    Input arguments
+        int*   values                      : array of values to be encoded
+        int    data_bits_per_byte = 7      : specify bits/byte used in encoding
+        int    bytes_per_value    = 2      : number of bytes expected per value
+
+    Encodes an array of values, gives the same result as encoding every
+    value using encode_byte. Negative values are encoded in two's complement.
+    '''
+    data_bits_per_byte = int(data_bits_per_byte)
+    bytes_per_value = int(bytes_per_value)
+    values = np.asarray(values, dtype=np.int64).reshape(-1, 1)
+    data = values >> _shifts(data_bits_per_byte, bytes_per_value)
+    data &= (1 << data_bits_per_byte) - 1
+    data |= 128
+    return data.astype(np.uint8).tobytes()
+
+
+def decode_values(message_bytes, data_bits_per_byte=7, bytes_per_value=2,
+                  signed_integer=True):
+    '''
+    Input arguments:
+        bytes     message_bytes      : the encoded values, without EOM
+        int       data_bits_per_byte : 7
+        int       bytes_per_value    : 2
+        bool      signed_integer     : True
+
+    returns numpy array of type int
+
+    Decodes the values of a message (see encode_byte), values are converted
+    to signed integers (of data_bits_per_byte*bytes_per_value bits) if
+    signed_integer is True. Trailing bytes that do not form a complete value
+    (e.g. the checksum) are ignored.
+    '''
+    data_bits_per_byte = int(data_bits_per_byte)
+    bytes_per_value = int(bytes_per_value)
+    data = np.frombuffer(bytes(message_bytes), dtype=np.uint8)
+    message_length = len(data)//bytes_per_value
+    data = data[:message_length*bytes_per_value].reshape(
+        message_length, bytes_per_value)
+    data = data & np.uint8((1 << data_bits_per_byte) - 1)
+    # the bits of the bytes do not overlap, adding is combining them
+    values = (data.astype(np.int64) <<
+              _shifts(data_bits_per_byte, bytes_per_value)).sum(axis=1)
+    if signed_integer:
+        values = convert_to_signed(values,
+                                   data_bits_per_byte*bytes_per_value,
+                                   validate=False)
+    return values
+
+
+def decode_message(data_bytes, data_bits_per_byte=7, bytes_per_value=2):
+    '''
+    Input arguments:
+        bytearray data_bytes         :
+        int       data_bits_per_byte : 7
+        int       bytes_per_value    : 2
+
+    returns numpy array of type int
+    Decodes a message (ending with EOM) of signed values.
+    '''
+    return decode_values(data_bytes[:-1], data_bits_per_byte,
+                         bytes_per_value)
+
+
+def decode_byte(data_bytes, data_bits_per_byte=7):
+    '''
+    Input arguments:
+        bytearray data_bytes
+        int       data_bits_per_byte : 7
+    returns
+        int       value
+
+    Inverse function of encode byte. Protocol is described in docstring
+    of encode_byte().
+    '''
+    mask = (1 << data_bits_per_byte) - 1
+    value = 0
+    for byte in data_bytes:
+        value = (value << data_bits_per_byte) | (byte & mask)
+    nr_bits = data_bits_per_byte*len(data_bytes)
+    if value & (1 << (nr_bits-1)):  # verify if negative
+        value -= 1 << nr_bits
+    return value
+
+
+def decode_records(message_bytes, data_bits_per_byte, bytes_per_value,
+                   signed_integer):
+    '''
+    Input arguments:
+        bytes     message_bytes      : the encoded records, without checksum
+                                       and EOM
+        list      data_bits_per_byte : per field of a record
+        list      bytes_per_value    : per field of a record
+        list      signed_integer     : per field of a record
+
+    returns numpy array of type int, of shape (nr_records, nr_fields)
+
+    Decodes a message that consists of records of several fields with
+    different encodings.
+    '''
+    bytes_per_record = sum(int(b) for b in bytes_per_value)
+    data = np.frombuffer(bytes(message_bytes), dtype=np.uint8)
+    nr_records = len(data)//bytes_per_record
+    data = data[:nr_records*bytes_per_record].reshape(nr_records,
+                                                      bytes_per_record)
+    values = np.empty((nr_records, len(bytes_per_value)), dtype=np.int64)
+    start = 0
+    for i, (dbpb, bpv, signed) in enumerate(zip(
+            data_bits_per_byte, bytes_per_value, signed_integer)):
+        bpv = int(bpv)
+        values[:, i] = decode_values(data[:, start:start+bpv].tobytes(),
+                                     dbpb, bpv, signed)
+        start += bpv
+    return values
+
+
+def convert_to_signed(values, bit_width, validate=True):
+    '''
+    Input arguments:
+        int*      values    : unsigned values
+        int       bit_width : bit width of the signed values
+        bool      validate  : True
+
+    returns numpy array of type int
+
+    Interprets unsigned values as signed (two's complement) values of
+    bit_width bits. Raises a ValueError if validate is True and a value does
+    not fit in bit_width bits.
+    '''
+    values = np.asarray(values, dtype=np.int64)
+    bit_width = int(bit_width)
+    if validate and (np.any(values < 0) or np.any(values >= 2**bit_width)):
+        raise ValueError('Values should be positive integers smaller than '
+                         '2**{}'.format(bit_width))
+    return np.where(values >= 2**(bit_width-1), values - 2**bit_width,
+                    values)
+
+
+def decode_boolean_array(data_bytes, data_bits_per_byte=4):
+    '''
+    Used in the qubit state logging mode
+    '''
+    # -2 to remove checksum and eom, only the last data bits of every byte
+    # are used
+    bits = np.unpackbits(np.frombuffer(bytes(data_bytes[:-2]),
+                                       dtype=np.uint8)).reshape(-1, 8)
+    values = bits[:, data_bits_per_byte:2*data_bits_per_byte].astype(float)
+    values = values.ravel()
+    ch0_values = values[:len(values)//2]
+    ch1_values = values[len(values)//2:]
+    return ch0_values, ch1_values
+
+
+def calculate_checksum(input_command):
+    '''
+    Input arguments
+        bytes input_command
+
+    Calculates checksum by taking the XOR of all bytes in input_command
+    '''
+    checksum = np.bitwise_xor.reduce(
+        np.frombuffer(input_command, dtype=np.uint8))
+    # Convert int to hexs and set MSbit
+    return bytes([int(checksum) | 128])
@@ -0,0 +1,196 @@
+'''
+Transport layers for the serial communication with the CBox.
+
+The driver only talks to the CBox through a transport, which allows replacing
+the serial port (VisaTransport) by an in memory device (FakeCBoxTransport),
+e.g. to test and benchmark the driver without hardware.
+
+Messages are read in blocks of all bytes that are available, the end of a
+message is found by searching the block for the EndOfMessageHeader. This is
+unambiguous because all other bytes of the protocol have the MSB set
+(see codec_numpy.encode_byte).
+'''
+import time
+import logging
+import visa
+from . import defHeaders
+from . import codec_numpy as c
+
+EOM = defHeaders.EndOfMessageHeader
+
+
+class CBoxTransport:
+    '''
+    Base class of the transports, subclasses implement _bytes_in_buffer,
+    _read, write and _clear.
+    Bytes that are read after the end of a message are kept for the next
+    message.
+    '''
+    # time to wait before polling again if no bytes are available
+    poll_interval = 0.0001
+    # maximum number of bytes read at once, None reads all available bytes
+    max_block_size = None
+
+    def __init__(self):
+        self._pending = bytearray()
+
+    def bytes_in_buffer(self):
+        return len(self._pending) + self._bytes_in_buffer()
+
+    def read(self, size):
+        '''
+        Reads (at most) size bytes, starting with the pending bytes.
+        '''
+        if self._pending:
+            data = bytes(self._pending[:size])
+            del self._pending[:size]
+            return data
+        return self._read(size)
+
+    def read_message(self, timeout=5):
+        '''
+        Reads until the EndOfMessageHeader is received.
+
+        returns the message as bytes (including the EndOfMessageHeader).
+        '''
+        t_start = time.time()
+        message = self._pending
+        self._pending = bytearray()
+        # bytes before scanned are known not to contain the EOM
+        scanned = 0
+        while True:
+            end = message.find(EOM, scanned)
+            if end != -1:
+                self._pending = message[end+1:]
+                return bytes(message[:end+1])
+            scanned = len(message)
+            in_wait = self._bytes_in_buffer()
+            if in_wait > 0:
+                if self.max_block_size is not None:
+                    in_wait = min(in_wait, self.max_block_size)
+                message += self._read(in_wait)
+            else:
+                if (time.time() - t_start) > timeout:
+                    self._pending = message
+                    raise Exception('Read timed out without EndOfMessage')
+                time.sleep(self.poll_interval)
+
+    def clear(self):
+        '''
+        Discards all bytes that were received.
+        '''
+        self._pending = bytearray()
+        self._clear()
+
+    def _bytes_in_buffer(self):
+        raise NotImplementedError()
+
+    def _read(self, size):
+        raise NotImplementedError()
+
+    def write(self, data):
+        raise NotImplementedError()
+
+    def _clear(self):
+        raise NotImplementedError()
+
+
+class VisaTransport(CBoxTransport):
+    '''
+    Transport over the (serial) visa resource of the driver.
+    '''
+
+    def __init__(self, visa_handle):
+        super().__init__()
+        self.visa_handle = visa_handle
+
+    def _bytes_in_buffer(self):
+        return self.visa_handle.bytes_in_buffer
+
+    def _read(self, size):
+        # this is to catch the timeout error that can occur due to the latency
+        # of 1ms in the serial emulator of windows.
+        for i in range(2):
+            try:
+                with(self.visa_handle.ignore_warning(
+                        visa.constants.VI_SUCCESS_MAX_CNT)):
+                    mes = self.visa_handle.visalib.read(
+                        self.visa_handle.session, size)
+                    break
+            except visa.VisaIOError as e:
+                logging.warning(e)
+        else:
+            raise Exception('Reading from the CBox failed')
+        return mes[0]
+
+    def write(self, data):
+        self.visa_handle.write_raw(data)
+
+    def _clear(self):
+        self.visa_handle.clear()
+
+
+class FakeCBoxTransport(CBoxTransport):
+    '''
+    In memory CBox that answers commands with protocol correct messages.
+
+    Every command is acknowledged with [checksum, EOM]. If a response is
+    registered for the header of the command, the response data is sent
+    after the acknowledgement as [data, checksum, EOM].
+    An empty response ([checksum, EOM]) is what the CBox sends if a
+    measurement has not finished.
+
+    Responses are registered with set_response, all commands that are
+    received are stored in self.commands.
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self._out_buffer = bytearray()
+        self._responses = {}
+        self.commands = []
+        # firmware version 2.15.0
+        self.set_response(defHeaders.ReadVersion, data=bytes([130, 143, 128]))
+
+    def set_response(self, header, values=None, data_bits_per_byte=7,
+                     bytes_per_value=4, data=None):
+        '''
+        Registers the response to commands starting with header.
+
+        Input arguments:
+            bytes    header         : header of the command, e.g.
+                                      defHeaders.ReadIntAverageResults
+            int*     values         : the values that are returned, encoded
+                                      using data_bits_per_byte and
+                                      bytes_per_value
+            bytes    data           : the encoded data that is returned
+                                      (alternative to values)
+        data can also be a function that returns the encoded data given the
+        command, e.g. to return an empty message the first time.
+        '''
+        if values is not None:
+            data = c.encode_array(values, data_bits_per_byte,
+                                  bytes_per_value)
+        self._responses[bytes(header)] = data
+
+    def write(self, data):
+        self.commands.append(bytes(data))
+        reply = c.create_message(data_bytes=c.calculate_checksum(data))
+        response = self._responses.get(bytes(data[:1]))
+        if callable(response):
+            response = response(data)
+        if response is not None:
+            reply += c.create_message(
+                data_bytes=response + c.calculate_checksum(response))
+        self._out_buffer += reply
+
+    def _bytes_in_buffer(self):
+        return len(self._out_buffer)
+
+    def _read(self, size):
+        data = bytes(self._out_buffer[:size])
+        del self._out_buffer[:size]
+        return data
+
+    def _clear(self):
+        self._out_buffer = bytearray()
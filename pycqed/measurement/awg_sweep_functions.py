@@ -7,6 +7,7 @@ from pycqed.measurement.pulse_sequences import single_qubit_tek_seq_elts as sqs
 from pycqed.measurement.pulse_sequences import single_qubit_2nd_exc_seqs as sqs2
 from pycqed.measurement.pulse_sequences import fluxing_sequences as fsqs
 from pycqed.measurement.pulse_sequences import multi_qubit_tek_seq_elts as mq_sqs
+from pycqed.measurement.waveform_control.sequence_cache import upload_sequence
 import time
 
 
@@ -63,7 +64,7 @@ class awg_seq_swf(swf.Hard_Sweep):
                 old_vals[i] = self.AWG.get('{}_amp'.format(ch))
                 self.AWG.set('{}_amp'.format(ch), 2)
 
-            self.awg_seq_func(**self.awg_seq_func_kwargs)
+            upload_sequence(self.awg_seq_func, **self.awg_seq_func_kwargs)
 
             for i, ch in enumerate(self.fluxing_channels):
                 self.AWG.set('{}_amp'.format(ch), old_vals[i])
@@ -88,10 +89,10 @@ class Rabi(swf.Hard_Sweep):
 
     def prepare(self, **kw):
         if self.upload:
-            sqs.Rabi_seq(amps=self.sweep_points,
-                         pulse_pars=self.pulse_pars,
-                         RO_pars=self.RO_pars,
-                         n=self.n, return_seq=self.return_seq)
+            upload_sequence(sqs.Rabi_seq, amps=self.sweep_points,
+                            pulse_pars=self.pulse_pars,
+                            RO_pars=self.RO_pars,
+                            n=self.n, return_seq=self.return_seq)
 
 
 class two_qubit_tomo_cardinal(swf.Hard_Sweep):
@@ -864,9 +865,9 @@ class T1(swf.Hard_Sweep):
 
     def prepare(self, **kw):
         if self.upload:
-            sqs.T1_seq(times=self.sweep_points,
-                       pulse_pars=self.pulse_pars,
-                       RO_pars=self.RO_pars)
+            upload_sequence(sqs.T1_seq, times=self.sweep_points,
+                            pulse_pars=self.pulse_pars,
+                            RO_pars=self.RO_pars)
 
 
 class AllXY(swf.Hard_Sweep):
@@ -888,9 +889,9 @@ class AllXY(swf.Hard_Sweep):
 
     def prepare(self, **kw):
         if self.upload:
-            sqs.AllXY_seq(pulse_pars=self.pulse_pars,
-                          RO_pars=self.RO_pars,
-                          double_points=self.double_points)
+            upload_sequence(sqs.AllXY_seq, pulse_pars=self.pulse_pars,
+                            RO_pars=self.RO_pars,
+                            double_points=self.double_points)
 
 
 class OffOn(swf.Hard_Sweep):
@@ -997,11 +998,11 @@ class Ramsey(swf.Hard_Sweep):
 
     def prepare(self, **kw):
         if self.upload:
-            sqs.Ramsey_seq(times=self.sweep_points,
-                           pulse_pars=self.pulse_pars,
-                           RO_pars=self.RO_pars,
-                           artificial_detuning=self.artificial_detuning,
-                           cal_points=self.cal_points)
+            upload_sequence(sqs.Ramsey_seq, times=self.sweep_points,
+                            pulse_pars=self.pulse_pars,
+                            RO_pars=self.RO_pars,
+                            artificial_detuning=self.artificial_detuning,
+                            cal_points=self.cal_points)
 
 
 class Echo(swf.Hard_Sweep):
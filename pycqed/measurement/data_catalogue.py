@@ -0,0 +1,464 @@
+"""
+Module containing the MeasurementCatalogue, an index of the measurements
+in a data directory.
+
+The data directory contains a folder per day (YYYYmmdd) that contains a
+folder per measurement (HHMMSS_label). Looking up data by walking these
+folders becomes slow for data directories that contain years of data
+(especially on a network share). The catalogue stores the timestamp, label,
+path and the sweep and value names of every measurement in an SQLite file
+in the data directory such that lookups are a single query.
+
+The catalogue is updated when a data file is created (see
+hdf5_data.Data) and synchronized with the most recent day folders before
+every lookup, such that measurements created by other means are found as
+well. Use rebuild or verify (also available from the command line) to
+bring it up to date after modifying older data by hand:
+
+    python -m pycqed.measurement.data_catalogue verify <datadir> --fix
+"""
+import os
+import json
+import logging
+import sqlite3
+import argparse
+
+import h5py
+
+CATALOGUE_FILENAME = '.measurement_catalogue.sqlite'
+CATALOGUE_VERSION = '1'
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS measurements (
+    folder TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    label TEXT NOT NULL,
+    sweep_parameter_names TEXT,
+    value_names TEXT
+);
+CREATE INDEX IF NOT EXISTS measurements_day_name
+    ON measurements (day, name);
+CREATE INDEX IF NOT EXISTS measurements_timestamp
+    ON measurements (timestamp);
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+def is_day_folder(name):
+    '''
+    Returns True if name is a day folder (YYYYmmdd).
+    '''
+    return len(name) == 8 and name.isdigit()
+
+
+def is_measurement_folder(name):
+    '''
+    Returns True if name is a measurement folder (HHMMSS or HHMMSS_label).
+    '''
+    return len(name) >= 6 and name[:6].isdigit()
+
+
+def split_measurement_folder(folder):
+    '''
+    Splits the path of a measurement folder into the data directory,
+    the day folder and the measurement folder name.
+    Returns None if the folder does not follow the naming convention.
+    '''
+    folder = os.path.abspath(folder)
+    day_path, name = os.path.split(folder)
+    datadir, day = os.path.split(day_path)
+    if not (is_day_folder(day) and is_measurement_folder(name)):
+        return None
+    return datadir, day, name
+
+
+def _list_dirs(path):
+    # Entries are not stat-ed to check that they are folders as this is slow
+    # on network shares, the naming convention is assumed to be sufficient.
+    try:
+        return os.listdir(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def read_names(filepath):
+    '''
+    Returns the sweep parameter names and value names stored in the
+    "Experimental Data" group of a data file.
+    '''
+    with h5py.File(filepath, 'r') as data_file:
+        return _read_names_from_file(data_file)
+
+
+def _read_names_from_file(data_file):
+    if 'Experimental Data' not in data_file:
+        return None, None
+    attrs = data_file['Experimental Data'].attrs
+    names = []
+    for key in ['sweep_parameter_names', 'value_names']:
+        if key in attrs:
+            names.append([n.decode('utf-8') if isinstance(n, bytes) else n
+                          for n in attrs[key]])
+        else:
+            names.append(None)
+    return tuple(names)
+
+
+class MeasurementCatalogue(object):
+
+    '''
+    Index of the measurements in a data directory.
+
+    Args:
+        datadir (str): the data directory, the catalogue is stored in
+            datadir/.measurement_catalogue.sqlite
+        timeout (float): seconds to wait for a lock on the catalogue when
+            it is being written to by another process.
+
+    All paths in the catalogue are relative to the data directory such that
+    it remains valid when the data directory is moved or mounted elsewhere.
+    '''
+
+    def __init__(self, datadir, timeout=10):
+        self.datadir = os.path.abspath(datadir)
+        self.filepath = os.path.join(self.datadir, CATALOGUE_FILENAME)
+        self.timeout = timeout
+        with self._connect() as conn:
+            conn.executescript(_schema)
+            conn.execute('INSERT OR IGNORE INTO info VALUES (?, ?)',
+                         ('version', CATALOGUE_VERSION))
+
+    def _connect(self):
+        return _Connection(self.filepath, self.timeout)
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT COUNT(*) FROM measurements').fetchone()[0]
+
+    def __repr__(self):
+        return '<MeasurementCatalogue of "{}">'.format(self.datadir)
+
+    ##########################################################################
+    # Updating the catalogue
+    ##########################################################################
+
+    @staticmethod
+    def _row(day, name, sweep_parameter_names=None, value_names=None):
+        return (day + '/' + name, day, name, day + name[:6], name[7:],
+                None if sweep_parameter_names is None
+                else json.dumps(list(sweep_parameter_names)),
+                None if value_names is None
+                else json.dumps(list(value_names)))
+
+    def add(self, day, name, sweep_parameter_names=None, value_names=None):
+        '''
+        Adds (or updates) the measurement in folder datadir/day/name.
+        Names that are None do not overwrite names already in the catalogue.
+        '''
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO measurements VALUES '
+                '(?, ?, ?, ?, ?, ?, ?)', self._row(day, name))
+            if sweep_parameter_names is not None or value_names is not None:
+                row = self._row(day, name, sweep_parameter_names,
+                                value_names)
+                conn.execute(
+                    'UPDATE measurements SET '
+                    'sweep_parameter_names=coalesce(?, sweep_parameter_names),'
+                    ' value_names=coalesce(?, value_names) WHERE folder=?',
+                    (row[5], row[6], row[0]))
+
+    def remove(self, day, name):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM measurements WHERE folder=?',
+                         (day + '/' + name, ))
+
+    def _scan_day(self, conn, day):
+        rows = [self._row(day, name)
+                for name in _list_dirs(os.path.join(self.datadir, day))
+                if is_measurement_folder(name)]
+        conn.executemany('INSERT OR IGNORE INTO measurements VALUES '
+                         '(?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def _get_info(self, conn, key):
+        row = conn.execute('SELECT value FROM info WHERE key=?',
+                           (key, )).fetchone()
+        return None if row is None else row[0]
+
+    def sync(self):
+        '''
+        Adds the measurement folders of the day folders that are newer than
+        (or equal to) the last synchronized day.
+
+        This is a listdir of the data directory and of the most recent
+        day folder(s) and picks up measurements that were not created
+        through hdf5_data.Data.
+        '''
+        days = sorted(d for d in _list_dirs(self.datadir)
+                      if is_day_folder(d))
+        if len(days) == 0:
+            return
+        with self._connect() as conn:
+            last_synced_day = self._get_info(conn, 'last_synced_day') or ''
+            for day in days:
+                if day >= last_synced_day:
+                    self._scan_day(conn, day)
+            if days[-1] != last_synced_day:
+                conn.execute('INSERT OR REPLACE INTO info VALUES (?, ?)',
+                             ('last_synced_day', days[-1]))
+
+    def rebuild(self, names=False):
+        '''
+        Rebuilds the catalogue by walking all day folders.
+
+        Args:
+            names (bool): if True the sweep and value names are read from
+                the data files, this is slow as every file is opened.
+        '''
+        with self._connect() as conn:
+            conn.execute('DELETE FROM measurements')
+            conn.execute("DELETE FROM info WHERE key='last_synced_day'")
+        self.sync()
+        if names:
+            self.update_names()
+
+    def update_names(self, only_missing=True):
+        '''
+        Reads the sweep and value names from the data files.
+        '''
+        query = 'SELECT day, name FROM measurements'
+        if only_missing:
+            query += ' WHERE value_names IS NULL'
+        with self._connect() as conn:
+            folders = conn.execute(query).fetchall()
+        for day, name in folders:
+            filepath = os.path.join(self.datadir, day, name, name + '.hdf5')
+            try:
+                sweep_parameter_names, value_names = read_names(filepath)
+            except OSError:
+                continue
+            self.add(day, name, sweep_parameter_names, value_names)
+
+    def verify(self, fix=False):
+        '''
+        Compares the catalogue with the folders on disk.
+
+        Returns:
+            missing (list): folders on disk that are not in the catalogue
+            stale (list): folders in the catalogue that are not on disk
+        If fix is True, the catalogue is updated accordingly.
+        '''
+        on_disk = set()
+        for day in _list_dirs(self.datadir):
+            if is_day_folder(day):
+                on_disk.update(
+                    day + '/' + name
+                    for name in _list_dirs(os.path.join(self.datadir, day))
+                    if is_measurement_folder(name))
+        with self._connect() as conn:
+            in_catalogue = set(f for (f, ) in conn.execute(
+                'SELECT folder FROM measurements'))
+        missing = sorted(on_disk - in_catalogue)
+        stale = sorted(in_catalogue - on_disk)
+        if fix:
+            with self._connect() as conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO measurements VALUES '
+                    '(?, ?, ?, ?, ?, ?, ?)',
+                    [self._row(*f.split('/')) for f in missing])
+                conn.executemany('DELETE FROM measurements WHERE folder=?',
+                                 [(f, ) for f in stale])
+        return missing, stale
+
+    ##########################################################################
+    # Lookups
+    ##########################################################################
+
+    def find(self, contains='', older_than=None, newer_than=None,
+             or_equal=False, day=None, timemark=None, limit=None,
+             ascending=False):
+        '''
+        Returns the (day, name) of the measurements with contains in their
+        folder name ordered by day and folder name (newest first unless
+        ascending is True).
+
+        Args:
+            contains (str or list): string(s) that must be in the name.
+            older_than, newer_than (str): timestamps (YYYYmmddHHMMSS).
+            or_equal (bool): include measurements with a timestamp equal to
+                older_than or newer_than.
+            day (str): only return measurements of this day (YYYYmmdd).
+            timemark (str): only return measurements with this time (HHMMSS).
+            limit (int): maximum number of results.
+
+        Folders that no longer exist are removed from the catalogue and are
+        not returned.
+        '''
+        query = 'SELECT day, name FROM measurements WHERE 1'
+        args = []
+        if isinstance(contains, str):
+            contains = [contains]
+        for c in contains:
+            if c:
+                query += ' AND instr(name, ?) > 0'
+                args.append(c)
+        ineq = '=' if or_equal else ''
+        if older_than is not None:
+            query += ' AND timestamp <{} ?'.format(ineq)
+            args.append(older_than)
+        if newer_than is not None:
+            query += ' AND timestamp >{} ?'.format(ineq)
+            args.append(newer_than)
+        if day is not None:
+            query += ' AND day = ?'
+            args.append(day)
+        if timemark is not None:
+            query += ' AND substr(name, 1, 6) = ?'
+            args.append(timemark)
+        order = 'ASC' if ascending else 'DESC'
+        query += ' ORDER BY day {0}, name {0}'.format(order)
+
+        results = []
+        while True:
+            batch_query = query
+            if limit is not None:
+                # Removed folders are deleted from the table, the offset is
+                # therefore the number of folders that were kept.
+                batch_query += ' LIMIT {} OFFSET {}'.format(
+                    limit - len(results), len(results))
+            with self._connect() as conn:
+                rows = conn.execute(batch_query, args).fetchall()
+            for day_, name in rows:
+                if os.path.isdir(os.path.join(self.datadir, day_, name)):
+                    results.append((day_, name))
+                else:
+                    self.remove(day_, name)
+            if limit is None or len(results) >= limit or len(rows) == 0:
+                return results
+
+    def get_names(self, day, name):
+        '''
+        Returns the sweep parameter names and value names of a measurement
+        (None if not known).
+        '''
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT sweep_parameter_names, value_names FROM measurements '
+                'WHERE folder=?', (day + '/' + name, )).fetchone()
+        if row is None:
+            return None, None
+        return tuple(None if r is None else json.loads(r) for r in row)
+
+
+class _Connection(object):
+
+    '''
+    Context manager that opens an sqlite connection, commits (or rolls
+    back) the transaction and closes the connection on exit.
+    A connection is opened per operation such that the catalogue can be used
+    from multiple threads and processes.
+    '''
+
+    def __init__(self, filepath, timeout):
+        self.conn = sqlite3.connect(filepath, timeout=timeout)
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.conn.close()
+
+
+_catalogues = {}
+
+
+def get_catalogue(datadir):
+    '''
+    Returns the synchronized MeasurementCatalogue of the datadir or None if
+    the catalogue can not be used (e.g. the datadir is not writable).
+    '''
+    datadir = os.path.abspath(datadir)
+    try:
+        if datadir not in _catalogues:
+            if not os.path.isdir(datadir):
+                return None
+            _catalogues[datadir] = MeasurementCatalogue(datadir)
+        catalogue = _catalogues[datadir]
+        catalogue.sync()
+        return catalogue
+    except (sqlite3.Error, OSError) as e:
+        logging.warning('Measurement catalogue of "{}" can not be used: {}'
+                        .format(datadir, e))
+        _catalogues.pop(datadir, None)
+        return None
+
+
+def register_measurement(folder, sweep_parameter_names=None,
+                         value_names=None):
+    '''
+    Adds the measurement folder to the catalogue of its data directory.
+    Failures are logged and do not raise, the catalogue is only an index.
+
+    Only existing catalogues are updated, writing data does not create a
+    catalogue in every directory data is written to (see get_catalogue).
+    '''
+    split = split_measurement_folder(folder)
+    if split is None:
+        return
+    datadir, day, name = split
+    if not os.path.isfile(os.path.join(datadir, CATALOGUE_FILENAME)):
+        return
+    try:
+        if datadir not in _catalogues:
+            _catalogues[datadir] = MeasurementCatalogue(datadir)
+        _catalogues[datadir].add(day, name, sweep_parameter_names,
+                                 value_names)
+    except (sqlite3.Error, OSError) as e:
+        logging.warning('Could not add "{}" to the measurement catalogue: {}'
+                        .format(folder, e))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Rebuild or verify the measurement catalogue of a '
+        'data directory.')
+    parser.add_argument('command', choices=['rebuild', 'verify'])
+    parser.add_argument('datadir')
+    parser.add_argument('--names', action='store_true',
+                        help='read the sweep and value names from the data '
+                        'files (rebuild only)')
+    parser.add_argument('--fix', action='store_true',
+                        help='update the catalogue (verify only)')
+    args = parser.parse_args(argv)
+
+    catalogue = MeasurementCatalogue(args.datadir)
+    if args.command == 'rebuild':
+        catalogue.rebuild(names=args.names)
+        print('Catalogue of "{}" contains {} measurements'.format(
+            args.datadir, len(catalogue)))
+    else:
+        missing, stale = catalogue.verify(fix=args.fix)
+        for folder in missing:
+            print('missing: {}'.format(folder))
+        for folder in stale:
+            print('stale: {}'.format(folder))
+        print('{} missing and {} stale measurements{}'.format(
+            len(missing), len(stale), ' fixed' if args.fix else ''))
+        return 0 if args.fix or not (missing or stale) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,202 @@
+"""
+Module containing the DataWriter used by the MeasurementControl to store
+the "Experimental Data/Data" dataset.
+
+The writer preallocates the dataset, keeps the (soft averaged) data in an
+in-memory numpy array and only writes the rows that changed to disk every
+"flush_interval" writes. This avoids resizing the dataset and reading back
+old values from disk for every iteration of a measurement.
+Single datapoints (soft sweeps) can be buffered such that they are averaged
+and written as a single block.
+The layout of the data on disk ("Version 2") is not changed by the writer.
+"""
+import numpy as np
+
+
+def get_chunk_shape(nr_rows, nr_cols, chunk_bytes=2**18, itemsize=4):
+    '''
+    Returns a chunk shape for a dataset with nr_rows x nr_cols entries.
+
+    Chunks always span all columns such that a datapoint (row) is written to
+    a single chunk. The number of rows is chosen such that a chunk is
+    approximately chunk_bytes large, but never larger than nr_rows
+    (if nr_rows is known, i.e. larger than 0).
+    '''
+    nr_cols = max(int(nr_cols), 1)
+    rows = max(int(chunk_bytes // (itemsize*nr_cols)), 1)
+    if nr_rows > 0:
+        rows = min(rows, int(nr_rows))
+    return (rows, nr_cols)
+
+
+class DataWriter(object):
+
+    '''
+    Buffers data in memory and writes it to an hdf5 dataset in batches.
+
+    Args:
+        dset (h5py.Dataset): resizable 2D dataset to write to, the first
+            nr_sweep_cols columns contain the sweep points, the other
+            columns contain the measured values.
+        nr_sweep_cols (int): number of sweep point columns.
+        flush_interval (int): number of writes after which the modified
+            rows are written to disk.
+        buffer_size (int): number of single datapoints that are buffered
+            (see buffer_point) before they are written.
+    '''
+
+    def __init__(self, dset, nr_sweep_cols, flush_interval=1, buffer_size=1):
+        self.dset = dset
+        self.nr_sweep_cols = nr_sweep_cols
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+
+        # In memory copy of the dataset, averaging is done in double precision
+        # The copy can contain more rows than the dataset to allow growing
+        # it without reallocating for every write.
+        self.data = np.zeros(dset.shape, dtype=np.float64)
+        # Highest row index that contains data (the "acquired" points)
+        self.nr_acquired = 0
+        self.nr_writes = 0
+        self.nr_flushes = 0
+        self._dirty_start = None
+        self._dirty_stop = None
+
+        self._buffer = np.zeros((buffer_size, dset.shape[1]))
+        self._buffer_start = 0
+        self._buffer_len = 0
+        self._buffer_soft_iteration = 0
+
+    def preallocate(self, nr_rows):
+        '''
+        Allocates nr_rows rows both in memory and on disk.
+        Rows that are not written to are removed again when closing.
+        '''
+        if nr_rows > self.dset.shape[0]:
+            self._resize(nr_rows, nr_rows)
+
+    def _resize(self, nr_rows, min_nr_rows):
+        '''
+        Grows the dataset to nr_rows and the in memory data to at least
+        nr_rows. If the in memory data has to be reallocated it is grown to
+        at least min_nr_rows.
+        '''
+        if nr_rows > self.data.shape[0]:
+            new_data = np.zeros((max(nr_rows, min_nr_rows),
+                                 self.data.shape[1]), dtype=np.float64)
+            new_data[:self.data.shape[0]] = self.data
+            self.data = new_data
+        self.dset.resize((nr_rows, self.dset.shape[1]))
+
+    def write(self, start_idx, values, sweep_points=None, soft_iteration=0):
+        '''
+        Writes values to the rows starting at start_idx.
+
+        Args:
+            start_idx (int): first row to write to.
+            values (array): measured values of shape (n, ) or
+                (n, nr_value_cols).
+            sweep_points (array): optional, sweep points of shape (n, ) or
+                (n, nr_sweep_cols) that are written to the sweep point
+                columns.
+            soft_iteration (int): the new values are averaged with the old
+                values as if soft_iteration values were averaged before.
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values.reshape(-1, 1)
+        stop_idx = start_idx + values.shape[0]
+        if stop_idx > self.dset.shape[0]:
+            # Grows the in memory data geometrically to avoid copying all
+            # data for every write when the size is not known in advance.
+            self._resize(stop_idx, 2*self.data.shape[0])
+
+        cols = slice(self.nr_sweep_cols, self.nr_sweep_cols+values.shape[1])
+        if soft_iteration == 0:
+            self.data[start_idx:stop_idx, cols] = values
+        else:
+            old_vals = self.data[start_idx:stop_idx, cols]
+            self.data[start_idx:stop_idx, cols] = (
+                (values + old_vals*soft_iteration)/(1+soft_iteration))
+
+        if sweep_points is not None:
+            self.data[start_idx:stop_idx, :self.nr_sweep_cols] = np.reshape(
+                sweep_points, (values.shape[0], self.nr_sweep_cols))
+
+        self._mark_dirty(start_idx, stop_idx)
+        self.nr_acquired = max(self.nr_acquired, stop_idx)
+        self.nr_writes += 1
+        if self.nr_writes % self.flush_interval == 0:
+            self.flush()
+        return start_idx, stop_idx
+
+    def buffer_point(self, idx, datapoint, soft_iteration=0):
+        '''
+        Buffers a single datapoint (sweep points followed by values) that
+        belongs in row idx.
+
+        Consecutive datapoints are collected and averaged and written in a
+        single vectorized write when the buffer is full, when a datapoint
+        is not consecutive or when the data is requested.
+        '''
+        if self._buffer_len > 0 and (
+                idx != self._buffer_start + self._buffer_len or
+                soft_iteration != self._buffer_soft_iteration):
+            self.write_buffer()
+        if self._buffer_len == 0:
+            self._buffer_start = idx
+            self._buffer_soft_iteration = soft_iteration
+        self._buffer[self._buffer_len] = datapoint
+        self._buffer_len += 1
+        if self._buffer_len == self.buffer_size:
+            self.write_buffer()
+
+    def write_buffer(self):
+        '''
+        Writes the buffered datapoints to the in memory data.
+        '''
+        if self._buffer_len == 0:
+            return
+        buffered = self._buffer[:self._buffer_len]
+        self._buffer_len = 0
+        self.write(self._buffer_start, buffered[:, self.nr_sweep_cols:],
+                   sweep_points=buffered[:, :self.nr_sweep_cols],
+                   soft_iteration=self._buffer_soft_iteration)
+
+    def _mark_dirty(self, start_idx, stop_idx):
+        if self._dirty_start is None:
+            self._dirty_start, self._dirty_stop = start_idx, stop_idx
+        else:
+            self._dirty_start = min(self._dirty_start, start_idx)
+            self._dirty_stop = max(self._dirty_stop, stop_idx)
+
+    def flush(self):
+        '''
+        Writes all rows that were modified since the last flush to disk.
+        '''
+        self.write_buffer()
+        if self._dirty_start is None:
+            return
+        self.dset[self._dirty_start:self._dirty_stop] = \
+            self.data[self._dirty_start:self._dirty_stop]
+        self._dirty_start = None
+        self._dirty_stop = None
+        self.nr_flushes += 1
+
+    def get_data(self):
+        '''
+        Returns a view of the acquired data (without preallocated rows).
+        '''
+        self.write_buffer()
+        return self.data[:self.nr_acquired]
+
+    def close(self):
+        '''
+        Flushes the data and removes preallocated rows that were never
+        written to such that the dataset has the same shape as if it was
+        grown point by point.
+        '''
+        self.flush()
+        if self.dset.shape[0] > self.nr_acquired:
+            self.dset.resize((self.nr_acquired, self.dset.shape[1]))
+        self.data = self.data[:self.nr_acquired]
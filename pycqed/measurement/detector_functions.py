@@ -1248,7 +1248,7 @@ class UHFQC_input_average_detector(Hard_Detector):
             time.sleep(0.01)
         data = ['']*len(self.channels)
         for i, channel in enumerate(self.channels):
-            dataset = eval("self.UHFQC.quex_iavg_data_{}()".format(channel))
+            dataset = getattr(self.UHFQC, 'quex_iavg_data_{}'.format(channel))()
             data[i] = dataset[0]['vector']
 
         return data
@@ -1256,13 +1256,15 @@ class UHFQC_input_average_detector(Hard_Detector):
     def prepare(self, sweep_points):
         if self.AWG is not None:
             self.AWG.stop()
-        self.UHFQC.quex_iavg_length(self.nr_samples)
-        self.UHFQC.quex_iavg_avgcnt(int(np.log2(self.nr_averages)))
-        self.UHFQC.awgs_0_userregs_1(1)  # 0 for rl, 1 for iavg
-        self.UHFQC.awgs_0_userregs_0(
-            int(self.nr_averages))  # 0 for rl, 1 for iavg
-        self.nr_sweep_points = self.nr_samples
-        self.UHFQC.awgs_0_single(1)
+        # the settings are sent to the UHFQC in a single transaction
+        with self.UHFQC.batch():
+            self.UHFQC.quex_iavg_length(self.nr_samples)
+            self.UHFQC.quex_iavg_avgcnt(int(np.log2(self.nr_averages)))
+            self.UHFQC.awgs_0_userregs_1(1)  # 0 for rl, 1 for iavg
+            self.UHFQC.awgs_0_userregs_0(
+                int(self.nr_averages))  # 0 for rl, 1 for iavg
+            self.nr_sweep_points = self.nr_samples
+            self.UHFQC.awgs_0_single(1)
 
     def finish(self):
         if self.AWG is not None:
@@ -1317,10 +1319,10 @@ class UHFQC_integrated_average_detector(Hard_Detector):
         data = ['']*len(self.channels)
         for i, channel in enumerate(self.channels):
             # FIXME: better to use dataset = self.UHFQC.get('quex_rl_data_{}'.format(channel))
-            dataset = eval("self.UHFQC.quex_rl_data_{}()".format(channel))
+            dataset = getattr(self.UHFQC, 'quex_rl_data_{}'.format(channel))()
             data[i] = dataset[0]['vector']/self.nr_averages
             if self.cross_talk_suppression:
-                data[i]=data[i]-eval("self.UHFQC.quex_trans_offset_weightfunction_{}()".format(channel))
+                data[i]=data[i]-getattr(self.UHFQC, 'quex_trans_offset_weightfunction_{}'.format(channel))()
 
         # data = self.UHFQC.single_acquisition(self.nr_sweep_points,
         #                                      self.poll_time, timeout=0,
@@ -1360,23 +1362,25 @@ class UHFQC_integrated_average_detector(Hard_Detector):
             self.nr_sweep_points = 1
         else:
             self.nr_sweep_points = len(sweep_points)
-        # this sets the result to integration and rotation outcome
-        if self.cross_talk_suppression:
-            # 2/0/1 raw/crosstalk supressed /digitized
-            self.UHFQC.quex_rl_source(0)
-        else:
-            # 2/0/1 raw/crosstalk supressed /digitized
-            self.UHFQC.quex_rl_source(2)
-        self.UHFQC.quex_rl_length(self.nr_sweep_points)
-        self.UHFQC.quex_rl_avgcnt(int(np.log2(self.nr_averages)))
-        self.UHFQC.quex_wint_length(int(self.integration_length*(1.8e9)))
-        # Configure the result logger to not do any averaging
-        # The AWG program uses userregs/0 to define the number o iterations in
-        # the loop
-        self.UHFQC.awgs_0_userregs_0(
-            int(self.nr_averages*self.nr_sweep_points))
-        self.UHFQC.awgs_0_userregs_1(0)  # 0 for rl, 1 for iavg
-        self.UHFQC.awgs_0_single(1)
+        # the settings are sent to the UHFQC in a single transaction
+        with self.UHFQC.batch():
+            # this sets the result to integration and rotation outcome
+            if self.cross_talk_suppression:
+                # 2/0/1 raw/crosstalk supressed /digitized
+                self.UHFQC.quex_rl_source(0)
+            else:
+                # 2/0/1 raw/crosstalk supressed /digitized
+                self.UHFQC.quex_rl_source(2)
+            self.UHFQC.quex_rl_length(self.nr_sweep_points)
+            self.UHFQC.quex_rl_avgcnt(int(np.log2(self.nr_averages)))
+            self.UHFQC.quex_wint_length(int(self.integration_length*(1.8e9)))
+            # Configure the result logger to not do any averaging
+            # The AWG program uses userregs/0 to define the number o
+            # iterations in the loop
+            self.UHFQC.awgs_0_userregs_0(
+                int(self.nr_averages*self.nr_sweep_points))
+            self.UHFQC.awgs_0_userregs_1(0)  # 0 for rl, 1 for iavg
+            self.UHFQC.awgs_0_single(1)
 
     def finish(self):
         if self.AWG is not None:
@@ -1427,10 +1431,10 @@ class UHFQC_integration_logging_det(Hard_Detector):
 
         data = ['']*len(self.channels)
         for i, channel in enumerate(self.channels):
-            dataset = eval("self.UHFQC.quex_rl_data_{}()".format(channel))
+            dataset = getattr(self.UHFQC, 'quex_rl_data_{}'.format(channel))()
             data[i] = dataset[0]['vector']
             if self.cross_talk_suppression:
-                data[i]=data[i]-eval("self.UHFQC.quex_trans_offset_weightfunction_{}()".format(channel))
+                data[i]=data[i]-getattr(self.UHFQC, 'quex_trans_offset_weightfunction_{}'.format(channel))()
         return data
 
     def prepare(self, sweep_points):
@@ -1441,19 +1445,21 @@ class UHFQC_integration_logging_det(Hard_Detector):
 
         # The AWG program uses userregs/0 to define the number o iterations in
         # the loop
-        self.UHFQC.awgs_0_single(1)
-        self.UHFQC.awgs_0_userregs_1(0)  # 0 for rl, 1 for iavg
-        self.UHFQC.awgs_0_userregs_0(self.nr_shots)
-        self.UHFQC.quex_rl_length(self.nr_shots)
-        self.UHFQC.quex_rl_avgcnt(0)  # 1 for single shot readout
-        self.UHFQC.quex_wint_length(int(self.integration_length*(1.8e9)))
-        # this sets the result to integration and rotation outcome
-        if self.cross_talk_suppression:
-            # 0/1/2 crosstalk supressed /digitized/raw
-            self.UHFQC.quex_rl_source(0)
-        else:
-            # 0/1/2 crosstalk supressed /digitized/raw
-            self.UHFQC.quex_rl_source(2)
+        # the settings are sent to the UHFQC in a single transaction
+        with self.UHFQC.batch():
+            self.UHFQC.awgs_0_single(1)
+            self.UHFQC.awgs_0_userregs_1(0)  # 0 for rl, 1 for iavg
+            self.UHFQC.awgs_0_userregs_0(self.nr_shots)
+            self.UHFQC.quex_rl_length(self.nr_shots)
+            self.UHFQC.quex_rl_avgcnt(0)  # 1 for single shot readout
+            self.UHFQC.quex_wint_length(int(self.integration_length*(1.8e9)))
+            # this sets the result to integration and rotation outcome
+            if self.cross_talk_suppression:
+                # 0/1/2 crosstalk supressed /digitized/raw
+                self.UHFQC.quex_rl_source(0)
+            else:
+                # 0/1/2 crosstalk supressed /digitized/raw
+                self.UHFQC.quex_rl_source(2)
 
     def finish(self):
         if self.AWG is not None:
@@ -16,6 +16,8 @@ import time
 import h5py
 import numpy as np
 import pycqed as pq
+from pycqed.measurement import data_catalogue
+from collections import OrderedDict as od
 from uuid import getnode as get_mac
 
 
@@ -143,6 +145,93 @@ class Data(h5py.File):
             os.makedirs(self.folder)
         super(Data, self).__init__(self.filepath, 'a')
         self.flush()
+        data_catalogue.register_measurement(self.folder)
+
+    def close(self):
+        '''
+        Closes the file and stores the sweep and value names in the
+        measurement catalogue of the data directory.
+        '''
+        if self.id.valid and self.mode != 'r':
+            try:
+                names = data_catalogue._read_names_from_file(self)
+            except Exception as e:
+                logging.warning('Could not read names of "{}": {}'.format(
+                    self.filepath, e))
+                names = (None, None)
+            if names != (None, None):
+                data_catalogue.register_measurement(self.folder, *names)
+        super(Data, self).close()
+
+
+def write_instrument_settings(data_object, settings, instrument_names=None):
+    '''
+    Writes instrument settings to the "Instrument settings" group as a single
+    table (dataset "settings") with columns instrument, parameter and value.
+    This is a lot faster than writing an attribute per parameter.
+
+    Args:
+        data_object (h5py.File): file to write to.
+        settings (list): list of (instrument, parameter, value) string tuples.
+        instrument_names (list): names of all instruments, including the
+            ones without parameters.
+
+    Use read_instrument_settings to read the settings back.
+    '''
+    set_grp = data_object.create_group('Instrument settings')
+    set_grp.attrs['settings_format'] = encode_to_utf8('Version 2')
+    if instrument_names is None:
+        instrument_names = list(od.fromkeys(ins for ins, _, _ in settings))
+    set_grp.attrs['instrument_names'] = encode_to_utf8(list(instrument_names))
+    table = np.array(settings, dtype=object).reshape(-1, 3)
+    set_grp.create_dataset('settings', data=table,
+                           dtype=h5py.special_dtype(vlen=str))
+    return set_grp
+
+
+class InstrumentSettingsGroup:
+    '''
+    Settings of a single instrument read from a settings table.
+    Mimics an h5py group such that instrument.attrs[parameter] works for
+    both ways of storing the instrument settings.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.attrs = od()
+
+    def __repr__(self):
+        return '<Instrument settings "{}" ({} parameters)>'.format(
+            self.name, len(self.attrs))
+
+
+def _decode(s):
+    return s.decode('utf-8') if isinstance(s, bytes) else s
+
+
+def read_instrument_settings(data_file):
+    '''
+    Returns the instrument settings stored in the data_file.
+
+    Settings stored with one attribute per parameter (the default before
+    settings_format "Version 2") are returned as the h5py group. Settings
+    stored as a table are returned as an ordered dict of
+    InstrumentSettingsGroup objects. In both cases the value of a parameter
+    is accessed as settings[instrument].attrs[parameter].
+    '''
+    set_grp = data_file['Instrument settings']
+    if _decode(set_grp.attrs.get('settings_format', '')) != 'Version 2':
+        return set_grp
+    settings = od()
+    for name in set_grp.attrs['instrument_names']:
+        name = _decode(name)
+        settings[name] = InstrumentSettingsGroup(name)
+    for ins, par, val in set_grp['settings'][()]:
+        ins = _decode(ins)
+        if ins not in settings:
+            settings[ins] = InstrumentSettingsGroup(ins)
+        settings[ins].attrs[_decode(par)] = _decode(val)
+    return settings
 
 
 def encode_to_utf8(s):
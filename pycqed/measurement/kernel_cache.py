@@ -0,0 +1,169 @@
+'''
+Content-addressed on-disk cache of predistortion kernels.
+
+Kernels are stored as binary .npy files named after a hash of everything
+the kernel depends on: the parameter values, the contents of the kernel
+files and the source of the modules that compute the kernel (see
+code_version). A cached kernel is only out of date if the kernel depends on
+code that is not part of its key, in that case clear the cache. The cache
+directory can be shared between processes, files are written atomically and
+the least recently used kernels are removed when the cache is full.
+
+Text kernel files (e.g. room temperature corrections) are parsed only once,
+afterwards the binary copy in the cache is loaded.
+'''
+import os
+import hashlib
+import tempfile
+import numpy as np
+
+default_cache_dir = os.path.join(tempfile.gettempdir(),
+                                 'pycqed_kernel_cache')
+# Maximum number of kernels that are kept in a cache directory
+default_cache_size = 200
+# Part of every key, increment when the way kernels are stored changes
+cache_format_version = 1
+# Hashes of the contents of files, reused as long as the file does not change
+_file_hashes = {}
+
+
+def file_hash(path):
+    '''
+    Returns the sha1 hash of the contents of a file, the hash is only
+    recomputed when the modification time or size of the file changed.
+    '''
+    st = os.stat(path)
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _file_hashes.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    _file_hashes[path] = (version, digest)
+    return digest
+
+
+def code_version(*modules):
+    '''
+    Returns a hash of the source files of the modules, kernels computed by
+    an other version of the code get a different key.
+    '''
+    return cache_key(*[file_hash(module.__file__) for module in modules])
+
+
+def cache_key(*items):
+    '''
+    Returns a key for the cache from (the repr of) the items and the
+    cache_format_version.
+    '''
+    return hashlib.sha1(
+        repr((cache_format_version,) + items).encode()).hexdigest()
+
+
+class KernelCache(object):
+
+    '''
+    Stores kernels (numpy arrays) as .npy files in a directory.
+
+    Args:
+        cache_dir (str): directory of the cache, created if it does not
+            exist.
+        max_size (int): maximum number of kernels, the least recently used
+            kernels are removed when it is exceeded.
+    '''
+
+    def __init__(self, cache_dir=default_cache_dir,
+                 max_size=default_cache_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.npy')
+
+    def get(self, key):
+        '''
+        Returns the kernel stored under key or None if it is not cached.
+        '''
+        path = self._path(key)
+        try:
+            kernel = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        try:
+            # the modification time is used as the last access time
+            os.utime(path)
+        except OSError:
+            pass
+        return kernel
+
+    def put(self, key, kernel):
+        '''
+        Stores the kernel under key.
+        '''
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write to a temporary file first such that other processes never
+        # read a partially written kernel
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.asarray(kernel), allow_pickle=False)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def keys(self):
+        '''
+        Returns the keys of the cached kernels, least recently used first.
+        '''
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return []
+        for name in names:
+            if not name.endswith('.npy'):
+                continue
+            try:
+                mtime = os.stat(os.path.join(self.cache_dir, name)).st_mtime
+            except OSError:
+                continue
+            entries.append((mtime, name[:-4]))
+        return [key for _, key in sorted(entries)]
+
+    def evict(self):
+        '''
+        Removes the least recently used kernels until at most max_size
+        kernels are left.
+        '''
+        keys = self.keys()
+        for key in keys[:max(len(keys) - self.max_size, 0)]:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                # removed by another process
+                pass
+
+    def clear(self):
+        for key in self.keys():
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def load_text_kernel(self, path):
+        '''
+        Returns the kernel stored in text file path (as np.loadtxt), the
+        text is only parsed if the contents of the file are not cached.
+        '''
+        key = 'txt_' + file_hash(path)
+        kernel = self.get(key)
+        if kernel is None:
+            kernel = np.loadtxt(path)
+            self.put(key, kernel)
+        return kernel
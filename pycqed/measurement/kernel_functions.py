@@ -1,6 +1,9 @@
 import logging
 import numpy as np
 from scipy import special
+from scipy import signal
+from scipy import linalg
+from pycqed.measurement.waveform_control import predistortion
 
 
 def heaviside(t):
@@ -15,27 +18,116 @@ def square(t, width=1, t0=0):
 htilde = lambda fun, t, params, width=1: fun(t, params)-fun(t-width, params)
 
 
-filter_matrix_generic = lambda fun, t, *params: np.sum(
-    np.array(map(lambda ii: np.diag(fun(t[ii], *params)*np.ones(len(t)-ii), k=-ii), range(len(t)))), 0)
+# Structured (lower triangular) Toeplitz toolkit
+# A causal filter with impulse response h acts on a waveform of N samples as
+# the N x N lower triangular Toeplitz matrix A[i, j] = h[i-j] (i >= j).
+# Products of these matrices are convolutions of the impulse responses and
+# the inverse is again lower triangular Toeplitz, the first column of the
+# inverse is the precompensating kernel. The functions below work with the
+# first columns only, such that no dense N x N matrices are required.
+
+def lower_toeplitz(c, n=None):
+    """
+    Returns the dense lower triangular Toeplitz matrix with first column
+    c[:n], only use this if the matrix itself is required.
+    """
+    c = np.asarray(c)[:n]
+    return linalg.toeplitz(c, np.zeros(len(c), dtype=c.dtype))
+
+
+def is_lower_toeplitz(A):
+    """
+    Returns True if the square matrix A is lower triangular Toeplitz.
+    """
+    A = np.asarray(A)
+    return (A.ndim == 2 and A.shape[0] == A.shape[1] and
+            not np.any(np.triu(A, 1)) and
+            np.array_equal(A[1:, 1:], A[:-1, :-1]))
+
+
+def convolve_kernels(kernels, length=None):
+    """
+    Returns the first length samples of the convolution of the kernels,
+    the first column of the product of their lower triangular Toeplitz
+    matrices (default length is the length of the longest kernel).
+    """
+    if length is None:
+        length = max(len(k) for k in kernels)
+    out = np.zeros(length)
+    k0 = np.asarray(kernels[0], dtype=float)[:length]
+    out[:len(k0)] = k0
+    for k in kernels[1:]:
+        out = predistortion.convolve_waveforms(out, k)
+    return out
+
+
+def invert_kernel(h, length=None, method=None):
+    """
+    Returns the first length samples of the inverse of kernel h, this is
+    the first column of the inverse of the lower triangular Toeplitz matrix
+    with first column h (default length is len(h)).
+
+    method:
+        'substitution': forward substitution, O(length*len(h)) and exact.
+        'fft': Newton iteration using FFT convolutions, O(length*log(length)).
+        None: picks 'fft' for long kernels.
+    """
+    h = np.asarray(h, dtype=float)
+    if length is None:
+        length = len(h)
+    h = h[:length]
+    if h[0] == 0:
+        raise ValueError('Kernel can not be inverted, h[0] == 0')
+    if method is None:
+        method = 'fft' if min(len(h), length) > 2000 else 'substitution'
+    if method == 'substitution':
+        impulse = np.zeros(length)
+        impulse[0] = 1.
+        return signal.lfilter([1.], h, impulse)
+    elif method == 'fft':
+        # g_2k = g_k*(2 - h*g_k), doubles the number of correct samples
+        g = np.array([1./h[0]])
+        while len(g) < length:
+            n = min(2*len(g), length)
+            g_pad = np.zeros(n)
+            g_pad[:len(g)] = g
+            e = -predistortion.convolve_waveforms(g_pad, h[:n],
+                                                  method='fft')
+            e[0] += 2.
+            g = predistortion.convolve_waveforms(e, g_pad, method='fft')
+        return g
+    else:
+        raise ValueError('Unknown method "{}"'.format(method))
+
+
+def filter_matrix_generic(fun, t, *params):
+    return lower_toeplitz(fun(np.asarray(t), *params))
 
 
 def kernel_generic(fun, t, *params):
-    return np.linalg.inv(filter_matrix_generic(fun, t, *params))[:, 0]
+    return invert_kernel(fun(np.asarray(t), *params))
+
+
+def _is_uniform(t):
+    dt = np.diff(t)
+    return len(dt) == 0 or np.all(dt == dt[0])
 
 
 def kernel_generic2(fun, t, *params):
-    return np.linalg.inv(filter_matrix_generic2(fun, t, *params))[:, 0]
+    t = np.asarray(t)
+    if _is_uniform(t) and len(t) > 0 and t[-1] >= t[0]:
+        # t[i]-t[j] == t[i-j]-t[0], the filter matrix is Toeplitz
+        return invert_kernel(fun(t-t[0], *params))
+    return kernel_from_filter_matrix(filter_matrix_generic2(fun, t, *params))
 
 
 def filter_matrix_generic2(fun, t, *params):
-    A = np.zeros((len(t), len(t)))
-    for i in range(len(t)):
-        for j in range(len(t)):
-            if t[i] < t[j]:
-                A[i, j] = 0.
-            else:
-                A[i, j] = heaviside(i-j)*fun(t[i]-t[j], *params)
-    return A
+    t = np.asarray(t)
+    dt = t[:, None] - t[None, :]
+    idx = np.arange(len(t))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        A = heaviside(idx[:, None]-idx[None, :])*fun(dt, *params)
+    return np.where(dt < 0, 0., A)
 
 
 def save_kernel(kernel, save_file=None):
@@ -55,13 +147,20 @@ def save_kernel(kernel, save_file=None):
 def filter_matrix_from_htilde(htilde, t=None):
     if t is None:
         t = len(htilde)
-    func = lambda ii: np.diag(htilde[ii]*np.ones(t-ii), k=-ii)
-    return np.sum(np.array([func(tt) for tt in range(t)]), 0)
+    return lower_toeplitz(htilde, t)
 
 
 # Inverts "A" matrix describing a filter response to give the inverse
 # precompensating filter.
-kernel_from_filter_matrix = lambda A: np.linalg.inv(A)[:, 0]
+def kernel_from_filter_matrix(A):
+    A = np.asarray(A)
+    if is_lower_toeplitz(A):
+        return invert_kernel(A[:, 0])
+    e0 = np.zeros(len(A))
+    e0[0] = 1.
+    if not np.any(np.triu(A, 1)):
+        return linalg.solve_triangular(A, e0, lower=True)
+    return np.linalg.solve(A, e0)
 
 
 def kernel_from_kernel_step(fun, kernel_length, params_dict, resolution=1):
@@ -293,15 +392,11 @@ def kernel_sampled(file_name, step_width_ns, points_per_ns, step_params=None,
         norm_type=norm_type)
     if max_points is None:
         max_points = len(my_htilde_sampled)
-    my_filter_matrix = filter_matrix_from_htilde(
-        my_htilde_sampled[:max_points])
-    print(my_filter_matrix.shape)
-    my_kernel = kernel_from_filter_matrix(my_filter_matrix)
+    my_kernel = invert_kernel(my_htilde_sampled[:max_points])
 
     if return_step:
-        my_kernel_step = np.dot(
-            np.linalg.inv(my_filter_matrix),
-            np.ones((len(my_filter_matrix), 1))).flatten()
+        # the inverse filter matrix applied to a step
+        my_kernel_step = np.cumsum(my_kernel)
         return my_kernel, my_kernel_step
     else:
         return my_kernel
@@ -432,3 +527,102 @@ def skin_kernel(alpha=0., length=601):
         kernel_skineffect = np.zeros(length)
         kernel_skineffect[0] = 1.
     return kernel_skineffect
+
+
+# IIR representations of the kernels above. A filter is described by the
+# coefficients (b, a) as used by scipy.signal.lfilter, a cascade of filters
+# by a list of (b, a). The impulse response of a filter is identical to the
+# corresponding kernel up to the length of the kernel (the kernels are
+# truncated, the filters are not).
+
+def decay_filter(amp=1., tau=11000):
+    """
+    Returns the IIR filter (b, a) of the decay kernel (see decay_kernel).
+
+    kernel:
+        k[0] = 1 + amp_k, k[t] = amp_k*(r-1)*r**(t-1) with r = exp(-1/tau_k)
+    """
+    if abs(amp) == 0.:
+        return np.array([1.]), np.array([1.])
+    tau_k = (1.-amp)*tau
+    amp_k = amp/(amp-1)
+    r = np.exp(-1./tau_k)
+    k0 = 1 + amp_k
+    return np.array([k0, amp_k*(r-1) - k0*r]), np.array([1., -r])
+
+
+def bounce_filter(amp=0.02, time=4, length=None):
+    """
+    Returns the IIR filter (b, a) of the bounce kernel (see bounce_kernel),
+    the inverse of the bounce response 1 - amp*z**-T.
+
+    The kernel is normalized to a sum of 1, if length is specified the
+    normalization of the kernel of that length is used.
+    """
+    if abs(amp) == 0.:
+        return np.array([1.]), np.array([1.])
+    a = htilde_bounce_vec(amp, time)
+    if length is None:
+        norm = np.sum(a)
+    else:
+        # the step response is the cumulative sum of the kernel
+        norm = 1./signal.lfilter([1.], a, np.ones(length))[-1]
+    return np.array([norm]), a
+
+
+def htilde_bounce_vec(amp, time):
+    """
+    Returns the impulse response of the bounce, 1 at t=0 and -amp at the
+    first sample t with t+1 > time.
+    """
+    T = max(int(np.floor(time)), 0)
+    htilde = np.zeros(T+1)
+    htilde[0] = 1.
+    htilde[T] -= amp
+    return htilde
+
+
+def skin_filter(alpha=0., length=601):
+    """
+    Returns the IIR filter (b, a) of the skin effect kernel (see
+    skin_kernel). The kernel is the inverse of the skin effect response of
+    the given length, the filter is an all-pole filter with this response
+    as denominator.
+    """
+    if abs(alpha) == 0.:
+        return np.array([1.]), np.array([1.])
+    return np.array([1.]), htilde_skineffect(np.arange(length), alpha)
+
+
+def filters_impulse_response(filters, length):
+    """
+    Returns the first length samples of the impulse response of a cascade
+    of filters.
+    """
+    impulse = np.zeros(length)
+    impulse[0] = 1.
+    return apply_filters(impulse, filters)
+
+
+def apply_filters(waveforms, filters):
+    """
+    Applies a cascade of filters to a waveform (or along the last axis of an
+    array of waveforms) in O(N).
+    FIR filters (a == [1]) are applied using the predistortion engine.
+
+    Args:
+        waveforms (array): waveform(s) to filter
+        filters (list): list of filter coefficients (b, a)
+    """
+    out = np.asarray(waveforms, dtype=float)
+    for b, a in filters:
+        b = np.asarray(b, dtype=float)
+        a = np.atleast_1d(np.asarray(a, dtype=float))
+        if len(a) == 1:
+            if len(b) == 1:
+                out = out * (b[0]/a[0])
+            else:
+                out = predistortion.convolve_waveforms(out, b/a[0])
+        else:
+            out = signal.lfilter(b, a, out, axis=-1)
+    return out
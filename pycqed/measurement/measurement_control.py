@@ -1,10 +1,14 @@
 import types
+import numbers
 import logging
 import time
 import sys
+import queue
+import threading
 import numpy as np
 from scipy.optimize import fmin_powell
 from pycqed.measurement import hdf5_data as h5d
+from pycqed.measurement.data_writer import DataWriter, get_chunk_shape
 from pycqed.utilities import general
 from pycqed.utilities.general import dict_to_ordered_tuples
 
@@ -37,6 +41,10 @@ except Exception:
     print('When instantiating an MC object,'
           ' be sure to set live_plot_enabled=False')
 
+# Values of which the string can be reused as long as the parameter holds
+# the same object, see MeasurementControl._get_parameter_values
+_immutable_types = (numbers.Number, str, bytes, np.generic, type(None))
+
 
 class MeasurementControl(Instrument):
 
@@ -80,10 +88,59 @@ class MeasurementControl(Instrument):
                            parameter_class=ManualParameter,
                            initial_value=True)
 
+        self.add_parameter('data_flush_interval',
+                           docstring=('Number of hard detector acquisitions '
+                                      'after which the data is written to '
+                                      'disk.'),
+                           parameter_class=ManualParameter,
+                           vals=vals.Ints(1),
+                           initial_value=10)
+
+        self.add_parameter('soft_sweep_buffer_size',
+                           docstring=('Number of soft sweep datapoints that '
+                                      'are averaged and stored as a single '
+                                      'block.'),
+                           parameter_class=ManualParameter,
+                           vals=vals.Ints(1),
+                           initial_value=100)
+        self.add_parameter('pipelined_acquisition',
+                           docstring=('If True, hard detectors are prepared '
+                                      'and read out in a separate thread '
+                                      'while the previous data is stored '
+                                      'and plotted.'),
+                           parameter_class=ManualParameter,
+                           vals=vals.Bool(),
+                           initial_value=False)
+        self.add_parameter('pipeline_queue_size',
+                           docstring=('Maximum number of acquisitions that '
+                                      'can be waiting to be stored when '
+                                      'using pipelined acquisition.'),
+                           parameter_class=ManualParameter,
+                           vals=vals.Ints(1),
+                           initial_value=2)
+
+        self.add_parameter('compact_instrument_settings',
+                           docstring=('If True, the instrument settings are '
+                                      'stored as a single table instead of '
+                                      'an attribute per parameter. Use '
+                                      'hdf5_data.read_instrument_settings '
+                                      'to read them.'),
+                           parameter_class=ManualParameter,
+                           vals=vals.Bool(),
+                           initial_value=True)
+
         self.add_parameter('instrument_monitor',
                            parameter_class=ManualParameter,
                            initial_value=None,
                            vals=vals.Strings())
+        self.add_parameter('instrument_monitor_interval',
+                           docstring=('Minimum time between updates of the '
+                                      'instrument monitor during a '
+                                      'measurement.'),
+                           unit='s',
+                           parameter_class=ManualParameter,
+                           vals=vals.Numbers(min_value=0),
+                           initial_value=0.5)
 
         # pyqtgraph plotting process is reused for different measurements.
         if self.live_plot_enabled():
@@ -95,6 +152,10 @@ class MeasurementControl(Instrument):
                 figsize=(600, 400))
 
         self.soft_iteration = 0  # used as a counter for soft_avg
+        self.data_writer = None
+        self._inst_mon_upd_time = 0
+        # (instrument, parameter): (value, value string)
+        self._settings_cache = {}
         self._persist_dat = None
         self._persist_xlabs = None
         self._persist_ylabs = None
@@ -129,14 +190,19 @@ class MeasurementControl(Instrument):
                     self.xlen = len(self.get_sweep_points())
                 except:
                     self.xlen = 1
-            if self.mode == '1D':
-                self.measure()
-            elif self.mode == '2D':
-                self.measure_2D()
-            elif self.mode == 'adaptive':
-                self.measure_soft_adaptive()
-            else:
-                raise ValueError('mode %s not recognized' % self.mode)
+            try:
+                if self.mode == '1D':
+                    self.measure()
+                elif self.mode == '2D':
+                    self.measure_2D()
+                elif self.mode == 'adaptive':
+                    self.measure_soft_adaptive()
+                else:
+                    raise ValueError('mode %s not recognized' % self.mode)
+            finally:
+                # Ensures buffered data is also stored if the measurement
+                # is interrupted
+                self.close_data_writer()
             result = self.dset[()]
             self.save_MC_metadata(self.data_object)  # timing labels etc
         self.finish(result)
@@ -153,10 +219,24 @@ class MeasurementControl(Instrument):
                 self.detector_function.detector_control == 'soft'):
             self.detector_function.prepare()
             self.get_measurement_preparetime()
+            self.data_writer = DataWriter(
+                self.dset, nr_sweep_cols=len(self.sweep_functions),
+                buffer_size=self.soft_sweep_buffer_size())
+            self.data_writer.preallocate(len(self.sweep_points))
             self.measure_soft_static()
+            if self.mode == '2D':
+                self.update_plotmon_2D(force_update=True)
 
         elif self.detector_function.detector_control == 'hard':
             sweep_points = self.get_sweep_points()
+            self.data_writer = DataWriter(
+                self.dset, nr_sweep_cols=len(self.sweep_functions),
+                flush_interval=self.data_flush_interval())
+            try:
+                self.data_writer.preallocate(np.shape(sweep_points)[0])
+            except IndexError:
+                # Some hard sweeps do not specify sweep points
+                pass
             if len(self.sweep_functions) == 1:
                 self.get_measurement_preparetime()
                 self.detector_function.prepare(
@@ -175,30 +255,21 @@ class MeasurementControl(Instrument):
 
             # will not be complet if it is a 2D loop, soft avg or many shots
             if not self.is_complete():
-                pts_per_iter = self.dset.shape[0]
+                pts_per_iter = self.data_writer.nr_acquired
                 swp_len = np.shape(sweep_points)[0]
                 req_nr_iterations = int(swp_len/pts_per_iter)
                 total_iterations = req_nr_iterations * self.soft_avg()
 
-                for i in range(total_iterations-1):
-                    start_idx, stop_idx = self.get_datawriting_indices(
-                        pts_per_iter=pts_per_iter)
-                    if start_idx == 0:
-                        self.soft_iteration += 1
-                    for i, sweep_function in enumerate(self.sweep_functions):
-                        if len(self.sweep_functions) != 1:
-                            swf_sweep_points = sweep_points[:, i]
-                            sweep_points_0 = sweep_points[:, 0]
-                        else:
-                            swf_sweep_points = sweep_points
-                            sweep_points_0 = sweep_points
-                        val = swf_sweep_points[start_idx]
-
-                        if sweep_function.sweep_control is 'soft':
-                            sweep_function.set_parameter(val)
-                    self.detector_function.prepare(
-                        sweep_points=sweep_points_0[start_idx:stop_idx])
-                    self.measure_hard()
+                if self.pipelined_acquisition():
+                    self.measure_hard_pipelined(
+                        total_iterations-1, pts_per_iter, sweep_points)
+                else:
+                    for i in range(total_iterations-1):
+                        start_idx, stop_idx = self.prepare_hard_iteration(
+                            self.iteration, pts_per_iter, sweep_points)
+                        if start_idx == 0:
+                            self.soft_iteration += 1
+                        self.measure_hard()
         else:
             raise Exception('Sweep and Detector functions not '
                             + 'of the same type. \nAborting measurement')
@@ -206,7 +277,7 @@ class MeasurementControl(Instrument):
             print(self.detector_function.detector_control)
 
         self.check_keyboard_interrupt()
-        self.update_instrument_monitor()
+        self.update_instrument_monitor(force_update=True)
         self.update_plotmon(force_update=True)
         for sweep_function in self.sweep_functions:
             sweep_function.finish()
@@ -234,6 +305,9 @@ class MeasurementControl(Instrument):
             sweep_function.prepare()
         self.detector_function.prepare()
         self.get_measurement_preparetime()
+        self.data_writer = DataWriter(
+            self.dset, nr_sweep_cols=len(self.sweep_functions),
+            buffer_size=self.soft_sweep_buffer_size())
 
         if adaptive_function == 'Powell':
             adaptive_function = fmin_powell
@@ -251,7 +325,7 @@ class MeasurementControl(Instrument):
             sweep_function.finish()
         self.detector_function.finish()
         self.check_keyboard_interrupt()
-        self.update_instrument_monitor()
+        self.update_instrument_monitor(force_update=True)
         self.update_plotmon(force_update=True)
         self.update_plotmon_adaptive(force_update=True)
         self.get_measurement_endtime()
@@ -262,58 +336,41 @@ class MeasurementControl(Instrument):
 
     def measure_hard(self):
         new_data = np.array(self.detector_function.get_values()).T
+        return self.store_hard_data(new_data)
+
+    def store_hard_data(self, new_data, update_instrument_monitor=True):
+        '''
+        Stores (and averages) the data of a single hard acquisition and
+        updates the plotmon.
+        '''
 
         ###########################
         # Shape determining block #
         ###########################
 
-        datasetshape = self.dset.shape
         start_idx, stop_idx = self.get_datawriting_indices(new_data)
-
-        new_datasetshape = (np.max([datasetshape[0], stop_idx]),
-                            datasetshape[1])
-        self.dset.resize(new_datasetshape)
         len_new_data = stop_idx-start_idx
-        if len(np.shape(new_data)) == 1:
-            old_vals = self.dset[start_idx:stop_idx,
-                                 len(self.sweep_functions)]
-            new_vals = ((new_data + old_vals*self.soft_iteration) /
-                        (1+self.soft_iteration))
-
-            self.dset[start_idx:stop_idx,
-                      len(self.sweep_functions)] = new_vals
-        else:
-            old_vals = self.dset[start_idx:stop_idx,
-                                 len(self.sweep_functions):]
-            new_vals = ((new_data + old_vals*self.soft_iteration) /
-                        (1+self.soft_iteration))
-
-            self.dset[start_idx:stop_idx,
-                      len(self.sweep_functions):] = new_vals
-        sweep_len = len(self.get_sweep_points().T)
 
         ######################
         # DATA STORING BLOCK #
         ######################
-        if sweep_len == len_new_data:  # 1D sweep
-            self.dset[:, 0] = self.get_sweep_points().T
-        else:
-            try:
-                if len(self.sweep_functions) != 1:
-                    relevant_swp_points = self.get_sweep_points()[
-                        start_idx:start_idx+len_new_data:]
-                    self.dset[start_idx:, 0:len(self.sweep_functions)] = \
-                        relevant_swp_points
-                else:
-                    self.dset[start_idx:, 0] = self.get_sweep_points()[
-                        start_idx:start_idx+len_new_data:].T
-            except Exception:
-                # There are some cases where the sweep points are not
-                # specified that you don't want to crash (e.g. on -off seq)
-                pass
+        # The sweep points are only stored if they match the data. There are
+        # some cases where the sweep points are not specified that you
+        # don't want to crash (e.g. on -off seq)
+        relevant_swp_points = None
+        try:
+            swp_points = self.get_sweep_points()[start_idx:stop_idx]
+            if np.shape(swp_points)[0] == len_new_data:
+                relevant_swp_points = swp_points
+        except Exception:
+            pass
+        self.data_writer.write(start_idx, new_data,
+                               sweep_points=relevant_swp_points,
+                               soft_iteration=self.soft_iteration)
 
         self.check_keyboard_interrupt()
-        self.update_instrument_monitor()
+        if update_instrument_monitor:
+            self.update_instrument_monitor()
         self.update_plotmon()
         if self.mode == '2D':
             self.update_plotmon_2D_hard()
@@ -321,6 +378,105 @@ class MeasurementControl(Instrument):
         self.iteration += 1
         return new_data
 
+    def prepare_hard_iteration(self, iteration, pts_per_iter, sweep_points):
+        '''
+        Sets the soft sweep functions and prepares the detector for the
+        hard acquisition with number "iteration".
+        Returns the datawriting indices of this acquisition.
+        '''
+        start_idx, stop_idx = self.get_datawriting_indices(
+            pts_per_iter=pts_per_iter, iteration=iteration)
+        for i, sweep_function in enumerate(self.sweep_functions):
+            if len(self.sweep_functions) != 1:
+                swf_sweep_points = sweep_points[:, i]
+                sweep_points_0 = sweep_points[:, 0]
+            else:
+                swf_sweep_points = sweep_points
+                sweep_points_0 = sweep_points
+            val = swf_sweep_points[start_idx]
+
+            if sweep_function.sweep_control is 'soft':
+                sweep_function.set_parameter(val)
+        self.detector_function.prepare(
+            sweep_points=sweep_points_0[start_idx:stop_idx])
+        return start_idx, stop_idx
+
+    def measure_hard_pipelined(self, nr_iterations, pts_per_iter,
+                               sweep_points):
+        '''
+        Performs nr_iterations hard acquisitions in a pipelined way.
+
+        A producer thread sets the soft sweep functions, prepares the
+        detector and acquires the data, while the main thread averages,
+        stores and plots the data of the previous acquisition.
+        The threads communicate through a queue of at most
+        pipeline_queue_size acquisitions.
+
+        The instrument monitor is not updated during the acquisitions as it
+        would communicate with the instruments from the main thread while
+        the producer thread is acquiring.
+        '''
+        data_queue = queue.Queue(maxsize=self.pipeline_queue_size())
+        stop_event = threading.Event()
+
+        def put(item):
+            # Uses a timeout such that the producer does not block forever
+            # if the main thread stops consuming (e.g. on an interrupt)
+            while not stop_event.is_set():
+                try:
+                    data_queue.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def producer():
+            iteration = self.iteration
+            soft_iteration = self.soft_iteration
+            try:
+                for i in range(nr_iterations):
+                    if stop_event.is_set():
+                        return
+                    start_idx, stop_idx = self.prepare_hard_iteration(
+                        iteration, pts_per_iter, sweep_points)
+                    if start_idx == 0:
+                        soft_iteration += 1
+                    new_data = np.array(
+                        self.detector_function.get_values()).T
+                    iteration += 1
+                    if not put((soft_iteration, new_data, None)):
+                        return
+            except BaseException as e:
+                put((None, None, e))
+
+        producer_thread = threading.Thread(
+            target=producer, name='{}_acquisition'.format(self.name),
+            daemon=True)
+        producer_thread.start()
+        try:
+            for i in range(nr_iterations):
+                # Uses a timeout such that a KeyboardInterrupt is also
+                # caught while waiting for data
+                while True:
+                    try:
+                        item = data_queue.get(timeout=0.05)
+                        break
+                    except queue.Empty:
+                        if not producer_thread.is_alive():
+                            raise RuntimeError(
+                                'Acquisition thread stopped unexpectedly')
+                soft_iteration, new_data, exception = item
+                if exception is not None:
+                    raise exception
+                self.soft_iteration = soft_iteration
+                self.store_hard_data(new_data,
+                                     update_instrument_monitor=False)
+        finally:
+            # Waits for an ongoing acquisition to finish such that the
+            # detector is never left in an undefined state
+            stop_event.set()
+            producer_thread.join()
+
     def measurement_function(self, x):
         '''
         Core measurement function used for soft sweeps
@@ -338,19 +494,13 @@ class MeasurementControl(Instrument):
             # is generally not important except for specifics: f.i. the phase
             # of an agilent generator is reset to 0 when the frequency is set.
 
-        datasetshape = self.dset.shape
-        # self.iteration = datasetshape[0] + 1
         start_idx, stop_idx = self.get_datawriting_indices(pts_per_iter=1)
         vals = self.detector_function.acquire_data_point()
-        # Resizing dataset and saving
-        new_datasetshape = (np.max([datasetshape[0], stop_idx]),
-                            datasetshape[1])
-        self.dset.resize(new_datasetshape)
+        # The datapoint is buffered and stored together with the
+        # next soft_sweep_buffer_size points
         new_data = np.append(x, vals)
-        old_vals = self.dset[start_idx:stop_idx, :]
-        new_vals = ((new_data + old_vals*self.soft_iteration) /
-                    (1+self.soft_iteration))
-        self.dset[start_idx:stop_idx, :] = new_vals
+        self.data_writer.buffer_point(start_idx, new_data,
+                                      soft_iteration=self.soft_iteration)
         # update plotmon
         self.check_keyboard_interrupt()
         self.update_instrument_monitor()
@@ -529,7 +679,7 @@ class MeasurementControl(Instrument):
 
     def update_plotmon(self, force_update=False):
         # Note: plotting_max_pts takes precendence over force update
-        if self.live_plot_enabled() and (self.dset.shape[0] <
+        if self.live_plot_enabled() and (self.get_nr_acquired_points() <
                                          self.plotting_max_pts()):
             i = 0
             try:
@@ -543,10 +693,11 @@ class MeasurementControl(Instrument):
                         force_update) :
 
                     nr_sweep_funcs = len(self.sweep_function_names)
+                    dat = self.get_acquired_data()
                     for y_ind in range(len(self.detector_function.value_names)):
                         for x_ind in range(nr_sweep_funcs):
-                            x = self.dset[:, x_ind]
-                            y = self.dset[:, nr_sweep_funcs+y_ind]
+                            x = dat[:, x_ind]
+                            y = dat[:, nr_sweep_funcs+y_ind]
 
                             self.curves[i]['config']['x'] = x
                             self.curves[i]['config']['y'] = y
@@ -588,21 +739,26 @@ class MeasurementControl(Instrument):
 
     def update_plotmon_2D(self, force_update=False):
         '''
-        Adds latest measured value to the TwoD_array and sends it
+        Adds the measured values to the TwoD_array and sends it
         to the QC_QtPlot.
         '''
         if self.live_plot_enabled():
             try:
-                i = int((self.iteration) % (self.xlen*self.ylen))
-                x_ind = int(i % self.xlen)
-                y_ind = int(i / self.xlen)
-                for j in range(len(self.detector_function.value_names)):
-                    z_ind = len(self.sweep_functions) + j
-                    self.TwoD_array[y_ind, x_ind, j] = self.dset[i, z_ind]
-                self.secondary_QtPlot.traces[j]['config']['z'] = self.TwoD_array[:, :, j]
                 if (time.time() - self.time_last_2Dplot_update >
                         self.plotting_interval()
-                        or self.iteration == len(self.sweep_points)):
+                        or self.iteration == len(self.sweep_points)
+                        or force_update):
+                    dat = self.get_acquired_data()
+                    nr_vals = len(self.detector_function.value_names)
+                    nr_pts = min(len(dat), self.xlen*self.ylen)
+                    z_ind = len(self.sweep_functions)
+                    # The TwoD_array is filled row by row such that a
+                    # reshaped view can be filled in a single step
+                    self.TwoD_array.reshape(-1, nr_vals)[:nr_pts] = \
+                        dat[:nr_pts, z_ind:z_ind+nr_vals]
+                    for j in range(nr_vals):
+                        self.secondary_QtPlot.traces[j]['config']['z'] = \
+                            self.TwoD_array[:, :, j]
                     self.time_last_2Dplot_update = time.time()
                     self.secondary_QtPlot.update_plot()
             except Exception as e:
@@ -634,9 +790,10 @@ class MeasurementControl(Instrument):
             try:
                 if (time.time() - self.time_last_ad_plot_update >
                         self.plotting_interval() or force_update):
+                    dat = self.get_acquired_data()
                     for j in range(len(self.detector_function.value_names)):
                         y_ind = len(self.sweep_functions) + j
-                        y = self.dset[:, y_ind]
+                        y = dat[:, y_ind]
                         x = range(len(y))
                         self.secondary_QtPlot.traces[j]['config']['x'] = x
                         self.secondary_QtPlot.traces[j]['config']['y'] = y
@@ -655,9 +812,10 @@ class MeasurementControl(Instrument):
             if self.live_plot_enabled():
                 i = int((self.iteration) % self.ylen)
                 y_ind = i
+                dat = self.get_acquired_data()
                 for j in range(len(self.detector_function.value_names)):
                     z_ind = len(self.sweep_functions) + j
-                    self.TwoD_array[y_ind, :, j] = self.dset[
+                    self.TwoD_array[y_ind, :, j] = dat[
                         i*self.xlen:(i+1)*self.xlen, z_ind]
                     self.secondary_QtPlot.traces[j]['config']['z'] = \
                         self.TwoD_array[:, :, j]
@@ -682,15 +840,40 @@ class MeasurementControl(Instrument):
         self._persist_xlabs = None
         self._persist_ylabs = None
 
-    def update_instrument_monitor(self):
+    def update_instrument_monitor(self, force_update=False):
         if self.instrument_monitor() is not None:
-            inst_mon = self.find_instrument(self.instrument_monitor())
-            inst_mon.update()
+            if (force_update or time.time() - self._inst_mon_upd_time >
+                    self.instrument_monitor_interval()):
+                inst_mon = self.find_instrument(self.instrument_monitor())
+                inst_mon.update()
+                self._inst_mon_upd_time = time.time()
 
     ##################################
     # Small helper/utility functions #
     ##################################
 
+    def get_acquired_data(self):
+        '''
+        Returns the data acquired so far. If a data writer is used the
+        in memory copy of the data is returned instead of the dataset.
+        '''
+        if self.data_writer is not None:
+            return self.data_writer.get_data()
+        return self.dset
+
+    def get_nr_acquired_points(self):
+        if self.data_writer is not None:
+            return self.data_writer.nr_acquired
+        return self.dset.shape[0]
+
+    def close_data_writer(self):
+        '''
+        Writes any buffered data to disk and detaches the data writer.
+        '''
+        if self.data_writer is not None:
+            self.data_writer.close()
+            self.data_writer = None
+
     def get_data_object(self):
         '''
         Used for external functions to write to a datafile.
@@ -718,11 +901,16 @@ class MeasurementControl(Instrument):
 
     def create_experimentaldata_dataset(self):
         data_group = self.data_object.create_group('Experimental Data')
+        nr_cols = (len(self.sweep_functions) +
+                   len(self.detector_function.value_names))
+        try:
+            nr_rows = np.shape(self.get_sweep_points())[0]
+        except Exception:
+            # sweep points are not always known before preparing
+            nr_rows = 0
         self.dset = data_group.create_dataset(
-            'Data', (0, len(self.sweep_functions) +
-                     len(self.detector_function.value_names)),
-            maxshape=(None, len(self.sweep_functions) +
-                      len(self.detector_function.value_names)))
+            'Data', (0, nr_cols), maxshape=(None, nr_cols),
+            chunks=get_chunk_shape(nr_rows, nr_cols))
         self.get_column_names()
         self.dset.attrs['column_names'] = h5d.encode_to_utf8(self.column_names)
         # Added to tell analysis how to extract the data
@@ -751,25 +939,75 @@ class MeasurementControl(Instrument):
         uses QCodes station snapshot to save the last known value of any
         parameter. Only saves the value and not the update time (which is
         known in the snapshot)
+
+        If compact_instrument_settings is True the settings are stored as a
+        single table (see h5d.write_instrument_settings), otherwise as one
+        attribute per parameter.
         '''
         if data_object is None:
             data_object = self.data_object
         if not hasattr(self, 'station'):
             logging.warning('No station object specified, could not save',
                             ' instrument settings')
+        elif self.compact_instrument_settings():
+            inslist = dict_to_ordered_tuples(self.station.components)
+            settings = []
+            for (iname, ins) in inslist:
+                settings.extend(
+                    (iname, p_name, val) for (p_name, val) in
+                    self._get_parameter_values(iname, ins))
+            h5d.write_instrument_settings(
+                data_object, settings,
+                instrument_names=[iname for (iname, ins) in inslist])
         else:
             set_grp = data_object.create_group('Instrument settings')
             inslist = dict_to_ordered_tuples(self.station.components)
             for (iname, ins) in inslist:
                 instrument_grp = set_grp.create_group(iname)
-                par_snap = ins.snapshot()['parameters']
-                parameter_list = dict_to_ordered_tuples(par_snap)
-                for (p_name, p) in parameter_list:
-                    try:
-                        val = str(p['value'])
-                    except KeyError:
-                        val = ''
-                    instrument_grp.attrs[p_name] = str(val)
+                for (p_name, val) in self._get_parameter_values(iname, ins):
+                    instrument_grp.attrs[p_name] = val
+
+    def _get_parameter_values(self, iname, ins):
+        '''
+        Returns a list of (parameter name, value string) tuples containing
+        the last known value of every parameter of an instrument.
+
+        For instruments that use the default qcodes snapshot the values are
+        read using get_latest, which skips building the snapshot dicts of
+        the parameters. Every parameter is still visited, the cache only
+        saves the str() conversion of values that did not change: the
+        string of an immutable value (e.g. a number or a string) is reused
+        if the parameter holds the same object as in the last call.
+        Instruments with a custom snapshot (e.g. one that updates the
+        values) use the snapshot.
+        '''
+        if not (type(ins).snapshot is Instrument.snapshot and
+                type(ins).snapshot_base is Instrument.snapshot_base):
+            par_snap = ins.snapshot()['parameters']
+            values = []
+            for (p_name, p) in dict_to_ordered_tuples(par_snap):
+                try:
+                    val = str(p['value'])
+                except KeyError:
+                    val = ''
+                values.append((p_name, str(val)))
+            return values
+
+        values = []
+        for (p_name, par) in dict_to_ordered_tuples(ins.parameters):
+            key = (iname, p_name)
+            val = par.get_latest()
+            cached = self._settings_cache.get(key)
+            # Mutable values (e.g. arrays) can be modified in place, the
+            # string of the same object is only reused for immutable values
+            if (cached is not None and cached[0] is val and
+                    isinstance(val, _immutable_types)):
+                val_str = cached[1]
+            else:
+                val_str = str(val)
+                self._settings_cache[key] = (val, val_str)
+            values.append((p_name, val_str))
+        return values
 
     def save_MC_metadata(self, data_object=None, *args):
         '''
@@ -790,7 +1028,10 @@ class MeasurementControl(Instrument):
 
     def print_progress(self, stop_idx=None):
         if self.verbose():
-            acquired_points = self.dset.shape[0]
+            # Soft sweep datapoints can still be buffered and not be counted
+            # as acquired
+            acquired_points = (self.get_nr_acquired_points()
+                               if stop_idx is None else stop_idx)
             total_nr_pts = len(self.get_sweep_points())
             if self.soft_avg() != 1:
                 progr = 1 if stop_idx == None else stop_idx/total_nr_pts
@@ -816,7 +1057,7 @@ class MeasurementControl(Instrument):
         """
         Returns True if enough data has been acquired.
         """
-        acquired_points = self.dset.shape[0]
+        acquired_points = self.get_nr_acquired_points()
         total_nr_pts = np.shape(self.get_sweep_points())[0]
         if acquired_points < total_nr_pts:
             return False
@@ -845,11 +1086,15 @@ class MeasurementControl(Instrument):
     def get_datetimestamp(self):
         return time.strftime('%Y%m%d_%H%M%S', time.localtime())
 
-    def get_datawriting_indices(self, new_data=None, pts_per_iter=None):
+    def get_datawriting_indices(self, new_data=None, pts_per_iter=None,
+                                iteration=None):
         """
         Calculates the start and stop indices required for
         storing a hard measurement.
+        If iteration is not specified the current iteration is used.
         """
+        if iteration is None:
+            iteration = self.iteration
         if new_data is None and pts_per_iter is None:
             raise(ValueError())
         elif new_data is not None:
@@ -866,7 +1111,7 @@ class MeasurementControl(Instrument):
         else:
             max_sweep_points = np.shape(self.get_sweep_points())[0]
         start_idx = int(
-            (xlen*(self.iteration)) % max_sweep_points)
+            (xlen*(iteration)) % max_sweep_points)
 
         stop_idx = start_idx + xlen
 
@@ -15,6 +15,7 @@ from pycqed.measurement.waveform_control import pulsar
 from pycqed.measurement.waveform_control.element import calculate_time_correction
 from pycqed.measurement.pulse_sequences.standard_elements import multi_pulse_elt
 from pycqed.measurement.pulse_sequences.standard_elements import distort_and_compensate
+from pycqed.measurement.pulse_sequences.standard_elements import distort_and_compensate_elements
 
 from importlib import reload
 reload(pulse)
@@ -351,15 +352,11 @@ def chevron_seq(operation_dict, q0,
             pulses += [operation_dict[p]]
 
         el = multi_pulse_elt(i, station, pulses, sequencer_config)
-        if distortion_dict is not None:
-            print('\r Distorting element {}/{}'.format(i+1, len(pulse_lengths)),
-                  end='')
-            if i == len(pulse_lengths):
-                print()
-            el = distort_and_compensate(
-                el, distortion_dict)
         el_list.append(el)
         seq.append_element(el, trigger_wait=True)
+    if distortion_dict is not None:
+        # all elements are distorted in a single batch
+        distort_and_compensate_elements(el_list, distortion_dict)
     if upload:
         station.components['AWG'].stop()
         station.pulsar.program_awg(seq, *el_list, verbose=verbose)
@@ -427,16 +424,11 @@ def SwapN(operation_dict, q0,
             pulses += [operation_dict[p]]
 
         el = multi_pulse_elt(i, station, pulses, sequencer_config)
-        if distortion_dict is not None:
-            print('\rDistorting element {}/{} '.format(i+1,
-                                                       len(nr_pulses_list)),
-                  end='')
-            if i == len(nr_pulses_list):
-                print()
-            el = distort_and_compensate(
-                el, distortion_dict)
         el_list.append(el)
         seq.append_element(el, trigger_wait=True)
+    if distortion_dict is not None:
+        # all elements are distorted in a single batch
+        distort_and_compensate_elements(el_list, distortion_dict)
 
     if upload:
         station.components['AWG'].stop()
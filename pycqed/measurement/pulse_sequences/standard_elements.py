@@ -1,6 +1,5 @@
 import logging
 import numpy as np
-from copy import deepcopy
 try:
     from math import gcd
 except:  # Moved to math in python 3.5, this is to be 3.4 compatible
@@ -8,6 +7,7 @@ except:  # Moved to math in python 3.5, this is to be 3.4 compatible
 from ..waveform_control import pulsar
 from ..waveform_control import element
 from ..waveform_control import pulse
+from ..waveform_control import predistortion
 from ..waveform_control.pulse_library import MW_IQmod_pulse, SSB_DRAG_pulse, \
     Mux_DRAG_pulse, SquareFluxPulse, MartinisFluxPulse
 from ..waveform_control.pulse import CosPulse, SquarePulse
@@ -37,8 +37,9 @@ def multi_pulse_elt(i, station, pulse_list, sequencer_config=None):
 
     Note: this function is used to generate most standard elements we use.
     '''
-    # Prevents accidently overwriting pulse pars in this list
-    pulse_list = deepcopy(pulse_list)
+    # Prevents accidently overwriting pulse pars in this list, the values
+    # are not modified in place so copying the dicts is sufficient
+    pulse_list = [dict(pulse_pars) for pulse_pars in pulse_list]
     last_op_type = 'other'  # used for determining relevant buffers
     flux_compensation_pulse_list = []
 
@@ -115,7 +116,7 @@ def multi_pulse_elt(i, station, pulse_list, sequencer_config=None):
 
         if cur_op_type == 'Flux':
             # Adds flux pulses to a list for automatic compensation pulses
-            flux_compensation_pulse_list += [deepcopy(pulse_pars)]
+            flux_compensation_pulse_list += [dict(pulse_pars)]
 
         ###################################
         #       Pulses get added here     #
@@ -240,13 +241,26 @@ def distort_and_compensate(element, distortion_dict):
               'chx': np.array(.....),
               'chy': np.array(.....)}
     """
+    return distort_and_compensate_elements([element], distortion_dict)[0]
 
-    t_vals, outputs_dict = element.waveforms()
+
+def distort_and_compensate_elements(elements, distortion_dict):
+    """
+    Distorts a list of elements (e.g. all elements of a sequence) using the
+    contents of a distortion dictionary (see distort_and_compensate).
+    The waveforms of all elements with the same length are convolved with
+    the kernel as a single 2D array.
+    """
+    outputs = [element.waveforms()[1] for element in elements]
     for ch in distortion_dict['ch_list']:
-        element._channels[ch]['distorted'] = True
-        length = len(outputs_dict[ch])
         kernelvec = distortion_dict[ch]
-        outputs_dict[ch] = np.convolve(
-            outputs_dict[ch], kernelvec)[:length]
-        element.distorted_wfs[ch] = outputs_dict[ch][:len(t_vals)]
-    return element
\ No newline at end of file
+        by_length = {}
+        for i, outputs_dict in enumerate(outputs):
+            by_length.setdefault(len(outputs_dict[ch]), []).append(i)
+        for idxs in by_length.values():
+            distorted = predistortion.convolve_waveforms(
+                np.array([outputs[i][ch] for i in idxs]), kernelvec)
+            for i, wf in zip(idxs, distorted):
+                elements[i]._channels[ch]['distorted'] = True
+                elements[i].distorted_wfs[ch] = wf
+    return elements
@@ -4,7 +4,6 @@
 # modified by: Adriaan Rol
 
 import numpy as np
-from copy import deepcopy
 import pprint
 from . import pulsar
 import logging
@@ -39,6 +38,18 @@ class Element:
         self.pulses = {}
         self._channels = {}
         self._last_added_pulse = None
+        self._auto_name_counters = {}
+
+        # Running aggregates over all pulses and channels, these are updated
+        # when a pulse is added such that the offset and length of the
+        # element do not require looping over all pulses.
+        self._min_t0 = None  # smallest t0 - delay
+        self._max_end = None  # largest end - delay
+        # Sample indices (start, stop) per (pulse, channel), only valid for
+        # the offset they were computed with.
+        self._sample_indices = {}
+        self._max_end_sample = None
+        self._indices_offset = None
 
         if self.pulsar is not None:
             self.clock = self.pulsar.clock
@@ -51,6 +62,18 @@ class Element:
                                     offset=chan['offset'],
                                     delay=delay)
         self.distorted_wfs = {}
+        # Waveforms evaluated outside of the element (e.g. by
+        # pulse_library.batch_evaluate_pulses), per pulse and channel the
+        # time values and the waveform. Only used for identical time values.
+        self.precomputed_wfs = {}
+
+    def __getstate__(self):
+        # The pulsar is only used when the element is created and holds the
+        # connection to the AWG, it is not pickled (e.g. when the element is
+        # sent to the processes compiling a sequence).
+        state = self.__dict__.copy()
+        state['pulsar'] = None
+        return state
 
     # tools for time calculations
 
@@ -71,25 +94,20 @@ class Element:
         if self.ignore_offset_correction:
             return 0
         else:
-            t0s = []
-            for p in self.pulses:
-                for c in self.pulses[p].channels:
-                    t0s.append(self.pulses[p].t0() -
-                               self._channels[c]['delay'])
-
-            return min(t0s)
+            if self._min_t0 is None:
+                raise ValueError('Element "{}" contains no pulses'.format(
+                    self.name))
+            return self._min_t0
 
     def ideal_length(self):
         """
         Returns the nominal length of the element before taking into account
         the discretization using the clock.
         """
-        ts = []
-        for p in self.pulses:
-            for c in self.pulses[p].channels:
-                ts.append(self.pulse_end_time(p, c))
-
-        return max(ts)
+        if self._max_end is None:
+            raise ValueError('Element "{}" contains no pulses'.format(
+                self.name))
+        return self._max_end - self.offset()
 
     def length(self):
         """
@@ -101,12 +119,11 @@ class Element:
         """
         Returns the number of samples the elements occupies.
         """
-        ends = []
-        for p in self.pulses:
-            for c in self.pulses[p].channels:
-                ends.append(self.pulse_end_sample(p, c))
-
-        samples = max(ends)+1
+        self._update_sample_indices()
+        if self._max_end_sample is None:
+            raise ValueError('Element "{}" contains no pulses'.format(
+                self.name))
+        samples = self._max_end_sample+1
         if samples < self.min_samples:
             samples = self.min_samples
         else:
@@ -135,6 +152,64 @@ class Element:
         self.ignore_offset_correction = True
         for name, pulse in self.pulses.items():
             pulse._t0 += dt
+        # Adding dt is monotonic, the extremes are the same pulses/channels
+        if self._min_t0 is not None:
+            self._min_t0 += dt
+            self._max_end += dt
+        self._indices_offset = None
+
+    ##########################
+    # aggregate bookkeeping  #
+    ##########################
+
+    def _add_to_aggregates(self, pname):
+        '''
+        Updates the running min start/max end with the pulse pname.
+        '''
+        pulse = self.pulses[pname]
+        for c in pulse.channels:
+            delay = self._channels[c]['delay']
+            t0 = pulse.t0() - delay
+            end = pulse.end() - delay
+            if self._min_t0 is None or t0 < self._min_t0:
+                self._min_t0 = t0
+            if self._max_end is None or end > self._max_end:
+                self._max_end = end
+
+    def _reset_aggregates(self):
+        '''
+        Recomputes the aggregates from all pulses, required when pulses are
+        replaced or channel delays change.
+        '''
+        self._min_t0 = None
+        self._max_end = None
+        self._indices_offset = None
+        for p in self.pulses:
+            self._add_to_aggregates(p)
+
+    def _compute_sample_indices(self, pname):
+        psamples = self.pulse_samples(pname)
+        for c in self.pulses[pname].channels:
+            idx0 = self._time2sample(self.pulse_start_time(pname, c))
+            self._sample_indices[(pname, c)] = (idx0, idx0 + psamples)
+            if (self._max_end_sample is None or
+                    idx0 + psamples - 1 > self._max_end_sample):
+                self._max_end_sample = idx0 + psamples - 1
+
+    def _update_sample_indices(self):
+        '''
+        Recomputes the cached sample indices of all pulses if the offset
+        changed since they were computed.
+        '''
+        if len(self.pulses) == 0:
+            return
+        offset = self.offset()
+        if offset != self._indices_offset:
+            self._sample_indices = {}
+            self._max_end_sample = None
+            self._indices_offset = offset
+            for p in self.pulses:
+                self._compute_sample_indices(p)
 
     ######################
     # channel management #
@@ -151,6 +226,8 @@ class Element:
             'low': low,
             'distorted': False
             }
+        if len(self.pulses) > 0:
+            self._reset_aggregates()
 
     def channel_delay(self, cname):
         return self._channels[cname]['delay']
@@ -160,9 +237,11 @@ class Element:
     ####################
 
     def _auto_pulse_name(self, base='pulse'):
-        i = 0
+        # Counting continues from the last generated name for this base
+        i = self._auto_name_counters.get(base, 0)
         while base+'-'+str(i) in self.pulses:
             i += 1
+        self._auto_name_counters[base] = i+1
         return base+'-'+str(i)
 
     def add(self, pulse, name=None, start=0,
@@ -188,7 +267,7 @@ class Element:
                                   this pulse is at a multiple of 1/fixed_point_freq
 
         '''
-        pulse = deepcopy(pulse)
+        pulse = pulse.copy()
         pulse.operation_type = operation_type
         if name is None:
             name = self._auto_pulse_name(pulse.name)
@@ -229,8 +308,19 @@ class Element:
                     t0 -= self.pulses[refpulse].effective_length()/2.
 
         pulse._t0 = t0
+        replaced = name in self.pulses
+        self.precomputed_wfs.pop(name, None)
         self.pulses[name] = pulse
         self._last_added_pulse = name
+        if replaced:
+            self._reset_aggregates()
+        else:
+            self._add_to_aggregates(name)
+            if self._indices_offset is not None:
+                if self.offset() == self._indices_offset:
+                    self._compute_sample_indices(name)
+                else:
+                    self._indices_offset = None
         # Shift all pulses to the fixed point for the first RO pulse encountered
         if operation_type == 'RO' and self.fixed_point_applied is False:
             time_corr = calculate_time_correction(t0, self.readout_fixed_point)
@@ -281,14 +371,26 @@ class Element:
         return self.pulses[pname].length
 
     def pulse_start_sample(self, pname, cname):
-        return self._time2sample(self.pulse_start_time(pname, cname))
+        return self.pulse_sample_indices(pname, cname)[0]
+
+    def pulse_sample_indices(self, pname, cname):
+        '''
+        Returns the (start, stop) sample indices of pulse pname on channel
+        cname such that wf[start:stop] contains the pulse.
+        '''
+        self._update_sample_indices()
+        indices = self._sample_indices.get((pname, cname))
+        if indices is None:
+            # channel not used by the pulse
+            idx0 = self._time2sample(self.pulse_start_time(pname, cname))
+            indices = (idx0, idx0 + self.pulse_samples(pname))
+        return indices
 
     def pulse_samples(self, pname):
         return self._time2sample(self.pulses[pname].length)
 
     def pulse_end_sample(self, pname, cname):
-        return self.pulse_start_sample(pname, cname) + \
-            self.pulse_samples(pname) - 1
+        return self.pulse_sample_indices(pname, cname)[1] - 1
 
     def effective_pulse_start_time(self, pname, cname):
         return self.pulse_start_time(pname, cname) + \
@@ -298,34 +400,60 @@ class Element:
         return self.pulse_end_time(pname, cname) - \
             self.pulses[pname].stop_offset
 
+    def pulse_tvals(self, pname, cname, tvals=None):
+        '''
+        Returns the time values at which the pulse pname is evaluated on
+        channel cname (for global_time elements).
+        '''
+        if tvals is None:
+            tvals = np.arange(self.samples())/self.clock
+        idx0, idx1 = self.pulse_sample_indices(pname, cname)
+        # slicing is a view, the addition creates the new array
+        return np.round(tvals[idx0:idx1] + self.channel_delay(cname) +
+                        self.time_offset, pulsar.SIGNIFICANT_DIGITS)
+
+    def _precomputed_wfs(self, pname, chan_tvals):
+        '''
+        Returns the precomputed waveforms of pulse pname if they were
+        computed for the time values chan_tvals, None otherwise.
+        '''
+        precomputed = self.precomputed_wfs.get(pname)
+        if precomputed is None:
+            return None
+        pulsewfs = {}
+        for c, c_tvals in chan_tvals.items():
+            if c not in precomputed:
+                return None
+            pre_tvals, wf = precomputed[c]
+            if not np.array_equal(pre_tvals, c_tvals):
+                return None
+            pulsewfs[c] = wf
+        return pulsewfs
+
     # computing the numerical waveform
     def ideal_waveforms(self):
         wfs = {}
-        tvals = np.arange(self.samples())/self.clock
+        samples = self.samples()
+        tvals = np.arange(samples)/self.clock
 
         for c in self._channels:
-            wfs[c] = np.zeros(self.samples()) + self._channels[c]['offset']
+            wfs[c] = np.zeros(samples) + self._channels[c]['offset']
         # we first compute the ideal function values
         for p in self.pulses:
             psamples = self.pulse_samples(p)
             if not self.global_time:
-                pulse_tvals = tvals.copy()[:psamples]
+                pulse_tvals = tvals[:psamples].copy()
                 pulsewfs = self.pulses[p].get_wfs(pulse_tvals)
             else:
                 chan_tvals = {}
                 for c in self.pulses[p].channels:
-                    idx0 = self.pulse_start_sample(p, c)
-                    idx1 = self.pulse_end_sample(p, c) + 1
-                    c_tvals = np.round(tvals.copy()[idx0:idx1] +
-                                       self.channel_delay(c) +
-                                       self.time_offset,
-                                       pulsar.SIGNIFICANT_DIGITS)
-                    chan_tvals[c] = c_tvals
-
-                pulsewfs = self.pulses[p].get_wfs(chan_tvals)
+                    chan_tvals[c] = self.pulse_tvals(p, c, tvals)
+
+                pulsewfs = self._precomputed_wfs(p, chan_tvals)
+                if pulsewfs is None:
+                    pulsewfs = self.pulses[p].get_wfs(chan_tvals)
             for c in self.pulses[p].channels:
-                idx0 = self.pulse_start_sample(p, c)
-                idx1 = self.pulse_end_sample(p, c) + 1
+                idx0, idx1 = self.pulse_sample_indices(p, c)
                 wfs[c][idx0:idx1] += pulsewfs[c]
 
         return tvals, wfs
@@ -1,4 +1,6 @@
 import numpy as np
+from pycqed.measurement import kernel_functions as kf
+
 
 def kernel_matrix_from_file(path, max_len=-1):
     """
@@ -9,13 +11,17 @@ def kernel_matrix_from_file(path, max_len=-1):
                     B_{i,j} =
                                 b_{i-j}, i>=j
     """
-    kernelvec = np.loadtxt(path)[:max_len]
-    kernel = np.zeros((len(kernelvec), len(kernelvec)))
-    for i in range(len(kernelvec)):
-        for j in range(len(kernelvec)):
-            kernel[i, j] = kernelvec[i-j]
-    del(kernelvec)
-    return kernel
+    return kf.lower_toeplitz(np.loadtxt(path)[:max_len])
+
+
+def kernel_vector_from_list(kernel_path_list, max_len=-1):
+    """
+    Returns the first column of the kernel matrix of kernel_from_list, the
+    kernels are composed by convolution.
+    """
+    kernels = [np.loadtxt(p)[:max_len] for p in kernel_path_list]
+    return kf.convolve_kernels(kernels, length=len(kernels[0]))
+
 
 def kernel_from_list(kernel_path_list, max_len=-1):
     """
@@ -23,11 +29,5 @@ def kernel_from_list(kernel_path_list, max_len=-1):
 
     Each kernel correction is loaded by kernel_matrix_from_file, format information can be found in the help of that function
     """
-    matrices = []
-    for p in kernel_path_list:
-        matrices.append(kernel_matrix_from_file(p, max_len))
-    kernel = matrices[0]
-
-    for m in matrices[1:]:
-        kernel = np.dot(m, kernel)
-    return kernel
+    return kf.lower_toeplitz(kernel_vector_from_list(kernel_path_list,
+                                                     max_len))
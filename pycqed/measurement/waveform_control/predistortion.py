@@ -0,0 +1,150 @@
+'''
+Convolution of waveforms with predistortion kernels.
+
+Waveforms are convolved with a kernel using direct convolution (short
+kernels), a single FFT (long kernels) or overlap-add (waveforms that are
+much longer than the kernel), depending on which is expected to be
+fastest. Only the first len(waveform) samples of the convolution are
+computed, as in distort_and_compensate.
+
+The FFTs of the kernels are cached per kernel and FFT length, many
+waveforms of the same length (e.g. all elements of a sequence) are convolved
+as a single 2D array.
+'''
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+# Maximum number of kernel FFTs that are kept in the cache
+fft_cache_size = 64
+# Relative cost of an FFT (per sample and log2 of the FFT length) compared
+# to a multiply-add of the direct convolution, used for choosing the method.
+fft_cost = 6.
+_kernel_fft_cache = OrderedDict()
+
+
+def clear_kernel_fft_cache():
+    _kernel_fft_cache.clear()
+
+
+def next_fast_len(target):
+    '''
+    Returns the smallest length >= target that is a product of 2, 3 and 5,
+    for which the FFT is fast.
+    '''
+    if target <= 6:
+        return max(int(target), 1)
+    best = 1 << (int(target) - 1).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            # the smallest power of 2 for which p2*p35 >= target
+            p2 = 1 << (-(-target // p35) - 1).bit_length()
+            best = min(best, p2 * p35)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _kernel_fft(kernel, nfft):
+    '''
+    Returns the (cached) real FFT of the kernel zero padded to nfft samples.
+    '''
+    key = (hashlib.sha1(kernel.tobytes()).hexdigest(), len(kernel), nfft)
+    kernel_fft = _kernel_fft_cache.get(key)
+    if kernel_fft is None:
+        kernel_fft = np.fft.rfft(kernel, n=nfft)
+        _kernel_fft_cache[key] = kernel_fft
+        while len(_kernel_fft_cache) > fft_cache_size:
+            _kernel_fft_cache.popitem(last=False)
+    else:
+        _kernel_fft_cache.move_to_end(key)
+    return kernel_fft
+
+
+def _overlap_add_nfft(kernel_length):
+    return next_fast_len(8*kernel_length)
+
+
+def choose_method(nr_samples, kernel_length):
+    '''
+    Returns the convolution method ('direct', 'fft' or 'overlap-add')
+    expected to be the fastest for convolving waveforms of nr_samples with
+    a kernel of kernel_length (taps beyond nr_samples are ignored).
+    '''
+    k = min(kernel_length, nr_samples)
+    costs = OrderedDict()
+    costs['direct'] = nr_samples * k
+    nfft = next_fast_len(nr_samples + k - 1)
+    costs['fft'] = fft_cost * nfft * np.log2(nfft)
+    nfft = _overlap_add_nfft(k)
+    if nfft < nr_samples:
+        nr_blocks = -(-nr_samples // (nfft - k + 1))
+        # the splitting and adding of the blocks adds about 50%
+        costs['overlap-add'] = (1.5 * fft_cost * nr_blocks * nfft *
+                                np.log2(nfft))
+    return min(costs, key=costs.get)
+
+
+def _convolve_fft(waveforms, kernel):
+    n = waveforms.shape[1]
+    nfft = next_fast_len(n + len(kernel) - 1)
+    spectrum = np.fft.rfft(waveforms, n=nfft, axis=1)
+    spectrum *= _kernel_fft(kernel, nfft)
+    return np.fft.irfft(spectrum, n=nfft, axis=1)[:, :n]
+
+
+def _convolve_overlap_add(waveforms, kernel):
+    m, n = waveforms.shape
+    k = len(kernel)
+    nfft = _overlap_add_nfft(k)
+    block = nfft - k + 1
+    nr_blocks = -(-n // block)
+    blocks = np.zeros((m, nr_blocks, block))
+    blocks.reshape(m, -1)[:, :n] = waveforms
+    # The convolution of every block is nfft samples long, the last k-1
+    # samples overlap with the next block (k-1 < block).
+    conv = np.fft.irfft(np.fft.rfft(blocks, n=nfft, axis=2) *
+                        _kernel_fft(kernel, nfft), n=nfft, axis=2)
+    out = np.zeros((m, nr_blocks + 1, block))
+    out[:, :-1] = conv[:, :, :block]
+    out[:, 1:, :k-1] += conv[:, :, block:]
+    return out.reshape(m, -1)[:, :n]
+
+
+def convolve_waveforms(waveforms, kernel, method=None):
+    '''
+    Convolves waveforms with a kernel and returns the first len(waveform)
+    samples, equivalent to np.convolve(wf, kernel)[:len(wf)] per waveform.
+
+    Args:
+        waveforms (array): a single waveform or a 2D array with a waveform
+            per row.
+        kernel (array): the convolution kernel.
+        method (str): 'direct', 'fft' or 'overlap-add', if None the method
+            is determined using choose_method.
+    returns:
+        array of the same shape as waveforms.
+    '''
+    waveforms = np.asarray(waveforms, dtype=float)
+    single = waveforms.ndim == 1
+    waveforms = np.atleast_2d(waveforms)
+    m, n = waveforms.shape
+    # taps beyond the length of the waveforms do not contribute
+    kernel = np.ascontiguousarray(np.asarray(kernel, dtype=float)[:n])
+    if n == 0 or len(kernel) == 0:
+        out = np.zeros(waveforms.shape)
+        return out[0] if single else out
+
+    if method is None:
+        method = choose_method(n, len(kernel))
+    if method == 'direct':
+        out = np.array([np.convolve(wf, kernel)[:n] for wf in waveforms])
+    elif method == 'fft':
+        out = _convolve_fft(waveforms, kernel)
+    elif method == 'overlap-add':
+        out = _convolve_overlap_add(waveforms, kernel)
+    else:
+        raise ValueError('Unknown convolution method "{}"'.format(method))
+    return out[0] if single else out
@@ -8,9 +8,19 @@
 # TODO in principle that could be generalized for other
 # sequencing hardware i guess
 
+import os
 import time
+import pickle
+import struct
+import hashlib
 import numpy as np
 import logging
+from itertools import repeat
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pycqed.measurement.waveform_control import pulse_library
 
 # some pulses use rounding when determining the correct sample at which to
 # insert a particular value. this might require correct rounding -- the pulses
@@ -21,6 +31,178 @@ import logging
 SIGNIFICANT_DIGITS = 11
 
 
+def _waveform_digest(id, wf, m1, m2):
+    '''
+    Returns a digest of the waveform and markers of channel id.
+    '''
+    h = hashlib.sha1(id.encode())
+    for arr in (wf, m1, m2):
+        h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+        h.update(b'|')
+    return h.hexdigest()
+
+
+# Shared, read-only buffer of zeros that is used for the subchannels that
+# are not used in an element, grown by _zeros when needed
+_zero_buffer = np.zeros(0)
+
+
+def _zeros(samples):
+    '''
+    Returns a read-only array of zeros of length samples, a view into a
+    buffer that is shared by all calls.
+    '''
+    global _zero_buffer
+    if len(_zero_buffer) < samples:
+        _zero_buffer = np.zeros(samples)
+        _zero_buffer.flags.writeable = False
+    return _zero_buffer[:samples]
+
+
+def pack_waveforms(wfs, m1s, m2s, out=None):
+    '''
+    Packs waveforms and markers into the 14-bit waveform + 2 marker bits
+    integer format of the Tektronix AWG5014, gives the same result as
+    packing them one by one using AWG.pack_waveform.
+
+    Args:
+        wfs (list): waveforms with values in [-1, 1].
+        m1s (list): first markers, with values 0 or 1.
+        m2s (list): second markers, with values 0 or 1.
+        out (array): uint16 buffer (of at least the total length of the
+            waveforms) that the waveforms are packed into, allocated if None.
+    Returns:
+        list of the packed waveforms, views into out.
+    '''
+    lengths = [len(wf) for wf in wfs]
+    if (lengths != [len(m1) for m1 in m1s] or
+            lengths != [len(m2) for m2 in m2s]):
+        raise Exception('error: sizes of the waveforms do not match')
+    offsets = np.concatenate([[0], np.cumsum(lengths, dtype=int)])
+    total = offsets[-1]
+    if out is None:
+        out = np.empty(total, dtype=np.uint16)
+    if total == 0:
+        return [out[:0] for wf in wfs]
+
+    # all waveforms are packed in one go, using a single work buffer
+    work = np.concatenate(wfs).astype(np.float64, copy=False)
+    if work.min() < -1 or work.max() > 1:
+        raise TypeError('Waveform values out of bonds.' +
+                        ' Allowed values: -1 to 1 (inclusive)')
+    np.multiply(work, 8191, out=work)
+    np.round(work, out=work)
+    work += 8191
+    markers = np.empty(total)
+    for i, (ms, bit) in enumerate([(m1s, 16384), (m2s, 32768)]):
+        for j, m in enumerate(ms):
+            markers[offsets[j]:offsets[j+1]] = m
+        if not np.all((markers == 0) | (markers == 1)):
+            raise TypeError('Marker {} contains invalid values.'.format(i+1) +
+                            ' Only 0 and 1 are allowed')
+        markers *= bit
+        work += markers
+    np.copyto(out[:total], work, casting='unsafe')
+    return [out[offsets[i]:offsets[i+1]] for i in range(len(wfs))]
+
+
+def _render_element(element, channel_groups, upload_ids, known_digests=None):
+    '''
+    Renders an element and returns the (unpacked) waveform and markers of
+    the channels. Subchannels that are not used refer to a shared buffer of
+    zeros.
+
+    Args:
+        element (Element): the element.
+        channel_groups (dict): per channel id the subchannel names as
+            returned by Pulsar.get_channel_names_by_id.
+        upload_ids (list): ids of the channels.
+        known_digests (set): waveforms with these digests are not returned.
+    Returns:
+        list of (channel id, digest, (waveform, marker1, marker2) or None)
+        and whether any of the waveforms has a non-zero first point.
+    '''
+    tvals, wfs = element.normalized_waveforms()
+    samples = len(tvals)
+    non_zero_first_point = False
+    results = []
+    for id in upload_ids:
+        chan_wfs = {id: None,
+                    id+'_marker1': None,
+                    id+'_marker2': None}
+        grp = channel_groups[id]
+
+        for sid in grp:
+            if grp[sid] != None and grp[sid] in wfs:
+                chan_wfs[sid] = wfs[grp[sid]]
+                if chan_wfs[sid][0] != 0.:
+                    non_zero_first_point = True
+            else:
+                chan_wfs[sid] = _zeros(samples)
+
+        wf, m1, m2 = (chan_wfs[id], chan_wfs[id+'_marker1'],
+                      chan_wfs[id+'_marker2'])
+        digest = _waveform_digest(id, wf, m1, m2)
+        if known_digests is not None and digest in known_digests:
+            results.append((id, digest, None))
+        else:
+            results.append((id, digest, (wf, m1, m2)))
+    return results, non_zero_first_point
+
+
+def _compile_element(element, channel_groups, upload_ids,
+                     known_digests=None):
+    '''
+    Renders an element and packs the waveform and markers of the channels,
+    see _render_element.
+
+    Returns:
+        list of (channel id, digest, packed waveform or None) and whether
+        any of the waveforms has a non-zero first point.
+    '''
+    results, non_zero_first_point = _render_element(
+        element, channel_groups, upload_ids, known_digests)
+    unpacked = [wfs for _, _, wfs in results if wfs is not None]
+    packed = iter(pack_waveforms(*zip(*unpacked)) if unpacked else [])
+    results = [(id, digest, None if wfs is None else next(packed))
+               for id, digest, wfs in results]
+    return results, non_zero_first_point
+
+
+def _awg_record_header(name, data_size):
+    '''
+    Returns the header of a record in a Tektronix .AWG file, the sizes of
+    the name and the data followed by the (null terminated) name.
+    '''
+    name = name.encode('ASCII') + b'\x00'
+    return struct.pack('<II', len(name), data_size) + name
+
+
+def _awg_record(name, data):
+    return _awg_record_header(name, len(data)) + data
+
+
+def _join_chunks(parts, chunk_size):
+    '''
+    Yields the contents of the parts (bytes or arrays) in chunks of
+    chunk_size bytes, the last chunk can be shorter.
+    '''
+    chunk = bytearray()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+        data = memoryview(part).cast('B')
+        while len(data):
+            n = chunk_size - len(chunk)
+            chunk += data[:n]
+            data = data[n:]
+            if len(chunk) == chunk_size:
+                yield bytes(chunk)
+                chunk = bytearray()
+    if chunk:
+        yield bytes(chunk)
+
+
 class Pulsar:
     """
     This is the object that communicates with the AWG.
@@ -34,9 +216,33 @@ class Pulsar:
                    'ch3', 'ch3_marker1', 'ch3_marker2',
                    'ch3', 'ch3_marker1', 'ch3_marker2']
     AWG_sequence_cfg = {}
+    # Maximum number of elements and of unique waveforms kept in the
+    # caches used by program_awg
+    element_cache_size = 1000
+    waveform_cache_size = 4000
+    # Elements are compiled (rendered and packed) in a process pool if at
+    # least this many elements need to be compiled.
+    min_elements_parallel = 64
+    # Maximum size in bytes of the writes used to stream an .AWG file over a
+    # raw socket (see program_awg)
+    awg_file_chunk_size = 1 << 20
 
     def __init__(self):
         self.channels = {}
+        # element fingerprint -> {channel id: waveform name}
+        self._element_wf_cache = OrderedDict()
+        # waveform name -> packed waveform
+        self._packed_wf_cache = OrderedDict()
+        # digest of channel id, unpacked waveform and markers -> waveform name
+        self._unpacked_wf_names = OrderedDict()
+        # AWG files sent by program_awg, file name -> key of the sequence
+        # it contains (see sequence_cache) or None
+        self.awg_files = {}
+        self.last_awg_file = None
+        # process pool used by _compile_elements, created when it is first
+        # needed and reused by later calls of program_awg
+        self._compile_pool = None
+        self._compile_pool_size = None
 
     # channel handling
     def define_channel(self, id, name, type, delay, offset,
@@ -179,12 +385,182 @@ class Pulsar:
     def delete_all_waveforms(self):
         self.AWG.delete_all_waveforms_from_list()
 
+    def clear_waveform_cache(self):
+        self._element_wf_cache.clear()
+        self._packed_wf_cache.clear()
+        self._unpacked_wf_names.clear()
+
+    def _get_compile_pool(self, n_processes):
+        '''
+        Returns the process pool used to compile elements, a new pool is only
+        started if there is none or if it has a different number of
+        processes.
+        '''
+        if (self._compile_pool is not None and
+                self._compile_pool_size != n_processes):
+            self.shutdown_compile_pool()
+        if self._compile_pool is None:
+            self._compile_pool = ProcessPoolExecutor(max_workers=n_processes)
+            self._compile_pool_size = n_processes
+        return self._compile_pool
+
+    def shutdown_compile_pool(self):
+        '''
+        Stops the processes used to compile elements (see program_awg).
+        '''
+        if self._compile_pool is not None:
+            self._compile_pool.shutdown()
+        self._compile_pool = None
+        self._compile_pool_size = None
+
+    @staticmethod
+    def _element_fingerprint(element):
+        '''
+        Returns a digest of everything that determines the waveforms of an
+        element (settings, channels, pulses and precomputed waveforms) or
+        None if the element can not be fingerprinted (e.g. a pulse attribute
+        can not be pickled).
+
+        The precomputed waveforms are included because they are used as long
+        as the time values of a pulse do not change, even if another pulse
+        attribute was changed after they were evaluated.
+        '''
+        try:
+            state = (element.clock, element.granularity, element.min_samples,
+                     element.ignore_offset_correction, element.global_time,
+                     element.time_offset, element._channels,
+                     element.distorted_wfs, element.precomputed_wfs,
+                     [(name, type(pulse).__name__, pulse.__dict__)
+                      for name, pulse in element.pulses.items()])
+            return hashlib.sha1(pickle.dumps(state, protocol=4)).hexdigest()
+        except Exception:
+            return None
+
+    def _compile_elements(self, elements, upload_ids, deduplicate=True,
+                          n_processes=None):
+        '''
+        Renders the elements and packs their waveforms (see
+        _compile_element), in a pool of n_processes processes if there are
+        at least min_elements_parallel elements (default is the number of
+        cpus). The pool is kept for later calls (see shutdown_compile_pool).
+        The results are in the order of the elements and do not depend on
+        the number of processes.
+
+        If deduplicate is True waveforms that are already in the cache are
+        not packed again. When compiling serially the waveforms of all
+        elements are packed at once into a single buffer.
+        '''
+        channel_groups = {id: self.get_channel_names_by_id(id)
+                          for id in upload_ids}
+        known_packed = None
+        if deduplicate:
+            known_packed = {digest: self._packed_wf_cache[wfname]
+                            for digest, wfname in
+                            self._unpacked_wf_names.items()
+                            if wfname in self._packed_wf_cache}
+
+        if n_processes is None:
+            n_processes = os.cpu_count()
+        compiled = None
+        if n_processes > 1 and len(elements) >= self.min_elements_parallel:
+            known_digests = None if known_packed is None else \
+                set(known_packed)
+            try:
+                executor = self._get_compile_pool(n_processes)
+                compiled = list(executor.map(
+                    _compile_element, elements, repeat(channel_groups),
+                    repeat(upload_ids), repeat(known_digests),
+                    chunksize=max(1, len(elements)//(4*n_processes))))
+            except Exception as e:
+                # e.g. an element that can not be pickled, errors in the
+                # elements themselves are raised again by the serial path
+                logging.warning('Compiling the elements in parallel '
+                                'failed ({}), compiling serially'.format(e))
+                if isinstance(e, BrokenProcessPool):
+                    self.shutdown_compile_pool()
+                compiled = None
+            if compiled is not None and known_packed is not None:
+                compiled = [([(id, digest, known_packed[digest]
+                               if packed is None else packed)
+                              for id, digest, packed in results], nzfp)
+                            for results, nzfp in compiled]
+
+        if compiled is None:
+            rendered = [_render_element(element, channel_groups, upload_ids,
+                                        known_packed)
+                        for element in elements]
+            # The waveforms of all elements are packed at once into a
+            # single buffer, waveforms are only packed once, also within a
+            # sequence
+            unpacked = OrderedDict()
+            for results, _ in rendered:
+                for id, digest, wfs in results:
+                    if wfs is not None:
+                        unpacked.setdefault(digest, wfs)
+            packed = dict(zip(unpacked, pack_waveforms(
+                *zip(*unpacked.values())) if unpacked else []))
+            if known_packed is not None:
+                packed.update(known_packed)
+            compiled = [([(id, digest, packed[digest])
+                          for id, digest, _ in results], nzfp)
+                        for results, nzfp in rendered]
+        return compiled
+
+    def _pack_channel_waveform(self, id, wf, m1, m2):
+        '''
+        Packs a waveform and markers of channel id and returns the name of the
+        packed waveform. The name is derived from the content such that
+        identical waveforms share a name (and are only uploaded once).
+        The name ends with the channel number as the AWG file format
+        derives the channel from the last character of the name.
+        '''
+        unpacked_digest = _waveform_digest(id, wf, m1, m2)
+        wfname = self._cached_waveform_name(unpacked_digest)
+        if wfname is not None:
+            return wfname
+        return self._add_packed_waveform(
+            id, unpacked_digest, pack_waveforms([wf], [m1], [m2])[0])
+
+    def _cached_waveform_name(self, unpacked_digest):
+        '''
+        Returns the name of the packed waveform with the digest or None if
+        it is not cached.
+        '''
+        wfname = self._unpacked_wf_names.get(unpacked_digest)
+        if wfname is not None and wfname in self._packed_wf_cache:
+            self._packed_wf_cache.move_to_end(wfname)
+            return wfname
+        return None
+
+    def _add_packed_waveform(self, id, unpacked_digest, packed):
+        '''
+        Adds a packed waveform of channel id to the cache (if it is not
+        cached yet) and returns its name (see _pack_channel_waveform).
+        '''
+        wfname = self._cached_waveform_name(unpacked_digest)
+        if wfname is not None:
+            return wfname
+        wfname = 'wf_{}_{}'.format(
+            hashlib.sha1(np.ascontiguousarray(packed).tobytes()
+                         ).hexdigest()[:16], id)
+        self._unpacked_wf_names[unpacked_digest] = wfname
+        self._packed_wf_cache[wfname] = packed
+        while len(self._packed_wf_cache) > self.waveform_cache_size:
+            self._packed_wf_cache.popitem(last=False)
+        while len(self._unpacked_wf_names) > self.waveform_cache_size:
+            self._unpacked_wf_names.popitem(last=False)
+        return wfname
+
     def program_awg(self, sequence, *elements, **kw):
         """
         Upload a single file to the AWG (.awg) which contains all waveforms
         AND sequence information (i.e. nr of repetitions, event jumps etc)
         Advantage is that it's much faster, since sequence information is sent
         to the AWG in a single file.
+
+        If stream_awg_file is True the file is sent to the AWG without
+        generating the complete file first (see _stream_awg_file), and None
+        is returned instead of the file.
         """
         # Stores the last uploaded elements for easy access and plotting
         self.last_sequence = sequence
@@ -199,9 +575,14 @@ class Pulsar:
         loop = kw.pop('loop', True)
         allow_non_zero_first_point_on_trigger_wait = \
             kw.pop('allow_first_zero', False)
+        deduplicate = kw.pop('deduplicate_waveforms', True)
+        n_processes = kw.pop('n_processes', None)
+        stream = kw.pop('stream_awg_file', False)
         elt_cnt = len(elements)
         chan_ids = self.get_used_channel_ids()
         packed_waveforms = {}
+        # maps "element name_channel id" to the name of the packed waveform
+        wfname_map = {}
 
         # Store offset settings to restore them after upload the seq
         # Note that this is the AWG setting offset, as distinct from the
@@ -211,61 +592,79 @@ class Pulsar:
 
         elements_with_non_zero_first_points = []
 
-        # order the waveforms according to physical AWG channels and
-        # make empty sequences where necessary
+        # determine which channels to upload
+        if channels == 'all':
+            upload_ids = chan_ids
+        else:
+            upload_ids = [id for id in chan_ids
+                          if any(self.channels[c]['id'][:3] == id
+                                 for c in channels)]
+
+        _t0 = time.time()
+        nr_cached = 0
+        # elements that need to be compiled, (element, fingerprint)
+        to_compile = []
         for i, element in enumerate(elements):
             if verbose:
                 print("%d / %d: %s (%d samples)... " % \
                     (i+1, elt_cnt, element.name, element.samples()))
-                print("Generate/upload '%s' (%d samples)... " \
-                    % (element.name, element.samples()), end=' ')
-            _t0 = time.time()
 
-            tvals, wfs = element.normalized_waveforms()
-            '''
-            channels_to_print=['MW_Imod']
-            for i in channels_to_print:
-                if len(np.where(wfs[i]>0)[0]) !=0:
-                    print i, np.where(wfs[i]>0)
-            '''
-            for id in chan_ids:
-                wfname = element.name + '_%s' % id
+            fingerprint = None
+            if deduplicate:
+                fingerprint = self._element_fingerprint(element)
+                cached = self._element_wf_cache.get(fingerprint)
+                if (fingerprint is not None and cached is not None and
+                        all(id in cached and cached[id] in
+                            self._packed_wf_cache for id in upload_ids)):
+                    # The element did not change since it was last packed
+                    self._element_wf_cache.move_to_end(fingerprint)
+                    nr_cached += 1
+                    for id in upload_ids:
+                        wfname_map[element.name + '_%s' % id] = cached[id]
+                        packed_waveforms[cached[id]] = \
+                            self._packed_wf_cache[cached[id]]
+                    continue
+            to_compile.append((element, fingerprint))
 
-                # determine if we actually want to upload this channel
-                upload = False
-                if channels == 'all':
-                    upload = True
-                else:
-                    for c in channels:
-                        if self.channels[c]['id'][:3] == id:
-                            upload = True
-                    if not upload:
-                        continue
-
-                chan_wfs = {id: None,
-                            id+'_marker1': None,
-                            id+'_marker2': None}
-                grp = self.get_channel_names_by_id(id)
-
-                for sid in grp:
-                    if grp[sid] != None and grp[sid] in wfs:
-                        chan_wfs[sid] = wfs[grp[sid]]
-                        if chan_wfs[sid][0] != 0.:
-                            elements_with_non_zero_first_points.append(
-                                element.name)
-                    else:
-                        chan_wfs[sid] = np.zeros(element.samples())
+        # Only the elements that are not cached are evaluated
+        pulse_library.batch_evaluate_pulses(
+            [element for element, _ in to_compile])
 
+        # order the waveforms according to physical AWG channels and
+        # make empty sequences where necessary
+        compiled = self._compile_elements(
+            [element for element, _ in to_compile], upload_ids,
+            deduplicate=deduplicate, n_processes=n_processes)
+        for (element, fingerprint), (results, non_zero_first_point) in zip(
+                to_compile, compiled):
+            if non_zero_first_point:
+                elements_with_non_zero_first_points.append(element.name)
+            element_wfnames = {}
+            for id, digest, packed in results:
+                wfname = element.name + '_%s' % id
                 # Create wform files
-                packed_waveforms[wfname] = self.AWG.pack_waveform(
-                    chan_wfs[id],
-                    chan_wfs[id+'_marker1'],
-                    chan_wfs[id+'_marker2'])
+                if deduplicate:
+                    packed_name = self._add_packed_waveform(
+                        id, digest, packed)
+                    packed_waveforms[packed_name] = \
+                        self._packed_wf_cache[packed_name]
+                    wfname_map[wfname] = packed_name
+                    element_wfnames[id] = packed_name
+                else:
+                    packed_waveforms[wfname] = packed
+
+            if deduplicate and fingerprint is not None:
+                self._element_wf_cache[fingerprint] = element_wfnames
+                while len(self._element_wf_cache) > self.element_cache_size:
+                    self._element_wf_cache.popitem(last=False)
 
         _t = time.time() - _t0
 
         if verbose:
             print("finished in %.2f seconds." % _t)
+            if deduplicate:
+                print("%d unique waveforms, %d cached element(s)"
+                      % (len(packed_waveforms), nr_cached))
 
         # sequence programming
         _t0 = time.time()
@@ -305,7 +704,8 @@ class Pulsar:
             el_wfnames = []
             # add all wf names of channel
             for elt in sequence.elements:
-                el_wfnames.append(elt['wfname'] + '_%s' % id)
+                wfname = elt['wfname'] + '_%s' % id
+                el_wfnames.append(wfname_map.get(wfname, wfname))
                 #  should the name include id nr?
             wfname_l.append(el_wfnames)
 
@@ -366,12 +766,22 @@ class Pulsar:
 
         filename = sequence.name+'_FILE.AWG'
 
-        awg_file = self.AWG.generate_awg_file(
-            packed_waveforms,
-            np.array(wfname_l),
-            nrep_l, wait_l, goto_l, logic_jump_l,
-            self.get_awg_channel_cfg())
-        self.AWG.send_awg_file(filename, awg_file)
+        if stream:
+            self._stream_awg_file(filename, self._awg_file_parts(
+                packed_waveforms,
+                np.array(wfname_l),
+                nrep_l, wait_l, goto_l, logic_jump_l,
+                self.get_awg_channel_cfg()))
+            awg_file = None
+        else:
+            awg_file = self.AWG.generate_awg_file(
+                packed_waveforms,
+                np.array(wfname_l),
+                nrep_l, wait_l, goto_l, logic_jump_l,
+                self.get_awg_channel_cfg())
+            self.AWG.send_awg_file(filename, awg_file)
+        self.awg_files[filename] = None
+        self.last_awg_file = filename
         self.AWG.load_awg_file(filename)
         self.AWG.timeout(old_timeout)
 
@@ -388,6 +798,70 @@ class Pulsar:
         print(" finished in %.2f seconds." % _t)
         return awg_file
 
+    def _awg_file_parts(self, packed_waveforms, wfname_l, nrep_l, wait_l,
+                        goto_l, logic_jump_l, channel_cfg):
+        '''
+        Returns the .AWG file (as generated by AWG.generate_awg_file) as a
+        list of parts, the record headers as bytes and the data of the
+        waveforms as the packed waveforms themselves, such that the
+        waveforms are not copied.
+        '''
+        # The settings and sequence records are generated by the AWG, the
+        # waveform records are inserted before the sequence records
+        awg_file = self.AWG.generate_awg_file(
+            {}, wfname_l, nrep_l, wait_l, goto_l, logic_jump_l, channel_cfg)
+        offset = 0
+        while offset < len(awg_file):
+            name_size, data_size = struct.unpack_from('<II', awg_file, offset)
+            if awg_file[offset+8:offset+8+name_size].startswith(b'SEQUENCE_'):
+                break
+            offset += 8 + name_size + data_size
+
+        timestamp = struct.pack('<8H', *np.array(time.localtime())[
+            [0, 1, 8, 2, 3, 4, 5, 6]])
+        parts = [awg_file[:offset]]
+        for ii, wfname in enumerate(sorted(packed_waveforms), start=21):
+            data = np.ascontiguousarray(packed_waveforms[wfname],
+                                        dtype='<u2')
+            parts.append(
+                _awg_record('WAVEFORM_NAME_{}'.format(ii),
+                            (wfname + '\x00').encode('ASCII')) +
+                _awg_record('WAVEFORM_TYPE_{}'.format(ii),
+                            struct.pack('<h', 1)) +
+                _awg_record('WAVEFORM_LENGTH_{}'.format(ii),
+                            struct.pack('<l', len(data))) +
+                _awg_record('WAVEFORM_TIMESTAMP_{}'.format(ii), timestamp) +
+                _awg_record_header('WAVEFORM_DATA_{}'.format(ii),
+                                   data.nbytes))
+            parts.append(data)
+        parts.append(awg_file[offset:])
+        return parts
+
+    def _stream_awg_file(self, filename, parts):
+        '''
+        Writes an .AWG file, given as parts (see _awg_file_parts), onto the
+        disk of the AWG as the data block of a single MMEMory:DATA command.
+
+        Over a raw socket the file is streamed in chunks of at most
+        awg_file_chunk_size bytes. Other interfaces (e.g. VXI-11 or GPIB)
+        terminate the command at the end of every write, the command is
+        then sent in a single write.
+        '''
+        size = sum(part.nbytes if isinstance(part, np.ndarray) else len(part)
+                   for part in parts)
+        visa_handle = self.AWG.visa_handle
+        # Header indicating the name and size of the file being send
+        header = 'MMEMory:DATA "{}",#{}{}'.format(
+            filename, len(str(size)), size).encode('ASCII')
+        chunks = _join_chunks(parts, self.awg_file_chunk_size)
+        resource_name = getattr(visa_handle, 'resource_name', None) or ''
+        if resource_name.upper().endswith('::SOCKET'):
+            visa_handle.write_raw(header)
+            for chunk in chunks:
+                visa_handle.write_raw(chunk)
+        else:
+            visa_handle.write_raw(header + b''.join(chunks))
+
     def check_sequence_consistency(self, packed_waveforms,
                                    wfname_l,
                                    nrep_l, wait_l, goto_l, logic_jump_l):
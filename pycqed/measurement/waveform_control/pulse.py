@@ -4,7 +4,7 @@
 # author: Wolfgang Pfaff
 
 import numpy as np
-from copy import deepcopy
+import copy
 
 
 def cp(pulse, *arg, **kw):
@@ -12,7 +12,7 @@ def cp(pulse, *arg, **kw):
     create a copy of the pulse, configure it by given arguments (using the
         call method of the pulse class), and return the copy
     """
-    pulse_copy = deepcopy(pulse)
+    pulse_copy = pulse.copy()
 
     return pulse_copy(*arg, **kw)
 
@@ -53,6 +53,17 @@ class Pulse:
     def __call__(self):
         return self
 
+    def copy(self):
+        """
+        Returns a copy of the pulse that shares the parameter values with
+        the original. Parameters are replaced rather than modified in place
+        (e.g. by __call__ or by an element setting the start time), only
+        the list of channels is modified in place and is therefore copied.
+        """
+        pulse_copy = copy.copy(self)
+        pulse_copy.channels = list(self.channels)
+        return pulse_copy
+
     def get_wfs(self, tvals):
         """
         The time values in tvals can always be given as one array of time
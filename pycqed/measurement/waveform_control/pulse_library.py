@@ -182,6 +182,88 @@ class SSB_DRAG_pulse(Pulse):
         return wf
 
 
+def SSB_DRAG_pulse_batch(tvals, amplitude, sigma, nr_sigma=4, motzoi=0,
+                         mod_frequency=1e6, phase=0., phaselock=True,
+                         alpha=1, phi_skew=0):
+    '''
+    Evaluates many SSB_DRAG_pulses that only differ in amplitude, motzoi,
+    phase and start time in a single numpy evaluation.
+
+    Args:
+        tvals (array): time values (s) of shape (N, samples), row i are
+            the time values of pulse i as passed to SSB_DRAG_pulse.chan_wf.
+        amplitude, motzoi, phase (float or array): parameters of the
+            pulses, arrays of length N specify a value per pulse.
+        other args as in SSB_DRAG_pulse.
+    returns:
+        [I_mod, Q_mod] arrays of shape (N, samples) with the waveforms of the
+        I and Q channel, identical to the output of SSB_DRAG_pulse.chan_wf.
+    '''
+    tvals = np.atleast_2d(tvals)
+    amplitude = np.reshape(amplitude, (-1, 1))
+    motzoi = np.reshape(motzoi, (-1, 1))
+    phase = np.reshape(phase, (-1, 1))
+    length = sigma * nr_sigma
+
+    t = tvals - tvals[:, :1]  # Gauss envelope should not be displaced
+    mu = length/2.0
+    if not phaselock:
+        tvals = t
+
+    gauss_env = amplitude*np.exp(-(0.5 * ((t-mu)**2) / sigma**2))
+    deriv_gauss_env = motzoi * -1 * (t-mu)/(sigma**1) * gauss_env
+    # substract offsets
+    gauss_env -= (gauss_env[:, :1]+gauss_env[:, -1:])/2.
+    deriv_gauss_env -= (deriv_gauss_env[:, :1]+deriv_gauss_env[:, -1:])/2.
+    return apply_modulation(gauss_env, deriv_gauss_env, tvals,
+                            mod_frequency=mod_frequency, phase=phase,
+                            phi_skew=phi_skew, alpha=alpha)
+
+
+def batch_evaluate_pulses(elements):
+    '''
+    Evaluates the SSB_DRAG_pulses of all elements in batches and stores the
+    waveforms in the precomputed_wfs of the elements, such that the elements
+    do not evaluate these pulses one by one when generating the waveforms.
+
+    Pulses are batched when they only differ in amplitude, motzoi, phase and
+    start time (e.g. the pulses of a Rabi or Ramsey sequence).
+    '''
+    batches = {}
+    for elt in elements:
+        if not elt.global_time:
+            continue
+        tvals = np.arange(elt.samples())/elt.clock
+        for pname, p in elt.pulses.items():
+            if type(p) is not SSB_DRAG_pulse:
+                continue
+            for chan in p.channels:
+                c_tvals = elt.pulse_tvals(pname, chan, tvals)
+                if len(c_tvals) == 0:
+                    continue
+                key = (p.sigma, p.nr_sigma, p.mod_frequency, p.phaselock,
+                       p.alpha, p.phi_skew, len(c_tvals))
+                batches.setdefault(key, []).append(
+                    (elt, pname, p, chan, c_tvals))
+
+    for key, batch in batches.items():
+        sigma, nr_sigma, mod_frequency, phaselock, alpha, phi_skew, _ = key
+        I_mod, Q_mod = SSB_DRAG_pulse_batch(
+            np.array([b[4] for b in batch]),
+            amplitude=[b[2].amplitude for b in batch],
+            motzoi=[b[2].motzoi for b in batch],
+            phase=[b[2].phase for b in batch],
+            sigma=sigma, nr_sigma=nr_sigma, mod_frequency=mod_frequency,
+            phaselock=phaselock, alpha=alpha, phi_skew=phi_skew)
+        for i, (elt, pname, p, chan, c_tvals) in enumerate(batch):
+            wf = np.zeros(len(c_tvals))
+            if chan == p.I_channel:
+                wf += I_mod[i]
+            if chan == p.Q_channel:
+                wf += Q_mod[i]
+            elt.precomputed_wfs.setdefault(pname, {})[chan] = (c_tvals, wf)
+
+
 class Mux_DRAG_pulse(SSB_DRAG_pulse):
 
     '''
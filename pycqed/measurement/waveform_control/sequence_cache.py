@@ -0,0 +1,150 @@
+'''
+Cache of uploaded sequences, used by the AWG sweep functions.
+
+A sequence is identified by the function that builds and uploads it, its
+arguments, the channel configuration of the pulsar and the sequencer config
+of the station. Sequences with arguments that are not plain data (numbers,
+strings, arrays and containers of these) are not cached. If the AWG file
+that was generated for an identical sequence is still stored on the AWG
+(it is not overwritten by another upload), it is loaded again instead of
+regenerating the sequence and sending the file.
+'''
+import sys
+import pickle
+import hashlib
+import logging
+from collections import OrderedDict
+import numpy as np
+
+# Set to False to always regenerate the sequences
+use_sequence_cache = True
+# Maximum number of sequences that are remembered
+sequence_cache_size = 100
+# sequence key -> name of the AWG file
+_sequence_cache = OrderedDict()
+
+
+def clear_sequence_cache():
+    _sequence_cache.clear()
+
+
+class NotPlainData(TypeError):
+    '''
+    Raised for arguments that can not be part of a sequence key, e.g.
+    instruments or functions of which the state is not known.
+    '''
+    pass
+
+
+def _canonical(obj):
+    '''
+    Converts plain data (numbers, strings, arrays and containers of these)
+    to a representation that does not depend on the order of dictionary
+    keys and that can be pickled deterministically.
+    Raises NotPlainData for other objects.
+    '''
+    if isinstance(obj, dict):
+        return ('dict', tuple(sorted(((_canonical(k), _canonical(v))
+                                      for k, v in obj.items()),
+                                     key=lambda item: repr(item[0]))))
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__, tuple(_canonical(v) for v in obj))
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return ('ndarray', obj.shape,
+                    tuple(_canonical(v) for v in obj.flat))
+        return ('ndarray', obj.dtype.str, obj.shape,
+                np.ascontiguousarray(obj).tobytes())
+    if isinstance(obj, (str, bytes, bool, int, float, complex, type(None),
+                        np.number, np.bool_)):
+        return obj
+    raise NotPlainData('{} can not be part of a sequence key'.format(
+        type(obj).__name__))
+
+
+def sequence_key(seq_func, kwargs, pulsar, sequencer_config=None):
+    '''
+    Returns a digest of the function building the sequence, its keyword
+    arguments, the channel configuration of the pulsar and the sequencer
+    config of the station.
+    Raises NotPlainData if one of these is not plain data.
+    '''
+    state = _canonical((seq_func.__module__, seq_func.__qualname__, kwargs,
+                        pulsar.channels, pulsar.AWG_type, pulsar.clock,
+                        sequencer_config))
+    return hashlib.sha1(pickle.dumps(state, protocol=4)).hexdigest()
+
+
+def get_station(seq_func):
+    '''
+    Returns the station of the module of the function building the sequence
+    or None.
+    '''
+    return getattr(sys.modules.get(seq_func.__module__), 'station', None)
+
+
+def get_pulsar(seq_func):
+    '''
+    Returns the pulsar used by the function building the sequence (the
+    pulsar of the station of its module) or None.
+    '''
+    return getattr(get_station(seq_func), 'pulsar', None)
+
+
+def upload_sequence(seq_func, pulsar=None, **kw):
+    '''
+    Builds and uploads a sequence by calling seq_func(**kw) unless an
+    identical sequence was uploaded before and its AWG file is still on
+    the AWG, in that case the file is loaded using Pulsar.load_awg_file.
+
+    Args:
+        seq_func (function): function that builds and uploads the
+            sequence using Pulsar.program_awg.
+        pulsar (Pulsar): pulsar used by seq_func, if None the pulsar of
+            the station of the module of seq_func.
+        kw: keyword arguments of seq_func.
+    Returns:
+        the return value of seq_func or None if the sequence was loaded.
+    '''
+    if pulsar is None:
+        pulsar = get_pulsar(seq_func)
+    if (not use_sequence_cache or pulsar is None or
+            not kw.get('upload', True) or kw.get('return_seq', False)):
+        return seq_func(**kw)
+
+    # The sequence functions take the amplitudes and offsets of the AWG
+    # channels from the pulsar, they are updated before determining the
+    # key. The key is determined before calling seq_func as the sequence
+    # functions can modify their arguments.
+    pulsar.update_channel_settings()
+    sequencer_config = getattr(get_station(seq_func), 'sequencer_config',
+                               None)
+    try:
+        key = sequence_key(seq_func, kw, pulsar, sequencer_config)
+    except NotPlainData as e:
+        logging.debug('Not caching the sequence of {} ({})'.format(
+            seq_func.__qualname__, e))
+        return seq_func(**kw)
+    filename = _sequence_cache.get(key)
+    if (filename is not None and pulsar.awg_files.get(filename) == key and
+            hasattr(pulsar.AWG, 'load_awg_file')):
+        try:
+            logging.info('Loading cached sequence "{}"'.format(filename))
+            if hasattr(pulsar.AWG, 'stop'):
+                pulsar.AWG.stop()
+            pulsar.load_awg_file(filename)
+            _sequence_cache.move_to_end(key)
+            return None
+        except Exception as e:
+            logging.warning('Loading "{}" failed ({}), regenerating the '
+                            'sequence'.format(filename, e))
+
+    pulsar.last_awg_file = None
+    result = seq_func(**kw)
+    filename = pulsar.last_awg_file
+    if filename is not None:
+        pulsar.awg_files[filename] = key
+        _sequence_cache[key] = filename
+        while len(_sequence_cache) > sequence_cache_size:
+            _sequence_cache.popitem(last=False)
+    return result
@@ -0,0 +1,45 @@
+qubit q0 
+
+init_all
+Rx q0 -0.5 
+RO q0  
+
+init_all
+Rx q0 -0.4 
+RO q0  
+
+init_all
+Rx q0 -0.3 
+RO q0  
+
+init_all
+Rx q0 -0.19999999999999996 
+RO q0  
+
+init_all
+Rx q0 -0.09999999999999998 
+RO q0  
+
+init_all
+Rx q0 0.0 
+RO q0  
+
+init_all
+Rx q0 0.10000000000000009 
+RO q0  
+
+init_all
+Rx q0 0.20000000000000007 
+RO q0  
+
+init_all
+Rx q0 0.30000000000000004 
+RO q0  
+
+init_all
+Rx q0 0.4 
+RO q0  
+
+init_all
+Rx q0 0.5 
+RO q0  
@@ -0,0 +1,300 @@
+qubit q0 
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 4 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 171 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 337 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 504 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 670 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 837 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 1004 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 1170 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 1337 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 1503 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 1670 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 1837 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 2003 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 2170 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 2336 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 2503 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 2670 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 2836 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 3003 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 3169 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 3336 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 3503 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 3669 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 3836 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 4002 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 4169 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 4336 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 4502 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 4669 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 4835 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 5002 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 5169 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 5335 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 5502 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 5668 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 5835 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 6002 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 6168 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 6335 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 6501 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 6668 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 6835 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 7001 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 7168 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 7334 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 7501 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 7668 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 7834 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 8001 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 8167 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 8334 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 8501 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 8667 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 8834 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 9000 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 9167 
+RO q0  
+
+init_all
+X180 q0     # exciting pi pulse
+I q0 9334 
+RO q0  
+
+init_all
+RO q0  
+
+init_all
+RO q0  
+
+init_all
+X180 q0 
+RO q0  
+
+init_all
+X180 q0 
+RO q0  
@@ -0,0 +1,12 @@
+qubit q0 
+
+init_all
+RO q0  
+RO q0  
+RO q0  
+
+init_all
+RO q0  
+X180 q0  
+RO q0  
+RO q0  
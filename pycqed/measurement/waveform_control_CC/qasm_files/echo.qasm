@@ -0,0 +1,489 @@
+qubit q0 
+
+init_all
+X90 q0     
+I q0 2 
+X180 q0     
+I q0 2 
+R90_phi q0 0.0
+RO q0  
+
+init_all
+X90 q0     
+I q0 85 
+X180 q0     
+I q0 85 
+R90_phi q0 23.60655737704918
+RO q0  
+
+init_all
+X90 q0     
+I q0 168 
+X180 q0     
+I q0 168 
+R90_phi q0 47.21311475409836
+RO q0  
+
+init_all
+X90 q0     
+I q0 252 
+X180 q0     
+I q0 252 
+R90_phi q0 70.81967213114754
+RO q0  
+
+init_all
+X90 q0     
+I q0 335 
+X180 q0     
+I q0 335 
+R90_phi q0 94.42622950819673
+RO q0  
+
+init_all
+X90 q0     
+I q0 418 
+X180 q0     
+I q0 418 
+R90_phi q0 118.0327868852459
+RO q0  
+
+init_all
+X90 q0     
+I q0 502 
+X180 q0     
+I q0 502 
+R90_phi q0 141.63934426229508
+RO q0  
+
+init_all
+X90 q0     
+I q0 585 
+X180 q0     
+I q0 585 
+R90_phi q0 165.24590163934425
+RO q0  
+
+init_all
+X90 q0     
+I q0 668 
+X180 q0     
+I q0 668 
+R90_phi q0 188.85245901639345
+RO q0  
+
+init_all
+X90 q0     
+I q0 751 
+X180 q0     
+I q0 751 
+R90_phi q0 212.45901639344262
+RO q0  
+
+init_all
+X90 q0     
+I q0 835 
+X180 q0     
+I q0 835 
+R90_phi q0 236.0655737704918
+RO q0  
+
+init_all
+X90 q0     
+I q0 918 
+X180 q0     
+I q0 918 
+R90_phi q0 259.672131147541
+RO q0  
+
+init_all
+X90 q0     
+I q0 1001 
+X180 q0     
+I q0 1001 
+R90_phi q0 283.27868852459017
+RO q0  
+
+init_all
+X90 q0     
+I q0 1085 
+X180 q0     
+I q0 1085 
+R90_phi q0 306.88524590163934
+RO q0  
+
+init_all
+X90 q0     
+I q0 1168 
+X180 q0     
+I q0 1168 
+R90_phi q0 330.4918032786885
+RO q0  
+
+init_all
+X90 q0     
+I q0 1251 
+X180 q0     
+I q0 1251 
+R90_phi q0 354.0983606557377
+RO q0  
+
+init_all
+X90 q0     
+I q0 1335 
+X180 q0     
+I q0 1335 
+R90_phi q0 17.704918032786907
+RO q0  
+
+init_all
+X90 q0     
+I q0 1418 
+X180 q0     
+I q0 1418 
+R90_phi q0 41.31147540983608
+RO q0  
+
+init_all
+X90 q0     
+I q0 1501 
+X180 q0     
+I q0 1501 
+R90_phi q0 64.91803278688525
+RO q0  
+
+init_all
+X90 q0     
+I q0 1584 
+X180 q0     
+I q0 1584 
+R90_phi q0 88.52459016393442
+RO q0  
+
+init_all
+X90 q0     
+I q0 1668 
+X180 q0     
+I q0 1668 
+R90_phi q0 112.13114754098359
+RO q0  
+
+init_all
+X90 q0     
+I q0 1751 
+X180 q0     
+I q0 1751 
+R90_phi q0 135.73770491803276
+RO q0  
+
+init_all
+X90 q0     
+I q0 1834 
+X180 q0     
+I q0 1834 
+R90_phi q0 159.344262295082
+RO q0  
+
+init_all
+X90 q0     
+I q0 1918 
+X180 q0     
+I q0 1918 
+R90_phi q0 182.95081967213116
+RO q0  
+
+init_all
+X90 q0     
+I q0 2001 
+X180 q0     
+I q0 2001 
+R90_phi q0 206.55737704918033
+RO q0  
+
+init_all
+X90 q0     
+I q0 2084 
+X180 q0     
+I q0 2084 
+R90_phi q0 230.1639344262295
+RO q0  
+
+init_all
+X90 q0     
+I q0 2168 
+X180 q0     
+I q0 2168 
+R90_phi q0 253.77049180327867
+RO q0  
+
+init_all
+X90 q0     
+I q0 2251 
+X180 q0     
+I q0 2251 
+R90_phi q0 277.37704918032784
+RO q0  
+
+init_all
+X90 q0     
+I q0 2334 
+X180 q0     
+I q0 2334 
+R90_phi q0 300.983606557377
+RO q0  
+
+init_all
+X90 q0     
+I q0 2417 
+X180 q0     
+I q0 2417 
+R90_phi q0 324.5901639344262
+RO q0  
+
+init_all
+X90 q0     
+I q0 2501 
+X180 q0     
+I q0 2501 
+R90_phi q0 348.19672131147536
+RO q0  
+
+init_all
+X90 q0     
+I q0 2584 
+X180 q0     
+I q0 2584 
+R90_phi q0 11.803278688524642
+RO q0  
+
+init_all
+X90 q0     
+I q0 2667 
+X180 q0     
+I q0 2667 
+R90_phi q0 35.40983606557381
+RO q0  
+
+init_all
+X90 q0     
+I q0 2751 
+X180 q0     
+I q0 2751 
+R90_phi q0 59.016393442622984
+RO q0  
+
+init_all
+X90 q0     
+I q0 2834 
+X180 q0     
+I q0 2834 
+R90_phi q0 82.62295081967216
+RO q0  
+
+init_all
+X90 q0     
+I q0 2917 
+X180 q0     
+I q0 2917 
+R90_phi q0 106.22950819672133
+RO q0  
+
+init_all
+X90 q0     
+I q0 3001 
+X180 q0     
+I q0 3001 
+R90_phi q0 129.8360655737705
+RO q0  
+
+init_all
+X90 q0     
+I q0 3084 
+X180 q0     
+I q0 3084 
+R90_phi q0 153.44262295081967
+RO q0  
+
+init_all
+X90 q0     
+I q0 3167 
+X180 q0     
+I q0 3167 
+R90_phi q0 177.04918032786884
+RO q0  
+
+init_all
+X90 q0     
+I q0 3250 
+X180 q0     
+I q0 3250 
+R90_phi q0 200.655737704918
+RO q0  
+
+init_all
+X90 q0     
+I q0 3334 
+X180 q0     
+I q0 3334 
+R90_phi q0 224.26229508196718
+RO q0  
+
+init_all
+X90 q0     
+I q0 3417 
+X180 q0     
+I q0 3417 
+R90_phi q0 247.86885245901635
+RO q0  
+
+init_all
+X90 q0     
+I q0 3500 
+X180 q0     
+I q0 3500 
+R90_phi q0 271.4754098360655
+RO q0  
+
+init_all
+X90 q0     
+I q0 3584 
+X180 q0     
+I q0 3584 
+R90_phi q0 295.0819672131148
+RO q0  
+
+init_all
+X90 q0     
+I q0 3667 
+X180 q0     
+I q0 3667 
+R90_phi q0 318.688524590164
+RO q0  
+
+init_all
+X90 q0     
+I q0 3750 
+X180 q0     
+I q0 3750 
+R90_phi q0 342.29508196721304
+RO q0  
+
+init_all
+X90 q0     
+I q0 3834 
+X180 q0     
+I q0 3834 
+R90_phi q0 5.901639344262321
+RO q0  
+
+init_all
+X90 q0     
+I q0 3917 
+X180 q0     
+I q0 3917 
+R90_phi q0 29.50819672131138
+RO q0  
+
+init_all
+X90 q0     
+I q0 4000 
+X180 q0     
+I q0 4000 
+R90_phi q0 53.11475409836066
+RO q0  
+
+init_all
+X90 q0     
+I q0 4083 
+X180 q0     
+I q0 4083 
+R90_phi q0 76.72131147540995
+RO q0  
+
+init_all
+X90 q0     
+I q0 4167 
+X180 q0     
+I q0 4167 
+R90_phi q0 100.327868852459
+RO q0  
+
+init_all
+X90 q0     
+I q0 4250 
+X180 q0     
+I q0 4250 
+R90_phi q0 123.93442622950829
+RO q0  
+
+init_all
+X90 q0     
+I q0 4333 
+X180 q0     
+I q0 4333 
+R90_phi q0 147.54098360655735
+RO q0  
+
+init_all
+X90 q0     
+I q0 4417 
+X180 q0     
+I q0 4417 
+R90_phi q0 171.14754098360663
+RO q0  
+
+init_all
+X90 q0     
+I q0 4500 
+X180 q0     
+I q0 4500 
+R90_phi q0 194.7540983606557
+RO q0  
+
+init_all
+X90 q0     
+I q0 4583 
+X180 q0     
+I q0 4583 
+R90_phi q0 218.36065573770497
+RO q0  
+
+init_all
+X90 q0     
+I q0 4667 
+X180 q0     
+I q0 4667 
+R90_phi q0 241.96721311475403
+RO q0  
+
+init_all
+X90 q0     
+I q0 4750 
+X180 q0     
+I q0 4750 
+R90_phi q0 265.5737704918033
+RO q0  
+
+init_all
+X90 q0     
+I q0 4833 
+X180 q0     
+I q0 4833 
+R90_phi q0 289.1803278688524
+RO q0  
+
+init_all
+X90 q0     
+I q0 4916 
+X180 q0     
+I q0 4916 
+R90_phi q0 312.78688524590166
+RO q0  
+
+init_all
+X90 q0     
+I q0 5000 
+X180 q0     
+I q0 5000 
+R90_phi q0 336.3934426229507
+RO q0  
@@ -0,0 +1,2708 @@
+qubit q0 
+init_all  
+mX90 q0
+Y180 q0
+mX90 q0
+mY90 q0
+mY90 q0
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X180 q0
+Y180 q0
+Y90 q0
+X90 q0
+RO q0  
+init_all  
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+X180 q0
+Y180 q0
+Y90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+RO q0  
+init_all  
+mX90 q0
+Y90 q0
+X180 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+Y180 q0
+X180 q0
+X90 q0
+Y180 q0
+X180 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+RO q0  
+init_all  
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X90 q0
+X180 q0
+Y180 q0
+X180 q0
+X180 q0
+mX90 q0
+mY90 q0
+X90 q0
+X180 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X180 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+X180 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X180 q0
+X90 q0
+mY90 q0
+X180 q0
+RO q0  
+init_all  
+X90 q0
+mY90 q0
+mY90 q0
+X180 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X180 q0
+Y90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+X90 q0
+mX90 q0
+mY90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+Y90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+Y180 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X180 q0
+Y180 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X180 q0
+X180 q0
+mX90 q0
+X180 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+Y180 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+Y90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+X180 q0
+Y180 q0
+RO q0  
+init_all  
+mY90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X180 q0
+X90 q0
+X90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+RO q0  
+init_all  
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X180 q0
+mX90 q0
+Y180 q0
+Y90 q0
+X90 q0
+mY90 q0
+X180 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+RO q0  
+init_all  
+X90 q0
+Y180 q0
+X180 q0
+Y180 q0
+mX90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y180 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X180 q0
+Y180 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X180 q0
+Y180 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X180 q0
+Y180 q0
+X180 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X180 q0
+RO q0  
+init_all  
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+Y180 q0
+X180 q0
+mY90 q0
+X180 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y180 q0
+mY90 q0
+X180 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y180 q0
+X90 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+X180 q0
+Y180 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y180 q0
+X180 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y180 q0
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X180 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+Y90 q0
+X90 q0
+Y90 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+mY90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+RO q0  
+init_all  
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X180 q0
+Y90 q0
+Y90 q0
+mX90 q0
+RO q0  
+init_all  
+X180 q0
+Y180 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X90 q0
+X180 q0
+X90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+X90 q0
+mX90 q0
+mY90 q0
+RO q0  
+init_all  
+mY90 q0
+mY90 q0
+X180 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y180 q0
+Y90 q0
+X90 q0
+Y90 q0
+X180 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y180 q0
+mX90 q0
+Y180 q0
+mY90 q0
+X180 q0
+X90 q0
+RO q0  
+init_all  
+X180 q0
+mY90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y180 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X90 q0
+X180 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X180 q0
+Y90 q0
+X180 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y180 q0
+mX90 q0
+mY90 q0
+RO q0  
+init_all  
+X180 q0
+Y180 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+X90 q0
+mY90 q0
+X180 q0
+Y180 q0
+X90 q0
+Y180 q0
+mY90 q0
+X180 q0
+mY90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+X90 q0
+Y90 q0
+mY90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y180 q0
+mX90 q0
+Y180 q0
+mX90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+Y90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X180 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X180 q0
+Y90 q0
+X180 q0
+mY90 q0
+X180 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X180 q0
+mY90 q0
+X90 q0
+Y180 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+X180 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X180 q0
+RO q0  
+init_all  
+mY90 q0
+X180 q0
+X90 q0
+Y90 q0
+X90 q0
+Y180 q0
+X180 q0
+Y90 q0
+X90 q0
+RO q0  
+init_all  
+X180 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+RO q0  
+init_all  
+Y90 q0
+X180 q0
+mX90 q0
+X180 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+Y180 q0
+Y90 q0
+X180 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+X180 q0
+Y180 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X180 q0
+X180 q0
+Y180 q0
+X90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+X90 q0
+Y180 q0
+X180 q0
+Y180 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y180 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X180 q0
+Y180 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X180 q0
+Y180 q0
+Y180 q0
+Y90 q0
+X180 q0
+RO q0  
+init_all  
+Y90 q0
+X90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y180 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y180 q0
+Y180 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+Y90 q0
+X180 q0
+Y180 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+Y90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+X90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X180 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+X180 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y180 q0
+X180 q0
+Y180 q0
+Y90 q0
+X180 q0
+X180 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X180 q0
+Y180 q0
+mY90 q0
+X180 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X90 q0
+Y180 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+RO q0  
+init_all  
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+X90 q0
+RO q0  
+init_all  
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+mX90 q0
+X180 q0
+RO q0  
+init_all  
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+X180 q0
+Y180 q0
+mY90 q0
+Y180 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X180 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+Y180 q0
+Y180 q0
+RO q0  
+init_all  
+mX90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X180 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X180 q0
+X90 q0
+X90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X180 q0
+X180 q0
+Y180 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y180 q0
+Y180 q0
+Y180 q0
+mX90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+Y180 q0
+RO q0  
+init_all  
+mX90 q0
+mY90 q0
+mX90 q0
+X180 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y180 q0
+Y90 q0
+mX90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y180 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X180 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X180 q0
+Y90 q0
+X180 q0
+X90 q0
+Y180 q0
+mX90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+Y90 q0
+X90 q0
+Y180 q0
+Y90 q0
+X180 q0
+X180 q0
+Y180 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+Y180 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X180 q0
+X90 q0
+mY90 q0
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+RO q0  
+init_all  
+X180 q0
+Y90 q0
+X180 q0
+mX90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+Y180 q0
+Y90 q0
+mX90 q0
+RO q0  
+init_all  
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y180 q0
+X90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+RO q0  
+init_all  
+Y90 q0
+X180 q0
+mX90 q0
+Y90 q0
+mY90 q0
+Y180 q0
+mX90 q0
+mY90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+X90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X180 q0
+X90 q0
+Y90 q0
+mY90 q0
+X90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+mX90 q0
+Y180 q0
+mY90 q0
+X180 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y180 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+RO q0  
+init_all  
+Y90 q0
+X90 q0
+Y90 q0
+X180 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X180 q0
+X180 q0
+Y180 q0
+mY90 q0
+X90 q0
+X90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+mY90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X180 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X180 q0
+mY90 q0
+X180 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+Y90 q0
+X180 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y180 q0
+mY90 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mX90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+Y180 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y180 q0
+Y90 q0
+Y90 q0
+X180 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X180 q0
+X90 q0
+Y180 q0
+Y180 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+mX90 q0
+Y180 q0
+X90 q0
+Y180 q0
+X180 q0
+RO q0  
+init_all  
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X180 q0
+mX90 q0
+Y90 q0
+RO q0  
+init_all  
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X180 q0
+Y180 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mY90 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X180 q0
+Y180 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+Y90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+X180 q0
+X90 q0
+mY90 q0
+X90 q0
+RO q0  
+init_all  
+mX90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X180 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+X180 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y180 q0
+X180 q0
+Y180 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X180 q0
+Y90 q0
+X180 q0
+mY90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X180 q0
+X90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+Y90 q0
+X180 q0
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X180 q0
+mY90 q0
+Y90 q0
+X180 q0
+Y90 q0
+X180 q0
+mY90 q0
+X180 q0
+mX90 q0
+mY90 q0
+mY90 q0
+X90 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X180 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X180 q0
+Y180 q0
+Y90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X180 q0
+X90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+Y180 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X180 q0
+Y180 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X90 q0
+Y180 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y180 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X180 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X180 q0
+Y90 q0
+X90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X180 q0
+Y180 q0
+Y90 q0
+X180 q0
+mY90 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+mX90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y90 q0
+RO q0  
+init_all  
+mX90 q0
+Y90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+RO q0  
+init_all  
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X180 q0
+mX90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X180 q0
+X180 q0
+RO q0  
+init_all  
+mX90 q0
+Y180 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y180 q0
+mY90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X180 q0
+X90 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mY90 q0
+X180 q0
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+X90 q0
+Y180 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+Y90 q0
+mX90 q0
+X180 q0
+X90 q0
+mY90 q0
+X180 q0
+Y180 q0
+X180 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y180 q0
+X180 q0
+Y180 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+RO q0  
+init_all  
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X180 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+Y180 q0
+Y90 q0
+Y90 q0
+X90 q0
+X180 q0
+Y90 q0
+X180 q0
+Y180 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+mY90 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X180 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+Y90 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X180 q0
+Y180 q0
+mY90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X180 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mY90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y180 q0
+X180 q0
+Y180 q0
+X90 q0
+mY90 q0
+X180 q0
+mY90 q0
+X90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+mY90 q0
+X180 q0
+X90 q0
+X90 q0
+Y90 q0
+RO q0  
+init_all  
+mX90 q0
+Y90 q0
+X180 q0
+Y180 q0
+Y90 q0
+X180 q0
+mX90 q0
+Y180 q0
+RO q0  
+init_all  
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+X180 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+RO q0  
+init_all  
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X180 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+Y90 q0
+X90 q0
+Y180 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+Y180 q0
+mY90 q0
+X180 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+mY90 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+RO q0  
+init_all  
+mY90 q0
+mX90 q0
+X90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+X90 q0
+Y90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+X90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+mY90 q0
+mY90 q0
+X180 q0
+X90 q0
+Y180 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X180 q0
+Y180 q0
+Y90 q0
+X90 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y180 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mX90 q0
+mY90 q0
+X180 q0
+X90 q0
+Y180 q0
+Y180 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+X90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X180 q0
+mY90 q0
+X180 q0
+X180 q0
+Y180 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y180 q0
+Y90 q0
+X180 q0
+X90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mX90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X180 q0
+Y180 q0
+mX90 q0
+mY90 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X90 q0
+mY90 q0
+X90 q0
+X90 q0
+mY90 q0
+X90 q0
+RO q0  
+init_all  
+Y90 q0
+X180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+mY90 q0
+X180 q0
+RO q0  
+init_all  
+mX90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X180 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+RO q0  
+init_all  
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y180 q0
+mY90 q0
+X180 q0
+Y90 q0
+X180 q0
+Y180 q0
+Y180 q0
+Y90 q0
+X180 q0
+mX90 q0
+Y180 q0
+mX90 q0
+X90 q0
+mY90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+RO q0  
+init_all  
+X90 q0
+Y90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+Y90 q0
+Y90 q0
+mX90 q0
+Y90 q0
+X180 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+X180 q0
+mY90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+Y180 q0
+Y90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+Y90 q0
+X180 q0
+mY90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y180 q0
+mX90 q0
+Y180 q0
+mY90 q0
+X90 q0
+X180 q0
+RO q0  
+init_all  
+mY90 q0
+mX90 q0
+X180 q0
+Y90 q0
+X90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+mX90 q0
+Y180 q0
+Y90 q0
+X180 q0
+mX90 q0
+Y180 q0
+mY90 q0
+mX90 q0
+X90 q0
+X90 q0
+mY90 q0
+X180 q0
+Y90 q0
+X90 q0
+X180 q0
+Y180 q0
+mX90 q0
+Y90 q0
+X90 q0
+mY90 q0
+Y90 q0
+Y180 q0
+mX90 q0
+Y180 q0
+X180 q0
+Y90 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+X90 q0
+mY90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+Y90 q0
+X90 q0
+Y180 q0
+Y90 q0
+X90 q0
+Y90 q0
+X180 q0
+Y180 q0
+Y180 q0
+mX90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+Y90 q0
+X180 q0
+X90 q0
+mY90 q0
+mX90 q0
+Y180 q0
+mX90 q0
+Y180 q0
+Y90 q0
+X180 q0
+mX90 q0
+mY90 q0
+X90 q0
+mY90 q0
+mX90 q0
+mX90 q0
+Y180 q0
+X90 q0
+mY90 q0
+X90 q0
+Y90 q0
+X90 q0
+mX90 q0
+Y90 q0
+mX90 q0
+mY90 q0
+X90 q0
+Y90 q0
+mX90 q0
+mX90 q0
+Y90 q0
+X90 q0
+mX90 q0
+X90 q0
+X90 q0
+X180 q0
+Y90 q0
+X180 q0
+Y90 q0
+mY90 q0
+X90 q0
+mX90 q0
+Y180 q0
+X90 q0
+Y180 q0
+X90 q0
+Y90 q0
+mX90 q0
+X90 q0
+mY90 q0
+X90 q0
+RO q0  
+init_all  
+RO q0  
+init_all  
+RO q0  
+init_all  
+X180 q0 
+RO q0  
+init_all  
+X180 q0 
+RO q0  
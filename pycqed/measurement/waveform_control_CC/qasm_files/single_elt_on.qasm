@@ -0,0 +1,5 @@
+qubit q0 
+
+init_all
+X180 q0     # On 
+RO q0  
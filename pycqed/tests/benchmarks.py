@@ -0,0 +1,270 @@
+'''
+Throughput benchmarks of optimized code paths, compared to the
+implementations they replace.
+
+These are not tests, the timings depend on the machine and its load and
+nothing is asserted. The correctness of the optimized code is covered by
+the tests. Run all benchmarks or only some of them using
+
+    python -m pycqed.tests.benchmarks [name ...]
+'''
+import sys
+import time
+from copy import deepcopy
+from collections import OrderedDict
+
+
+def best_time(func, repeat=3):
+    '''
+    Returns the shortest of repeat run times of func() in seconds.
+    '''
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def element_build():
+    '''
+    Building elements with (shallow) pulse copies versus the deep copies
+    that were made before.
+    '''
+    from pycqed.measurement.waveform_control.pulsar import Pulsar
+    from pycqed.measurement.waveform_control import pulse
+    from pycqed.measurement.pulse_sequences.standard_elements import \
+        multi_pulse_elt
+
+    class Station:
+        pulsar = Pulsar()
+    for i in range(4):
+        Station.pulsar.define_channel(
+            id='ch{}'.format(i+1), name='ch{}'.format(i+1), type='analog',
+            high=.7, low=-.7, offset=0.0, delay=0, active=True)
+        for m in [1, 2]:
+            Station.pulsar.define_channel(
+                id='ch{}_marker{}'.format(i+1, m),
+                name='ch{}_marker{}'.format(i+1, m), type='marker',
+                high=2.0, low=0, offset=0., delay=0, active=True)
+    pulse_list = [{'pulse_type': 'SSB_DRAG_pulse',
+                   'I_channel': 'ch1', 'Q_channel': 'ch2',
+                   'amplitude': .5, 'sigma': 10e-9, 'nr_sigma': 4,
+                   'motzoi': .1, 'mod_frequency': -50e6, 'phase': 90*i,
+                   'alpha': 1, 'phi_skew': 0, 'pulse_delay': 0}
+                  for i in range(100)]
+
+    def build_elements():
+        return [multi_pulse_elt(i, Station, pulse_list,
+                                sequencer_config={'RO_fixed_point': 1e-6})
+                for i in range(10)]
+
+    results = OrderedDict()
+    results['shallow copies'] = best_time(build_elements)
+    copy = pulse.Pulse.copy
+    pulse.Pulse.copy = lambda self: deepcopy(self)
+    try:
+        results['deep copies'] = best_time(build_elements)
+    finally:
+        pulse.Pulse.copy = copy
+    return 'Building 10 elements of 100 pulses', results
+
+
+def pipelined_hard_sweep():
+    '''
+    A 2D hard sweep of which the acquisition and the storing of the data
+    each take 20 ms per iteration, with and without pipelined acquisition.
+    '''
+    import numpy as np
+    from qcodes import station
+    from pycqed.measurement import measurement_control
+    from pycqed.measurement.sweep_functions import None_Sweep
+    import pycqed.measurement.detector_functions as det
+
+    MC = measurement_control.MeasurementControl(
+        'MC_benchmark', live_plot_enabled=False, verbose=False)
+    MC.station = station.Station()
+    store_hard_data = MC.store_hard_data
+
+    def slow_store_hard_data(new_data, **kw):
+        time.sleep(.02)
+        return store_hard_data(new_data, **kw)
+    MC.store_hard_data = slow_store_hard_data
+
+    def run():
+        MC.set_sweep_function(None_Sweep(sweep_control='hard'))
+        MC.set_sweep_function_2D(None_Sweep(sweep_control='soft'))
+        MC.set_sweep_points(np.arange(5))
+        MC.set_sweep_points_2D(np.arange(10))
+        MC.set_detector_function(det.Dummy_Detector_Hard(delay=.02))
+        MC.run('2D_hard_throughput', mode='2D')
+
+    results = OrderedDict()
+    try:
+        for name, pipelined in [('sequential', False), ('pipelined', True)]:
+            MC.pipelined_acquisition(pipelined)
+            results[name] = best_time(run, repeat=1)
+    finally:
+        MC.close()
+    return 'A 2D hard sweep of 10 iterations', results
+
+
+def cython_codec():
+    '''
+    Returns the cython codec of the CBox or None if it can not be compiled.
+    The pyximport hook is only installed while the codec is imported.
+    '''
+    try:
+        import numpy as np
+        import pyximport
+    except ImportError:
+        return None
+    # codec.pyx relies on integer division
+    importers = pyximport.install(
+        setup_args={"include_dirs": np.get_include()}, language_level=2)
+    try:
+        from pycqed.instrument_drivers.physical_instruments._controlbox \
+            import codec
+        return codec
+    except Exception:
+        return None
+    finally:
+        pyximport.uninstall(*importers)
+
+
+def cbox_decode():
+    '''
+    Decoding input average/integration logs of the CBox with the numpy
+    codec, the cython codec (if it can be compiled) and the pure python
+    algorithm of the cython codec.
+    '''
+    import numpy as np
+    from pycqed.instrument_drivers.physical_instruments._controlbox import \
+        codec_numpy as c
+    from pycqed.tests.test_cbox_codec import reference_decode_message
+
+    codecs = [('numpy', c.decode_message),
+              ('python', reference_decode_message)]
+    cython = cython_codec()
+    if cython is not None:
+        codecs.append(('cython', cython.decode_message))
+    nr_samples = 64000
+    x = np.random.randint(-2**27, 2**27, nr_samples)
+    message = bytearray(c.create_message(
+        data_bytes=c.encode_array(x, 7, 4) + b'\x80'))
+    results = OrderedDict()
+    for name, decode_message in codecs:
+        results[name] = best_time(lambda: decode_message(message, 7, 4))
+    return 'Decoding {} samples'.format(nr_samples), results
+
+
+def cbox_acquisition():
+    '''
+    Integrated average acquisitions from the fake CBox, reading the
+    response byte by byte (as serial_read did) versus reading blocks.
+    '''
+    import numpy as np
+    from pycqed.instrument_drivers.physical_instruments._controlbox import \
+        defHeaders
+    from pycqed.instrument_drivers.physical_instruments._controlbox.\
+        Fake_QuTech_ControlBoxdriver import Fake_QuTech_ControlBox
+
+    CBox = Fake_QuTech_ControlBox('CBox_benchmark', address='fake',
+                                  server_name=None)
+    try:
+        nr_samples = 2047
+        CBox.nr_samples(nr_samples)
+        CBox.transport.set_response(
+            defHeaders.ReadIntAverageResults,
+            values=np.random.randint(-2**27, 2**27, 2*nr_samples))
+        results = OrderedDict()
+        for name, block_size in [('byte by byte', 1), ('blocks', None)]:
+            CBox.transport.max_block_size = block_size
+            results[name] = best_time(CBox.get_integrated_avg_results)
+    finally:
+        CBox.close()
+    return 'Acquiring {} samples'.format(nr_samples), results
+
+
+def uhfqc_acquisition():
+    '''
+    Acquiring UHFQC results by copying polled chunks into preallocated
+    buffers versus growing the arrays with np.concatenate for every chunk
+    (as single_acquisition_get did).
+    '''
+    import numpy as np
+    from pycqed.instrument_drivers.physical_instruments.ZurichInstruments \
+        import UHFQC_acquisition as acq
+    from pycqed.tests.test_UHFQC_acquisition import RecordedDAQ, \
+        record_polls
+
+    samples = 200000
+    paths = {ch: '/dev2178/quex/rl/data/{}'.format(ch) for ch in range(4)}
+    polls = record_polls({p: np.random.rand(samples) for p in paths.values()},
+                         [500]*(samples//500))
+
+    def concatenate():
+        data = {ch: [] for ch in paths}
+        for dataset in polls:
+            for ch, p in paths.items():
+                for v in dataset[p]:
+                    data[ch] = np.concatenate((data[ch], v['vector']))
+
+    def preallocated():
+        buf = acq.AcquisitionBuffer(paths.keys(), samples)
+        acq.poll_acquisition(RecordedDAQ(polls), buf, paths, timeout=1e6)
+
+    results = OrderedDict()
+    results['concatenate'] = best_time(concatenate, repeat=1)
+    results['preallocated'] = best_time(preallocated)
+    return 'Acquiring 4x{} samples'.format(samples), results
+
+
+def zi_prepare():
+    '''
+    Setting the ~20 nodes of a detector prepare one by one versus in a
+    single transaction, with a round trip latency of 1 ms.
+    '''
+    from pycqed.instrument_drivers.physical_instruments.ZurichInstruments.\
+        ZI_nodes import NodeAccess
+    from pycqed.tests.test_ZI_nodes import FakeDAQServer, prepare_settings
+
+    nodes = NodeAccess(FakeDAQServer(latency=1e-3), 'dev2178')
+    settings = prepare_settings()
+
+    def one_by_one():
+        for path, value in settings:
+            nodes.set(path, value)
+
+    def batched():
+        with nodes.batch():
+            one_by_one()
+
+    results = OrderedDict()
+    results['one by one'] = best_time(one_by_one)
+    results['batched'] = best_time(batched)
+    return 'Setting {} nodes'.format(len(settings)), results
+
+
+benchmarks = OrderedDict([
+    ('pipelined_hard_sweep', pipelined_hard_sweep),
+    ('element_build', element_build),
+    ('cbox_decode', cbox_decode),
+    ('cbox_acquisition', cbox_acquisition),
+    ('uhfqc_acquisition', uhfqc_acquisition),
+    ('zi_prepare', zi_prepare),
+])
+
+
+def run(names=None):
+    '''
+    Runs the benchmarks and prints the durations.
+    '''
+    for name in names or benchmarks:
+        description, durations = benchmarks[name]()
+        print('{}: {}'.format(description, ', '.join(
+            '{} {:.4f} s'.format(k, t) for k, t in durations.items())))
+
+
+if __name__ == '__main__':
+    run(sys.argv[1:])
@@ -0,0 +1 @@
+qubit q0 
@@ -0,0 +1,2 @@
+qubit q0 
+Xbla q0     # invalid cmd
@@ -1,12 +1,18 @@
+import time
+import threading
 import unittest
+import h5py
 import numpy as np
 from pycqed.measurement import measurement_control
+from pycqed.measurement import hdf5_data as h5d
 from pycqed.measurement.sweep_functions import None_Sweep
 import pycqed.measurement.detector_functions as det
 from pycqed.instrument_drivers.physical_instruments.dummy_instruments import DummyParHolder
 from pycqed.measurement.optimization import nelder_mead
 
 from qcodes import station
+from qcodes.instrument.parameter import ManualParameter
+from qcodes.utils import validators as vals
 
 
 class Test_MeasurementControl(unittest.TestCase):
@@ -42,6 +48,32 @@ class Test_MeasurementControl(unittest.TestCase):
         np.testing.assert_array_almost_equal(y0, y[0, :])
         np.testing.assert_array_almost_equal(y1, y[1, :])
 
+    def test_soft_sweep_2D_buffered_soft_averages(self):
+        sweep_pts = np.linspace(0, 10, 13)
+        sweep_pts_2D = np.linspace(0, 10, 4)
+        self.MC.soft_avg(3)
+        self.MC.soft_sweep_buffer_size(5)
+        try:
+            self.MC.set_sweep_function(None_Sweep(sweep_control='soft'))
+            self.MC.set_sweep_function_2D(None_Sweep(sweep_control='soft'))
+            self.MC.set_sweep_points(sweep_pts)
+            self.MC.set_sweep_points_2D(sweep_pts_2D)
+            self.MC.set_detector_function(det.Dummy_Detector_Soft())
+            dat = self.MC.run('2D_soft_buffered', mode='2D')
+        finally:
+            self.MC.soft_sweep_buffer_size(100)
+        nr_pts = len(sweep_pts)*len(sweep_pts_2D)
+        self.assertEqual(np.shape(dat), (nr_pts, 4))
+        # The detector returns a different value every iteration
+        xr = np.arange(3*nr_pts).reshape(3, nr_pts)/15
+        z = np.mean([np.sin(xr/np.pi), np.cos(xr/np.pi)], axis=1)
+        np.testing.assert_array_almost_equal(
+            dat[:, 0], np.tile(sweep_pts, len(sweep_pts_2D)))
+        np.testing.assert_array_almost_equal(
+            dat[:, 1], np.repeat(sweep_pts_2D, len(sweep_pts)))
+        np.testing.assert_array_almost_equal(dat[:, 2], z[0])
+        np.testing.assert_array_almost_equal(dat[:, 3], z[1])
+
     def test_hard_sweep_1D(self):
         sweep_pts = np.linspace(0, 10, 5)
         self.MC.set_sweep_function(None_Sweep(sweep_control='hard'))
@@ -58,6 +90,20 @@ class Test_MeasurementControl(unittest.TestCase):
         d = self.MC.detector_function
         self.assertEqual(d.times_called, 1)
 
+    def test_hard_sweep_data_flush_interval(self):
+        sweep_pts = np.arange(50)
+        self.MC.data_flush_interval(3)
+        self.MC.set_sweep_function(None_Sweep(sweep_control='hard'))
+        self.MC.set_sweep_points(sweep_pts)
+        self.MC.set_detector_function(det.Dummy_Shots_Detector(max_shots=5))
+        dat = self.MC.run('flush_interval')
+        self.MC.data_flush_interval(10)
+        # 10 acquisitions are not a multiple of the flush interval, the last
+        # acquisition is written to disk when the measurement finishes
+        self.assertEqual(np.shape(dat), (len(sweep_pts), 2))
+        np.testing.assert_array_almost_equal(dat[:, 0], sweep_pts)
+        np.testing.assert_array_almost_equal(dat[:, 1], sweep_pts)
+
     def test_soft_sweep_2D(self):
         sweep_pts = np.linspace(0, 10, 30)
         sweep_pts_2D = np.linspace(0, 10, 5)
@@ -208,6 +254,133 @@ class Test_MeasurementControl(unittest.TestCase):
 
         self.assertEqual(d.times_called, 5*1000+5)
 
+    def test_pipelined_hard_sweep_2D(self):
+        sweep_pts = np.arange(5)
+        sweep_pts_2D = np.linspace(5, 10, 5)
+        self.MC.soft_avg(3)
+        self.MC.pipelined_acquisition(True)
+        try:
+            self.MC.set_sweep_function(None_Sweep(sweep_control='hard'))
+            self.MC.set_sweep_function_2D(None_Sweep(sweep_control='soft'))
+            self.MC.set_sweep_points(sweep_pts)
+            self.MC.set_sweep_points_2D(sweep_pts_2D)
+            self.MC.set_detector_function(det.Dummy_Detector_Hard())
+            dat = self.MC.run('2D_hard_pipelined', mode='2D')
+        finally:
+            self.MC.pipelined_acquisition(False)
+        x = dat[:, 0]
+        y = dat[:, 1]
+        x_tiled = np.tile(sweep_pts, len(sweep_pts_2D))
+        y_rep = np.repeat(sweep_pts_2D, len(sweep_pts))
+        np.testing.assert_array_almost_equal(x, x_tiled)
+        np.testing.assert_array_almost_equal(y, y_rep)
+        np.testing.assert_array_almost_equal(dat[:, 2], np.sin(x/np.pi))
+        np.testing.assert_array_almost_equal(dat[:, 3], np.cos(x/np.pi))
+        d = self.MC.detector_function
+        self.assertEqual(d.times_called, 5*3)
+
+    def test_pipelined_hard_sweep_overlap(self):
+        # see benchmarks.pipelined_hard_sweep for the gain in throughput
+        sweep_pts = np.arange(5)
+        sweep_pts_2D = np.arange(4)
+        datasets = []
+        nr_stored = [0]
+        stored_while_acquiring = []
+        store_hard_data = self.MC.store_hard_data
+
+        def store_and_wait(new_data, **kw):
+            # waits until the next acquisition is done, which happens while
+            # storing only if the acquisition is pipelined. The first
+            # acquisition is done before the pipeline is started.
+            nr_stored[0] += 1
+            d = self.MC.detector_function
+            if 1 < nr_stored[0] < len(sweep_pts_2D):
+                t0 = time.time()
+                while (d.times_called <= nr_stored[0] and
+                       time.time() - t0 < 5):
+                    time.sleep(.001)
+                stored_while_acquiring.append(
+                    d.times_called > nr_stored[0])
+            return store_hard_data(new_data, **kw)
+        try:
+            for pipelined in [False, True]:
+                self.MC.pipelined_acquisition(pipelined)
+                self.MC.set_sweep_function(None_Sweep(sweep_control='hard'))
+                self.MC.set_sweep_function_2D(
+                    None_Sweep(sweep_control='soft'))
+                self.MC.set_sweep_points(sweep_pts)
+                self.MC.set_sweep_points_2D(sweep_pts_2D)
+                self.MC.set_detector_function(det.Dummy_Detector_Hard())
+                if pipelined:
+                    self.MC.store_hard_data = store_and_wait
+                datasets.append(self.MC.run('2D_hard_overlap', mode='2D'))
+        finally:
+            self.MC.pipelined_acquisition(False)
+            self.MC.__dict__.pop('store_hard_data', None)
+        np.testing.assert_array_equal(datasets[0], datasets[1])
+        self.assertEqual(stored_while_acquiring,
+                         [True]*(len(sweep_pts_2D)-2))
+
+    def test_pipelined_hard_sweep_error(self):
+        class Failing_Detector(det.Dummy_Detector_Hard):
+            def get_values(self):
+                if self.times_called == 3:
+                    raise ValueError('Acquisition failed')
+                return super().get_values()
+
+        self.MC.pipelined_acquisition(True)
+        try:
+            self.MC.set_sweep_function(None_Sweep(sweep_control='hard'))
+            self.MC.set_sweep_function_2D(None_Sweep(sweep_control='soft'))
+            self.MC.set_sweep_points(np.arange(5))
+            self.MC.set_sweep_points_2D(np.arange(5))
+            self.MC.set_detector_function(Failing_Detector())
+            with self.assertRaises(ValueError):
+                self.MC.run('2D_hard_pipelined_error', mode='2D')
+        finally:
+            self.MC.pipelined_acquisition(False)
+        # The acquisition thread is stopped
+        self.assertNotIn('MC_acquisition',
+                         [t.name for t in threading.enumerate()])
+        self.assertEqual(self.MC.data_writer, None)
+
+    def test_save_instrument_settings(self):
+        for compact in [True, False]:
+            self.MC.compact_instrument_settings(compact)
+            for x in [3.5, -2]:
+                # The second value tests that changed parameters are not
+                # taken from the settings cache
+                self.mock_parabola.x(x)
+                self.MC.set_sweep_function(None_Sweep(sweep_control='hard'))
+                self.MC.set_sweep_points(np.arange(3))
+                self.MC.set_detector_function(det.Dummy_Detector_Hard())
+                self.MC.run('instrument_settings')
+                with h5py.File(self.MC.data_object.filepath, 'r') as f:
+                    settings = h5d.read_instrument_settings(f)
+                    self.assertEqual(
+                        settings['mock_parabola'].attrs['x'], str(x))
+                    self.assertEqual(settings['MC'].attrs['soft_avg'], '1')
+                    self.assertEqual(
+                        settings['MC'].attrs['compact_instrument_settings'],
+                        str(compact))
+        self.MC.compact_instrument_settings(True)
+
+    def test_instrument_settings_cache(self):
+        ins = DummyParHolder('settings_cache_ins')
+        try:
+            ins.add_parameter('arr', parameter_class=ManualParameter,
+                              vals=vals.Anything(), initial_value=[1, 2])
+            ins.x(1.5)
+            values = dict(self.MC._get_parameter_values(ins.name, ins))
+            self.assertEqual((values['x'], values['arr']), ('1.5', '[1, 2]'))
+            # a value that is modified in place is converted again
+            ins.arr()[0] = 3
+            ins.x(2)
+            values = dict(self.MC._get_parameter_values(ins.name, ins))
+            self.assertEqual((values['x'], values['arr']), ('2', '[3, 2]'))
+        finally:
+            ins.close()
+
     def test_soft_sweep_1D_soft_averages(self):
         self.mock_parabola.noise(0)
         self.mock_parabola.x(0)
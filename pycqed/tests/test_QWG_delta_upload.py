@@ -0,0 +1,186 @@
+import socketserver
+import threading
+import unittest
+import numpy as np
+from pycqed.instrument_drivers.physical_instruments.QuTech_AWG_Module \
+    import QuTech_AWG_Module
+
+
+class MockQWGHandler(socketserver.BaseRequestHandler):
+    '''
+    Parses the SCPI commands (including IEEE488.2 binblocks) sent by the
+    client, keeps a waveform list and answers queries.
+    '''
+
+    def handle(self):
+        buf = b''
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                break
+            buf = self.parse(buf + data)
+
+    def parse(self, buf):
+        server = self.server
+        while True:
+            nl = buf.find(b'\n')
+            hs = buf.find(b'#')
+            if hs != -1 and (nl == -1 or hs < nl):
+                # binblock, the data can contain newlines
+                if len(buf) < hs + 2:
+                    return buf
+                nr_digits = int(buf[hs+1:hs+2])
+                if len(buf) < hs + 2 + nr_digits:
+                    return buf
+                start = hs + 2 + nr_digits
+                end = start + int(buf[hs+2:start])
+                if len(buf) < end:
+                    return buf
+                cmd = buf[:hs].decode().strip()
+                server.commands.append(cmd)
+                name = cmd.split('"')[1]
+                data = np.frombuffer(buf[start:end], dtype=np.float32)
+                # as the QWG, the data does not change the length of a
+                # waveform
+                if len(server.wlist.get(name, [])) != len(data):
+                    server.errors.append(cmd)
+                else:
+                    server.wlist[name] = data
+                buf = buf[end:]
+            elif nl != -1:
+                cmd = buf[:nl].decode().strip()
+                buf = buf[nl+1:]
+                if cmd:
+                    server.commands.append(cmd)
+                    self.execute(cmd)
+            else:
+                return buf
+
+    def execute(self, cmd):
+        server = self.server
+        if cmd.startswith('wlist:waveform:new'):
+            name, length = cmd.split('"')[1], cmd.split(',')[1]
+            server.wlist.setdefault(name, np.zeros(int(length)))
+        elif cmd == 'wlist:waveform:delete all':
+            server.wlist.clear()
+        elif cmd.startswith('wlist:waveform:delete'):
+            if server.wlist.pop(cmd.split('"')[1], None) is None:
+                server.errors.append(cmd)
+        elif cmd.endswith('?'):
+            if cmd == '*IDN?':
+                reply = 'QuTech,QWG,0,0'
+            elif cmd == 'wlist:size?':
+                reply = str(len(server.wlist))
+            else:
+                reply = '1'
+            self.request.sendall((reply + '\n').encode())
+
+
+class Test_QWG_delta_upload(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = socketserver.TCPServer(('127.0.0.1', 0), MockQWGHandler)
+        cls.server.commands = []
+        cls.server.wlist = {}
+        cls.server.errors = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.qwg = QuTech_AWG_Module(
+            'QWG_mock', address='127.0.0.1',
+            port=cls.server.server_address[1], server_name=None)
+        cls.nr_writes = 0
+        writeBinary = cls.qwg.writeBinary
+
+        def counting_writeBinary(binMsg):
+            cls.nr_writes += 1
+            writeBinary(binMsg)
+        cls.qwg.writeBinary = counting_writeBinary
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.qwg.close()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.qwg.deleteWaveformAll()
+        self.sync()
+        self.server.errors.clear()
+
+    def sync(self):
+        # the commands are processed in order, after the reply to the query
+        # all commands sent before were received
+        self.qwg.getOperationComplete()
+        commands = [c for c in self.server.commands if c != '*OPC?']
+        self.server.commands.clear()
+        Test_QWG_delta_upload.nr_writes = 0
+        return commands
+
+    def test_unchanged_waveforms_are_not_uploaded(self):
+        wf = np.linspace(-1, 1, 100)
+        self.qwg.createWaveformReal('test', wf)
+        self.assertEqual(self.sync(), ['wlist:waveform:new "test",100,real',
+                                       'wlist:waveform:data "test",'])
+        np.testing.assert_array_almost_equal(self.server.wlist['test'], wf)
+
+        self.qwg.createWaveformReal('test', wf)
+        self.assertEqual(self.sync(), [])
+
+        # only the data is sent if the length did not change
+        self.qwg.createWaveformReal('test', -wf)
+        self.assertEqual(self.sync(), ['wlist:waveform:data "test",'])
+        np.testing.assert_array_almost_equal(self.server.wlist['test'], -wf)
+
+        self.qwg.createWaveformReal('test', wf[:50])
+        self.assertEqual(self.sync(), ['wlist:waveform:delete "test"',
+                                       'wlist:waveform:new "test",50,real',
+                                       'wlist:waveform:data "test",'])
+        np.testing.assert_array_almost_equal(self.server.wlist['test'],
+                                             wf[:50])
+
+        # uploaded again after the waveform list was cleared
+        self.qwg.deleteWaveformAll()
+        self.qwg.createWaveformReal('test', wf[:50])
+        self.assertEqual(len(self.sync()), 3)
+        self.assertIn('test', self.server.wlist)
+        self.assertEqual(self.server.errors, [])
+
+    def test_batched_upload(self):
+        waveforms = {'wf{}'.format(i): np.sin(np.arange(1000)*i/100)
+                     for i in range(20)}
+        self.qwg.createWaveformsReal(waveforms)
+        self.assertEqual(self.nr_writes, 1)
+        self.assertEqual(len(self.sync()), 40)
+        for name, wf in waveforms.items():
+            np.testing.assert_array_almost_equal(self.server.wlist[name], wf)
+
+        waveforms['wf3'] = waveforms['wf3']/2
+        self.qwg.createWaveformsReal(waveforms)
+        self.assertEqual(self.sync(), ['wlist:waveform:data "wf3",'])
+
+        # batches are limited in size
+        max_size = self.qwg.max_upload_batch_size
+        self.qwg.max_upload_batch_size = 10000
+        try:
+            self.qwg.createWaveformsReal({name: -wf for name, wf in
+                                          waveforms.items()})
+            self.assertEqual(self.nr_writes, 10)
+        finally:
+            self.qwg.max_upload_batch_size = max_size
+        self.assertEqual(len(self.sync()), 20)
+        for name, wf in waveforms.items():
+            np.testing.assert_array_almost_equal(self.server.wlist[name], -wf)
+
+    def test_waveform_from_earlier_session(self):
+        # a waveform with the same name but another length is on the AWG
+        # before the first upload, e.g. from an earlier session, that is
+        # not known to the shadow of the new session
+        self.server.wlist['test'] = np.zeros(20)
+        self.qwg.clearWaveformShadow()
+        wf = np.linspace(-1, 1, 100)
+        self.qwg.createWaveformReal('test', wf)
+        self.assertEqual(self.sync(), ['wlist:waveform:delete "test"',
+                                       'wlist:waveform:new "test",100,real',
+                                       'wlist:waveform:data "test",'])
+        np.testing.assert_array_almost_equal(self.server.wlist['test'], wf)
+        self.assertEqual(self.server.errors, [])
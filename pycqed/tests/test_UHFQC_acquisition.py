@@ -0,0 +1,173 @@
+import unittest
+import h5py
+import numpy as np
+from pycqed.measurement.data_writer import DataWriter
+from pycqed.instrument_drivers.physical_instruments.ZurichInstruments import \
+    UHFQC_acquisition as acq
+
+
+class RecordedDAQ(object):
+    '''
+    Replays recorded poll results, replaces the ziDAQServer.
+    '''
+
+    def __init__(self, polls):
+        self.polls = list(polls)
+        self.nr_polls = 0
+
+    def poll(self, recording_time, timeout, flags=4, flat=True):
+        self.nr_polls += 1
+        if self.polls:
+            return self.polls.pop(0)
+        return {}
+
+
+def record_polls(data, chunk_sizes):
+    '''
+    Splits the data of every path in chunks, one chunk per path per poll.
+    '''
+    polls = []
+    idx = 0
+    for chunk_size in chunk_sizes:
+        polls.append({path: [{'vector': d[idx:idx+chunk_size]}]
+                      for path, d in data.items()})
+        idx += chunk_size
+    return polls
+
+
+class Test_UHFQC_acquisition(unittest.TestCase):
+
+    def setUp(self):
+        self.paths = {0: '/dev2178/quex/rl/data/0',
+                      1: '/dev2178/quex/rl/data/1'}
+        self.samples = 1000
+        self.data = {p: np.random.rand(self.samples)
+                     for p in self.paths.values()}
+
+    def test_poll_acquisition(self):
+        chunk_sizes = np.random.randint(1, 100, 200)
+        daq = RecordedDAQ(record_polls(self.data, chunk_sizes))
+        buf = acq.AcquisitionBuffer(self.paths.keys(), self.samples)
+        self.assertTrue(acq.poll_acquisition(daq, buf, self.paths,
+                                             timeout=10))
+        data = buf.get_data()
+        for ch, path in self.paths.items():
+            np.testing.assert_array_equal(data[ch], self.data[path])
+        # polling stops once all samples were received
+        self.assertEqual(daq.nr_polls,
+                         np.searchsorted(np.cumsum(chunk_sizes),
+                                         self.samples)+1)
+
+    def test_incomplete_acquisition(self):
+        daq = RecordedDAQ(record_polls(self.data, [100, 100]))
+        buf = acq.AcquisitionBuffer(self.paths.keys(), self.samples)
+        self.assertFalse(acq.poll_acquisition(daq, buf, self.paths,
+                                              acquisition_time=0.01,
+                                              timeout=0.05))
+        self.assertEqual(buf.nr_received, {0: 200, 1: 200})
+        self.assertEqual(len(buf.get_data()[0]), 200)
+
+    def test_stream_chunks(self):
+        chunks = []
+
+        def callback(start_idx, values):
+            chunks.append((start_idx, np.array(values)))
+
+        daq = RecordedDAQ(record_polls(self.data, [33]*40))
+        # a ring buffer of 2 chunks is enough if the channels are in sync
+        buf = acq.AcquisitionBuffer(self.paths.keys(), self.samples,
+                                    chunk_size=128, callback=callback,
+                                    buffer_length=256)
+        self.assertTrue(acq.poll_acquisition(daq, buf, self.paths,
+                                             timeout=10))
+        self.assertEqual([c[0] for c in chunks], list(range(0, 1000, 128)))
+        values = np.concatenate([c[1] for c in chunks])
+        np.testing.assert_array_equal(values, np.array(
+            [self.data[p] for p in self.paths.values()]).T)
+        with self.assertRaises(ValueError):
+            buf.get_data()
+
+    def test_default_buffer_length(self):
+        buf = acq.AcquisitionBuffer(self.paths.keys(), self.samples,
+                                    chunk_size=100, callback=lambda i, v: 0)
+        self.assertEqual(buf.buffer_length, self.samples)
+        self.assertFalse(buf.is_ring_buffer())
+
+    def test_skewed_channels(self):
+        # a poll can contain several chunks of one channel and none of the
+        # other channel, the data of channel 1 arrives in later polls
+        chunks = []
+
+        def callback(start_idx, values):
+            chunks.append((start_idx, np.array(values)))
+
+        data_0, data_1 = [self.data[self.paths[ch]] for ch in [0, 1]]
+        polls = [{self.paths[0]: [{'vector': data_0[:300]}]},
+                 {self.paths[0]: [{'vector': data_0[300:]}],
+                  self.paths[1]: [{'vector': data_1[:50]}]},
+                 {self.paths[1]: [{'vector': data_1[50:700]}]},
+                 {},
+                 {self.paths[1]: [{'vector': data_1[700:]}]}]
+        buf = acq.AcquisitionBuffer(self.paths.keys(), self.samples,
+                                    chunk_size=100, callback=callback)
+        self.assertTrue(acq.poll_acquisition(RecordedDAQ(polls), buf,
+                                             self.paths, timeout=10))
+        self.assertEqual([c[0] for c in chunks], list(range(0, 1000, 100)))
+        np.testing.assert_array_equal(
+            np.concatenate([c[1] for c in chunks]),
+            np.array([data_0, data_1]).T)
+        np.testing.assert_array_equal(buf.get_data()[1], data_1)
+
+        buf = acq.AcquisitionBuffer([0, 1], 100, chunk_size=10,
+                                    callback=lambda i, v: 0)
+        acq.add_dataset(buf, {'a': [{'vector': np.arange(30)}]},
+                        {0: 'a', 1: 'b'})
+        self.assertEqual(buf.nr_received, {0: 30, 1: 0})
+        # a ring buffer has to absorb the skew
+        buf = acq.AcquisitionBuffer([0, 1], 100, chunk_size=10,
+                                    callback=lambda i, v: 0,
+                                    buffer_length=20)
+        with self.assertRaises(ValueError):
+            acq.add_dataset(buf, {'a': [{'vector': np.arange(30)}]},
+                            {0: 'a', 1: 'b'})
+
+    def test_stream_to_data_writer(self):
+        with h5py.File('acq.hdf5', 'w', driver='core',
+                       backing_store=False) as f:
+            dset = f.create_dataset('Data', (0, 3), maxshape=(None, 3))
+            dw = DataWriter(dset, nr_sweep_cols=1)
+            dw.preallocate(self.samples)
+            daq = RecordedDAQ(record_polls(self.data, [250]*4))
+            buf = acq.AcquisitionBuffer(self.paths.keys(), self.samples,
+                                        chunk_size=100, callback=dw.write)
+            acq.poll_acquisition(daq, buf, self.paths, timeout=10)
+            dw.close()
+            np.testing.assert_array_almost_equal(
+                dset[:, 1:], np.array(list(self.data.values())).T)
+
+    def test_ring_buffer_overflow(self):
+        buf = acq.AcquisitionBuffer([0, 1], 1000, chunk_size=100,
+                                    callback=lambda i, v: None,
+                                    buffer_length=200)
+        buf.add(0, np.zeros(200))
+        with self.assertRaises(ValueError):
+            buf.add(0, np.zeros(1))
+        buf.add(1, np.zeros(150))
+        # only complete chunks are streamed
+        self.assertEqual(buf.nr_streamed, 100)
+        buf.add(0, np.zeros(100))
+        with self.assertRaises(ValueError):
+            acq.AcquisitionBuffer([0], 1000, buffer_length=200)
+
+    def test_long_acquisition(self):
+        # see benchmarks.uhfqc_acquisition for the speed up over growing
+        # the arrays with np.concatenate
+        samples = 200000
+        paths = {ch: '/dev2178/quex/rl/data/{}'.format(ch) for ch in range(4)}
+        data = {p: np.random.rand(samples) for p in paths.values()}
+        polls = record_polls(data, [500]*(samples//500))
+        buf = acq.AcquisitionBuffer(paths.keys(), samples)
+        self.assertTrue(acq.poll_acquisition(RecordedDAQ(polls), buf, paths,
+                                             timeout=1e6))
+        for ch, p in paths.items():
+            np.testing.assert_array_equal(buf.get_data()[ch], data[p])
@@ -0,0 +1,131 @@
+import unittest
+import numpy as np
+from pycqed.instrument_drivers.physical_instruments.ZurichInstruments.\
+    ZI_awg_programs import AWGProgramLoader, interleave_waveforms
+
+
+class FakeAWGModule(object):
+    '''
+    In process replacement of the awgModule, programs are "compiled" into
+    ELF files that are kept in a dict and uploaded instantly.
+    '''
+
+    def __init__(self):
+        self.nodes = {'compiler/status': -1, 'compiler/statusstring': '',
+                      'elf/status': -1, 'elf/upload': 0, 'progress': 1.}
+        self.elf_files = {}
+        self.loaded = None
+        self.nr_compilations = 0
+
+    def get(self, path):
+        node = path[len('awgModule/'):]
+        value = {node.split('/')[-1]: [self.nodes[node]]}
+        for key in reversed(node.split('/')[:-1]):
+            value = {key: value}
+        return value
+
+    def set(self, path, value):
+        node = path[len('awgModule/'):]
+        self.nodes[node] = value
+        if node == 'compiler/sourcestring':
+            self.compile(value)
+        elif node == 'compiler/start':
+            self.compile(self.nodes['compiler/sourcefile'])
+        elif node == 'elf/upload':
+            self.upload(self.elf_files.get(self.nodes['elf/file']))
+
+    def compile(self, source):
+        self.nr_compilations += 1
+        if 'error' in source:
+            self.nodes['compiler/status'] = 1
+            self.nodes['compiler/statusstring'] = 'Compilation failed'
+            return
+        self.nodes['compiler/status'] = 0
+        self.nodes['compiler/statusstring'] = 'Compilation successful'
+        self.elf_files[self.nodes['elf/file']] = source
+        self.upload(source)
+
+    def upload(self, program):
+        self.nodes['elf/status'] = 1 if program is None else 0
+        self.nodes['elf/upload'] = 0
+        if program is not None:
+            self.loaded = program
+
+
+class Test_AWGProgramLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.awg_module = FakeAWGModule()
+        self.loader = AWGProgramLoader(self.awg_module, poll_interval=0)
+
+    def test_programs_are_cached(self):
+        self.assertEqual(self.loader.load_string('prog A'), 'compiled')
+        self.assertEqual(self.loader.status_string, 'Compilation successful')
+        self.assertEqual(self.loader.load_string('prog A'), 'loaded')
+        self.assertEqual(self.loader.load_string('prog B'), 'compiled')
+        self.assertEqual(self.awg_module.loaded, 'prog B')
+        # a program that was compiled before is uploaded from its ELF file
+        self.assertEqual(self.loader.load_string('prog A'), 'uploaded')
+        self.assertEqual(self.awg_module.loaded, 'prog A')
+        self.assertEqual(self.awg_module.nr_compilations, 2)
+
+    def test_invalidate(self):
+        self.loader.load_string('prog A')
+        # e.g. programmed by another client
+        self.awg_module.loaded = 'other'
+        self.loader.invalidate()
+        self.assertEqual(self.loader.load_string('prog A'), 'uploaded')
+        self.assertEqual(self.awg_module.loaded, 'prog A')
+        # a program loaded from a file invalidates the loaded program
+        self.awg_module.nodes['compiler/sourcefile'] = 'prog C'
+        self.assertEqual(self.loader.load_file('prog.seqc'), 'compiled')
+        self.assertIsNone(self.loader.loaded_hash)
+        self.assertEqual(self.loader.load_string('prog A'), 'uploaded')
+        self.loader.clear()
+        self.assertFalse(self.loader.is_compiled('prog A'))
+        self.assertEqual(self.loader.load_string('prog A'), 'compiled')
+
+    def test_failures(self):
+        self.loader.load_string('prog A')
+        self.assertEqual(self.loader.load_string('error'), 'failed')
+        self.assertEqual(self.loader.status_string, 'Compilation failed')
+        self.assertIsNone(self.loader.loaded_hash)
+        self.assertFalse(self.loader.is_compiled('error'))
+        # the ELF file is gone, the program is compiled again
+        self.awg_module.elf_files.clear()
+        self.assertEqual(self.loader.load_string('prog A'), 'compiled')
+        self.assertEqual(self.awg_module.loaded, 'prog A')
+        self.assertEqual(self.awg_module.nr_compilations, 3)
+
+
+    def test_waveforms(self):
+        wave = interleave_waveforms([.1, .2], [.3, .4])
+        self.loader.load_string('prog A')
+        self.assertTrue(self.loader.needs_waveform_upload(0, wave))
+        self.loader.mark_waveform_uploaded(0, wave)
+        self.assertFalse(self.loader.needs_waveform_upload(0, wave.copy()))
+        self.assertTrue(self.loader.needs_waveform_upload(1, wave))
+        # the record is a copy of what was uploaded
+        wave[0] = 0
+        self.assertTrue(self.loader.needs_waveform_upload(0, wave))
+        self.loader.mark_waveform_uploaded(0, wave)
+        self.loader.load_string('prog A')
+        self.assertFalse(self.loader.needs_waveform_upload(0, wave))
+        # loading another program resets the waveforms
+        self.loader.load_string('prog B')
+        self.loader.load_string('prog A')
+        self.assertTrue(self.loader.needs_waveform_upload(0, wave))
+        self.loader.mark_waveform_uploaded(0, wave)
+        self.loader.load_file('prog.seqc')
+        self.assertTrue(self.loader.needs_waveform_upload(0, wave))
+        self.loader.mark_waveform_uploaded(0, wave)
+        self.loader.invalidate()
+        self.assertTrue(self.loader.needs_waveform_upload(0, wave))
+
+
+class Test_interleave_waveforms(unittest.TestCase):
+
+    def test_interleave_waveforms(self):
+        np.testing.assert_array_equal(
+            interleave_waveforms([.1, .2, .3], [-.1, -.2]),
+            [.1, -.1, .2, -.2, .3, 0])
@@ -0,0 +1,142 @@
+import time
+import unittest
+from pycqed.instrument_drivers.physical_instruments.ZurichInstruments.ZI_nodes \
+    import NodeAccess
+
+
+class FakeDAQServer(object):
+    '''
+    In process replacement of the ziDAQServer that keeps the node values in
+    a dict, every call is a "round trip" that takes latency seconds.
+    '''
+
+    def __init__(self, latency=0):
+        self.nodes = {}
+        self.latency = latency
+        self.nr_round_trips = 0
+        self.transactions = []
+
+    def _round_trip(self):
+        self.nr_round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def setInt(self, path, value):
+        self._round_trip()
+        self.nodes[path] = int(value)
+
+    def setDouble(self, path, value):
+        self._round_trip()
+        self.nodes[path] = float(value)
+
+    def set(self, items):
+        self._round_trip()
+        self.transactions.append(items)
+        for path, value in items:
+            self.nodes[path] = value
+
+    def getDouble(self, path):
+        self._round_trip()
+        return float(self.nodes.get(path, 0))
+
+    def sync(self):
+        self._round_trip()
+
+
+def prepare_settings():
+    '''
+    Returns the (path, value) pairs of the rotations and the transformation
+    matrix that a detector prepare sets.
+    '''
+    return [('quex/rot/{}/real'.format(i), 1.) for i in range(4)] + [
+        ('quex/trans/{}/col/{}/real'.format(i, j), float(i == j))
+        for i in range(4) for j in range(4)]
+
+
+class Test_ZI_nodes(unittest.TestCase):
+
+    def setUp(self):
+        self.daq = FakeDAQServer()
+        self.nodes = NodeAccess(self.daq, 'dev2178')
+
+    def test_set_get(self):
+        self.nodes.set('quex/rl/length', 100)
+        self.assertEqual(self.daq.nodes['/dev2178/quex/rl/length'], 100)
+        self.nodes.set('/dev2178/quex/rot/0/real', 0.5)
+        self.assertEqual(self.daq.nr_round_trips, 2)
+        # outside a cached block every get reads the device
+        self.assertEqual(self.nodes.get('quex/rl/length', int), 100)
+        self.daq.nodes['/dev2178/quex/rl/length'] = 200
+        self.assertEqual(self.nodes.get('quex/rl/length', int), 200)
+        self.assertEqual(self.daq.nr_round_trips, 4)
+
+    def test_cached(self):
+        self.daq.nodes['/dev2178/quex/rl/length'] = 10
+        with self.nodes.cached():
+            self.assertEqual(self.nodes.get('quex/rl/length', int), 10)
+            with self.nodes.cached():
+                self.daq.nodes['/dev2178/quex/rl/length'] = 20
+                self.assertEqual(self.nodes.get('quex/rl/length', int), 10)
+            self.assertEqual(self.nodes.get('quex/rl/length', int), 10)
+            self.assertEqual(self.daq.nr_round_trips, 1)
+            self.nodes.invalidate('quex/rl/*')
+            self.assertEqual(self.nodes.get('quex/rl/length', int), 20)
+            # the device can coerce the value that is set, it is read again
+            self.nodes.set('quex/rl/length', 31)
+            self.daq.nodes['/dev2178/quex/rl/length'] = 32
+            self.assertEqual(self.nodes.get('quex/rl/length', int), 32)
+            self.nodes.invalidate()
+            self.assertEqual(self.nodes.get('quex/rl/length', int), 32)
+        self.daq.nodes['/dev2178/quex/rl/length'] = 40
+        self.assertEqual(self.nodes.get('quex/rl/length', int), 40)
+
+    def test_volatile_nodes(self):
+        with self.nodes.cached():
+            self.nodes.set('awgs/0/enable', 1)
+            self.assertEqual(self.nodes.get('awgs/0/enable', int), 1)
+            # the AWG finished
+            self.daq.nodes['/dev2178/awgs/0/enable'] = 0
+            self.assertEqual(self.nodes.get('awgs/0/enable', int), 0)
+            # an output that is switched off on an overload
+            self.nodes.get('sigouts/0/on')
+            self.daq.nodes['/dev2178/sigouts/0/on'] = 1
+            self.assertEqual(self.nodes.get('sigouts/0/on', int), 1)
+            self.daq.nodes['/dev2178/awgs/0/elf/checksum'] = 1
+            self.nodes.add_volatile_node('awgs/0/elf/checksum')
+            self.nodes.get('awgs/0/elf/checksum')
+            self.daq.nodes['/dev2178/awgs/0/elf/checksum'] = 2
+            self.assertEqual(self.nodes.get('awgs/0/elf/checksum'), 2)
+
+    def test_batch(self):
+        with self.nodes.batch():
+            self.nodes.set('quex/rl/length', 100)
+            with self.nodes.batch():
+                self.nodes.set('quex/rl/avgcnt', 10)
+            self.nodes.set('quex/wint/length', 4096)
+            self.assertEqual(self.daq.nr_round_trips, 0)
+            # pending values are returned from the cache
+            self.assertEqual(self.nodes.get('quex/rl/length', int), 100)
+        self.assertEqual(self.daq.nr_round_trips, 1)
+        self.assertEqual(self.daq.transactions[0], [
+            ['/dev2178/quex/rl/length', 100],
+            ['/dev2178/quex/rl/avgcnt', 10],
+            ['/dev2178/quex/wint/length', 4096]])
+
+        with self.assertRaises(RuntimeError):
+            with self.nodes.batch():
+                self.nodes.set('quex/rl/length', 200)
+                raise RuntimeError()
+        self.assertEqual(len(self.daq.transactions), 1)
+        # the value that was not set is not cached
+        self.assertEqual(self.nodes.get('quex/rl/length', int), 100)
+
+    def test_prepare(self):
+        # the ~20 nodes of a detector prepare are set one by one or in a
+        # single transaction
+        settings = prepare_settings()
+        for path, value in settings:
+            self.nodes.set(path, value)
+        with self.nodes.batch():
+            for path, value in settings:
+                self.nodes.set(path, value)
+        self.assertEqual(self.daq.nr_round_trips, len(settings)+1)
@@ -0,0 +1,168 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import h5py
+import numpy as np
+
+from pycqed.analysis import analysis_toolbox as a_tools
+from pycqed.analysis.tools import file_handling as fh
+from pycqed.measurement import data_catalogue as dc
+from pycqed.measurement import hdf5_data as h5d
+
+
+def write_data_file(datadir, timestamp, label, T1, x, data,
+                    compact_settings=True):
+    name = '{}_{}'.format(timestamp[9:], label)
+    folder = os.path.join(datadir, timestamp[:8], name)
+    os.makedirs(folder)
+    with h5py.File(os.path.join(folder, name + '.hdf5'), 'w') as f:
+        grp = f.create_group('Experimental Data')
+        grp.attrs['datasaving_format'] = h5d.encode_to_utf8('Version 2')
+        grp.attrs['sweep_parameter_names'] = h5d.encode_to_utf8(['time'])
+        grp.attrs['sweep_parameter_units'] = h5d.encode_to_utf8(['s'])
+        grp.attrs['value_names'] = h5d.encode_to_utf8(['I', 'Q'])
+        grp.attrs['value_units'] = h5d.encode_to_utf8(['V', 'V'])
+        grp.create_dataset('Data', data=np.vstack([x, data]).T)
+        settings = [('q0', 'T1', str(T1)), ('q0', 'freq', '5e9'),
+                    ('MC', 'soft_avg', '1')]
+        if compact_settings:
+            h5d.write_instrument_settings(f, settings)
+        else:
+            set_grp = f.create_group('Instrument settings')
+            for ins, par, val in settings:
+                if ins not in set_grp:
+                    set_grp.create_group(ins)
+                set_grp[ins].attrs[par] = val
+        fit_grp = f.create_group('Analysis').create_group('Fitted Params I')
+        fit_grp.attrs['chisqr'] = 2*T1
+        fit_grp.create_group('tau').attrs['value'] = T1
+    return os.path.join(folder, name + '.hdf5')
+
+
+class Test_BulkLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.datadir = tempfile.mkdtemp()
+        self.old_datadir = a_tools.datadir
+        a_tools.datadir = self.datadir
+        fh.clear_file_cache()
+        self.x = np.linspace(0, 1, 11)
+        self.timestamps = ['20170101_{:06d}'.format(100000 + 100*i)
+                           for i in range(20)]
+        self.T1s = 10e-6 + 1e-6*np.arange(20)
+        self.data = [np.array([T1*self.x, -T1*self.x]) for T1 in self.T1s]
+        self.filepaths = [
+            write_data_file(self.datadir, ts, 'T1_q0', T1, self.x, data,
+                            compact_settings=i % 2 == 0)
+            for i, (ts, T1, data) in enumerate(zip(
+                self.timestamps, self.T1s, self.data))]
+
+    def tearDown(self):
+        a_tools.datadir = self.old_datadir
+        fh.clear_file_cache()
+        dc._catalogues.clear()
+        shutil.rmtree(self.datadir)
+
+    def test_get_data_from_timestamps(self):
+        data = a_tools.get_data_from_timestamps(
+            self.timestamps,
+            {'T1': 'q0.T1', 'tau': 'Fitted Params I.tau.value',
+             'chisqr': 'Fitted Params I.chisqr', 'missing': 'q0.missing'},
+            numeric_params=['T1'])
+        self.assertEqual(data['timestamps'], self.timestamps)
+        np.testing.assert_array_almost_equal(data['T1'], self.T1s)
+        self.assertIsInstance(data['tau'], np.ndarray)
+        np.testing.assert_array_almost_equal(data['tau'], self.T1s)
+        np.testing.assert_array_almost_equal(data['chisqr'], 2*self.T1s)
+        self.assertEqual(data['missing'], [None]*len(self.timestamps))
+
+        df = a_tools.get_data_from_timestamps(
+            self.timestamps, ['q0.freq', 'MC.soft_avg'],
+            return_dataframe=True)
+        self.assertEqual(list(df.index), self.timestamps)
+        self.assertEqual(list(df['q0.freq']), ['5e9']*len(self.timestamps))
+
+    def test_get_data_from_timestamp_list(self):
+        os.remove(self.filepaths[3])
+        data = a_tools.get_data_from_timestamp_list(
+            self.timestamps, ['q0.T1', 'Fitted Params I.tau.value'],
+            numeric_params=['q0.T1'], max_files=10)
+        expected_ts = self.timestamps[:3] + self.timestamps[4:10]
+        self.assertEqual(data['timestamps'], expected_ts)
+        expected_T1 = np.append(self.T1s[:3], self.T1s[4:10])
+        np.testing.assert_array_almost_equal(data['q0.T1'], expected_T1)
+        self.assertIsInstance(data['Fitted Params I.tau.value'], list)
+        np.testing.assert_array_almost_equal(
+            data['Fitted Params I.tau.value'], expected_T1)
+
+    def test_settings_are_read_once_per_file(self):
+        # 'all_data' requires a MeasurementAnalysis per timestamp
+        params = {p: p for p in ['all_data', 'q0.T1', 'q0.freq',
+                                 'MC.soft_avg']}
+        with mock.patch.object(a_tools, 'read_instrument_settings',
+                               wraps=a_tools.read_instrument_settings) as r:
+            data = a_tools.get_data_from_timestamp_list(
+                self.timestamps[:4], params)
+        self.assertEqual(r.call_count, 4)
+        self.assertEqual(data['q0.T1'], [str(T1) for T1 in self.T1s[:4]])
+        self.assertEqual(data['MC.soft_avg'], ['1']*4)
+
+    def test_parallel_loading(self):
+        fh.min_files_parallel = 4
+        try:
+            records = fh.bulk_load_params(
+                self.filepaths, ['q0.T1', 'Fitted Params I.tau.value'],
+                n_processes=2)
+        finally:
+            fh.min_files_parallel = 16
+        self.assertEqual([r['q0.T1'] for r in records],
+                         [str(T1) for T1 in self.T1s])
+        # values read in the worker processes are cached
+        self.assertEqual(len(fh._file_cache), 2*len(self.filepaths))
+
+    def test_cache_is_invalidated_by_modification(self):
+        records = fh.bulk_load_params(self.filepaths[:2], ['q0.T1'])
+        self.assertEqual(records[0]['q0.T1'], str(self.T1s[0]))
+        self.assertIn((self.filepaths[0], 'q0.T1'), fh._file_cache)
+        # The cache is used when the file did not change
+        fh._file_cache[(self.filepaths[1], 'q0.T1')] = (
+            fh._file_version(self.filepaths[1]), 'cached')
+        records = fh.bulk_load_params(self.filepaths[:2], ['q0.T1'])
+        self.assertEqual(records[1]['q0.T1'], 'cached')
+
+        time.sleep(0.01)
+        with h5py.File(self.filepaths[0], 'r+') as f:
+            f['Instrument settings/settings'][0, 2] = '1.0'
+        records = fh.bulk_load_params(self.filepaths[:2], ['q0.T1'])
+        self.assertEqual(records[0]['q0.T1'], '1.0')
+
+    def test_get_mean_df(self):
+        mean_df, dataframes = a_tools.get_mean_df(
+            'T1_q0', self.timestamps[0], self.timestamps[-1],
+            return_raw_dataframes=True)
+        np.testing.assert_array_almost_equal(mean_df['time'], self.x)
+        data = np.array(self.data)
+        np.testing.assert_array_almost_equal(
+            mean_df['I_mean'], np.mean(data[:, 0], axis=0))
+        np.testing.assert_array_almost_equal(
+            mean_df['Q_sem'],
+            np.std(data[:, 1], axis=0, ddof=1)/np.sqrt(len(data)))
+        self.assertEqual(list(dataframes[0].columns), self.timestamps)
+
+    def test_get_mean_df_old_data_format(self):
+        # files that the bulk loader does not support are loaded using a
+        # MeasurementAnalysis
+        with h5py.File(self.filepaths[1], 'r+') as f:
+            grp = f['Experimental Data']
+            grp.attrs['datasaving_format'] = h5d.encode_to_utf8('Version 1')
+            grp.attrs['sweep_parameter_name'] = h5d.encode_to_utf8('time')
+            grp.attrs['sweep_parameter_unit'] = h5d.encode_to_utf8('s')
+        fh.clear_file_cache()
+        mean_df = a_tools.get_mean_df('T1_q0', self.timestamps[0],
+                                      self.timestamps[-1])
+        np.testing.assert_array_almost_equal(mean_df['time'], self.x)
+        np.testing.assert_array_almost_equal(
+            mean_df['I_mean'], np.mean(np.array(self.data)[:, 0], axis=0))
@@ -0,0 +1,117 @@
+import unittest
+import numpy as np
+from pycqed.instrument_drivers.physical_instruments._controlbox import \
+    codec_numpy as c
+
+
+def reference_decode_byte(data_bytes, data_bits_per_byte=7):
+    # the algorithm of decode_byte in codec.pyx
+    mask = (1 << data_bits_per_byte) - 1
+    value = 0
+    len_db = len(data_bytes)
+    nr_bits_m1 = data_bits_per_byte*len_db - 1
+    for i in range(len_db):
+        bits = mask & data_bytes[len_db-1-i]
+        value |= bits << (data_bits_per_byte*i)
+    if value & (1 << nr_bits_m1):
+        value &= ~(1 << nr_bits_m1)
+        value = value - 2**nr_bits_m1
+    return value
+
+
+def reference_decode_message(data_bytes, data_bits_per_byte=7,
+                             bytes_per_value=2):
+    # the algorithm of decode_message in codec.pyx
+    message_bytes = data_bytes[:-1]
+    message_length = len(message_bytes)//bytes_per_value
+    values = np.empty(message_length, dtype=int)
+    for i in range(message_length):
+        values[i] = reference_decode_byte(
+            message_bytes[i*bytes_per_value:(i+1)*bytes_per_value],
+            data_bits_per_byte)
+    return values
+
+
+class Test_CBox_codec(unittest.TestCase):
+
+    def test_encode_byte(self):
+        self.assertEqual(c.encode_byte(128, 7), bytes([0b10000001, 0x80]))
+        self.assertEqual(c.encode_byte(128, 4), bytes([0b10001000, 0x80]))
+        encoded = c.encode_byte(546815, 4, 6)
+        self.assertEqual(len(encoded), 6)
+        self.assertEqual(c.decode_byte(encoded, 4), 546815)
+        self.assertEqual(c.decode_byte(c.encode_byte(546815, 7, 4), 7),
+                         546815)
+        self.assertEqual(c.decode_byte(c.encode_byte(-235, 7, 4), 7), -235)
+        # float numbers of bytes are used by the driver
+        self.assertEqual(c.encode_byte(5, 7, np.ceil(10/7.)),
+                         c.encode_byte(5, 7, 2))
+
+    def test_encode_decode_array(self):
+        for data_bits_per_byte, bytes_per_value in [(7, 2), (7, 4), (4, 8),
+                                                    (4, 2)]:
+            nr_bits = data_bits_per_byte*bytes_per_value
+            x = np.random.randint(-2**(nr_bits-1), 2**(nr_bits-1), 1000)
+            data_bytes = c.encode_array(x, data_bits_per_byte,
+                                        bytes_per_value)
+            self.assertEqual(data_bytes, b''.join(
+                c.encode_byte(v, data_bits_per_byte, bytes_per_value)
+                for v in x))
+            # checksum and EOM
+            message = c.create_message(
+                data_bytes=data_bytes +
+                c.calculate_checksum(data_bytes))
+            x_dec = c.decode_message(message, data_bits_per_byte,
+                                     bytes_per_value)
+            np.testing.assert_array_equal(x_dec, x)
+            np.testing.assert_array_equal(
+                x_dec, reference_decode_message(message, data_bits_per_byte,
+                                                bytes_per_value))
+
+    def test_decode_records(self):
+        n = 300
+        records = np.array([np.random.randint(-2**27, 2**27, n),
+                            np.random.randint(-2**27, 2**27, n),
+                            np.arange(n) % 128, np.ones(n)]).T
+        data_bytes = b''.join(
+            c.encode_byte(r[0], 7, 4) + c.encode_byte(r[1], 7, 4) +
+            c.encode_byte(r[2], 7, 1) + c.encode_byte(r[3], 7, 1)
+            for r in records)
+        values = c.decode_records(data_bytes, [7, 7, 7, 7], [4, 4, 1, 1],
+                                  [True, True, False, False])
+        np.testing.assert_array_equal(values, records)
+
+    def test_convert_to_signed(self):
+        np.testing.assert_array_equal(
+            c.convert_to_signed([0, 1, 127, 128, 255], 8),
+            [0, 1, 127, -128, -1])
+        np.testing.assert_array_equal(
+            c.convert_to_signed([2**31, 2**32-1], 32), [-2**31, -1])
+        with self.assertRaises(ValueError):
+            c.convert_to_signed([256], 8)
+        with self.assertRaises(ValueError):
+            c.convert_to_signed([-1], 8)
+
+    def test_decode_boolean_array(self):
+        bits = np.random.randint(0, 2, 64)
+        data_bytes = bytes(
+            [128 | int(''.join(map(str, bits[i:i+4])), 2)
+             for i in range(0, len(bits), 4)]) + b'\x80\x7F'
+        ch0, ch1 = c.decode_boolean_array(data_bytes)
+        np.testing.assert_array_equal(ch0, bits[:32])
+        np.testing.assert_array_equal(ch1, bits[32:])
+
+    def test_checksum(self):
+        self.assertEqual(c.calculate_checksum(b'\x81\x82\x04'),
+                         bytes([0x81 ^ 0x82 ^ 0x04 | 128]))
+
+    def test_decode_long_messages(self):
+        # input average/integration logs, see benchmarks.cbox_decode for
+        # the throughput
+        for nr_samples in [8000, 64000]:
+            x = np.random.randint(-2**27, 2**27, nr_samples)
+            message = bytearray(c.create_message(
+                data_bytes=c.encode_array(x, 7, 4) + b'\x80'))
+            np.testing.assert_array_equal(c.decode_message(message, 7, 4), x)
+        np.testing.assert_array_equal(
+            reference_decode_message(message, 7, 4), x)
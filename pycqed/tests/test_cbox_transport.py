@@ -0,0 +1,86 @@
+import unittest
+import numpy as np
+from pycqed.instrument_drivers.physical_instruments._controlbox import \
+    defHeaders
+from pycqed.instrument_drivers.physical_instruments._controlbox import \
+    codec_numpy as c
+from pycqed.instrument_drivers.physical_instruments._controlbox.transport \
+    import FakeCBoxTransport
+from pycqed.instrument_drivers.physical_instruments._controlbox.\
+    Fake_QuTech_ControlBoxdriver import Fake_QuTech_ControlBox
+
+
+class Test_CBox_transport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.CBox = Fake_QuTech_ControlBox('CBox_fake', address='fake',
+                                          server_name=None)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.CBox.close()
+
+    def setUp(self):
+        self.CBox.transport.max_block_size = None
+
+    def test_read_message(self):
+        transport = FakeCBoxTransport()
+        command = c.create_message(defHeaders.ReadVersion)
+        transport.write(command)
+        # the acknowledgement and the response arrive in one block
+        self.assertEqual(transport.bytes_in_buffer(), 7)
+        self.assertEqual(transport.read_message(),
+                         c.calculate_checksum(command) + b'\x7F')
+        self.assertEqual(transport.read_message(),
+                         bytes([130, 143, 128, 130 ^ 143 ^ 128 | 128, 127]))
+        self.assertEqual(transport.bytes_in_buffer(), 0)
+        with self.assertRaises(Exception):
+            transport.read_message(timeout=0.01)
+
+    def test_firmware_version(self):
+        self.assertEqual(self.CBox.firmware_version(), 'v2.15.0')
+        self.assertEqual(self.CBox.transport.commands[-1],
+                         c.create_message(defHeaders.ReadVersion))
+
+    def test_integrated_avg_results(self):
+        nr_samples = self.CBox.nr_samples()
+        x = np.random.randint(-2**27, 2**27, 2*nr_samples)
+        requests = []
+
+        def response(command):
+            # the first request returns an empty message as if the
+            # measurement is not finished yet
+            requests.append(command)
+            return b'' if len(requests) == 1 else c.encode_array(x, 7, 4)
+        self.CBox.transport.set_response(defHeaders.ReadIntAverageResults,
+                                         data=response)
+        ch0, ch1 = self.CBox.get_integrated_avg_results()
+        self.assertEqual(len(requests), 2)
+        np.testing.assert_array_equal(ch0, x[::2])
+        np.testing.assert_array_equal(ch1, x[1::2])
+
+    def test_input_avg_results(self):
+        nr_samples = self.CBox.nr_samples()
+        x = np.random.randint(-2**20, 2**20, 2*nr_samples)
+        self.CBox.transport.set_response(
+            defHeaders.ReadInputAverageResults, values=x)
+        ch0, ch1 = self.CBox.get_input_avg_results()
+        avg = self.CBox.nr_averages()
+        np.testing.assert_array_almost_equal(ch0, x[::2]/avg)
+        np.testing.assert_array_almost_equal(ch1, x[1::2]/avg)
+
+    def test_read_byte_by_byte(self):
+        # the results do not depend on how the transport reads the
+        # response, see benchmarks.cbox_acquisition for the throughput
+        nr_samples = 2047
+        self.CBox.nr_samples(nr_samples)
+        x = np.random.randint(-2**27, 2**27, 2*nr_samples)
+        self.CBox.transport.set_response(
+            defHeaders.ReadIntAverageResults, values=x)
+        for block_size in [1, None]:
+            self.CBox.transport.max_block_size = block_size
+            ch0, ch1 = self.CBox.get_integrated_avg_results()
+            np.testing.assert_array_equal(ch0, x[::2])
+            np.testing.assert_array_equal(ch1, x[1::2])
+        self.CBox.nr_samples(100)
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from pycqed.analysis import analysis_toolbox as a_tools
+from pycqed.measurement import data_catalogue as dc
+from pycqed.measurement import hdf5_data as h5d
+
+
+class Test_DataCatalogue(unittest.TestCase):
+
+    def setUp(self):
+        self.datadir = tempfile.mkdtemp()
+        self.folders = ['20170101/120000_Rabi_q0', '20170101/130000_T1_q0',
+                        '20170102/090000_Rabi_q1', '20170102/090001_T1_q1',
+                        '20170103/100000_Ramsey_q0']
+        for folder in self.folders:
+            os.makedirs(os.path.join(self.datadir, folder))
+        # folders that do not follow the naming convention are ignored
+        os.makedirs(os.path.join(self.datadir, 'some_folder'))
+        os.makedirs(os.path.join(self.datadir, '20170103', 'notes'))
+        self.old_datadir = a_tools.datadir
+        a_tools.datadir = self.datadir
+
+    def tearDown(self):
+        a_tools.datadir = self.old_datadir
+        a_tools.use_catalogue = True
+        dc._catalogues.clear()
+        shutil.rmtree(self.datadir)
+
+    def lookups(self):
+        return [
+            a_tools.latest_data(),
+            a_tools.latest_data('Rabi'),
+            a_tools.latest_data('T1', older_than='20170102_090001'),
+            a_tools.latest_data('T1', older_than='20170102_090001',
+                                or_equal=True, return_timestamp=True),
+            a_tools.latest_data('q0', newer_than='20170101_120000'),
+            a_tools.latest_data('Rabi', return_all=True),
+            a_tools.latest_data('Echo'),
+            a_tools.data_from_time('20170102_090000'),
+            a_tools.return_last_n_timestamps(3, contains='q'),
+            a_tools.get_timestamps_in_range(
+                '20170101_130000', '20170103_100000', label='_'),
+            a_tools.get_timestamps_in_range(
+                '20170101_000000', '20170103_000000', label=['T1', 'q1'],
+                exact_label_match=False)]
+
+    def test_lookups_match_directory_walk(self):
+        a_tools.use_catalogue = False
+        expected = self.lookups()
+        a_tools.use_catalogue = True
+        self.assertEqual(self.lookups(), expected)
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.datadir, dc.CATALOGUE_FILENAME)))
+        self.assertEqual(len(dc.get_catalogue(self.datadir)),
+                         len(self.folders))
+        # the directory walk skips the catalogue file
+        a_tools.use_catalogue = False
+        self.assertEqual(self.lookups(), expected)
+
+    def test_catalogue_only_in_datadir(self):
+        other_dir = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(other_dir, '20170101/120000_Rabi'))
+            self.assertEqual(
+                a_tools.latest_data('Rabi', folder=other_dir),
+                os.path.join(other_dir, '20170101', '120000_Rabi'))
+            folder = os.path.join(other_dir, '20170102', '101010_T1')
+            h5d.Data(name='T1', filepath=os.path.join(
+                folder, 'T1.hdf5')).close()
+            self.assertFalse(os.path.exists(
+                os.path.join(other_dir, dc.CATALOGUE_FILENAME)))
+        finally:
+            shutil.rmtree(other_dir)
+
+    def test_catalogue_is_synchronized(self):
+        a_tools.latest_data()
+        os.makedirs(os.path.join(self.datadir, '20170103/110000_Echo_q0'))
+        os.makedirs(os.path.join(self.datadir, '20170104/080000_Echo_q1'))
+        self.assertEqual(a_tools.return_last_n_timestamps(2, 'Echo'),
+                         ['20170104080000', '20170103110000'])
+        # deleted folders are removed when looked up
+        shutil.rmtree(os.path.join(self.datadir, '20170104'))
+        self.assertEqual(a_tools.latest_data('Echo', return_timestamp=True),
+                         ('20170103110000', os.path.join(
+                             self.datadir, '20170103', '110000_Echo_q0')))
+
+    def test_verify_and_rebuild(self):
+        catalogue = dc.MeasurementCatalogue(self.datadir)
+        missing, stale = catalogue.verify()
+        self.assertEqual(missing, self.folders)
+        self.assertEqual(stale, [])
+        catalogue.rebuild()
+        self.assertEqual(catalogue.verify(), ([], []))
+
+        # old day folders are not synchronized automatically
+        os.makedirs(os.path.join(self.datadir, '20170101/140000_Echo'))
+        shutil.rmtree(os.path.join(self.datadir, '20170101/120000_Rabi_q0'))
+        catalogue.sync()
+        self.assertEqual(catalogue.verify(fix=True),
+                         (['20170101/140000_Echo'],
+                          ['20170101/120000_Rabi_q0']))
+        self.assertEqual(catalogue.verify(), ([], []))
+
+        self.assertEqual(dc.main(['verify', self.datadir]), 0)
+        self.assertEqual(dc.main(['rebuild', self.datadir]), 0)
+        self.assertEqual(len(catalogue), len(self.folders))
+
+    def test_data_file_is_registered(self):
+        folder = os.path.join(self.datadir, '20170105', '101010_Rabi_q2')
+        catalogue = dc.MeasurementCatalogue(self.datadir)
+        data_object = h5d.Data(
+            name='Rabi_q2', filepath=os.path.join(folder, 'Rabi_q2.hdf5'))
+        self.assertEqual(catalogue.find(limit=1),
+                         [('20170105', '101010_Rabi_q2')])
+        grp = data_object.create_group('Experimental Data')
+        grp.attrs['sweep_parameter_names'] = h5d.encode_to_utf8(['amp'])
+        grp.attrs['value_names'] = h5d.encode_to_utf8(['I', 'Q'])
+        grp.create_dataset('Data', data=np.zeros((3, 3)))
+        data_object.close()
+        self.assertEqual(catalogue.get_names('20170105', '101010_Rabi_q2'),
+                         (['amp'], ['I', 'Q']))
+        self.assertEqual(a_tools.data_from_time('20170105101010'), folder)
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import unittest
+import h5py
+import numpy as np
+
+from pycqed.measurement.data_writer import DataWriter, get_chunk_shape
+
+
+class Test_DataWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_file = h5py.File(
+            os.path.join(self.tmp_dir, 'test_data_writer.hdf5'), 'w')
+        self.dset = self.data_file.create_dataset(
+            'Data', (0, 3), maxshape=(None, 3),
+            chunks=get_chunk_shape(100, 3))
+
+    def tearDown(self):
+        self.data_file.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_chunk_shape(self):
+        self.assertEqual(get_chunk_shape(100, 3), (100, 3))
+        self.assertEqual(get_chunk_shape(0, 4, chunk_bytes=1024), (64, 4))
+        self.assertEqual(get_chunk_shape(1e6, 4, chunk_bytes=1024), (64, 4))
+        self.assertEqual(get_chunk_shape(10, 10**6, chunk_bytes=1024),
+                         (1, 10**6))
+
+    def test_preallocate_and_close(self):
+        dw = DataWriter(self.dset, nr_sweep_cols=1, flush_interval=1)
+        dw.preallocate(100)
+        self.assertEqual(self.dset.shape, (100, 3))
+        x = np.arange(10)
+        dw.write(0, np.array([x, 2*x]).T, sweep_points=x)
+        self.assertEqual(dw.nr_acquired, 10)
+        # written to disk as flush_interval is 1
+        np.testing.assert_array_almost_equal(self.dset[:10, 2], 2*x)
+        dw.close()
+        # unused rows are removed when closing
+        self.assertEqual(self.dset.shape, (10, 3))
+        np.testing.assert_array_almost_equal(self.dset[:, 0], x)
+        np.testing.assert_array_almost_equal(self.dset[:, 1], x)
+
+    def test_flush_interval(self):
+        dw = DataWriter(self.dset, nr_sweep_cols=1, flush_interval=3)
+        dw.preallocate(9)
+        for i in range(3):
+            x = np.arange(3*i, 3*i+3)
+            dw.write(3*i, np.array([x, x]).T, sweep_points=x)
+            if i < 2:
+                np.testing.assert_array_equal(self.dset[:, 0], np.zeros(9))
+        self.assertEqual(dw.nr_flushes, 1)
+        np.testing.assert_array_almost_equal(self.dset[:, 0], np.arange(9))
+
+    def test_soft_averaging(self):
+        dw = DataWriter(self.dset, nr_sweep_cols=1, flush_interval=5)
+        x = np.arange(4)
+        vals = np.random.rand(20, 4, 2)
+        for soft_iteration in range(20):
+            dw.write(0, vals[soft_iteration], sweep_points=x,
+                     soft_iteration=soft_iteration)
+        dw.close()
+        np.testing.assert_array_almost_equal(
+            self.dset[:, 1:], np.mean(vals, axis=0), decimal=6)
+        np.testing.assert_array_almost_equal(self.dset[:, 0], x)
+
+    def test_grows_beyond_preallocation(self):
+        dw = DataWriter(self.dset, nr_sweep_cols=1)
+        dw.preallocate(2)
+        dw.write(0, np.ones(5))
+        dw.close()
+        self.assertEqual(self.dset.shape, (5, 3))
+        np.testing.assert_array_almost_equal(self.dset[:, 1], np.ones(5))
+        np.testing.assert_array_almost_equal(self.dset[:, 2], np.zeros(5))
+
+    def test_buffer_points(self):
+        dw = DataWriter(self.dset, nr_sweep_cols=1, buffer_size=4)
+        dw.preallocate(10)
+        for i in range(10):
+            dw.buffer_point(i, [i, 2*i, 3*i])
+            # points are only written when the buffer is full
+            self.assertEqual(dw.nr_acquired, 4*((i+1)//4))
+        self.assertEqual(dw.nr_writes, 2)
+        np.testing.assert_array_almost_equal(dw.get_data()[:, 2],
+                                             3*np.arange(10))
+        self.assertEqual(dw.nr_writes, 3)
+        dw.close()
+        np.testing.assert_array_almost_equal(self.dset[:, 0], np.arange(10))
+
+    def test_buffer_points_soft_averaging(self):
+        dw = DataWriter(self.dset, nr_sweep_cols=1, buffer_size=3)
+        vals = np.random.rand(5, 7, 2)
+        for soft_iteration in range(5):
+            for i in range(7):
+                dw.buffer_point(i, np.append(i, vals[soft_iteration, i]),
+                                soft_iteration=soft_iteration)
+        dw.close()
+        self.assertEqual(self.dset.shape, (7, 3))
+        np.testing.assert_array_almost_equal(self.dset[:, 0], np.arange(7))
+        np.testing.assert_array_almost_equal(
+            self.dset[:, 1:], np.mean(vals, axis=0), decimal=6)
+
+    def test_grow_without_preallocation(self):
+        dw = DataWriter(self.dset, nr_sweep_cols=1, buffer_size=2)
+        for i in range(21):
+            dw.buffer_point(i, [i, i, -i])
+        dw.close()
+        self.assertEqual(self.dset.shape, (21, 3))
+        np.testing.assert_array_almost_equal(self.dset[:, 2], -np.arange(21))
@@ -1,11 +1,16 @@
 import os
+import time
+import shutil
+import tempfile
 import pycqed as pq
 import unittest
+from unittest import mock
 import numpy as np
 
 from pycqed.instrument_drivers.meta_instrument import kernel_object as ko
 
 from pycqed.measurement import kernel_functions as kf
+from pycqed.measurement import kernel_cache
 
 from qcodes import station
 
@@ -33,6 +38,13 @@ class Test_KernelObject(unittest.TestCase):
         self.k1 = ko.Distortion('k1')
         self.station.add_component(self.k0)
         self.station.add_component(self.k1)
+        self.cache_dir = tempfile.mkdtemp()
+        self.k0.kernel_cache_dir(self.cache_dir)
+        self.k1.kernel_cache_dir(self.cache_dir)
+
+    @classmethod
+    def tearDownClass(self):
+        shutil.rmtree(self.cache_dir)
 
     def test_skin_kernel(self):
         self.k0.skineffect_alpha(0.1)
@@ -118,6 +130,107 @@ class Test_KernelObject(unittest.TestCase):
     def test_convolve_kernel(self):
         pass
 
+    def test_kernel_cache(self):
+        cache = self.k0.get_kernel_cache()
+        cache.clear()
+        kernel_dir = tempfile.mkdtemp()
+        try:
+            ext_kernel = np.array([1., .1, -.05, .01])
+            np.savetxt(os.path.join(kernel_dir, 'RT.txt'), ext_kernel)
+            self.k0.kernel_dir_path(kernel_dir)
+            self.k0.kernel_list(['RT.txt'])
+            self.k0.decay_amp_1(.1)
+            self.k0.decay_tau_1(20)
+            self.k0.decay_length_1(50)
+            for name, par in self.k0.parameters.items():
+                if isinstance(par, ko.ConfigParameter):
+                    self.k1.set(name, par.get())
+            self.k1.kernel_dir_path(kernel_dir)
+            kernel = self.k0.kernel()
+            np.testing.assert_array_equal(kernel,
+                                          self.k0.get_corrections_kernel())
+            # the text kernel and the corrections kernel are cached
+            self.assertEqual(len(cache.keys()), 2)
+            np.testing.assert_array_equal(
+                cache.get('txt_' + kernel_cache.file_hash(
+                    os.path.join(kernel_dir, 'RT.txt'))), ext_kernel)
+
+            # an instrument with the same configuration uses the cache
+            get_corrections_kernel = self.k1.get_corrections_kernel
+            self.k1.get_corrections_kernel = None
+            try:
+                np.testing.assert_array_equal(self.k1.kernel(), kernel)
+            finally:
+                self.k1.get_corrections_kernel = get_corrections_kernel
+
+            # changing a kernel file changes the key
+            key = self.k0.corrections_kernel_key()
+            time.sleep(0.01)
+            np.savetxt(os.path.join(kernel_dir, 'RT.txt'), 2*ext_kernel)
+            self.assertNotEqual(self.k0.corrections_kernel_key(), key)
+            # as does changing the code of the kernel functions
+            key = self.k0.corrections_kernel_key()
+            with mock.patch.object(kernel_cache, 'code_version',
+                                   return_value='other'):
+                self.assertNotEqual(self.k0.corrections_kernel_key(), key)
+            self.k0.decay_amp_1(.2)
+            self.assertNotEqual(self.k0.corrections_kernel_key(), key)
+            self.assertEqual(len(self.k0.load_external_kernels()), 1)
+            np.testing.assert_array_equal(
+                self.k0.load_external_kernels()[0], 2*ext_kernel)
+        finally:
+            for k in [self.k0, self.k1]:
+                k.kernel_list([])
+                k.decay_amp_1(0)
+            shutil.rmtree(kernel_dir)
+
+    def test_kernel_cache_eviction(self):
+        cache = kernel_cache.KernelCache(os.path.join(self.cache_dir, 'lru'),
+                                         max_size=2)
+        for i, key in enumerate(['a', 'b']):
+            cache.put(key, np.arange(i+1))
+            os.utime(cache._path(key), (i, i))
+        np.testing.assert_array_equal(cache.get('a'), [0])
+        cache.put('c', np.arange(3))
+        self.assertEqual(sorted(cache.keys()), ['a', 'c'])
+        self.assertIsNone(cache.get('b'))
+        cache.clear()
+        self.assertEqual(cache.keys(), [])
+
+    def test_corrections_filters(self):
+        self.k0.kernel_list([])
+        self.k0.bounce_amp_1(.1)
+        self.k0.bounce_tau_1(5)
+        self.k0.bounce_length_1(300)
+        self.k0.bounce_amp_2(0)
+        self.k0.decay_amp_1(.2)
+        self.k0.decay_tau_1(50)
+        self.k0.decay_length_1(300)
+        self.k0.decay_amp_2(-.05)
+        self.k0.decay_tau_2(200)
+        self.k0.decay_length_2(400)
+        self.k0.skineffect_alpha(.1)
+        self.k0.skineffect_length(300)
+        # identity filters are left out
+        self.assertEqual(len(self.k0.get_corrections_filters()), 4)
+
+        # Up to the length of the kernels the filters are identical
+        waveforms = np.zeros((2, 300))
+        waveforms[0, 20:120] = .5
+        waveforms[1, 50:250] = -.3
+        kernel_wfs = self.k0.distort_waveform(waveforms, method='kernel')
+        filter_wfs = self.k0.distort_waveform(waveforms)
+        np.testing.assert_array_almost_equal(filter_wfs, kernel_wfs,
+                                             decimal=12)
+        np.testing.assert_array_almost_equal(
+            self.k0.distort_waveform(waveforms[0]), kernel_wfs[0],
+            decimal=12)
+        # Computing the filters does not require inverting kernels
+        with mock.patch.object(kf, 'invert_kernel',
+                               side_effect=kf.invert_kernel) as invert:
+            self.k0.distort_waveform(waveforms)
+        self.assertEqual(invert.call_count, 0)
+
     # def test_kernel_loading(self):
         # self.k0.corrections_length(50)  # ns todo rescale.
         # self.k0.kernel_to_cache()
@@ -130,7 +243,81 @@ class Test_KernelObject(unittest.TestCase):
 class Test_Kernel_functions(unittest.TestCase):
 
     def test_bounce_kernel(self):
-        pass
+        # the bounce step response is 1 + amp*heaviside(t-time)
+        kernel = kf.bounce_kernel(amp=.1, time=5, length=200)
+        step = np.cumsum(kf.convolve_kernels(
+            [kf.htilde_bounce_vec(.1, 5), kernel], length=200))
+        np.testing.assert_array_almost_equal(
+            step, np.ones(200)*step[0], decimal=10)
+
+    def test_filters_match_kernels(self):
+        for amp, tau, length in [(3, 15, 100), (.1, 11000, 2000),
+                                 (-.05, 300, 500), (0, 10, 10)]:
+            np.testing.assert_array_almost_equal(
+                kf.filters_impulse_response(
+                    [kf.decay_filter(amp=amp, tau=tau)], length),
+                kf.decay_kernel(amp=amp, tau=tau, length=length), decimal=12)
+        for amp, bounce_time, length in [(.2, 12, 40), (.3, 4.5, 100),
+                                         (.3, 0, 20)]:
+            np.testing.assert_array_almost_equal(
+                kf.filters_impulse_response(
+                    [kf.bounce_filter(amp=amp, time=bounce_time,
+                                      length=length)], length),
+                kf.bounce_kernel(amp=amp, time=bounce_time, length=length),
+                decimal=12)
+        np.testing.assert_array_almost_equal(
+            kf.filters_impulse_response([kf.skin_filter(.1, 40)], 40),
+            kf.skin_kernel(alpha=.1, length=40), decimal=12)
+        # a cascade is the convolution of the kernels
+        filters = [kf.decay_filter(amp=.1, tau=20),
+                   kf.skin_filter(.1, 40), ([1., .5, .25], [1.])]
+        kernel = np.convolve(np.convolve(
+            kf.decay_kernel(amp=.1, tau=20, length=40),
+            kf.skin_kernel(alpha=.1, length=40)), [1., .5, .25])[:40]
+        np.testing.assert_array_almost_equal(
+            kf.filters_impulse_response(filters, 40), kernel, decimal=12)
+
+    def test_structured_toeplitz(self):
+        rng = np.random.RandomState(0)
+        n = 1500
+        h = kf.decay_kernel(amp=.2, tau=300, length=n)
+        h[1:] += 1e-3*rng.randn(n-1)
+        A = kf.lower_toeplitz(h)
+        self.assertTrue(kf.is_lower_toeplitz(A))
+        np.testing.assert_array_equal(A, kf.filter_matrix_from_htilde(h))
+        expected = np.linalg.inv(A)[:, 0]
+        for method in ['substitution', 'fft', None]:
+            np.testing.assert_array_almost_equal(
+                kf.invert_kernel(h, method=method), expected, decimal=10)
+        np.testing.assert_array_almost_equal(
+            kf.kernel_from_filter_matrix(A), expected, decimal=10)
+        # composition of kernels is the product of the matrices
+        k2 = kf.skin_kernel(alpha=.1, length=n)
+        np.testing.assert_array_almost_equal(
+            kf.convolve_kernels([h, k2]),
+            np.dot(kf.lower_toeplitz(k2), A)[:, 0], decimal=10)
+        # generic (non Toeplitz) filter matrices
+        t = np.cumsum(rng.rand(50))
+        fun = lambda t, tau: np.exp(-t/tau)
+        A = np.tril(fun(t[:, None]-t[None, :], 3.))
+        np.testing.assert_array_almost_equal(
+            kf.filter_matrix_generic2(fun, t, 3.), A, decimal=12)
+        np.testing.assert_array_almost_equal(
+            kf.kernel_generic2(fun, t, 3.), np.linalg.inv(A)[:, 0],
+            decimal=10)
+        with self.assertRaises(ValueError):
+            kf.invert_kernel([0, 1.])
+
+    def test_structured_toeplitz_long_kernels(self):
+        n = 20000
+        h = kf.decay_kernel(amp=.1, tau=5000, length=n)
+        kernel = kf.invert_kernel(h, method='fft')
+        composed = kf.convolve_kernels([h, kernel])
+        expected = np.zeros(n)
+        expected[0] = 1.
+        np.testing.assert_array_almost_equal(composed, expected, decimal=10)
+        np.testing.assert_array_almost_equal(
+            kernel, kf.invert_kernel(h, method='substitution'), decimal=10)
 
     def test_heaviside(self):
         hs = kf.heaviside(np.array([-1, -.5, 0, 1, 2]))
@@ -0,0 +1,240 @@
+import unittest
+import numpy as np
+from pycqed.instrument_drivers.meta_instrument.waveform_cache import \
+    WaveformCache
+from pycqed.instrument_drivers.meta_instrument.CBox_LookuptableManager \
+    import QuTech_ControlBox_LookuptableManager
+from pycqed.instrument_drivers.meta_instrument.UHFQC_LookuptableManager \
+    import UHFQC_LookuptableManager
+from pycqed.instrument_drivers.meta_instrument.QWG_LookuptableManager \
+    import QWG_LookuptableManager
+
+
+class FakeCBox(object):
+
+    def __init__(self):
+        self.uploads = []
+
+    def set_awg_lookuptable(self, awg_nr, lut_index, channel, wave):
+        self.uploads.append((awg_nr, lut_index, channel))
+
+
+class FakeUHFQC(object):
+
+    def __init__(self):
+        self.uploads = []
+
+    def awg_sequence_acquisition_and_pulse(self, Iwave, Qwave,
+                                           acquisition_delay,
+                                           force_upload=False):
+        self.uploads.append((Iwave, Qwave, acquisition_delay, force_upload))
+
+
+class FakeQWG(object):
+
+    def __init__(self):
+        self.waveforms = {}
+        self.uploads = []
+        self.settings = {'ch1_amp': 1.0}
+        self.nr_sets = 0
+        self.nr_deletes = 0
+
+    def createWaveformsReal(self, waveforms):
+        self.uploads.append(list(waveforms.keys()))
+        self.waveforms.update(waveforms)
+
+    def deleteWaveformAll(self):
+        self.nr_deletes += 1
+        self.waveforms.clear()
+
+    def get(self, name):
+        return self.settings[name]
+
+    def set(self, name, value):
+        self.nr_sets += 1
+        self.settings[name] = value
+
+    def stop(self):
+        pass
+
+    def start(self):
+        pass
+
+    def getOperationComplete(self):
+        return True
+
+
+class Test_WaveformCache(unittest.TestCase):
+
+    def test_dirty_tracking(self):
+        pars = {'amp': 1., 'width': 2.}
+        cache = WaveformCache(None, FakeCBox())
+        cache.add_waveform('a', lambda: pars['amp']*np.ones(3),
+                           [lambda: pars['amp']])
+        cache.add_waveform('b', lambda: pars['width']*np.ones(3),
+                           [lambda: pars['width']])
+        self.assertTrue(cache.is_dirty('a'))
+        cache.get_all()
+        pars['amp'] = 0.5
+        self.assertTrue(cache.is_dirty('a'))
+        self.assertFalse(cache.is_dirty('b'))
+        np.testing.assert_array_equal(cache.get_all()['a'], 0.5*np.ones(3))
+        self.assertEqual(cache.nr_generated, {'a': 2, 'b': 1})
+        cache.invalidate('b')
+        cache.get('b')
+        self.assertEqual(cache.nr_generated['b'], 2)
+
+        wave = np.ones(3)
+        self.assertTrue(cache.needs_upload(0, wave))
+        cache.mark_uploaded(0, wave)
+        self.assertFalse(cache.needs_upload(0, np.ones(3)))
+        # the record is a copy of what was uploaded
+        wave[0] = 2
+        self.assertTrue(cache.needs_upload(0, wave))
+        self.assertTrue(cache.needs_upload(0, np.ones(4)))
+        cache.clear_uploads()
+        self.assertTrue(cache.needs_upload(0, np.ones(3)))
+        self.assertEqual(cache.nr_uploads, 1)
+
+
+class Test_CBox_LutMan_dirty_tracking(unittest.TestCase):
+
+    def setUp(self):
+        self.CBox = FakeCBox()
+        self.lm = QuTech_ControlBox_LookuptableManager(
+            'CBox_LutMan_cache', CBox=self.CBox, server_name=None)
+        self.lm.load_pulses_onto_AWG_lookuptable(0)
+
+    def tearDown(self):
+        self.lm.close()
+
+    def test_initial_upload(self):
+        # every entry of the lut_mapping is loaded once (I and Q)
+        self.assertEqual(len(self.CBox.uploads), 2*8)
+        self.assertEqual(self.lm.waveform_cache.nr_uploads, 8)
+        self.assertEqual(set(self.lm.waveform_cache.nr_generated.values()),
+                         {1})
+        self.lm.load_pulses_onto_AWG_lookuptable(0)
+        self.assertEqual(len(self.CBox.uploads), 2*8)
+        self.assertEqual(set(self.lm.waveform_cache.nr_generated.values()),
+                         {1})
+
+    def test_amplitude_calibration(self):
+        for amp in np.linspace(0.01, 0.1, 5):
+            self.CBox.uploads = []
+            self.lm.Q_amp90(amp)
+            self.lm.load_pulses_onto_AWG_lookuptable(0)
+            # only the 90 degree pulses are loaded
+            self.assertEqual(sorted(set(u[1] for u in self.CBox.uploads)),
+                             [3, 4, 5, 6])
+        nr_generated = self.lm.waveform_cache.nr_generated
+        self.assertEqual(nr_generated['X90'], 6)
+        self.assertEqual(nr_generated['X180'], 1)
+        self.assertEqual(nr_generated['M_square'], 1)
+
+    def test_motzoi_calibration(self):
+        self.CBox.uploads = []
+        self.lm.Q_motzoi_parameter(0.1)
+        self.lm.load_pulses_onto_AWG_lookuptable(0)
+        # all gaussian pulses but not the identity and the block
+        self.assertEqual(sorted(set(u[1] for u in self.CBox.uploads)),
+                         [1, 2, 3, 4, 5, 6])
+        # the QI amp ratio is applied when uploading
+        self.lm.mixer_QI_amp_ratio(0.9)
+        self.lm.load_pulses_onto_AWG_lookuptable(0)
+        self.assertEqual(self.lm.waveform_cache.nr_generated['X180'], 2)
+        self.assertEqual(self.lm.waveform_cache.nr_uploads, 8+6+7)
+
+    def test_force_upload(self):
+        self.lm.load_pulses_onto_AWG_lookuptable(0, force_upload=True)
+        self.assertEqual(len(self.CBox.uploads), 2*2*8)
+        # other AWGs are separate slots
+        self.lm.load_pulses_onto_AWG_lookuptable(1)
+        self.assertEqual(len(self.CBox.uploads), 3*2*8)
+
+    def test_shared_CBox(self):
+        lm2 = QuTech_ControlBox_LookuptableManager(
+            'CBox_LutMan_cache2', CBox=self.CBox, server_name=None)
+        try:
+            lm2.Q_amp180(0.2)
+            lm2.load_pulses_onto_AWG_lookuptable(0)
+            self.assertEqual(lm2.waveform_cache.nr_uploads, 2)
+            # the pulses of lm2 were loaded, lm has to upload again
+            self.lm.load_pulses_onto_AWG_lookuptable(0)
+            self.assertEqual(self.lm.waveform_cache.nr_uploads, 8+2)
+        finally:
+            lm2.close()
+
+
+class Test_UHFQC_LutMan_dirty_tracking(unittest.TestCase):
+
+    def setUp(self):
+        self.UHFQC = FakeUHFQC()
+        self.lm = UHFQC_LookuptableManager(
+            'UHFQC_LutMan_cache', UHFQC=self.UHFQC, server_name=None)
+
+    def tearDown(self):
+        self.lm.close()
+
+    def test_RO_pulse(self):
+        # the UHFQC decides whether the pulse has to be uploaded
+        self.lm.load_pulse_onto_AWG_lookuptable('M_square')
+        self.lm.Q_amp180(0.3)
+        self.lm.load_pulse_onto_AWG_lookuptable('M_square')
+        self.assertEqual(len(self.UHFQC.uploads), 2)
+        self.assertEqual(self.lm.waveform_cache.nr_generated['M_square'], 1)
+        I_wave = self.UHFQC.uploads[-1][0]
+        self.lm.M_amp(0.2)
+        self.lm.acquisition_delay(300e-9)
+        self.lm.load_pulse_onto_AWG_lookuptable('M_square', force_upload=True)
+        self.assertEqual(self.lm.waveform_cache.nr_generated['M_square'], 2)
+        I_new, Q_new, delay, force_upload = self.UHFQC.uploads[-1]
+        self.assertFalse(np.array_equal(I_new, I_wave))
+        self.assertEqual(delay, 300e-9)
+        self.assertTrue(force_upload)
+
+    def test_predistortion(self):
+        I, Q = self.lm.give_back_wave_forms('M_square')
+        self.lm.mixer_apply_predistortion_matrix(True)
+        self.lm.mixer_alpha(0.5)
+        I_pre, Q_pre = self.lm.give_back_wave_forms('M_square')
+        np.testing.assert_array_almost_equal(I_pre, I)
+        np.testing.assert_array_almost_equal(Q_pre, np.clip(
+            2*Q, -1, 1-1/2**13))
+        self.assertEqual(self.lm.waveform_cache.nr_generated['M_square'], 2)
+
+
+class Test_QWG_LutMan_dirty_tracking(unittest.TestCase):
+
+    def setUp(self):
+        self.QWG = FakeQWG()
+        self.lm = QWG_LookuptableManager('QWG_LutMan_cache', QWG=self.QWG,
+                                         server_name=None)
+        self.lm.load_pulses_onto_AWG_lookuptable()
+
+    def tearDown(self):
+        self.lm.close()
+
+    def test_amplitude_calibration(self):
+        # the QWG decides which waveforms have to be uploaded
+        self.assertEqual(len(self.QWG.uploads[0]), 13)
+        self.assertEqual(self.QWG.nr_sets, 6*4)
+        self.lm.Q_amp90_scale(0.4)
+        self.lm.load_pulses_onto_AWG_lookuptable()
+        self.assertEqual(len(self.QWG.uploads[-1]), 13)
+        # the gaussian is not regenerated
+        self.assertEqual(self.lm.waveform_cache.nr_generated['gauss'], 1)
+        np.testing.assert_array_almost_equal(
+            self.QWG.waveforms['X90_q0_I'],
+            0.4*self.QWG.waveforms['X180_q0_I'])
+
+        self.lm.Q_motzoi(0.1)
+        self.lm.load_pulses_onto_AWG_lookuptable()
+        self.assertEqual(self.lm.waveform_cache.nr_generated['gauss'], 2)
+        self.assertEqual(self.QWG.nr_deletes, 0)
+
+    def test_force_upload(self):
+        self.lm.load_pulses_onto_AWG_lookuptable(force_upload=True)
+        self.assertEqual(self.QWG.nr_deletes, 1)
+        self.assertEqual(len(self.QWG.uploads[-1]), 13)
+        self.assertEqual(self.QWG.nr_sets, 2*6*4)
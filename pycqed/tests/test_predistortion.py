@@ -0,0 +1,73 @@
+import numpy as np
+import unittest
+
+from pycqed.measurement.waveform_control import predistortion as pd
+from pycqed.measurement.waveform_control.pulsar import Pulsar
+from pycqed.measurement.waveform_control import element
+from pycqed.measurement.waveform_control.pulse import SquarePulse
+from pycqed.measurement.pulse_sequences import standard_elements as st_elts
+from pycqed.measurement import kernel_functions as kf
+
+
+class Test_Predistortion(unittest.TestCase):
+
+    def setUp(self):
+        pd.clear_kernel_fft_cache()
+        rng = np.random.RandomState(0)
+        self.waveforms = rng.randn(5, 3000)
+        self.kernel = kf.decay_kernel(amp=.3, tau=400, length=1200)
+
+    def test_methods_match_direct_convolution(self):
+        expected = np.array([np.convolve(wf, self.kernel)[:3000]
+                             for wf in self.waveforms])
+        for method in ['direct', 'fft', 'overlap-add', None]:
+            out = pd.convolve_waveforms(self.waveforms, self.kernel,
+                                        method=method)
+            np.testing.assert_array_almost_equal(out, expected, decimal=10)
+        # single waveforms and kernels longer than the waveforms
+        for kernel in [self.kernel[:7], np.tile(self.kernel, 4)]:
+            out = pd.convolve_waveforms(self.waveforms[0], kernel)
+            np.testing.assert_array_almost_equal(
+                out, np.convolve(self.waveforms[0], kernel)[:3000],
+                decimal=10)
+        with self.assertRaises(ValueError):
+            pd.convolve_waveforms(self.waveforms, self.kernel, method='x')
+
+    def test_choose_method(self):
+        self.assertEqual(pd.choose_method(1000, 10), 'direct')
+        self.assertEqual(pd.choose_method(20000, 4000), 'fft')
+        self.assertEqual(pd.choose_method(2000000, 200), 'overlap-add')
+
+    def test_next_fast_len(self):
+        self.assertEqual([pd.next_fast_len(n) for n in [1, 7, 97, 1025]],
+                         [1, 8, 100, 1080])
+
+    def test_kernel_fft_is_cached(self):
+        pd.convolve_waveforms(self.waveforms, self.kernel, method='fft')
+        self.assertEqual(len(pd._kernel_fft_cache), 1)
+        pd.convolve_waveforms(self.waveforms, self.kernel, method='fft')
+        pd.convolve_waveforms(self.waveforms[:2], self.kernel, method='fft')
+        self.assertEqual(len(pd._kernel_fft_cache), 1)
+        # a different length requires a different FFT length
+        pd.convolve_waveforms(self.waveforms[:, :1000], self.kernel,
+                              method='fft')
+        self.assertEqual(len(pd._kernel_fft_cache), 2)
+
+    def test_distort_elements(self):
+        pulsar = Pulsar()
+        pulsar.define_channel(id='ch1', name='ch1', type='analog',
+                              high=.7, low=-.7, offset=0.0, delay=0,
+                              active=True)
+        el_list = []
+        for i, length in enumerate([100e-9, 200e-9, 2000e-9]):
+            el = element.Element('elt_{}'.format(i), pulsar=pulsar)
+            el.add(SquarePulse(name='sq', channel='ch1', amplitude=.1,
+                               length=length))
+            el_list.append(el)
+        ideal_wfs = [el.waveforms()[1]['ch1'] for el in el_list]
+        dist_dict = {'ch_list': ['ch1'], 'ch1': self.kernel}
+        st_elts.distort_and_compensate_elements(el_list, dist_dict)
+        for el, wf in zip(el_list, ideal_wfs):
+            np.testing.assert_array_almost_equal(
+                el.waveforms()[1]['ch1'],
+                np.convolve(wf, self.kernel)[:len(wf)], decimal=10)
@@ -1,8 +1,15 @@
+import re
+from copy import deepcopy
 import numpy as np
 import unittest
+from unittest import mock
 import qcodes as qc
-from pycqed.measurement.waveform_control.pulsar import Pulsar
+from qcodes.instrument_drivers.tektronix.AWG5014 import Tektronix_AWG5014
+from pycqed.measurement.waveform_control.pulsar import Pulsar, pack_waveforms
 from pycqed.measurement.waveform_control import element
+from pycqed.measurement.waveform_control import sequence
+from pycqed.measurement.waveform_control import pulse
+from pycqed.measurement.waveform_control import pulse_library
 from pycqed.measurement.waveform_control.pulse import SquarePulse
 from pycqed.measurement.pulse_sequences.standard_elements import multi_pulse_elt
 
@@ -45,6 +52,59 @@ class Test_Element(unittest.TestCase):
         expected_wf[:20] = .3
         np.testing.assert_array_almost_equal(ch1_wf, expected_wf)
 
+    def test_pulses_are_not_modified(self):
+        sq_pulse = SquarePulse(name='sq', channel='ch1', amplitude=.3,
+                               length=20e-9)
+        test_elt = element.Element('test_elt', pulsar=self.pulsar)
+        test_elt.add(sq_pulse, name='sq_0', start=10e-9)
+        test_elt.add(pulse.cp(sq_pulse, channel='ch2'), name='sq_1')
+        self.assertIsNone(sq_pulse._t0)
+        self.assertEqual(sq_pulse.channels, ['ch1'])
+        self.assertEqual(test_elt.pulses['sq_1'].channels, ['ch1', 'ch2'])
+        self.assertAlmostEqual(test_elt.pulses['sq_0'].t0(), 10e-9)
+
+        pulse_list = [{'pulse_type': 'SquarePulse', 'channel': 'ch1',
+                       'amplitude': .1, 'length': 20e-9, 'pulse_delay': 0,
+                       'refpoint': 'simultaneous'},
+                      {'pulse_type': 'SquareFluxPulse', 'channel': 'ch2',
+                       'amplitude': .2, 'square_pulse_length': 20e-9,
+                       'pulse_buffer': 0, 'pulse_delay': 0,
+                       'operation_type': 'Flux'}]
+        pulse_list_copy = deepcopy(pulse_list)
+        el = multi_pulse_elt(0, self.station, pulse_list)
+        self.assertEqual(pulse_list, pulse_list_copy)
+        # the flux pulse is compensated
+        self.assertEqual(el.pulses['SquareFluxPulse_1-0'].amplitude, .2)
+        self.assertEqual(el.pulses['SquareFluxPulse_1-1'].amplitude, -.2)
+
+    def test_shallow_pulse_copies(self):
+        # Elements built with the (shallow) pulse copies are identical to
+        # those built with the deep copies that were made before, see
+        # benchmarks.element_build for the speed up
+        pulse_list = []
+        for i in range(20):
+            pulse_list.append({'pulse_type': 'SSB_DRAG_pulse',
+                               'I_channel': 'ch1', 'Q_channel': 'ch2',
+                               'amplitude': .5, 'sigma': 10e-9,
+                               'nr_sigma': 4, 'motzoi': .1,
+                               'mod_frequency': -50e6, 'phase': 90*i,
+                               'alpha': 1, 'phi_skew': 0, 'pulse_delay': 0})
+
+        def build_element():
+            return multi_pulse_elt(0, self.station, pulse_list,
+                                   sequencer_config={'RO_fixed_point': 1e-6})
+
+        elt = build_element()
+        copy = pulse.Pulse.copy
+        pulse.Pulse.copy = lambda self: deepcopy(self)
+        try:
+            elt_deep = build_element()
+        finally:
+            pulse.Pulse.copy = copy
+        for ch in ['ch1', 'ch2']:
+            np.testing.assert_array_equal(elt.waveforms()[1][ch],
+                                          elt_deep.waveforms()[1][ch])
+
     def test_timing(self):
         test_elt = element.Element('test_elt', pulsar=self.pulsar)
         refpulse = SquarePulse(name='dummy_square',
@@ -144,6 +204,50 @@ class Test_Element(unittest.TestCase):
 
         np.testing.assert_array_almost_equal(ch1_wf, expected_wf)
 
+    def _build_long_element(self, nr_pulses):
+        test_elt = element.Element('long_elt', pulsar=self.pulsar)
+        for i in range(nr_pulses):
+            test_elt.add(SquarePulse(name='dummy_square',
+                                     channel='ch{}'.format(i % 4 + 1),
+                                     amplitude=.1, length=10e-9),
+                         refpulse=test_elt._last_added_pulse)
+        return test_elt
+
+    def test_incremental_bookkeeping(self):
+        test_elt = self._build_long_element(10)
+        test_elt.add(SquarePulse(name='early', channel='ch2',
+                                 amplitude=.2, length=10e-9),
+                     start=-50e-9, name='early')
+        # Moves the offset, all sample indices are updated
+        self.assertAlmostEqual(test_elt.offset(), -50e-9)
+        self.assertAlmostEqual(test_elt.ideal_length(), 150e-9)
+        self.assertEqual(test_elt.pulse_start_sample('early', 'ch2'), 0)
+        self.assertEqual(test_elt.pulse_start_sample('dummy_square-0', 'ch1'),
+                         50)
+        self.assertEqual(test_elt.pulse_end_sample('dummy_square-9', 'ch2'),
+                         149)
+        wfs = test_elt.waveforms()[1]
+        np.testing.assert_array_almost_equal(wfs['ch2'][:10], .2)
+        np.testing.assert_array_almost_equal(wfs['ch2'][60:70], .1)
+
+        test_elt.shift_all_pulses(60e-9)
+        self.assertEqual(test_elt.offset(), 0)
+        self.assertEqual(test_elt.pulse_start_sample('early', 'ch2'), 10)
+        self.assertAlmostEqual(test_elt.ideal_length(), 160e-9)
+
+    def test_normalized_waveforms_scaling(self):
+        '''
+        The time to build the waveforms of an element scales linearly with
+        the number of pulses: the start of each pulse is only evaluated once.
+        '''
+        for nr_pulses in [200, 800]:
+            test_elt = self._build_long_element(nr_pulses)
+            with mock.patch.object(SquarePulse, 't0', autospec=True,
+                                   side_effect=SquarePulse.t0) as t0:
+                tvals, wfs = test_elt.normalized_waveforms()
+            self.assertEqual(len(tvals), max(960, 10*nr_pulses))
+            self.assertEqual(t0.call_count, nr_pulses)
+
     # def test_distorted_attribute(self):
 
     #     test_elt = element.Element('test_elt', pulsar=self.pulsar)
@@ -168,3 +272,260 @@ class Test_Element(unittest.TestCase):
     #             self.assertTrue(ch in test_elt.distorted_wfs.keys())
     #         else:
     #             self.assertFalse(item['distorted'])
+
+
+class FakeAWGParameter:
+
+    def __init__(self, value):
+        self.value = value
+
+    def get_latest(self):
+        return self.value
+
+
+class FakeAWG:
+    '''
+    Stands in for a Tektronix AWG5014, the waveforms are packed and the AWG
+    file is generated as by the driver but nothing is sent to an instrument.
+    '''
+    pack_waveform = Tektronix_AWG5014.pack_waveform
+    generate_awg_file = Tektronix_AWG5014.generate_awg_file
+    _pack_record = Tektronix_AWG5014._pack_record
+    AWG_FILE_FORMAT_HEAD = Tektronix_AWG5014.AWG_FILE_FORMAT_HEAD
+    AWG_FILE_FORMAT_CHANNEL = Tektronix_AWG5014.AWG_FILE_FORMAT_CHANNEL
+
+    def __init__(self):
+        self._timeout = 10
+        self.awg_files = {}
+        for i in range(4):
+            setattr(self, 'ch{}_offset'.format(i+1), FakeAWGParameter(0.))
+            setattr(self, 'ch{}_amp'.format(i+1), FakeAWGParameter(1.4))
+
+    def timeout(self, val=None):
+        if val is None:
+            return self._timeout
+        self._timeout = val
+
+    def generate_sequence_cfg(self):
+        return {}
+
+    def send_awg_file(self, filename, awg_file):
+        self.awg_files[filename] = awg_file
+
+    def load_awg_file(self, filename):
+        pass
+
+    def is_awg_ready(self):
+        return True
+
+    def get(self, name):
+        return getattr(self, name).get_latest()
+
+    def set(self, name, value):
+        pass
+
+
+class FakeVisaHandle:
+
+    def __init__(self, written, resource_name='TCPIP0::192.168.0.2::INSTR'):
+        self.written = written
+        self.resource_name = resource_name
+
+    def write_raw(self, message):
+        self.written.append(message)
+
+
+def strip_timestamps(awg_file):
+    '''
+    Removes the waveform timestamps (time of creation) from an .AWG file.
+    '''
+    return re.sub(rb'(WAVEFORM_TIMESTAMP_\d+\x00).{16}', rb'\1',
+                  awg_file, flags=re.S)
+
+
+class Test_Pulsar_program_awg(unittest.TestCase):
+
+    def setUp(self):
+        self.pulsar = Pulsar()
+        self.pulsar.AWG = FakeAWG()
+        for i in range(4):
+            self.pulsar.define_channel(id='ch{}'.format(i+1),
+                                       name='ch{}'.format(i+1),
+                                       type='analog', high=.7, low=-.7,
+                                       offset=0.0, delay=0, active=True)
+            for m in [1, 2]:
+                self.pulsar.define_channel(
+                    id='ch{}_marker{}'.format(i+1, m),
+                    name='ch{}_marker{}'.format(i+1, m), type='marker',
+                    high=2.0, low=0, offset=0., delay=0, active=True)
+        self.pulsar.activate_channels = lambda channels: None
+        # Count how often the waveforms of an element are computed
+        self.nr_computed = {}
+        normalized_waveforms = element.Element.normalized_waveforms
+
+        def counting_normalized_waveforms(elt):
+            self.nr_computed[elt.name] = self.nr_computed.get(elt.name, 0) + 1
+            return normalized_waveforms(elt)
+        self.normalized_waveforms = normalized_waveforms
+        element.Element.normalized_waveforms = counting_normalized_waveforms
+
+    def tearDown(self):
+        element.Element.normalized_waveforms = self.normalized_waveforms
+        self.pulsar.shutdown_compile_pool()
+
+    def make_sequence(self, amplitudes):
+        seq = sequence.Sequence('dedup_seq')
+        elements = []
+        for i, amp in enumerate(amplitudes):
+            elt = element.Element('elt_{}'.format(i), pulsar=self.pulsar)
+            # the pulse module is reloaded by some of the sequence modules,
+            # use the current class such that the elements can be pickled
+            elt.add(pulse.SquarePulse(name='pulse', channel='ch1',
+                                      amplitude=amp, length=20e-9))
+            elt.add(pulse.SquarePulse(name='marker', channel='ch1_marker1',
+                                      amplitude=1, length=20e-9))
+            elements.append(elt)
+            seq.append(elt.name, elt.name, trigger_wait=True)
+        return seq, elements
+
+    def program(self, amplitudes, **kw):
+        seq, elements = self.make_sequence(amplitudes)
+        wfs = {}
+        generate_awg_file = self.pulsar.AWG.generate_awg_file
+
+        def capture(packed_waveforms, wfname_l, *args, **kw):
+            wfs['packed'] = packed_waveforms
+            wfs['names'] = wfname_l
+            return generate_awg_file(packed_waveforms, wfname_l, *args, **kw)
+        self.pulsar.AWG.generate_awg_file = capture
+        awg_file = self.pulsar.program_awg(seq, *elements, **kw)
+        del self.pulsar.AWG.generate_awg_file
+        return awg_file, wfs
+
+    def test_waveforms_are_deduplicated(self):
+        amplitudes = [.1, .2, .1, .2, .1, .3]
+        file_all, wfs_all = self.program(amplitudes,
+                                         deduplicate_waveforms=False)
+        file_dedup, wfs_dedup = self.program(amplitudes)
+        # 6 elements x 4 channels without and 3 ch1 + 3 zero channels with
+        # deduplication
+        self.assertEqual(len(wfs_all['packed']), 24)
+        self.assertEqual(len(wfs_dedup['packed']), 6)
+        self.assertLess(len(file_dedup), len(file_all))
+        # The sequence table refers to identical waveforms
+        self.assertEqual(wfs_dedup['names'].shape, wfs_all['names'].shape)
+        for names_all, names_dedup in zip(wfs_all['names'].flatten(),
+                                          wfs_dedup['names'].flatten()):
+            self.assertEqual(names_all[-1], names_dedup[-1])
+            np.testing.assert_array_equal(wfs_all['packed'][names_all],
+                                          wfs_dedup['packed'][names_dedup])
+
+    def test_parallel_compilation(self):
+        amplitudes = np.round(np.linspace(-.5, .5, 40), 3).tolist()*2
+        self.pulsar.min_elements_parallel = 4
+        for dedup in [True, False]:
+            self.pulsar.clear_waveform_cache()
+            file_serial, wfs_serial = self.program(
+                amplitudes, deduplicate_waveforms=dedup, n_processes=1)
+            self.pulsar.clear_waveform_cache()
+            self.nr_computed = {}
+            file_parallel, wfs_parallel = self.program(
+                amplitudes, deduplicate_waveforms=dedup, n_processes=2)
+            # the waveforms were computed in the worker processes
+            self.assertEqual(self.nr_computed, {})
+            self.assertEqual(strip_timestamps(file_parallel),
+                             strip_timestamps(file_serial))
+            self.assertEqual(list(wfs_parallel['packed']),
+                             list(wfs_serial['packed']))
+        # elements that can not be pickled are compiled serially
+        seq, elements = self.make_sequence(amplitudes[:8])
+        elements[3].unpicklable = lambda: None
+        self.pulsar.clear_waveform_cache()
+        self.assertEqual(
+            strip_timestamps(self.pulsar.program_awg(seq, *elements,
+                                                     n_processes=2)),
+            strip_timestamps(self.program(amplitudes[:8], n_processes=1)[0]))
+        # the process pool is started once and reused
+        pool = self.pulsar._compile_pool
+        self.assertIsNotNone(pool)
+        self.program(amplitudes, n_processes=2)
+        self.assertIs(self.pulsar._compile_pool, pool)
+
+    def test_pack_waveforms(self):
+        wfs = [np.linspace(-1, 1, 100), np.sin(np.arange(960)),
+               np.zeros(20)]
+        m1s = [np.arange(100) % 2, np.zeros(960), np.ones(20)]
+        m2s = [np.ones(100), np.arange(960) % 3 == 0, np.zeros(20)]
+        packed = pack_waveforms(wfs, m1s, m2s)
+        for wf, m1, m2, p in zip(wfs, m1s, m2s, packed):
+            np.testing.assert_array_equal(
+                p, self.pulsar.AWG.pack_waveform(wf, m1, m2))
+        # all waveforms are packed into one buffer
+        self.assertIs(packed[0].base, packed[2].base)
+        with self.assertRaises(TypeError):
+            pack_waveforms([np.ones(3)*1.1], [np.zeros(3)], [np.zeros(3)])
+        with self.assertRaises(TypeError):
+            pack_waveforms([np.zeros(3)], [np.ones(3)*.5], [np.zeros(3)])
+
+    def test_streamed_awg_file(self):
+        amplitudes = [.1, .2, .1, .3]
+        awg_file, _ = self.program(amplitudes)
+        header = 'MMEMory:DATA "dedup_seq_FILE.AWG",#{}{}'.format(
+            len(str(len(awg_file))), len(awg_file)).encode('ASCII')
+        # VXI-11 terminates a command at the end of a write, the command
+        # is sent in a single write
+        written = []
+        self.pulsar.AWG.visa_handle = FakeVisaHandle(written)
+        seq, elements = self.make_sequence(amplitudes)
+        self.assertIsNone(self.pulsar.program_awg(seq, *elements,
+                                                  stream_awg_file=True))
+        self.assertEqual(len(written), 1)
+        self.assertEqual(strip_timestamps(written[0]),
+                         strip_timestamps(header + awg_file))
+
+        # over a raw socket the file is streamed in chunks
+        written = []
+        self.pulsar.AWG.visa_handle = FakeVisaHandle(
+            written, 'TCPIP0::192.168.0.2::4000::SOCKET')
+        self.pulsar.awg_file_chunk_size = 1000
+        self.assertIsNone(self.pulsar.program_awg(seq, *elements,
+                                                  stream_awg_file=True))
+        self.assertEqual(written[0], header)
+        self.assertEqual(len(written), 1 + -(-len(awg_file)//1000))
+        self.assertEqual([len(w) for w in written[1:-1]],
+                         [1000]*(len(written)-2))
+        self.assertEqual(strip_timestamps(b''.join(written[1:])),
+                         strip_timestamps(awg_file))
+
+    def test_unchanged_elements_are_not_recomputed(self):
+        self.program([.1, .2, .3])
+        self.assertEqual(self.nr_computed,
+                         {'elt_0': 1, 'elt_1': 1, 'elt_2': 1})
+        self.program([.1, .2, .3])
+        self.assertEqual(self.nr_computed,
+                         {'elt_0': 1, 'elt_1': 1, 'elt_2': 1})
+        _, wfs = self.program([.1, .25, .3])
+        self.assertEqual(self.nr_computed,
+                         {'elt_0': 1, 'elt_1': 2, 'elt_2': 1})
+        expected = self.pulsar.AWG.pack_waveform(
+            np.where(np.arange(960) < 20, .25/.7, 0),
+            np.where(np.arange(960) < 20, 1, 0), np.zeros(960))
+        np.testing.assert_array_equal(wfs['packed'][wfs['names'][0, 1]],
+                                      expected)
+
+    def test_only_uncached_elements_are_evaluated(self):
+        with mock.patch.object(pulse_library, 'batch_evaluate_pulses',
+                               wraps=pulse_library.batch_evaluate_pulses) \
+                as batch_evaluate:
+            self.program([.1, .2, .3])
+            self.program([.1, .25, .3])
+        evaluated = [[elt.name for elt in call[0][0]]
+                     for call in batch_evaluate.call_args_list]
+        self.assertEqual(evaluated, [['elt_0', 'elt_1', 'elt_2'], ['elt_1']])
+
+        # precomputed waveforms are part of the fingerprint
+        _, (elt, _, _) = self.make_sequence([.1, .1, .1])
+        fingerprint = self.pulsar._element_fingerprint(elt)
+        elt.precomputed_wfs['pulse'] = {'ch1': (np.zeros(20), np.ones(20))}
+        self.assertNotEqual(self.pulsar._element_fingerprint(elt),
+                            fingerprint)
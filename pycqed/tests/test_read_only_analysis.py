@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+import h5py
+import numpy as np
+
+from pycqed.analysis import measurement_analysis as ma
+from pycqed.analysis.tools import file_handling as fh
+from pycqed.measurement import hdf5_data as h5d
+
+
+class Test_ReadOnlyAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.folder = os.path.join(self.tmp_dir, '20170101', '120000_scan')
+        os.makedirs(self.folder)
+        self.filepath = os.path.join(self.folder, '120000_scan.hdf5')
+        self.data = np.random.rand(50, 4)
+        with h5py.File(self.filepath, 'w') as f:
+            grp = f.create_group('Experimental Data')
+            grp.attrs['datasaving_format'] = h5d.encode_to_utf8('Version 2')
+            grp.attrs['sweep_parameter_names'] = h5d.encode_to_utf8(
+                ['x', 'y'])
+            grp.attrs['sweep_parameter_units'] = h5d.encode_to_utf8(
+                ['s', 'V'])
+            grp.attrs['value_names'] = h5d.encode_to_utf8(['I', 'Q'])
+            grp.attrs['value_units'] = h5d.encode_to_utf8(['V', 'V'])
+            # chunked like the datasets created by the MeasurementControl
+            grp.create_dataset('Data', data=self.data, chunks=(16, 4),
+                               maxshape=(None, 4))
+            grp.create_dataset('shots', data=self.data[:, 2])
+        self.mtime = os.stat(self.filepath).st_mtime_ns
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_lazy_dataset(self):
+        with h5py.File(self.filepath, 'r') as f:
+            lazy = fh.get_dataset_view(f['Experimental Data/Data'])
+            self.assertIsInstance(lazy, fh.LazyDataset)
+            self.assertEqual(lazy.shape, (50, 4))
+            self.assertEqual(lazy.T.shape, (4, 50))
+            for key in [(slice(None), 1), (-1, ), (slice(-20, None), -2),
+                        (slice(None, None, -3), slice(1, 3))]:
+                np.testing.assert_array_equal(lazy[key], self.data[key])
+            for key in [(0, slice(None)), (slice(-2, None), slice(None)),
+                        (slice(3, 0, -1), 5)]:
+                np.testing.assert_array_equal(lazy.T[key], self.data.T[key])
+            np.testing.assert_array_equal(np.asarray(lazy.T), self.data.T)
+
+            shots = fh.get_dataset_view(f['Experimental Data/shots'])
+            # contiguous datasets are memory mapped
+            self.assertIsInstance(shots, np.memmap)
+            np.testing.assert_array_equal(shots, self.data[:, 2])
+
+    def test_read_only_analysis(self):
+        a = ma.MeasurementAnalysis(folder=self.folder, auto=False,
+                                   read_only=True)
+        self.assertEqual(a.data_file.mode, 'r')
+        a.get_naming_and_values()
+        np.testing.assert_array_equal(a.sweep_points, self.data[:, :2].T)
+        np.testing.assert_array_equal(a.measured_values, self.data[:, 2:].T)
+        shots = a.get_values('shots')
+        self.assertIsInstance(shots, np.memmap)
+        self.assertFalse(shots.flags.writeable)
+        np.testing.assert_array_equal(a.get_values('Q'), self.data[:, 3])
+
+        # Analysis results are stored in the side-car file
+        a.add_analysis_datagroup_to_file()
+        a.add_dataset_to_analysisgroup('mean_I', np.mean(self.data[:, 2]))
+        a.finish()
+        self.assertEqual(os.stat(self.filepath).st_mtime_ns, self.mtime)
+        with h5py.File(os.path.join(self.folder, 'analysis.hdf5'), 'r') as f:
+            self.assertAlmostEqual(f['Analysis/mean_I'][()],
+                                   np.mean(self.data[:, 2]))
+        with h5py.File(self.filepath, 'r') as f:
+            self.assertNotIn('Analysis', f)
+
+    def test_default_mode(self):
+        a = ma.MeasurementAnalysis(folder=self.folder, auto=False)
+        a.get_naming_and_values()
+        self.assertEqual(a.measured_values.dtype, np.float64)
+        np.testing.assert_array_almost_equal(a.measured_values,
+                                             self.data[:, 2:].T)
+        a.add_analysis_datagroup_to_file()
+        a.finish()
+        with h5py.File(self.filepath, 'r') as f:
+            self.assertIn('Analysis', f)
@@ -3,7 +3,10 @@ import unittest
 
 from pycqed.measurement.waveform_control.pulsar import Pulsar
 from pycqed.measurement.waveform_control import element
+from pycqed.measurement.waveform_control import pulse_library as pl
 from pycqed.measurement.pulse_sequences import single_qubit_tek_seq_elts as sqs
+from pycqed.measurement.waveform_control import sequence_cache
+from pycqed.tests.test_pulsar_element import FakeAWG
 
 
 class Test_SingleQubitTek(unittest.TestCase):
@@ -143,6 +146,131 @@ class Test_SingleQubitTek(unittest.TestCase):
                             t1 = el.effective_pulse_start_time(
                                 'pulse_1-0', 'ch1')
 
+    def test_batched_pulse_evaluation(self):
+        self.RO_pars['amplitude'] = .5
+        self.pulse_pars['phase'] = 30
+        self.pulse_pars['mod_frequency'] = 50e6
+        for phaselock in [False, True]:
+            self.pulse_pars['phaselock'] = phaselock
+            seq, el_list = sqs.Rabi_seq(np.linspace(-.5, .5, 11),
+                                        self.pulse_pars, self.RO_pars, n=2,
+                                        upload=False, return_seq=True)
+            ref_wfs = [el.normalized_waveforms()[1] for el in el_list]
+            pl.batch_evaluate_pulses(el_list)
+            for el, ref in zip(el_list, ref_wfs):
+                # Both DRAG pulses are evaluated in the batch
+                self.assertEqual(
+                    sorted(el.precomputed_wfs),
+                    ['SSB_DRAG_pulse_0-0', 'SSB_DRAG_pulse_1-0'])
+                wfs = el.normalized_waveforms()[1]
+                for ch in ref:
+                    np.testing.assert_array_equal(wfs[ch], ref[ch])
+
+        # Moving a pulse invalidates the precomputed waveform
+        el = el_list[3]
+        el.shift_all_pulses(1e-9)
+        ref = el.pulses['SSB_DRAG_pulse_0-0'].get_wfs(
+            {ch: el.pulse_tvals('SSB_DRAG_pulse_0-0', ch)
+             for ch in ['ch1', 'ch2']})
+        idx0, idx1 = el.pulse_sample_indices('SSB_DRAG_pulse_0-0', 'ch1')
+        wfs = el.ideal_waveforms()[1]
+        np.testing.assert_array_equal(wfs['ch1'][idx0:idx1], ref['ch1'])
+
+    def test_SSB_DRAG_pulse_batch(self):
+        tvals = 1e-9*np.arange(40) + np.array([[0], [13e-9], [101e-9]])
+        amps = [.1, -.3, .5]
+        motzois = [0, .5, -1]
+        phases = [0, 90, 270]
+        I_mod, Q_mod = pl.SSB_DRAG_pulse_batch(
+            tvals, amplitude=amps, motzoi=motzois, phase=phases,
+            sigma=10e-9, nr_sigma=4, mod_frequency=50e6, alpha=.9,
+            phi_skew=5)
+        for i in range(3):
+            pulse = pl.SSB_DRAG_pulse(
+                'p', 'ch1', 'ch2', amplitude=amps[i], motzoi=motzois[i],
+                phase=phases[i], sigma=10e-9, nr_sigma=4, mod_frequency=50e6,
+                alpha=.9, phi_skew=5)
+            np.testing.assert_array_almost_equal(
+                I_mod[i], pulse.chan_wf('ch1', tvals[i]), decimal=12)
+            np.testing.assert_array_almost_equal(
+                Q_mod[i], pulse.chan_wf('ch2', tvals[i]), decimal=12)
+
+
+class Test_SequenceCache(unittest.TestCase):
+
+    def setUp(self):
+        Test_SingleQubitTek.setUp(self)
+        self.RO_pars['amplitude'] = .5
+        sequence_cache.clear_sequence_cache()
+        self.pulsar.activate_channels = lambda channels: None
+        awg = FakeAWG()
+        self.pulsar.AWG = awg
+        self.sent = []
+        self.loaded = []
+        awg.stop = lambda: None
+        awg.send_awg_file = lambda filename, awg_file: self.sent.append(
+            filename)
+        awg.load_awg_file = lambda filename: self.loaded.append(filename)
+        sqs.station.components = {'AWG': awg}
+        self.times = np.linspace(0, 5e-6, 11)
+
+    def upload_T1(self, **kw):
+        return sequence_cache.upload_sequence(
+            sqs.T1_seq, times=self.times, pulse_pars=self.pulse_pars,
+            RO_pars=self.RO_pars, **kw)
+
+    def test_cached_sequence_is_reloaded(self):
+        self.upload_T1()
+        self.assertEqual(self.sent, ['T1_sequence_FILE.AWG'])
+        # an identical sequence is loaded without regenerating it
+        self.assertIsNone(self.upload_T1())
+        self.assertEqual(self.sent, ['T1_sequence_FILE.AWG'])
+        self.assertEqual(self.loaded, ['T1_sequence_FILE.AWG']*2)
+
+        # changes to the arguments or the channels are detected
+        self.pulse_pars = dict(self.pulse_pars, amplitude=.4)
+        self.upload_T1()
+        self.assertEqual(len(self.sent), 2)
+        self.pulsar.channels['ch1']['offset'] = .1
+        self.upload_T1()
+        self.assertEqual(len(self.sent), 3)
+        self.upload_T1()
+        self.assertEqual(len(self.sent), 3)
+        # the amplitudes of the AWG are read before the key is determined
+        self.pulsar.AWG.ch1_amp.value = 1.
+        self.upload_T1()
+        self.assertEqual(len(self.sent), 4)
+        self.assertEqual(self.pulsar.channels['ch1']['high'], .5)
+        # the sequencer config of the station is part of the key
+        sqs.station.sequencer_config = {'RO_fixed_point': 1e-6}
+        self.upload_T1()
+        self.assertEqual(len(self.sent), 5)
+        self.upload_T1()
+        self.assertEqual(len(self.sent), 5)
+
+        # the file is overwritten by an upload that is not cached
+        sqs.T1_seq(times=self.times[:5], pulse_pars=self.pulse_pars,
+                   RO_pars=self.RO_pars)
+        self.upload_T1()
+        self.assertEqual(len(self.sent), 7)
+
+        sequence_cache.use_sequence_cache = False
+        try:
+            self.upload_T1()
+        finally:
+            sequence_cache.use_sequence_cache = True
+        self.assertEqual(len(self.sent), 8)
+        # arguments that are not plain data are never cached
+        for i in range(2):
+            self.upload_T1(cal_points=Bunch())
+        self.assertEqual(len(self.sent), 10)
+        with self.assertRaises(sequence_cache.NotPlainData):
+            sequence_cache.sequence_key(sqs.T1_seq, {'pars': lambda: 1},
+                                        self.pulsar)
+        # sequences are always generated if they are returned
+        self.assertEqual(len(self.upload_T1(return_seq=True)[1]),
+                         len(self.times))
+
 
 class Bunch:
 
@@ -2,6 +2,7 @@ import os
 # import qt
 import h5py
 from pycqed.analysis import analysis_toolbox as a_tools
+from pycqed.measurement import hdf5_data as h5d
 import errno
 
 import sys
@@ -93,7 +94,7 @@ def load_settings_onto_instrument(instrument, load_from_instr=None, folder=None,
                     folder = folder
                 filepath = a_tools.measurement_filename(folder)
                 f = h5py.File(filepath, 'r')
-                sets_group = f['Instrument settings']
+                sets_group = h5d.read_instrument_settings(f)
                 if load_from_instr is None:
                     ins_group = sets_group[instrument_name]
                 else: